@@ -16,8 +16,9 @@ from app.core.auth import get_current_user
 from app.services.intent_service import classify_intent, Intent
 from app.api.v1.chat import get_chat_service
 from app.schemas.chat import ChatRequest
-from app.clients.deepseek_client import DeepSeekClient
+from app.clients.deepseek_client import get_llm_client
 from app.audit.audit_client import get_audit_client
+from app.audit.audit_queue import get_audit_queue
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -71,7 +72,7 @@ async def rag_answer(message: str) -> RagResult:
 
 async def llm_chat(message: str) -> str:
     """普通闲聊：不查库，直接 LLM 回复"""
-    client = DeepSeekClient()
+    client = get_llm_client()
     if not client.is_available:
         return "当前未配置 AI，仅支持故障类问题检索。请描述设备故障或报警现象。"
     system = (
@@ -108,11 +109,12 @@ async def chat(request: Request, req: ChatReq):
     """聊天入口：意图分类 -> RAG/闲聊 -> 返回"""
     start_time = time.time()
     audit = get_audit_client()
+    audit_queue = get_audit_queue()
 
     # 获取当前登录用户 ID（从 JWT token）
     user_id = await get_current_user(request)
 
-    # 1. 准备 conversation_id
+    # 1. 准备 conversation_id（唯一同步的审计调用，后续事件都走后台队列）
     conversation_id = req.conversation_id
     if not conversation_id and audit.is_enabled:
         conversation_id = await audit.start_conversation(
@@ -124,7 +126,7 @@ async def chat(request: Request, req: ChatReq):
     # 2. 记录 user message
     user_message_id: Optional[str] = None
     if audit.is_enabled and conversation_id:
-        user_message_id = await audit.append_message(
+        user_message_id = audit_queue.append_message(
             conversation_id=conversation_id,
             role="user",
             content=req.message,
@@ -168,7 +170,7 @@ async def chat(request: Request, req: ChatReq):
     # 5. 记录 assistant message
     assistant_message_id: Optional[str] = None
     if audit.is_enabled and conversation_id:
-        assistant_message_id = await audit.append_message(
+        assistant_message_id = audit_queue.append_message(
             conversation_id=conversation_id,
             role="assistant",
             content=answer,
@@ -176,7 +178,7 @@ async def chat(request: Request, req: ChatReq):
     
     # 6. 记录决策（关联到 user message）
     if audit.is_enabled and user_message_id:
-        await audit.log_decision(
+        audit_queue.log_decision(
             message_id=user_message_id,
             intent_type=intent_res.intent.value,
             confidence=intent_res.confidence,
@@ -188,12 +190,12 @@ async def chat(request: Request, req: ChatReq):
     
     # 7. 记录 RAG 检索（如果有）
     if audit.is_enabled and user_message_id and docs:
-        await audit.log_retrieval(message_id=user_message_id, docs=docs)
+        audit_queue.log_retrieval(message_id=user_message_id, docs=docs)
     
     # 8. 记录响应（关联到 assistant message）
     response_time_ms = int((time.time() - start_time) * 1000)
     if audit.is_enabled and assistant_message_id:
-        await audit.log_response(
+        audit_queue.log_response(
             message_id=assistant_message_id,
             final_answer=answer,
             response_time_ms=response_time_ms,
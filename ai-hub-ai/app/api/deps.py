@@ -3,6 +3,7 @@ from functools import lru_cache
 
 from app.core.config import settings
 from app.infra.db.sqlserver import SqlServer
+from app.infra.embedding.cached_embedder import CachedEmbedder
 from app.infra.embedding.fake_embedder import FakeEmbedder
 from app.infra.embedding.openai_embedder import OpenAIEmbedder
 from app.infra.vectorstore.chroma_store import ChromaVectorStore
@@ -22,11 +23,24 @@ def get_vector_store() -> ChromaVectorStore:
     return ChromaVectorStore()
 
 
+@lru_cache
+def get_base_embedder():
+    """不带查询缓存的 embedder：批量 / 增量写向量用，文档向量不挤占查询缓存"""
+    return OpenAIEmbedder() if settings.EMBEDDING_PROVIDER == "openai" else FakeEmbedder()
+
+
 @lru_cache
 def get_embedder():
-    if settings.EMBEDDING_PROVIDER == "openai":
-        return OpenAIEmbedder()
-    return FakeEmbedder()
+    """检索用：重复问题命中缓存"""
+    embedder = get_base_embedder()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embedder
+    return CachedEmbedder(
+        embedder,
+        max_size=settings.EMBEDDING_CACHE_MAX_SIZE,
+        ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+        persist_path=settings.EMBEDDING_CACHE_PERSIST_PATH or None,
+    )
 
 
 @lru_cache
@@ -41,7 +55,7 @@ def get_vec_repo() -> VectorRepository:
 
 @lru_cache
 def get_ingest_service() -> IngestService:
-    return IngestService(get_kb_repo(), get_vec_repo(), get_embedder())
+    return IngestService(get_kb_repo(), get_vec_repo(), get_base_embedder())
 
 
 @lru_cache
@@ -1,8 +1,8 @@
 """审计状态自检接口：用于排查「域名访问客服无审计记录」"""
-import httpx
 from fastapi import APIRouter
 
 from app.audit.audit_client import get_audit_client
+from app.clients.http_clients import get_async_http_client
 
 router = APIRouter(tags=["审计"])
 
@@ -37,9 +37,8 @@ async def audit_status():
     # 检查是否能连上 .NET（只访问根路径，不涉及 internal API）
     dotnet_reachable = None
     try:
-        async with httpx.AsyncClient() as http_client:
-            r = await http_client.get(base_url, timeout=2.0)
-            dotnet_reachable = r.status_code in (200, 302, 404)
+        r = await get_async_http_client("dotnet").get(base_url, timeout=2.0)
+        dotnet_reachable = r.status_code in (200, 302, 404)
     except Exception:
         dotnet_reachable = False
 
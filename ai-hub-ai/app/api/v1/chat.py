@@ -9,6 +9,7 @@ from app.core.config import settings
 from app.core.logging_config import get_logger
 from app.api.deps import get_query_service, get_kb_repo
 from app.audit.audit_client import get_audit_client
+from app.audit.audit_queue import get_audit_queue
 from app.core.auth import get_current_user
 
 logger = get_logger(__name__)
@@ -69,6 +70,7 @@ async def search_and_answer(
     """
     start_time = time.time()
     audit = get_audit_client()
+    audit_queue = get_audit_queue()
     service = get_chat_service()
 
     # 1. 准备用户ID（从认证头获取，如果有的话）
@@ -77,7 +79,7 @@ async def search_and_answer(
         # 如果有JWT token，使用它作为user_id
         current_user_id = f"jwt_{authorization.split(' ')[1][:8]}"
 
-    # 2. 准备 conversation_id
+    # 2. 准备 conversation_id（唯一同步的审计调用，后续事件都走后台队列）
     conversation_id = request.conversation_id
     if not conversation_id and audit.is_enabled:
         conversation_id = await audit.start_conversation(
@@ -89,7 +91,7 @@ async def search_and_answer(
     # 2. 记录 user message
     user_message_id: Optional[str] = None
     if audit.is_enabled and conversation_id:
-        user_message_id = await audit.append_message(
+        user_message_id = audit_queue.append_message(
             conversation_id=conversation_id,
             role="user",
             content=request.question,
@@ -117,7 +119,7 @@ async def search_and_answer(
         # 4. 记录 assistant message
         assistant_message_id: Optional[str] = None
         if audit.is_enabled and conversation_id and response:
-            assistant_message_id = await audit.append_message(
+            assistant_message_id = audit_queue.append_message(
                 conversation_id=conversation_id,
                 role="assistant",
                 content=response.short_answer_text,
@@ -138,7 +140,7 @@ async def search_and_answer(
             if not use_knowledge or response.confidence < 0.5:
                 fallback_reason = "no_match" if not use_knowledge else "low_confidence"
             
-            await audit.log_decision(
+            audit_queue.log_decision(
                 message_id=user_message_id,
                 intent_type=intent_type,
                 confidence=response.confidence,
@@ -159,11 +161,11 @@ async def search_and_answer(
                 }
                 for i, doc in enumerate(response.cited_docs)
             ]
-            await audit.log_retrieval(message_id=user_message_id, docs=docs)
+            audit_queue.log_retrieval(message_id=user_message_id, docs=docs)
         
         # 7. 记录响应
         if audit.is_enabled and assistant_message_id:
-            await audit.log_response(
+            audit_queue.log_response(
                 message_id=assistant_message_id,
                 final_answer=response.short_answer_text if response else None,
                 response_time_ms=response_time_ms,
@@ -3,8 +3,9 @@ import traceback
 from typing import Optional
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 
-from app.schemas.excel import ExcelImportResponse
+from app.schemas.excel import ExcelImportResponse, ImportJobResponse
 from app.services.excel_import_service import ExcelImportService
+from app.services.import_jobs import get_import_job_manager
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -29,21 +30,51 @@ async def import_excel(
     device_type: Optional[str] = Form(None),
 ):
     """
-    导入 Excel 文件为知识条目
+    导入 Excel 文件为知识条目（同步等待结果，兼容旧调用方）
     - 接收 .xlsx 文件
     - 可选表单字段 device_type：造型机、浇注机、抛丸机、通用（或标准码），写入每条知识的适用范围
     - 每行映射为一条知识草稿
     - 调用 .NET 批量创建文章与附件
+    大文件建议改用 POST /import/excel/jobs 后台导入并轮询进度
     """
     logger.info("收到 Excel 导入请求: %s device_type=%s", file.filename or "", device_type)
-    service = get_excel_service()
+    manager = get_import_job_manager()
     try:
         contents = await file.read()
-        return await service.import_excel(
-            contents, file.filename or "unknown.xlsx", device_type=device_type
-        )
+        job = manager.submit(get_excel_service(), contents, file.filename or "unknown.xlsx", device_type)
+        await manager.wait(job)
     except HTTPException:
         raise
     except Exception as e:
         logger.error("导入失败: %s\n%s", e, traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
+    if job.error is not None:
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    return job.result
+
+
+@router.post("/import/excel/jobs", response_model=ImportJobResponse, status_code=202)
+async def submit_import_job(
+    file: UploadFile = File(...),
+    device_type: Optional[str] = Form(None),
+):
+    """
+    提交后台导入任务，立即返回 job_id
+    - 参数同 POST /import/excel
+    - 通过 GET /import/excel/jobs/{job_id} 轮询进度与结果
+    """
+    logger.info("收到 Excel 后台导入请求: %s device_type=%s", file.filename or "", device_type)
+    contents = await file.read()
+    job = get_import_job_manager().submit(
+        get_excel_service(), contents, file.filename or "unknown.xlsx", device_type
+    )
+    return job.to_dict()
+
+
+@router.get("/import/excel/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(job_id: str):
+    """查询导入任务：status、各阶段行数；结束后 result / error 有值，保留一段时间后清理"""
+    job = get_import_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在或已过期")
+    return job.to_dict()
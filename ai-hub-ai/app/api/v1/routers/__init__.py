@@ -1,10 +1,12 @@
-"""v1 子路由汇聚：health / ingest / query，挂到 /api/v1 下"""
+"""v1 子路由汇聚：health / ingest / query / metrics，挂到 /api/v1 下"""
 from fastapi import APIRouter
 from .health import router as health_router
 from .ingest import router as ingest_router
 from .query import router as query_router
+from .metrics import router as metrics_router
 
 router = APIRouter()
 router.include_router(health_router)
 router.include_router(ingest_router)
 router.include_router(query_router)
+router.include_router(metrics_router)
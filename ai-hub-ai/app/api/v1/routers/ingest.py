@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Query
 from app.api.deps import get_ingest_service
 from app.core.config import settings
+from app.services.kb_sync import get_kb_sync
 from app.schemas.ingest import (
     IngestArticleResponse,
     IngestBatchRequest,
@@ -14,7 +15,7 @@ router = APIRouter(tags=["ingest"])
 
 @router.post("/ingest/article/{article_id}", response_model=IngestArticleResponse)
 def ingest_article(article_id: int):
-    """重建单条向量：删旧 → 重新拆分 → 重新写入"""
+    """重建单条向量：重新拆分 → 与现有向量比对 → 只重写内容变化的部分（upserted 为重新写入的条数）"""
     svc = get_ingest_service()
     upserted = svc.rebuild_article(article_id)
     return IngestArticleResponse(article_id=article_id, upserted=upserted)
@@ -33,8 +34,8 @@ def ingest_batch(req: IngestBatchRequest):
 @router.post("/ingest/clear")
 def ingest_clear():
     """
-    仅清空向量库（删除集合并重建空集合）。
-    若要做全量覆盖，可直接用 POST /ingest/all 且 body 里 clear_first: true，无需先调本接口。
+    仅清空向量库（删除集合并重建空集合），清空后到重新写入前检索为空。
+    若要做全量覆盖，用 POST /ingest/all 且 body 里 clear_first: true（写影子集合后切换，检索不中断），无需先调本接口。
     """
     svc = get_ingest_service()
     svc.clear_vector_collection()
@@ -44,8 +45,9 @@ def ingest_clear():
 @router.post("/ingest/all", response_model=IngestBatchResponse)
 def ingest_all(req: IngestAllRequest):
     """
-    全量重建：从 SQL 拉取 id 列表，再批量重建。
-    请求体里传 clear_first: true 可先清空向量库再写入，实现全量覆盖（主库更新后必用，避免旧 article_id 导致检索到空）。
+    全量重建：从 SQL 分页读取，再批量重建。
+    请求体里传 clear_first: true 实现全量覆盖（主库更新后必用，避免旧 article_id 导致检索到空）：
+    写入新版本的影子集合，当前集合照常服务检索，校验通过后原子切换，结果见 swap。
     """
     svc = get_ingest_service()
     tenant_id = req.tenant_id or settings.DEFAULT_TENANT
@@ -58,6 +60,33 @@ def ingest_all(req: IngestAllRequest):
     return IngestBatchResponse(**result)
 
 
+@router.get("/ingest/collections")
+def ingest_collections():
+    """当前 / 上一版本 / 构建中的向量集合"""
+    return get_ingest_service().collection_info()
+
+
+@router.post("/ingest/rollback")
+def ingest_rollback():
+    """切回上一版本向量集合（全量重建切换后发现检索异常时用；再调一次可切回来）"""
+    try:
+        return {"ok": True, **get_ingest_service().rollback_collection()}
+    except ValueError as e:
+        return {"ok": False, "message": str(e)}
+
+
+@router.post("/ingest/sync")
+def ingest_sync():
+    """
+    立即执行一轮增量同步：从上次水位起把主库新增 / 修改的条目写入向量库，软删除的条目删除向量。
+    后台同步（KB_SYNC_ENABLED=true）之外也可手动触发；已有一轮在跑时返回 running: true
+    """
+    result = get_kb_sync().sync_once()
+    if "failed" in result:
+        result["failed"] = len(result["failed"])
+    return result
+
+
 @router.get("/ingest/debug/count")
 def ingest_debug_count(
     tenant_id: str | None = Query(None, description="租户 ID，不传则用配置的 DEFAULT_TENANT"),
@@ -0,0 +1,37 @@
+"""运行指标：缓存命中率等，便于观察性能优化效果"""
+from fastapi import APIRouter
+from app.api.deps import get_embedder
+from app.audit.audit_queue import get_audit_queue
+from app.infra.embedding.embedding_store import get_embedding_store_stats
+from app.clients.http_clients import get_http_registry
+from app.services.attachment_service import get_attachment_index_stats
+from app.services.chat_service import get_speculation_stats
+from app.services.import_jobs import get_import_job_manager
+from app.services.ingest_pipeline import get_ingest_pipeline_stats
+from app.services.intent_service import get_intent_engine
+from app.services.kb_sync import get_kb_sync_stats
+from app.services.reference_resolver import get_reference_resolver_stats
+from app.infra.db.pool import get_pool
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def metrics():
+    """GET /metrics - 各缓存/队列的运行统计"""
+    embedder = get_embedder()
+    stats = getattr(embedder, "stats", None)
+    return {
+        "embedding_cache": stats() if callable(stats) else {"enabled": False},
+        "db_pool": get_pool().stats(),
+        "audit_queue": get_audit_queue().stats(),
+        "http_clients": get_http_registry().stats(),
+        "intent": get_intent_engine().stats(),
+        "speculative_retrieval": get_speculation_stats(),
+        "attachment_index": get_attachment_index_stats(),
+        "reference_resolver": get_reference_resolver_stats(),
+        "import_jobs": get_import_job_manager().stats(),
+        "ingest_pipeline": get_ingest_pipeline_stats(),
+        "embedding_store": get_embedding_store_stats(),
+        "kb_sync": get_kb_sync_stats(),
+    }
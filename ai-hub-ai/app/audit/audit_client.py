@@ -1,6 +1,7 @@
 """审计客户端：调用 .NET internal audit API"""
 import httpx
 from typing import Optional, List
+from app.clients.http_clients import get_async_http_client
 from app.core.config import settings
 from app.core.logging_config import get_logger
 from app.audit.models import (
@@ -17,11 +18,99 @@ from app.audit.models import (
 
 logger = get_logger(__name__)
 
+# 事件类型 -> .NET internal API 路径（AuditQueue 后台批量发送时也用这张表）
+EVENT_PATHS = {
+    "message": "/internal/ai-audit/message",
+    "decision": "/internal/ai-audit/decision",
+    "retrieval": "/internal/ai-audit/retrieval",
+    "response": "/internal/ai-audit/response",
+    "end": "/internal/ai-audit/conversation/end",
+}
+
+
+def message_payload(
+    conversation_id: str,
+    role: str,
+    content: str,
+    is_masked: bool = False,
+    masked_content: Optional[str] = None,
+    message_id: Optional[str] = None,
+) -> dict:
+    """追加消息请求体；message_id 由调用方预生成时 .NET 直接使用该 ID"""
+    return {
+        "conversationId": conversation_id,
+        "messageId": message_id,
+        "role": role,
+        "content": content,
+        "isMasked": is_masked,
+        "maskedContent": masked_content,
+    }
+
+
+def decision_payload(
+    message_id: str,
+    intent_type: str,
+    confidence: float,
+    model_name: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    use_knowledge: bool = False,
+    fallback_reason: Optional[str] = None,
+    tokens_in: Optional[int] = None,
+    tokens_out: Optional[int] = None,
+) -> dict:
+    return {
+        "messageId": message_id,
+        "intentType": intent_type,
+        "confidence": confidence,
+        "modelName": model_name,
+        "promptVersion": prompt_version,
+        "useKnowledge": use_knowledge,
+        "fallbackReason": fallback_reason,
+        "tokensIn": tokens_in,
+        "tokensOut": tokens_out,
+    }
+
+
+def retrieval_payload(message_id: str, docs: List[dict]) -> dict:
+    """docs 格式：[{doc_id, doc_title, score, rank, chunk_id}]"""
+    return {
+        "messageId": message_id,
+        "docs": [
+            {
+                "docId": str(d.get("doc_id") or d.get("article_id") or ""),
+                "docTitle": d.get("doc_title") or d.get("title"),
+                "score": float(d.get("score", 0)),
+                "rank": int(d.get("rank", i + 1)),
+                "chunkId": d.get("chunk_id") or d.get("hit_type"),
+            }
+            for i, d in enumerate(docs)
+        ],
+    }
+
+
+def response_payload(
+    message_id: str,
+    final_answer: Optional[str],
+    response_time_ms: int,
+    is_success: bool = True,
+    error_type: Optional[str] = None,
+    error_detail: Optional[str] = None,
+) -> dict:
+    return {
+        "messageId": message_id,
+        "finalAnswer": final_answer,
+        "responseTimeMs": response_time_ms,
+        "isSuccess": is_success,
+        "errorType": error_type,
+        "errorDetail": error_detail,
+    }
+
 
 class AuditClient:
     """审计日志客户端：封装 .NET internal API 调用"""
 
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self._http_client = http_client
         self._base_url = (settings.DOTNET_BASE_URL or "http://localhost:5000").rstrip("/")
         self._token = settings.INTERNAL_TOKEN or ""
         self._enabled = getattr(settings, "ENABLE_AUDIT_LOG", True)
@@ -49,6 +138,23 @@ class AuditClient:
             "X-Internal-Token": self._token,
         }
 
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        """注入的客户端优先，否则用 lifespan 管理的 dotnet 共享连接池"""
+        return self._http_client or get_async_http_client("dotnet")
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        """POST 到 .NET internal API，返回响应 JSON（无内容时为空 dict）；HTTP 错误直接抛出"""
+        resp = await self._http.post(
+            f"{self._base_url}{path}", json=payload, headers=self._headers(), timeout=self._timeout
+        )
+        resp.raise_for_status()
+        return resp.json() if resp.content else {}
+
+    async def send_event(self, kind: str, payload: dict) -> dict:
+        """按事件类型发送（供 AuditQueue 后台 worker 使用），失败抛异常由调用方决定重试/丢弃"""
+        return await self._post(EVENT_PATHS[kind], payload)
+
     async def start_conversation(
         self,
         tenant_id: str = "default",
@@ -71,14 +177,13 @@ class AuditClient:
 
         try:
             logger.info("调用审计 API 创建会话: %s", url)
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                logger.info("审计 API 响应: status=%d", resp.status_code)
-                resp.raise_for_status()
-                data = resp.json()
-                conv_id = data.get("conversationId")
-                logger.info("创建会话成功: %s", conv_id)
-                return conv_id
+            resp = await self._http.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
+            logger.info("审计 API 响应: status=%d", resp.status_code)
+            resp.raise_for_status()
+            data = resp.json()
+            conv_id = data.get("conversationId")
+            logger.info("创建会话成功: %s", conv_id)
+            return conv_id
         except httpx.HTTPStatusError as e:
             logger.error("创建会话失败 (HTTP %d): %s", e.response.status_code, e.response.text)
             return None
@@ -99,28 +204,18 @@ class AuditClient:
         content: str,
         is_masked: bool = False,
         masked_content: Optional[str] = None,
+        message_id: Optional[str] = None,
     ) -> Optional[str]:
         """追加消息，返回 message_id；失败返回 None"""
         if not self.is_enabled or not conversation_id:
             return None
 
-        url = f"{self._base_url}/internal/ai-audit/message"
-        payload = {
-            "conversationId": conversation_id,
-            "role": role,
-            "content": content,
-            "isMasked": is_masked,
-            "maskedContent": masked_content,
-        }
-
+        payload = message_payload(conversation_id, role, content, is_masked, masked_content, message_id)
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                resp.raise_for_status()
-                data = resp.json()
-                msg_id = data.get("messageId")
-                logger.debug("追加消息: %s, role=%s", msg_id, role)
-                return msg_id
+            data = await self._post(EVENT_PATHS["message"], payload)
+            msg_id = data.get("messageId")
+            logger.debug("追加消息: %s, role=%s", msg_id, role)
+            return msg_id
         except Exception as e:
             logger.warning("追加消息失败: %s", e)
             return None
@@ -141,25 +236,14 @@ class AuditClient:
         if not self.is_enabled or not message_id:
             return False
 
-        url = f"{self._base_url}/internal/ai-audit/decision"
-        payload = {
-            "messageId": message_id,
-            "intentType": intent_type,
-            "confidence": confidence,
-            "modelName": model_name,
-            "promptVersion": prompt_version,
-            "useKnowledge": use_knowledge,
-            "fallbackReason": fallback_reason,
-            "tokensIn": tokens_in,
-            "tokensOut": tokens_out,
-        }
-
+        payload = decision_payload(
+            message_id, intent_type, confidence, model_name, prompt_version,
+            use_knowledge, fallback_reason, tokens_in, tokens_out,
+        )
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                resp.raise_for_status()
-                logger.debug("记录决策: msg=%s, intent=%s", message_id, intent_type)
-                return True
+            await self._post(EVENT_PATHS["decision"], payload)
+            logger.debug("记录决策: msg=%s, intent=%s", message_id, intent_type)
+            return True
         except Exception as e:
             logger.warning("记录决策失败: %s", e)
             return False
@@ -173,27 +257,10 @@ class AuditClient:
         if not self.is_enabled or not message_id:
             return False
 
-        url = f"{self._base_url}/internal/ai-audit/retrieval"
-        payload = {
-            "messageId": message_id,
-            "docs": [
-                {
-                    "docId": str(d.get("doc_id") or d.get("article_id") or ""),
-                    "docTitle": d.get("doc_title") or d.get("title"),
-                    "score": float(d.get("score", 0)),
-                    "rank": int(d.get("rank", i + 1)),
-                    "chunkId": d.get("chunk_id") or d.get("hit_type"),
-                }
-                for i, d in enumerate(docs)
-            ],
-        }
-
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                resp.raise_for_status()
-                logger.debug("记录检索: msg=%s, docs=%d", message_id, len(docs))
-                return True
+            await self._post(EVENT_PATHS["retrieval"], retrieval_payload(message_id, docs))
+            logger.debug("记录检索: msg=%s, docs=%d", message_id, len(docs))
+            return True
         except Exception as e:
             logger.warning("记录检索失败: %s", e)
             return False
@@ -211,22 +278,13 @@ class AuditClient:
         if not self.is_enabled or not message_id:
             return False
 
-        url = f"{self._base_url}/internal/ai-audit/response"
-        payload = {
-            "messageId": message_id,
-            "finalAnswer": final_answer,
-            "responseTimeMs": response_time_ms,
-            "isSuccess": is_success,
-            "errorType": error_type,
-            "errorDetail": error_detail,
-        }
-
+        payload = response_payload(
+            message_id, final_answer, response_time_ms, is_success, error_type, error_detail
+        )
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                resp.raise_for_status()
-                logger.debug("记录响应: msg=%s, time=%dms", message_id, response_time_ms)
-                return True
+            await self._post(EVENT_PATHS["response"], payload)
+            logger.debug("记录响应: msg=%s, time=%dms", message_id, response_time_ms)
+            return True
         except Exception as e:
             logger.warning("记录响应失败: %s", e)
             return False
@@ -236,15 +294,10 @@ class AuditClient:
         if not self.is_enabled or not conversation_id:
             return False
 
-        url = f"{self._base_url}/internal/ai-audit/conversation/end"
-        payload = {"conversationId": conversation_id}
-
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=self._headers(), timeout=self._timeout)
-                resp.raise_for_status()
-                logger.debug("结束会话: %s", conversation_id)
-                return True
+            await self._post(EVENT_PATHS["end"], {"conversationId": conversation_id})
+            logger.debug("结束会话: %s", conversation_id)
+            return True
         except Exception as e:
             logger.warning("结束会话失败: %s", e)
             return False
@@ -0,0 +1,371 @@
+"""
+审计后台队列：对话接口只把审计事件放入进程内队列，由后台 worker 批量异步发送到 .NET
+- 接口路径上只保留 start_conversation（需要返回 conversation_id），其余事件不再 await
+- message_id 由本端预生成（uuid4）并随追加消息请求下发，后续决策/检索/响应直接引用
+- 队列有界；满了按 AUDIT_OVERFLOW_POLICY 丢弃（drop）或落盘（spill），空闲时自动回放落盘事件
+- 每批先发消息再发依赖消息的事件，保证 .NET 侧外键先后顺序；消息本身失败重排或尚未发出时，
+  依赖它的事件一并排到它后面（不计重试次数）
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from app.audit.audit_client import (
+    AuditClient,
+    decision_payload,
+    get_audit_client,
+    message_payload,
+    response_payload,
+    retrieval_payload,
+)
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 本端 message_id -> .NET 实际返回的 message_id（兼容未支持预生成 ID 的旧版 .NET）
+_ID_MAP_MAX = 10000
+
+
+class AuditQueue:
+    """有界审计事件队列 + 后台批量发送 worker"""
+
+    def __init__(
+        self,
+        client: Optional[AuditClient] = None,
+        max_size: int = 5000,
+        batch_size: int = 50,
+        flush_interval: float = 0.2,
+        max_attempts: int = 3,
+        send_concurrency: int = 8,
+        overflow_policy: str = "drop",
+        spill_path: str = "",
+    ) -> None:
+        self._client = client or get_audit_client()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_size))
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.0, flush_interval)
+        self._max_attempts = max(1, max_attempts)
+        self._send_sem = asyncio.Semaphore(max(1, send_concurrency))
+        self._policy = (overflow_policy or "drop").lower()
+        self._spill_path = spill_path or ""
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._failed_streak = 0
+        self._id_map: "OrderedDict[str, str]" = OrderedDict()
+        # 已入队但尚未发成功（也未放弃）的消息 message_id
+        self._pending_messages: set = set()
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "deferred": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "batches": 0,
+        }
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._client.is_enabled
+
+    # ---------- 入队接口（同步、不做网络 IO） ----------
+
+    def append_message(
+        self,
+        conversation_id: Optional[str],
+        role: str,
+        content: str,
+        is_masked: bool = False,
+        masked_content: Optional[str] = None,
+    ) -> Optional[str]:
+        """追加消息入队，立即返回预生成的 message_id；审计未启用时返回 None"""
+        if not conversation_id or not self.is_enabled:
+            return None
+        message_id = str(uuid.uuid4())
+        self._put("message", message_payload(conversation_id, role, content, is_masked, masked_content, message_id))
+        return message_id
+
+    def log_decision(
+        self,
+        message_id: Optional[str],
+        intent_type: str,
+        confidence: float,
+        model_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        use_knowledge: bool = False,
+        fallback_reason: Optional[str] = None,
+        tokens_in: Optional[int] = None,
+        tokens_out: Optional[int] = None,
+    ) -> None:
+        if not message_id or not self.is_enabled:
+            return
+        self._put("decision", decision_payload(
+            message_id, intent_type, confidence, model_name, prompt_version,
+            use_knowledge, fallback_reason, tokens_in, tokens_out,
+        ))
+
+    def log_retrieval(self, message_id: Optional[str], docs: List[dict]) -> None:
+        if not message_id or not self.is_enabled:
+            return
+        self._put("retrieval", retrieval_payload(message_id, docs))
+
+    def log_response(
+        self,
+        message_id: Optional[str],
+        final_answer: Optional[str],
+        response_time_ms: int,
+        is_success: bool = True,
+        error_type: Optional[str] = None,
+        error_detail: Optional[str] = None,
+    ) -> None:
+        if not message_id or not self.is_enabled:
+            return
+        self._put("response", response_payload(
+            message_id, final_answer, response_time_ms, is_success, error_type, error_detail
+        ))
+
+    def end_conversation(self, conversation_id: Optional[str]) -> None:
+        if not conversation_id or not self.is_enabled:
+            return
+        self._put("end", {"conversationId": conversation_id})
+
+    # ---------- 生命周期 ----------
+
+    async def start(self) -> None:
+        """启动后台 worker（lifespan 启动时调用；首次入队时也会自动启动）"""
+        self._stopping = False
+        self._spawn_worker()
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中已有事件全部处理完，返回是否在超时前完成"""
+        if self._queue.empty():
+            return True
+        # 不经 start()：stop() 途中 flush 不能清掉 _stopping
+        self._spawn_worker()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """关闭：尽量发完剩余事件，超时后剩余事件按溢出策略落盘或丢弃"""
+        self._stopping = True
+        await self.flush(timeout)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        while not self._queue.empty():
+            self._overflow(self._queue.get_nowait())
+            self._queue.task_done()
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        s["queue_size"] = self._queue.qsize()
+        s["max_size"] = self._queue.maxsize
+        s["overflow_policy"] = self._policy
+        s["running"] = self._task is not None and not self._task.done()
+        return s
+
+    # ---------- 内部实现 ----------
+
+    def _put(self, kind: str, payload: dict) -> None:
+        self._ensure_worker()
+        event = {"kind": kind, "payload": payload, "attempts": 0}
+        try:
+            self._queue.put_nowait(event)
+            self._stats["enqueued"] += 1
+            self._track(event)
+        except asyncio.QueueFull:
+            self._overflow(event)
+
+    def _track(self, event: dict) -> None:
+        if event.get("kind") == "message" and event["payload"].get("messageId"):
+            self._pending_messages.add(event["payload"]["messageId"])
+
+    def _spawn_worker(self) -> None:
+        """没有在跑的 worker 时创建；关闭途中不回放落盘事件（_replay_spill 内判断）"""
+        if self._task is None or self._task.done():
+            self._replay_spill()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _ensure_worker(self) -> None:
+        if self._stopping or (self._task is not None and not self._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 无事件循环（脚本/同步测试）：事件先留在队列，由 start()/flush() 发送
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                logger.warning("审计批量发送异常: %s", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if self._failed_streak:
+                # .NET 不可达时退避，避免空转重试
+                await asyncio.sleep(min(0.5 * self._failed_streak, 5.0))
+            if self._queue.empty():
+                self._replay_spill()
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send_batch(self, batch: List[dict]) -> None:
+        """
+        先发追加消息，再发依赖 message_id 的决策/检索/响应；
+        所属消息仍未发成功（本批失败已重排，或还在队列里）的事件排回队尾，不计重试次数
+        """
+        messages = [e for e in batch if e["kind"] == "message"]
+        results: List[bool] = []
+        if messages:
+            results += await asyncio.gather(*(self._send(e) for e in messages))
+        others: List[dict] = []
+        for e in batch:
+            if e["kind"] == "message":
+                continue
+            if e["payload"].get("messageId") in self._pending_messages:
+                self._stats["deferred"] += 1
+                self._requeue(e)
+            else:
+                others.append(e)
+        if others:
+            results += await asyncio.gather(*(self._send(e) for e in others))
+        self._stats["batches"] += 1
+        if results:
+            self._failed_streak = self._failed_streak + 1 if not any(results) else 0
+
+    async def _send(self, event: dict) -> bool:
+        kind = event["kind"]
+        payload = event["payload"]
+        local_id = payload.get("messageId")
+        if kind != "message" and local_id in self._id_map:
+            payload["messageId"] = self._id_map[local_id]
+        try:
+            async with self._send_sem:
+                data = await self._client.send_event(kind, payload)
+        except Exception as e:
+            event["attempts"] += 1
+            if event["attempts"] < self._max_attempts and not self._stopping:
+                self._stats["retried"] += 1
+                self._requeue(event)
+            else:
+                self._stats["failed"] += 1
+                self._pending_messages.discard(local_id)
+                logger.warning("审计事件发送失败，已放弃: kind=%s, err=%s", kind, e)
+            return False
+        self._stats["sent"] += 1
+        if kind == "message":
+            self._pending_messages.discard(local_id)
+        if kind == "message" and local_id:
+            server_id = str((data or {}).get("messageId") or "")
+            if server_id and server_id.lower() != local_id.lower():
+                self._id_map[local_id] = server_id
+                while len(self._id_map) > _ID_MAP_MAX:
+                    self._id_map.popitem(last=False)
+        return True
+
+    def _requeue(self, event: dict) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflow(event)
+
+    def _overflow(self, event: dict) -> None:
+        # 离开内存队列的消息不再阻挡依赖它的事件（否则它们会一直排回队尾）
+        if event.get("kind") == "message":
+            self._pending_messages.discard(event["payload"].get("messageId"))
+        if self._policy == "spill" and self._spill_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self._spill_path)), exist_ok=True)
+                with open(self._spill_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._stats["spilled"] += 1
+                return
+            except OSError as e:
+                logger.warning("审计事件落盘失败，改为丢弃: %s", e)
+        self._stats["dropped"] += 1
+        if self._stats["dropped"] % 100 == 1:
+            logger.warning(
+                "审计队列已满（%d），丢弃事件 kind=%s，累计丢弃 %d",
+                self._queue.maxsize, event.get("kind"), self._stats["dropped"],
+            )
+
+    def _replay_spill(self) -> None:
+        """队列空闲时回放落盘事件；回放途中队列再满则剩余事件重新落盘"""
+        if self._stopping or not self._spill_path or not os.path.exists(self._spill_path):
+            return
+        replay_path = self._spill_path + ".replay"
+        try:
+            os.replace(self._spill_path, replay_path)
+        except OSError:
+            return
+        try:
+            with open(replay_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event: Any = json.loads(line)
+                    except ValueError:
+                        continue
+                    try:
+                        self._queue.put_nowait(event)
+                        self._stats["replayed"] += 1
+                        self._track(event)
+                    except asyncio.QueueFull:
+                        self._overflow(event)
+            os.remove(replay_path)
+        except OSError as e:
+            logger.warning("审计落盘事件回放失败: %s", e)
+
+
+# 单例
+_audit_queue: Optional[AuditQueue] = None
+
+
+def get_audit_queue() -> AuditQueue:
+    """获取审计队列单例"""
+    global _audit_queue
+    if _audit_queue is None:
+        _audit_queue = AuditQueue(
+            max_size=settings.AUDIT_QUEUE_MAX_SIZE,
+            batch_size=settings.AUDIT_BATCH_SIZE,
+            flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+            max_attempts=settings.AUDIT_MAX_ATTEMPTS,
+            send_concurrency=settings.AUDIT_SEND_CONCURRENCY,
+            overflow_policy=settings.AUDIT_OVERFLOW_POLICY,
+            spill_path=settings.AUDIT_SPILL_PATH,
+        )
+    return _audit_queue
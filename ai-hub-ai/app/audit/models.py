@@ -21,6 +21,7 @@ class StartConversationResponse(BaseModel):
 class AppendMessageRequest(BaseModel):
     """追加消息请求"""
     conversationId: str
+    messageId: Optional[str] = None  # 本端预生成的 UUID，不传则由 .NET 生成
     role: str = "user"  # user/assistant/system
     content: str = ""
     isMasked: bool = False
@@ -1,5 +1,5 @@
 # 外部服务客户端
 from app.clients.dotnet_client import DotnetClient
-from app.clients.deepseek_client import DeepSeekClient
+from app.clients.deepseek_client import DeepSeekClient, get_llm_client
 
-__all__ = ["DotnetClient", "DeepSeekClient"]
+__all__ = ["DotnetClient", "DeepSeekClient", "get_llm_client"]
@@ -7,6 +7,7 @@ from typing import List, Optional
 import httpx
 from openai import AsyncOpenAI
 
+from app.clients.http_clients import get_async_http_client
 from app.core.config import settings
 from app.core.logging_config import get_logger
 
@@ -30,13 +31,18 @@ class DeepSeekClient:
         base_url: Optional[str] = None,
         model: Optional[str] = None,
         timeout: float = 30.0,
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
+        self._http_client = http_client
         self._use_dashscope = _use_dashscope_llm()
         if self._use_dashscope:
             self.api_key = (api_key or settings.LLM_API_KEY or settings.DASHSCOPE_API_KEY or "").strip()
             self.base_url = (base_url or settings.LLM_BASE_URL or "").rstrip("/")
             self.model = (model or settings.LLM_MODEL or "").strip()
-            self._client: Optional[AsyncOpenAI] = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+            # openai 库复用 llm 共享连接池，不再每个实例各建一套连接
+            self._client: Optional[AsyncOpenAI] = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, http_client=self._http
+            )
             logger.info("对话 LLM 使用百炼兼容: base_url=%s, model=%s", self.base_url, self.model)
         else:
             self.api_key = (api_key or settings.DEEPSEEK_API_KEY or "").strip()
@@ -45,11 +51,26 @@ class DeepSeekClient:
             self._client = None
         self.timeout = timeout
 
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        """注入的客户端优先，否则用 lifespan 管理的 llm 共享连接池"""
+        return self._http_client or get_async_http_client("llm")
+
     @property
     def is_available(self) -> bool:
         """是否已配置 API Key，可用以调用"""
         return bool(self.api_key)
 
+    async def warmup(self) -> None:
+        """预建到 LLM 服务的 TLS 连接（只请求 base_url，不调用模型），失败忽略"""
+        if not self.is_available:
+            return
+        try:
+            await self._http.get(self.base_url, timeout=5.0)
+            logger.info("对话 LLM 连接已预热: %s", self.base_url)
+        except Exception as e:
+            logger.debug("对话 LLM 连接预热失败（忽略）: %s", e)
+
     async def chat(
         self,
         user_content: str,
@@ -102,27 +123,44 @@ class DeepSeekClient:
             "temperature": 0.3,
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                data = response.json()
-                choices = data.get("choices") or []
-                if choices:
-                    msg = choices[0].get("message")
-                    if isinstance(msg, dict):
-                        return (msg.get("content") or "").strip()
-                return None
+            response = await self._http.post(
+                url,
+                json=payload,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            choices = data.get("choices") or []
+            if choices:
+                msg = choices[0].get("message")
+                if isinstance(msg, dict):
+                    return (msg.get("content") or "").strip()
+            return None
         except httpx.HTTPStatusError as e:
             logger.warning("DeepSeek API 请求失败: %s %s", e.response.status_code, e.response.text[:200])
             return None
         except Exception as e:
             logger.warning("DeepSeek 调用异常: %s", e)
             return None
+
+
+# 单例：意图分类 / 闲聊 / 兜底回答 / 查询扩展共用同一个客户端，复用 llm 共享连接池里的热连接
+_llm_client: Optional[DeepSeekClient] = None
+
+
+def get_llm_client() -> DeepSeekClient:
+    """获取对话 LLM 客户端单例"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = DeepSeekClient()
+    return _llm_client
+
+
+def reset_llm_client() -> None:
+    """丢弃单例（lifespan 关闭时调用；底层连接池由 http_clients 统一释放）"""
+    global _llm_client
+    _llm_client = None
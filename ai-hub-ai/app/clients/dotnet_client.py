@@ -5,6 +5,7 @@
 from typing import List, Dict, Any, Optional
 import httpx
 
+from app.clients.http_clients import get_async_http_client
 from app.core.config import settings
 from app.core.logging_config import get_logger
 
@@ -20,11 +21,18 @@ class DotnetClient:
         tenant_id: Optional[str] = None,
         internal_token: Optional[str] = None,
         timeout: float = 30.0,
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
         self.base_url = (base_url or settings.DOTNET_BASE_URL).rstrip("/")
         self.tenant_id = tenant_id or settings.DEFAULT_TENANT
         self.internal_token = internal_token or settings.INTERNAL_TOKEN
         self.timeout = timeout
+        self._http_client = http_client
+
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        """注入的客户端优先，否则用 lifespan 管理的 dotnet 共享连接池"""
+        return self._http_client or get_async_http_client("dotnet")
 
     def _headers(self, use_internal_token: bool = False, user_id: Optional[str] = None) -> Dict[str, str]:
         """请求头：租户 ID 必带，内部接口需带 Internal-Token，用户认证接口需带 Bearer token"""
@@ -48,15 +56,29 @@ class DotnetClient:
         POST /api/ai/kb/articles/batch
         """
         url = f"{self.base_url}/api/ai/kb/articles/batch"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json={"articles": articles},
-                headers=self._headers(use_internal_token=True),
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._http.post(
+            url,
+            json={"articles": articles},
+            headers=self._headers(use_internal_token=True),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def batch_update_articles(self, articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量更新知识条目（每项带 articleId，状态不变）
+        PUT /api/ai/kb/articles/batch
+        """
+        url = f"{self.base_url}/api/ai/kb/articles/batch"
+        response = await self._http.put(
+            url,
+            json={"articles": articles},
+            headers=self._headers(use_internal_token=True),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def batch_create_assets(self, assets: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -64,15 +86,14 @@ class DotnetClient:
         POST /api/ai/kb/articles/assets/batch
         """
         url = f"{self.base_url}/api/ai/kb/articles/assets/batch"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json={"assets": assets},
-                headers=self._headers(use_internal_token=True),
-                timeout=self.timeout,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._http.post(
+            url,
+            json={"assets": assets},
+            headers=self._headers(use_internal_token=True),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def search_knowledge(
         self,
@@ -94,12 +115,11 @@ class DotnetClient:
         }
         if status is not None:
             params["status"] = status
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                params=params,
-                headers=self._headers(use_internal_token=False, user_id=user_id),
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._http.get(
+            url,
+            params=params,
+            headers=self._headers(use_internal_token=False, user_id=user_id),
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        return response.json()
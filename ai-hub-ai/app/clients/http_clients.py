@@ -0,0 +1,146 @@
+"""
+出站 HTTP 客户端注册表：按上游复用 httpx 连接池
+- 每个上游（dotnet / llm / attachment）一个长驻 AsyncClient / Client，keep-alive 复用 TCP+TLS 连接
+- 安装了 h2 且 HTTP_ENABLE_HTTP2=true 时开启 HTTP/2
+- 每个上游单独配置连接数上限与默认超时（调用处仍可按请求覆盖 timeout）
+- 由 app.main.create_app 的 lifespan 在关闭时统一释放
+"""
+import importlib.util
+import threading
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    max_connections: int
+    max_keepalive: int
+    timeout: float
+    connect_timeout: float = 5.0
+
+
+def _upstreams() -> dict[str, UpstreamConfig]:
+    return {
+        # .NET 后端：审计、知识条目批量写入、知识搜索
+        "dotnet": UpstreamConfig(
+            max_connections=settings.HTTP_DOTNET_MAX_CONNECTIONS,
+            max_keepalive=max(1, settings.HTTP_DOTNET_MAX_CONNECTIONS // 2),
+            timeout=30.0,
+        ),
+        # 对话 LLM（DeepSeek 直连 / 百炼兼容）
+        "llm": UpstreamConfig(
+            max_connections=settings.HTTP_LLM_MAX_CONNECTIONS,
+            max_keepalive=max(1, settings.HTTP_LLM_MAX_CONNECTIONS // 2),
+            timeout=60.0,
+        ),
+        # 附件服务器文件列表 API
+        "attachment": UpstreamConfig(
+            max_connections=settings.HTTP_ATTACHMENT_MAX_CONNECTIONS,
+            max_keepalive=max(1, settings.HTTP_ATTACHMENT_MAX_CONNECTIONS // 2),
+            timeout=15.0,
+        ),
+    }
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 需要 h2 包（httpx[http2]），未安装时退回 HTTP/1.1 keep-alive"""
+    return bool(settings.HTTP_ENABLE_HTTP2) and importlib.util.find_spec("h2") is not None
+
+
+class HttpClientRegistry:
+    """按上游名称懒创建并缓存 httpx 客户端"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._async: dict[str, httpx.AsyncClient] = {}
+        self._sync: dict[str, httpx.Client] = {}
+        self._http2 = http2_enabled()
+
+    def _options(self, name: str) -> dict:
+        cfg = _upstreams().get(name) or UpstreamConfig(max_connections=10, max_keepalive=5, timeout=30.0)
+        return {
+            "limits": httpx.Limits(
+                max_connections=max(1, cfg.max_connections),
+                max_keepalive_connections=max(1, cfg.max_keepalive),
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            "timeout": httpx.Timeout(cfg.timeout, connect=cfg.connect_timeout),
+            "http2": self._http2,
+        }
+
+    def get_async(self, name: str) -> httpx.AsyncClient:
+        client = self._async.get(name)
+        if client is not None and not client.is_closed:
+            return client
+        with self._lock:
+            client = self._async.get(name)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(**self._options(name))
+                self._async[name] = client
+                logger.info("创建共享 HTTP 客户端: %s (async, http2=%s)", name, self._http2)
+            return client
+
+    def get_sync(self, name: str) -> httpx.Client:
+        client = self._sync.get(name)
+        if client is not None and not client.is_closed:
+            return client
+        with self._lock:
+            client = self._sync.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(**self._options(name))
+                self._sync[name] = client
+                logger.info("创建共享 HTTP 客户端: %s (sync, http2=%s)", name, self._http2)
+            return client
+
+    async def aclose(self) -> None:
+        with self._lock:
+            async_clients = list(self._async.items())
+            sync_clients = list(self._sync.items())
+            self._async.clear()
+            self._sync.clear()
+        for name, client in async_clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("关闭 HTTP 客户端失败: %s, %s", name, e)
+        for name, client in sync_clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning("关闭 HTTP 客户端失败: %s, %s", name, e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "http2": self._http2,
+                "async_clients": sorted(self._async),
+                "sync_clients": sorted(self._sync),
+            }
+
+
+_registry = HttpClientRegistry()
+
+
+def get_http_registry() -> HttpClientRegistry:
+    return _registry
+
+
+def get_async_http_client(name: str) -> httpx.AsyncClient:
+    """获取指定上游的共享 AsyncClient（勿在调用处 close / async with）"""
+    return _registry.get_async(name)
+
+
+def get_sync_http_client(name: str) -> httpx.Client:
+    """获取指定上游的共享 Client（线程安全，勿在调用处 close / with）"""
+    return _registry.get_sync(name)
+
+
+async def close_http_clients() -> None:
+    """lifespan 关闭时释放所有共享连接池"""
+    await _registry.aclose()
@@ -0,0 +1,55 @@
+"""
+阻塞调用卸载：pyodbc / Chroma 等同步 IO 放到有界线程池执行，避免阻塞 uvicorn 事件循环
+按用途分池（vector / db / ingest 等），一类慢调用不会占满另一类的线程
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _max_workers(name: str) -> int:
+    if name == "vector":
+        return max(1, settings.VECTOR_QUERY_MAX_WORKERS)
+    if name == "db":
+        return max(1, settings.DB_QUERY_MAX_WORKERS)
+    return 4
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """获取（懒创建）指定名称的有界线程池"""
+    ex = _executors.get(name)
+    if ex is not None:
+        return ex
+    with _lock:
+        ex = _executors.get(name)
+        if ex is None:
+            ex = ThreadPoolExecutor(max_workers=_max_workers(name), thread_name_prefix=f"aihub-{name}")
+            _executors[name] = ex
+        return ex
+
+
+async def run_blocking(executor: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在指定线程池中执行同步函数并 await 结果"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(executor), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """应用关闭时释放线程池"""
+    with _lock:
+        for name, ex in _executors.items():
+            ex.shutdown(wait=False, cancel_futures=True)
+            logger.info("线程池已关闭: %s", name)
+        _executors.clear()
@@ -60,6 +60,28 @@ class Settings(BaseSettings):
     # 服务器附件 API（生产用，与本地二选一）：列表接口 + 远程路径
     ATTACHMENT_FILES_API_BASE_URL: str = ""  # 如 https://www.yonghongjituan.com:4023
     ATTACHMENT_REMOTE_PATH: str = ""         # 如 diyi/永红造型线维修视频
+    # 本地附件索引：两次检查目录 mtime 的最小间隔（秒），0 表示每次查找都检查
+    ATTACHMENT_INDEX_REFRESH_SECONDS: float = 30.0
+    # 远程附件目录（api/files/list）缓存有效期（秒），也是后台刷新间隔；0 表示每次查找都条件请求
+    ATTACHMENT_CATALOG_TTL_SECONDS: float = 300.0
+    # 对话「参考xxx」解析结果的缓存条数（附件目录变化时整体失效），0 表示不缓存
+    REFERENCE_RESOLVE_CACHE_SIZE: int = 2048
+    # Excel 导入时并发查找附件引用的线程数
+    EXCEL_ATTACHMENT_RESOLVE_WORKERS: int = 8
+    # Excel 流式读取时每块的行数
+    EXCEL_IMPORT_CHUNK_ROWS: int = 500
+    # 重复导入同一文件/sheet 时按行指纹增量处理（未变跳过、变更更新）；关闭则每次全部新建
+    EXCEL_IMPORT_INCREMENTAL: bool = True
+    # 导入结果上传 .NET：每个批量请求的条数、并发请求数、单块最多尝试次数
+    DOTNET_UPLOAD_PAGE_SIZE: int = 100
+    DOTNET_UPLOAD_CONCURRENCY: int = 4
+    DOTNET_UPLOAD_MAX_ATTEMPTS: int = 3
+    # 后台导入任务：解析/映射使用的进程数（0 表示在 import 线程池执行）、已结束任务保留时长（秒）
+    IMPORT_PROCESS_WORKERS: int = 1
+    IMPORT_JOB_RETENTION_SECONDS: float = 3600.0
+    # 导入完成后把新建/更新的条目写入向量库（每批条数对应一次 embedding 请求）
+    IMPORT_AUTO_INGEST: bool = True
+    IMPORT_INGEST_BATCH_SIZE: int = 32
 
     # DeepSeek AI（保留兼容）
     DEEPSEEK_API_KEY: str = ""
@@ -71,6 +93,15 @@ class Settings(BaseSettings):
     LLM_BASE_URL: str | None = None  # 如 https://dashscope.aliyuncs.com/compatible-mode/v1
     LLM_MODEL: str | None = None     # 如 deepseek-v3.2 或 qwen-plus
     LLM_API_KEY: str | None = None   # 不填则用 DASHSCOPE_API_KEY
+    LLM_WARMUP_ON_STARTUP: bool = True  # 启动时预建到 LLM 的连接
+
+    # 意图分类分层：缓存 → 本地规则 → LLM（确定的情况不调用 LLM）
+    INTENT_CACHE_ENABLED: bool = True
+    INTENT_CACHE_MAX_SIZE: int = 4096
+    INTENT_CACHE_TTL_SECONDS: int = 3600      # <=0 表示不过期
+    INTENT_LOCAL_RULES_ENABLED: bool = True
+    # 需要调用 LLM 判意图时，同时投机启动向量检索；意图非查库则取消丢弃（浪费率见 /api/v1/metrics）
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = True
 
     # SQL Server（kb_article 来源）
     SQLSERVER_DSN: str = "Driver={ODBC Driver 17 for SQL Server};Server=localhost;Database=ai_hub;Trusted_Connection=yes;"
@@ -89,6 +120,62 @@ class Settings(BaseSettings):
     # 阿里百炼 DashScope（embedding 用 OpenAI 兼容接口时可用 DASHSCOPE_API_KEY）
     DASHSCOPE_API_KEY: str = ""
 
+    # 单次 embedding 请求上限（批量写入时打包用）；不填按服务商默认：百炼 10 条，OpenAI 2048 条，其它 256 条
+    EMBEDDING_BATCH_MAX_ITEMS: int | None = None
+    EMBEDDING_BATCH_MAX_CHARS: int | None = None  # 单次请求文本总字符数上限
+    # 批量 / 全量重建时每批处理的文章数（批内各文章的 chunk 合并打包请求 embedding）
+    INGEST_REBUILD_BATCH_ARTICLES: int = 200
+    # 重建时跳过内容指纹（doc + 模型 + 维度）未变的 chunk；false 则全部重新 embedding
+    INGEST_SKIP_UNCHANGED: bool = True
+    # Embedding 服务商配额（全进程共享令牌桶），0 表示不限：每秒请求数、每分钟 token 数（按字符数估算）
+    EMBEDDING_RATE_LIMIT_QPS: float = 0.0
+    EMBEDDING_RATE_LIMIT_TPM: int = 0
+    # 全量重建流水线：SQL 每页行数、并发 embedding 线程数、段间队列长度、每次 upsert 的向量条数
+    INGEST_READ_PAGE_SIZE: int = 500
+    INGEST_EMBED_WORKERS: int = 4
+    INGEST_QUEUE_SIZE: int = 8
+    INGEST_WRITE_BATCH_SIZE: int = 512
+    # 本地内容寻址 embedding 仓库（重建 / 清空向量库 / 切回旧维度时读盘不再请求服务商），空字符串关闭；
+    # 每个模型 + 维度组合的磁盘上限（MB），超过按最近使用淘汰
+    EMBEDDING_STORE_DIR: str = "./data/embedding_store"
+    EMBEDDING_STORE_MAX_MB: float = 512
+    # kb_article 增量同步：后台按 (changed_at, id) 水位轮询主库（默认租户），变更行增量写向量、软删除行删向量
+    KB_SYNC_ENABLED: bool = False
+    KB_SYNC_INTERVAL_SECONDS: float = 5.0
+    KB_SYNC_BATCH_SIZE: int = 200
+    KB_SYNC_OVERLAP_SECONDS: float = 2.0       # 回看窗口，补上提交较晚的事务（增量同步水位推进后、影子重建补写时）
+    KB_SYNC_STATE_PATH: str = "./data/kb_sync_state.json"
+    KB_SYNC_MAX_ATTEMPTS: int = 3              # 同一篇连续写入失败次数上限，达到后转入死信，水位越过它
+    # 全量覆盖重建（clear_first）写入影子集合，校验后原子切换别名；false 则先清空当前集合再写入（重建期间检索为空）
+    VECTOR_BLUE_GREEN_REBUILD: bool = True
+    VECTOR_SWAP_MIN_RATIO: float = 0.8          # 影子集合条数不低于当前集合的比例，否则不切换；0 不校验
+    VECTOR_SWAP_MAX_FAILED_RATIO: float = 0.01  # 失败文章比例上限
+
+    # Embedding 缓存（相同问题不再重复请求远程 embedding）
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_SIZE: int = 2048       # 内存 LRU 条数上限
+    EMBEDDING_CACHE_TTL_SECONDS: int = 86400   # <=0 表示不过期
+    EMBEDDING_CACHE_PERSIST_PATH: str = ""     # 非空则落盘（sqlite），如 ./data/embedding_cache.sqlite3
+
+    # 阻塞调用线程池（Chroma 查询 / SQL Server 查询放到线程池，不阻塞事件循环）
+    VECTOR_QUERY_MAX_WORKERS: int = 4
+    DB_QUERY_MAX_WORKERS: int = 8
+
+    # 出站 HTTP 共享连接池（.NET / LLM / 附件 API 各一个，keep-alive 复用连接）
+    HTTP_ENABLE_HTTP2: bool = True              # 需安装 h2（pip install httpx[http2]），未安装时自动退回 HTTP/1.1
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30
+    HTTP_DOTNET_MAX_CONNECTIONS: int = 50
+    HTTP_LLM_MAX_CONNECTIONS: int = 20
+    HTTP_ATTACHMENT_MAX_CONNECTIONS: int = 10
+
+    # SQL Server 连接池（KbArticleRepository / execute_query / 维护脚本共用）
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10                  # 建议 >= DB_QUERY_MAX_WORKERS
+    DB_POOL_IDLE_TIMEOUT_SECONDS: int = 300     # 空闲超过该时长的连接回收（保留 min_size 条），<=0 不回收
+    DB_POOL_HEALTH_CHECK_AFTER_SECONDS: int = 30  # 空闲超过该时长的连接取出前先 SELECT 1，0 表示每次都检查
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS: int = 10   # 连接全部借出时的等待上限
+    DB_SLOW_QUERY_MS: int = 500                 # 慢查询日志阈值，<=0 关闭
+
     # 向量相关（保留兼容）
     EMBEDDING_API_KEY: str = ""
     EMBEDDING_BASE_URL: str = "https://api.openai.com/v1"
@@ -99,6 +186,14 @@ class Settings(BaseSettings):
 
     # 审计日志（调用 .NET internal API 记录对话全链路）
     ENABLE_AUDIT_LOG: bool = True
+    # 审计后台队列（对话接口不再等待审计请求，由后台 worker 批量发送）
+    AUDIT_QUEUE_MAX_SIZE: int = 5000
+    AUDIT_BATCH_SIZE: int = 50
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_MAX_ATTEMPTS: int = 3
+    AUDIT_SEND_CONCURRENCY: int = 8
+    AUDIT_OVERFLOW_POLICY: str = "drop"   # 队列满时：drop 丢弃 | spill 落盘，空闲时回放
+    AUDIT_SPILL_PATH: str = "./data/audit_spill.jsonl"
 
     # 服务端口（与 main.py 中 uvicorn 的 port 一致，用于启动时打开 Swagger）
     PORT: int = 8000
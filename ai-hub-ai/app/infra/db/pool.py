@@ -0,0 +1,314 @@
+"""
+SQL Server 连接池（线程安全）
+- min/max 连接数可配置，超出 max 时等待归还（超时抛 TimeoutError）
+- 取出时若连接空闲超过阈值，先 SELECT 1 做健康检查，失败则丢弃重连
+- 空闲超时的连接自动回收（保留 min_size 条）
+- 遇到通信类瞬时错误（08S01 等）丢弃连接并重试
+- 记录每条查询耗时，慢查询打日志，累计指标供 /api/v1/metrics 查看
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, TypeVar
+
+import pyodbc
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 连接类 SQLSTATE：连接已断开/无法建立，换一条新连接重试即可
+TRANSIENT_SQLSTATES = {"08S01", "08001", "08003", "08004", "08007"}
+
+
+def is_transient_error(e: BaseException) -> bool:
+    """是否为可重连重试的 ODBC 瞬时错误"""
+    if not isinstance(e, pyodbc.Error):
+        return False
+    state = str(e.args[0]) if e.args else ""
+    if state in TRANSIENT_SQLSTATES:
+        return True
+    msg = str(e).lower()
+    return "communication link failure" in msg or "connection is busy" in msg
+
+
+def _default_connect(dsn: str) -> Any:
+    conn = pyodbc.connect(dsn, autocommit=True)
+    conn.setencoding(encoding="utf-8")
+    return conn
+
+
+@dataclass
+class _IdleConn:
+    conn: Any
+    last_used: float
+
+
+class ConnectionPool:
+    """pyodbc 连接池"""
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300,
+        health_check_after: float = 30,
+        acquire_timeout: float = 10,
+        max_retries: int = 1,
+        slow_query_ms: float = 500,
+        connect: Callable[[str], Any] | None = None,
+    ) -> None:
+        self._dsn = dsn
+        self._min_size = max(0, min_size)
+        self._max_size = max(1, max_size, self._min_size)
+        self._idle_timeout = idle_timeout
+        self._health_check_after = health_check_after
+        self._acquire_timeout = acquire_timeout
+        self._max_retries = max(0, max_retries)
+        self._slow_query_ms = slow_query_ms
+        self._connect = connect or _default_connect
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._max_size)
+        self._idle: deque[_IdleConn] = deque()
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "health_check_failures": 0,
+            "reconnects": 0,
+            "queries": 0,
+            "errors": 0,
+            "slow_queries": 0,
+            "total_query_ms": 0.0,
+            "max_query_ms": 0.0,
+            "total_wait_ms": 0.0,
+        }
+
+    # ---------- 对外接口 ----------
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """借出一条连接，用毕自动归还；执行中出现瞬时错误时该连接直接丢弃"""
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = is_transient_error(e)
+            raise
+        finally:
+            self._checkin(conn, broken)
+
+    def run(self, fn: Callable[[Any], T], label: str = "") -> T:
+        """在池化连接上执行 fn(conn) 并计时；瞬时错误时清空空闲连接后重试"""
+        attempt = 0
+        while True:
+            conn = self._checkout()
+            start = time.perf_counter()
+            try:
+                result = fn(conn)
+            except Exception as e:
+                self._record(time.perf_counter() - start, label, ok=False)
+                transient = is_transient_error(e)
+                self._checkin(conn, broken=transient)
+                if attempt >= self._max_retries or not transient:
+                    raise
+                err = e
+            else:
+                self._record(time.perf_counter() - start, label, ok=True)
+                self._checkin(conn, broken=False)
+                return result
+            attempt += 1
+            with self._lock:
+                self._stats["reconnects"] += 1
+            logger.warning("SQL Server 连接异常，重连重试(%d/%d): %s", attempt, self._max_retries, err)
+            self._purge_idle()
+
+    def warmup(self) -> None:
+        """预建 min_size 条连接（启动时调用，失败只打日志）"""
+        created = []
+        try:
+            while len(created) < self._min_size:
+                with self._lock:
+                    if self._size >= self._min_size:
+                        break
+                created.append(self._checkout())
+        except Exception as e:
+            logger.warning("SQL Server 连接池预热失败: %s", e)
+        for conn in created:
+            self._checkin(conn, broken=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["size"] = self._size
+            s["idle"] = len(self._idle)
+            s["in_use"] = self._size - len(self._idle)
+            s["min_size"] = self._min_size
+            s["max_size"] = self._max_size
+        s["avg_query_ms"] = round(s["total_query_ms"] / s["queries"], 2) if s["queries"] else 0.0
+        s["total_query_ms"] = round(s["total_query_ms"], 2)
+        s["max_query_ms"] = round(s["max_query_ms"], 2)
+        s["total_wait_ms"] = round(s["total_wait_ms"], 2)
+        return s
+
+    def close(self) -> None:
+        """关闭池中所有空闲连接；借出中的连接归还时关闭"""
+        with self._lock:
+            self._closed = True
+        self._purge_idle()
+
+    # ---------- 内部实现 ----------
+
+    def _checkout(self) -> Any:
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self._acquire_timeout):
+            raise TimeoutError(
+                f"获取 SQL Server 连接超时（{self._acquire_timeout}s，max_size={self._max_size}）"
+            )
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = self._create()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_ms"] += (time.perf_counter() - start) * 1000
+        return conn
+
+    def _checkin(self, conn: Any, broken: bool) -> None:
+        try:
+            with self._lock:
+                keep = not broken and not self._closed
+                if keep:
+                    self._idle.append(_IdleConn(conn, time.monotonic()))
+            if not keep:
+                self._discard(conn)
+            self._evict_idle()
+        finally:
+            self._slots.release()
+
+    def _take_idle(self) -> Any | None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                # LIFO：最近用过的连接最可能仍然有效，老连接留给空闲回收
+                entry = self._idle.pop()
+            if time.monotonic() - entry.last_used < self._health_check_after or self._ping(entry.conn):
+                return entry.conn
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            self._discard(entry.conn)
+
+    def _ping(self, conn: Any) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1").fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.info("SQL Server 空闲连接健康检查失败，丢弃重连: %s", e)
+            return False
+
+    def _create(self) -> Any:
+        conn = self._connect(self._dsn)
+        with self._lock:
+            self._size += 1
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats["closed"] += 1
+
+    def _evict_idle(self) -> None:
+        """回收空闲超时的连接，保留 min_size 条"""
+        if self._idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while (
+                self._idle
+                and self._size - len(expired) > self._min_size
+                and now - self._idle[0].last_used > self._idle_timeout
+            ):
+                expired.append(self._idle.popleft())
+        for entry in expired:
+            self._discard(entry.conn)
+
+    def _purge_idle(self) -> None:
+        with self._lock:
+            entries = list(self._idle)
+            self._idle.clear()
+        for entry in entries:
+            self._discard(entry.conn)
+
+    def _record(self, elapsed: float, label: str, ok: bool) -> None:
+        ms = elapsed * 1000
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["total_query_ms"] += ms
+            if ms > self._stats["max_query_ms"]:
+                self._stats["max_query_ms"] = ms
+            if not ok:
+                self._stats["errors"] += 1
+            slow = ms >= self._slow_query_ms > 0
+            if slow:
+                self._stats["slow_queries"] += 1
+        if slow:
+            logger.warning("SQL Server 慢查询 %.1fms: %s", ms, " ".join((label or "").split())[:200])
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: str | None = None) -> ConnectionPool:
+    """按 DSN 获取进程内共享连接池（默认用配置中的 SQLSERVER_DSN）"""
+    dsn = dsn or settings.SQLSERVER_DSN or settings.KB_SQLSERVER_CONNECTION_STRING or ""
+    pool = _pools.get(dsn)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = ConnectionPool(
+                dsn,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                idle_timeout=settings.DB_POOL_IDLE_TIMEOUT_SECONDS,
+                health_check_after=settings.DB_POOL_HEALTH_CHECK_AFTER_SECONDS,
+                acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                slow_query_ms=settings.DB_SLOW_QUERY_MS,
+            )
+            _pools[dsn] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    """应用/脚本退出时关闭所有连接池"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -1,70 +1,85 @@
-"""SQL Server 连接与执行"""
-import pyodbc
+"""SQL Server 连接与执行（所有查询共用 app.infra.db.pool 中的进程级连接池）"""
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
 from app.core.config import settings
 from app.core.logging_config import get_logger
+from app.infra.db.pool import ConnectionPool, get_pool
 
 logger = get_logger(__name__)
 
 
 class SqlServer:
-    def __init__(self) -> None:
+    def __init__(self, pool: ConnectionPool | None = None) -> None:
         # 优先用新配置，兼容旧配置
         self._dsn = settings.SQLSERVER_DSN or settings.KB_SQLSERVER_CONNECTION_STRING or ""
+        self._pool = pool or get_pool(self._dsn)
 
     def fetch_one(self, sql: str, params: tuple) -> dict | None:
         """执行查询，返回单行 dict 或 None"""
-        try:
-            with pyodbc.connect(self._dsn) as conn:
-                conn.setencoding(encoding="utf-8")
-                cursor = conn.cursor()
+        def _query(conn) -> dict | None:
+            cursor = conn.cursor()
+            try:
                 row = cursor.execute(sql, params).fetchone()
                 if not row:
                     return None
                 columns = [c[0] for c in cursor.description]
                 return dict(zip(columns, row))
+            finally:
+                cursor.close()
+
+        try:
+            return self._pool.run(_query, sql)
         except Exception as e:
             logger.warning("SQL Server 查询失败: %s", e)
             raise
 
     def fetch_all(self, sql: str, params: tuple = ()) -> list[dict]:
         """查询多行"""
-        try:
-            with pyodbc.connect(self._dsn) as conn:
-                conn.setencoding(encoding="utf-8")
-                cursor = conn.cursor()
+        def _query(conn) -> list[dict]:
+            cursor = conn.cursor()
+            try:
                 rows = cursor.execute(sql, params).fetchall()
                 if not rows:
                     return []
                 columns = [c[0] for c in cursor.description]
                 return [dict(zip(columns, r)) for r in rows]
+            finally:
+                cursor.close()
+
+        try:
+            return self._pool.run(_query, sql)
         except Exception as e:
             logger.warning(f"SQL Server 查询失败: {e}")
             raise
 
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        """执行写操作（UPDATE/INSERT/DELETE），返回影响行数"""
+        def _exec(conn) -> int:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return cursor.rowcount
+            finally:
+                cursor.close()
 
-# 兼容旧代码的函数式接口
-def _get_connection():
-    try:
-        import pyodbc
-        dsn = settings.SQLSERVER_DSN or settings.KB_SQLSERVER_CONNECTION_STRING
-        return pyodbc.connect(dsn)
-    except Exception as e:
-        logger.warning("SQL Server 连接失败: %s", e)
-        raise
+        try:
+            return self._pool.run(_exec, sql)
+        except Exception as e:
+            logger.warning("SQL Server 执行失败: %s", e)
+            raise
 
-
-from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+    def close(self) -> None:
+        """关闭连接池（脚本结束时调用；服务内由 lifespan 统一关闭）"""
+        self._pool.close()
 
 
+# 兼容旧代码的函数式接口
 @contextmanager
 def get_connection():
-    """上下文内使用连接，用毕关闭"""
-    conn = _get_connection()
-    try:
+    """上下文内从连接池借用连接，用毕归还"""
+    with get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def execute_query(
@@ -75,7 +90,7 @@ def execute_query(
     执行查询，返回行列表，每行为 dict（列名小写）。
     仅做 SELECT，不做写操作。
     """
-    with get_connection() as conn:
+    def _query(conn) -> List[Dict[str, Any]]:
         cursor = conn.cursor()
         try:
             cursor.execute(sql, params or ())
@@ -86,3 +101,5 @@ def execute_query(
             return rows
         finally:
             cursor.close()
+
+    return get_pool().run(_query, sql)
@@ -1,9 +1,31 @@
 """Embedding 接口，便于替换为本地模型 / 其他厂商"""
+import asyncio
 from abc import ABC, abstractmethod
 
+from app.infra.embedding.batching import BatchLimits, resolve_batch_limits
+
 
 class IEmbedder(ABC):
     @abstractmethod
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         """批量生成向量"""
         raise NotImplementedError
+
+    async def aembed_texts(self, texts: list[str]) -> list[list[float]]:
+        """异步批量生成向量；默认放到线程里跑同步实现，避免阻塞事件循环"""
+        return await asyncio.to_thread(self.embed_texts, texts)
+
+    @property
+    def model_name(self) -> str:
+        """模型标识（用于缓存 key 等），默认取类名"""
+        return type(self).__name__
+
+    @property
+    def dimensions(self) -> int | None:
+        """向量维度；未知时为 None（用模型默认）"""
+        return None
+
+    @property
+    def batch_limits(self) -> BatchLimits:
+        """单次 embed_texts 的条数/字符上限（批量写入时据此打包）"""
+        return resolve_batch_limits()
@@ -0,0 +1,164 @@
+"""
+Embedding 批量打包：把大量文本按服务商的单次请求上限打包成若干次 embed_texts
+- 上限 = 条数 + 总字符数；按 base_url 识别服务商给默认值，EMBEDDING_BATCH_MAX_ITEMS / _MAX_CHARS 可覆盖
+- 某批报「超出大小」类错误时对半拆分重试，并把后续批的条数上限收紧到拆分后的大小
+- 其余错误只记到该批文本上，不影响其它批
+- 可传入限流器（rate_limit.EmbeddingRateLimiter），每次实际请求前按配额取令牌；实例可被多个线程共用
+- 可传入本地 embedding 仓库（embedding_store.EmbeddingStore）：打包前先查仓库，只有未存的文本才发请求，
+  算出的向量写回仓库；命中部分不占限流配额
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class BatchLimits:
+    """单次 embedding 请求的上限；max_chars 为 None 表示不限总字符数"""
+
+    max_items: int
+    max_chars: Optional[int] = None
+
+
+# 按 base_url 关键字匹配（先匹配先用）；百炼 text-embedding-v3/v4 单次最多 10 条
+_PROVIDER_LIMITS = (
+    ("dashscope", BatchLimits(max_items=10)),
+    ("api.openai.com", BatchLimits(max_items=2048, max_chars=200_000)),
+)
+_DEFAULT_LIMITS = BatchLimits(max_items=256, max_chars=100_000)
+
+# 400 且错误信息含这些词、或 413，视为请求体超限，可拆小重试
+_SIZE_LIMIT_HINTS = ("batch", "too many", "too long", "too large", "larger", "maximum", "exceed", "超过", "超出")
+
+
+def resolve_batch_limits(base_url: Optional[str] = None) -> BatchLimits:
+    """服务商默认上限，再用配置项覆盖"""
+    base = (base_url or "").lower()
+    limits = next((lim for key, lim in _PROVIDER_LIMITS if key in base), _DEFAULT_LIMITS)
+    max_items = settings.EMBEDDING_BATCH_MAX_ITEMS or limits.max_items
+    max_chars = settings.EMBEDDING_BATCH_MAX_CHARS or limits.max_chars
+    return BatchLimits(max_items=max(1, int(max_items)), max_chars=max_chars)
+
+
+def is_size_limit_error(e: Exception) -> bool:
+    """OpenAI SDK / httpx 异常中识别「批太大」"""
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    if status == 413:
+        return True
+    if status != 400:
+        return False
+    message = str(e).lower()
+    return any(hint in message for hint in _SIZE_LIMIT_HINTS)
+
+
+class BatchEmbedder:
+    """按 BatchLimits 打包调用 embedder.embed_texts；同一实例内学到的更小批大小对后续调用持续生效"""
+
+    def __init__(self, embedder, limits: Optional[BatchLimits] = None, limiter=None, store=None) -> None:
+        self._embedder = embedder
+        limits = limits or embedder.batch_limits
+        self._max_items = limits.max_items
+        self._max_chars = limits.max_chars
+        self._limiter = limiter
+        self._store = store
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.splits = 0
+        self.stored = 0
+
+    @property
+    def model_name(self) -> str:
+        return self._embedder.model_name
+
+    @property
+    def dimensions(self) -> Optional[int]:
+        return self._embedder.dimensions
+
+    @property
+    def max_items(self) -> int:
+        return self._max_items
+
+    def embed(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict[int, str]]:
+        """
+        返回 (vectors, errors)：vectors 与 texts 一一对应，失败的位置为 None；
+        errors 为 {下标: 错误信息}
+        """
+        if self._store is None:
+            return self._embed_all(texts)
+        model, dims = self.model_name, self.dimensions
+        vectors = self._store.get_many(model, dims, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        with self._lock:
+            self.stored += len(texts) - len(missing)
+        if not missing:
+            return vectors, {}
+        fresh, fresh_errors = self._embed_all([texts[i] for i in missing])
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec
+        ok = [j for j in range(len(missing)) if j not in fresh_errors]
+        if ok:
+            try:
+                self._store.put_many(model, dims, [texts[missing[j]] for j in ok], [fresh[j] for j in ok])
+            except OSError as e:
+                logger.warning("写入 embedding 仓库失败，不影响本次结果: %s", e)
+        return vectors, {missing[j]: e for j, e in fresh_errors.items()}
+
+    def _embed_all(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict[int, str]]:
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        errors: Dict[int, str] = {}
+        for start, end in self._pack(texts):
+            self._embed_range(texts, start, end, vectors, errors)
+        return vectors, errors
+
+    def _pack(self, texts: List[str]) -> Iterator[Tuple[int, int]]:
+        """按当前上限依次切出 [start, end)；上限可能在上一批拆分后变小"""
+        start = 0
+        while start < len(texts):
+            end, chars = start, 0
+            while end < len(texts) and end - start < self._max_items:
+                size = len(texts[end])
+                if self._max_chars and end > start and chars + size > self._max_chars:
+                    break
+                chars += size
+                end += 1
+            yield start, end
+            start = end
+
+    def _embed_range(self, texts, start: int, end: int, vectors: list, errors: Dict[int, str]) -> None:
+        with self._lock:
+            self.requests += 1
+        try:
+            if self._limiter is not None:
+                self._limiter.acquire(texts[start:end])
+            result = self._embedder.embed_texts(texts[start:end])
+            if len(result) != end - start:
+                raise ValueError(f"embedding 返回条数不符: 期望 {end - start}, 实际 {len(result)}")
+        except Exception as e:
+            count = end - start
+            if count > 1 and is_size_limit_error(e):
+                with self._lock:
+                    self.splits += 1
+                    shrink = count // 2 < self._max_items
+                    if shrink:
+                        self._max_items = count // 2
+                if shrink:
+                    logger.warning("embedding 批过大（%d 条），后续批上限降为 %d: %s", count, self._max_items, e)
+                # 按（可能在子批里继续收紧的）当前上限重新切这一段
+                pos = start
+                while pos < end:
+                    step = min(self._max_items, end - pos)
+                    self._embed_range(texts, pos, pos + step, vectors, errors)
+                    pos += step
+                return
+            logger.warning("embedding 批失败（第 %d-%d 条）: %s", start + 1, end, e)
+            for i in range(start, end):
+                errors[i] = str(e)
+            return
+        vectors[start:end] = result
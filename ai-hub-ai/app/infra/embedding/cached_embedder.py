@@ -0,0 +1,201 @@
+"""带缓存的 Embedding 装饰器：LRU + TTL，可选落盘（sqlite），重复问题不再走远程 embedding"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from app.core.logging_config import get_logger
+from app.infra.embedding.base import IEmbedder
+
+logger = get_logger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """缓存 key 用的文本规范化：去首尾空白、合并连续空白"""
+    return " ".join((text or "").split())
+
+
+class CachedEmbedder(IEmbedder):
+    """
+    包装任意 IEmbedder：
+    - key = sha256(model | dimensions | 规范化文本)；规范化只用于 key，交给内层的仍是原文
+    - 内存 LRU（max_size 条）+ TTL（ttl_seconds，<=0 表示不过期）
+    - persist_path 非空时同时写入本地 sqlite，重启后仍可命中
+    """
+
+    def __init__(
+        self,
+        inner: IEmbedder,
+        max_size: int = 2048,
+        ttl_seconds: float = 86400,
+        persist_path: str | None = None,
+    ) -> None:
+        self._inner = inner
+        self._max_size = max(1, int(max_size))
+        self._ttl = float(ttl_seconds or 0)
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple[list[float], float]]" = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._db: sqlite3.Connection | None = None
+        if persist_path:
+            self._db = self._open_db(persist_path)
+
+    # ---------- IEmbedder ----------
+
+    @property
+    def model_name(self) -> str:
+        return self._inner.model_name
+
+    @property
+    def dimensions(self) -> int | None:
+        return self._inner.dimensions
+
+    @property
+    def batch_limits(self):
+        return self._inner.batch_limits
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """先查缓存，未命中的文本合并成一次批量请求交给内层 embedder"""
+        out, missing, miss_texts = self._lookup(texts)
+        if missing:
+            self._fill(out, missing, self._inner.embed_texts(miss_texts))
+        return out
+
+    async def aembed_texts(self, texts: list[str]) -> list[list[float]]:
+        """异步版本：缓存查找同上，未命中部分 await 内层的 aembed_texts"""
+        out, missing, miss_texts = self._lookup(texts)
+        if missing:
+            self._fill(out, missing, await self._inner.aembed_texts(miss_texts))
+        return out
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> dict:
+        """命中统计：hits 含 disk_hits"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._mem),
+                "max_size": self._max_size,
+                "ttl_seconds": self._ttl,
+                "persistent": self._db is not None,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        """清空内存与落盘缓存（切换模型/维度后可调用）"""
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embedding_cache")
+                self._db.commit()
+
+    # ---------- 内部实现 ----------
+
+    def _lookup(self, texts: list[str]) -> tuple[list, "OrderedDict[str, list[int]]", list[str]]:
+        """
+        查缓存，返回 (out, missing, miss_texts)：
+        out 中命中位置已填好；missing 为 key -> 结果下标（同一批重复文本只请求一次），
+        miss_texts 为每个 key 第一次出现时的原文
+        """
+        out: list = [None] * len(texts)
+        missing: "OrderedDict[str, list[int]]" = OrderedDict()
+        for i, text in enumerate(texts):
+            key = self._make_key(normalize_text(text))
+            vec = self._get(key)
+            if vec is not None:
+                out[i] = vec
+            else:
+                missing.setdefault(key, []).append(i)
+        miss_texts = [texts[idx[0]] for idx in missing.values()]
+        return out, missing, miss_texts
+
+    def _fill(self, out: list, missing: "OrderedDict[str, list[int]]", vecs: list[list[float]]) -> None:
+        """把内层返回的向量写回缓存并填入 out"""
+        for (key, idx_list), vec in zip(missing.items(), vecs):
+            self._put(key, vec)
+            for i in idx_list:
+                out[i] = vec
+
+    def _make_key(self, normalized_text: str) -> str:
+        raw = f"{self.model_name}|{self.dimensions or ''}|{normalized_text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self._ttl > 0 and now - created_at > self._ttl
+
+    def _get(self, key: str) -> list[float] | None:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                vec, created_at = item
+                if not self._expired(created_at, now):
+                    self._mem.move_to_end(key)
+                    self._hits += 1
+                    return vec
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vec, created_at FROM embedding_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1], now):
+                    vec = array("d", row[0]).tolist()
+                    self._mem_put(key, vec, row[1])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return vec
+
+            self._misses += 1
+            return None
+
+    def _put(self, key: str, vec: list[float]) -> None:
+        now = time.time()
+        with self._lock:
+            self._mem_put(key, vec, now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embedding_cache (key, vec, created_at) VALUES (?, ?, ?)",
+                        (key, array("d", vec).tobytes(), now),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning("Embedding 缓存落盘失败: %s", e)
+
+    def _mem_put(self, key: str, vec: list[float], created_at: float) -> None:
+        """调用方需持有 self._lock"""
+        self._mem[key] = (vec, created_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self._max_size:
+            self._mem.popitem(last=False)
+            self._evictions += 1
+
+    def _open_db(self, persist_path: str) -> sqlite3.Connection | None:
+        try:
+            path = Path(persist_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(path), check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "key TEXT PRIMARY KEY, vec BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            if self._ttl > 0:
+                db.execute("DELETE FROM embedding_cache WHERE created_at < ?", (time.time() - self._ttl,))
+            db.commit()
+            logger.info("Embedding 缓存落盘: %s", path)
+            return db
+        except Exception as e:
+            logger.warning("Embedding 缓存落盘文件打开失败，仅使用内存缓存: %s", e)
+            return None
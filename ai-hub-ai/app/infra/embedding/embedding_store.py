@@ -0,0 +1,385 @@
+"""
+本地内容寻址 embedding 仓库：key = sha256(模型 | 维度 | 文本)，重建 / 清空向量库 / 切回旧维度时直接读盘，不再请求 embedding 服务
+- 每个 (模型, 维度) 一组文件：{space}.json 元数据 + {space}.{代}.f32 向量矩阵（float32 行存，mmap 读）
+  + {space}.{代}.idx 索引（每条 32 字节摘要 + 4 字节行号，追加写）+ {space}.lock 文件锁
+- 多进程共用一个目录（API 服务与 scripts/rebuild_all_vectors.py）：写入持排他锁，行号按矩阵文件实际大小计算；
+  读取持共享锁，先按磁盘增量读入其它进程追加的索引，发现代数变化（其它进程压缩过）则整体重载
+- 写入只追加，先落矩阵再落索引；崩溃残留的半行 / 越界索引在下次写入时截掉
+- 超过 EMBEDDING_STORE_MAX_MB 时按最近使用顺序压缩到上限的 80%：写新一代文件，元数据原子切换后删旧文件
+  （最近使用顺序以本进程为准）
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = get_logger(__name__)
+
+_RECORD = struct.Struct("<32sI")
+# 压缩后保留上限的比例，避免刚压完又触发
+_COMPACT_TARGET = 0.8
+
+
+def _space_id(model: str, dimensions: Optional[int]) -> str:
+    return hashlib.sha256(f"{model}|{dimensions or ''}".encode("utf-8")).hexdigest()[:16]
+
+
+def text_key(model: str, dimensions: Optional[int], text: str) -> bytes:
+    return hashlib.sha256(f"{model}|{dimensions or ''}|{text}".encode("utf-8")).digest()
+
+
+def _lock_file(f, exclusive: bool) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    # msvcrt 只有排他锁；LK_LOCK 重试约 10 秒后抛错，继续等
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Space:
+    """一个 (模型, 维度) 的矩阵 + 索引；进程内由调用方持锁，进程间靠 {space}.lock 文件锁"""
+
+    def __init__(self, root: Path, model: str, dimensions: Optional[int], max_bytes: int) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self._root = root
+        self._id = _space_id(model, dimensions)
+        self._max_bytes = max_bytes
+        self.dim: Optional[int] = None
+        self._gen = 0
+        self._rows = 0
+        # 摘要 → 行号，按最近使用排序（末尾最新）
+        self._index: "OrderedDict[bytes, int]" = OrderedDict()
+        self._idx_offset = 0  # 已读入的索引文件字节数
+        self._mm: Optional[mmap.mmap] = None
+        self._mapped_rows = 0
+        self.compactions = 0
+        self._lock_fh = open(self._root / f"{self._id}.lock", "a+b")
+        with self._locked(exclusive=False):
+            self._refresh()
+        if self._index:
+            logger.info("embedding 仓库已加载: model=%s, dimensions=%s, %d 条", model, dimensions, len(self._index))
+
+    # ---------- 路径 ----------
+
+    @property
+    def _meta_path(self) -> Path:
+        return self._root / f"{self._id}.json"
+
+    def _vec_path(self, gen: int) -> Path:
+        return self._root / f"{self._id}.{gen}.f32"
+
+    def _idx_path(self, gen: int) -> Path:
+        return self._root / f"{self._id}.{gen}.idx"
+
+    @property
+    def _row_bytes(self) -> int:
+        return (self.dim or 0) * 4
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        _lock_file(self._lock_fh, exclusive)
+        try:
+            yield
+        finally:
+            _unlock_file(self._lock_fh)
+
+    # ---------- 读写 ----------
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        with self._locked(exclusive=False):
+            self._refresh()
+            return [self._get(key) for key in keys]
+
+    def put_many(self, items: Sequence[Tuple[bytes, Sequence[float]]]) -> int:
+        """写入未存过的条目，返回实际写入条数"""
+        with self._locked(exclusive=True):
+            self._refresh()
+            fresh: Dict[bytes, Sequence[float]] = {}
+            for key, vec in items:
+                if key not in self._index:
+                    fresh.setdefault(key, vec)
+            if not fresh:
+                return 0
+            if self.dim is None:
+                self.dim = len(next(iter(fresh.values())))
+                self._write_meta(self._gen)
+            rows = []
+            for key, vec in fresh.items():
+                if len(vec) != self.dim:
+                    logger.warning("embedding 维度与仓库不一致，不写入: 期望 %d, 实际 %d", self.dim, len(vec))
+                    continue
+                rows.append((key, vec))
+            if not rows:
+                return 0
+            self._repair()
+            start = self._rows
+            with open(self._vec_path(self._gen), "ab") as vf:
+                for _, vec in rows:
+                    vf.write(array("f", vec).tobytes())
+            # 先落矩阵再落索引：索引里的行一定已在矩阵中
+            with open(self._idx_path(self._gen), "ab") as xf:
+                xf.write(b"".join(_RECORD.pack(key, start + i) for i, (key, _) in enumerate(rows)))
+            for i, (key, _) in enumerate(rows):
+                self._index[key] = start + i
+            self._rows += len(rows)
+            self._idx_offset += len(rows) * _RECORD.size
+            if self._max_bytes and self._rows * self._row_bytes > self._max_bytes:
+                self._compact()
+            return len(rows)
+
+    def _get(self, key: bytes) -> Optional[List[float]]:
+        row = self._index.get(key)
+        if row is None:
+            return None
+        if row >= self._mapped_rows:
+            self._remap()
+        start = row * self._row_bytes
+        self._index.move_to_end(key)
+        return array("f", self._mm[start:start + self._row_bytes]).tolist()
+
+    @property
+    def entries(self) -> int:
+        return len(self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._rows * self._row_bytes
+
+    def close(self) -> None:
+        self._unmap()
+        self._lock_fh.close()
+
+    # ---------- 与磁盘同步（调用方持文件锁） ----------
+
+    def _refresh(self) -> None:
+        """读入其它进程追加的索引；元数据代数 / 维度变了（被压缩或重建）则整体重载"""
+        meta = self._read_meta()
+        if meta is None:
+            if self.dim is not None:
+                self._reset(None, 0)
+            return
+        dim, gen = meta
+        if dim != self.dim or gen != self._gen:
+            self._reset(dim, gen)
+        vec_path, idx_path = self._vec_path(self._gen), self._idx_path(self._gen)
+        rows = vec_path.stat().st_size // self._row_bytes if vec_path.exists() else 0
+        if not idx_path.exists():
+            self._rows = rows
+            return
+        with open(idx_path, "rb") as f:
+            f.seek(self._idx_offset)
+            data = f.read()
+        consumed = 0
+        for offset in range(0, len(data) - _RECORD.size + 1, _RECORD.size):
+            key, row = _RECORD.unpack_from(data, offset)
+            if row >= rows:
+                break
+            self._index[key] = row
+            consumed = offset + _RECORD.size
+        self._idx_offset += consumed
+        self._rows = rows
+
+    def _repair(self) -> None:
+        """截掉崩溃残留的半行矩阵与越界索引，保证新行号 = 矩阵完整行数；调用方持排他锁且刚 _refresh 过"""
+        for path, size in ((self._vec_path(self._gen), self._rows * self._row_bytes),
+                           (self._idx_path(self._gen), self._idx_offset)):
+            try:
+                if path.exists() and path.stat().st_size != size:
+                    os.truncate(path, size)
+            except OSError as e:
+                logger.warning("embedding 仓库截断残留失败: %s, %s", path, e)
+
+    def _reset(self, dim: Optional[int], gen: int) -> None:
+        self._unmap()
+        self.dim, self._gen = dim, gen
+        self._index = OrderedDict()
+        self._idx_offset = 0
+        self._rows = 0
+
+    def _read_meta(self) -> Optional[Tuple[int, int]]:
+        if not self._meta_path.exists():
+            return None
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+            return int(meta["dim"]), int(meta.get("generation", 0))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("embedding 仓库元数据损坏，忽略已有数据: %s, %s", self._meta_path, e)
+            return None
+
+    def _remap(self) -> None:
+        self._unmap()
+        with open(self._vec_path(self._gen), "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_rows = len(self._mm) // self._row_bytes
+
+    def _unmap(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._mapped_rows = 0
+
+    def _write_meta(self, gen: int) -> None:
+        tmp = self._meta_path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps({"model": self.model, "dimensions": self.dimensions, "dim": self.dim, "generation": gen}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._meta_path)
+
+    def _compact(self) -> None:
+        """调用方持排他锁"""
+        keep_rows = int(self._max_bytes * _COMPACT_TARGET) // self._row_bytes
+        keep: List[Tuple[bytes, int]] = list(self._index.items())[-keep_rows:] if keep_rows > 0 else []
+        self._remap()
+        gen = self._gen + 1
+        with open(self._vec_path(gen), "wb") as vf, open(self._idx_path(gen), "wb") as xf:
+            for new_row, (key, row) in enumerate(keep):
+                start = row * self._row_bytes
+                vf.write(self._mm[start:start + self._row_bytes])
+                xf.write(_RECORD.pack(key, new_row))
+        dropped = len(self._index) - len(keep)
+        self._write_meta(gen)
+        self._unmap()
+        self._gen = gen
+        self._index = OrderedDict((key, i) for i, (key, _) in enumerate(keep))
+        self._rows = len(keep)
+        self._idx_offset = len(keep) * _RECORD.size
+        # 旧代文件可能仍被其它进程映射（Windows 上删不掉），删不掉的留待下次压缩
+        for path in list(self._root.glob(f"{self._id}.*.f32")) + list(self._root.glob(f"{self._id}.*.idx")):
+            if path.stem.split(".")[-1] != str(gen):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        self.compactions += 1
+        logger.info("embedding 仓库压缩完成: model=%s, 保留 %d 条, 淘汰 %d 条", self.model, len(keep), dropped)
+
+
+class EmbeddingStore:
+    """按 (模型, 维度) 分组的内容寻址向量仓库，线程安全；同一目录可被多个进程同时使用"""
+
+    def __init__(self, root: str, max_mb: float = 512) -> None:
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = int(max(0.0, float(max_mb)) * 1024 * 1024)
+        self._spaces: Dict[str, _Space] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    def _space(self, model: str, dimensions: Optional[int]) -> _Space:
+        sid = _space_id(model, dimensions)
+        space = self._spaces.get(sid)
+        if space is None:
+            space = self._spaces[sid] = _Space(self._root, model, dimensions, self._max_bytes)
+        return space
+
+    def get_many(self, model: str, dimensions: Optional[int], texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """按文本取向量，未存的位置为 None"""
+        with self._lock:
+            space = self._space(model, dimensions)
+            out = space.get_many([text_key(model, dimensions, t) for t in texts])
+            found = sum(1 for v in out if v is not None)
+            self._hits += found
+            self._misses += len(out) - found
+            return out
+
+    def put_many(self, model: str, dimensions: Optional[int], texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        with self._lock:
+            space = self._space(model, dimensions)
+            items = [(text_key(model, dimensions, t), v) for t, v in zip(texts, vectors) if v is not None]
+            self._writes += space.put_many(items)
+
+    def close(self) -> None:
+        with self._lock:
+            for space in self._spaces.values():
+                space.close()
+            self._spaces.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": True,
+                "path": str(self._root),
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "spaces": [
+                    {
+                        "model": s.model,
+                        "dimensions": s.dimensions,
+                        "entries": s.entries,
+                        "size_bytes": s.size_bytes,
+                        "compactions": s.compactions,
+                    }
+                    for s in self._spaces.values()
+                ],
+            }
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """进程内共享的 embedding 仓库；EMBEDDING_STORE_DIR 为空或目录不可用时返回 None"""
+    global _store
+    if _store is None and settings.EMBEDDING_STORE_DIR:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = EmbeddingStore(settings.EMBEDDING_STORE_DIR, settings.EMBEDDING_STORE_MAX_MB)
+                except OSError as e:
+                    logger.warning("embedding 仓库目录不可用，不启用: %s", e)
+                    return None
+    return _store
+
+
+def get_embedding_store_stats() -> dict:
+    """embedding 仓库统计（/api/v1/metrics）"""
+    store = get_embedding_store()
+    return store.stats() if store is not None else {"enabled": False}
+
+
+def close_embedding_store() -> None:
+    """应用关闭时释放文件句柄与 mmap"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -8,6 +8,14 @@ class FakeEmbedder(IEmbedder):
     本地伪向量：用于先把链路跑通（不依赖外部模型）
     向量维度固定 64
     """
+    @property
+    def model_name(self) -> str:
+        return "fake"
+
+    @property
+    def dimensions(self) -> int | None:
+        return 64
+
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         vectors: list[list[float]] = []
         for t in texts:
@@ -1,9 +1,10 @@
 """OpenAI 兼容的 Embedding 实现（批量），支持 OpenAI / DeepSeek / 阿里百炼 DashScope"""
 from typing import List
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from app.core.config import settings
 from app.core.logging_config import get_logger
 from app.infra.embedding.base import IEmbedder
+from app.infra.embedding.batching import BatchLimits, resolve_batch_limits
 
 logger = get_logger(__name__)
 
@@ -49,12 +50,27 @@ class OpenAIEmbedder(IEmbedder):
         base_url = _embedder_base_url()
         if base_url:
             self._client = OpenAI(api_key=api_key, base_url=base_url.rstrip("/"))
+            self._aclient = AsyncOpenAI(api_key=api_key, base_url=base_url.rstrip("/"))
             logger.info("Embedding 使用兼容接口: base_url=%s", base_url)
         else:
             self._client = OpenAI(api_key=api_key)
+            self._aclient = AsyncOpenAI(api_key=api_key)
         self._model = settings.OPENAI_EMBEDDING_MODEL or settings.EMBEDDING_MODEL
         self._extra = _embedder_extra_kwargs()
 
+    @property
+    def model_name(self) -> str:
+        return self._model
+
+    @property
+    def dimensions(self) -> int | None:
+        return self._extra.get("dimensions")
+
+    @property
+    def batch_limits(self) -> BatchLimits:
+        """按 base_url 识别服务商（如百炼单次最多 10 条）"""
+        return resolve_batch_limits(_embedder_base_url())
+
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         """OpenAI 兼容 embeddings，支持批量 input；百炼 v3/v4 可传 dimensions"""
         kwargs: dict = {"model": self._model, "input": texts, **self._extra}
@@ -62,6 +78,13 @@ class OpenAIEmbedder(IEmbedder):
         items = sorted(resp.data, key=lambda x: x.index)
         return [item.embedding for item in items]
 
+    async def aembed_texts(self, texts: list[str]) -> list[list[float]]:
+        """异步版本：AsyncOpenAI 直接 await，不占用线程"""
+        kwargs: dict = {"model": self._model, "input": texts, **self._extra}
+        resp = await self._aclient.embeddings.create(**kwargs)
+        items = sorted(resp.data, key=lambda x: x.index)
+        return [item.embedding for item in items]
+
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """兼容旧代码的方法名"""
         return self.embed_texts(texts)
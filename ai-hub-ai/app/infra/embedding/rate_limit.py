@@ -0,0 +1,92 @@
+"""
+Embedding 调用限流：令牌桶，按服务商配额（每秒请求数 QPS、每分钟 token 数 TPM）放行
+- 进程内共享一个限流器，批量重建、导入写向量等并发调用合计不超配额
+- token 数按字符数估算（中文约 1 字 1 token，偏保守）
+- 配额为 0 表示不限
+"""
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+
+class TokenBucket:
+    """容量 capacity、每秒补充 rate 的令牌桶；acquire 不足时阻塞等待"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = float(rate)
+        self._capacity = max(1.0, float(capacity))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """取 amount 个令牌（超过容量按容量算，避免永远等不到），返回等待秒数"""
+        amount = min(float(amount), self._capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self._rate
+            time.sleep(delay)
+            waited += delay
+
+
+class EmbeddingRateLimiter:
+    """请求数 + token 数两个令牌桶；每次 embed_texts 前调用 acquire"""
+
+    def __init__(self, qps: float = 0.0, tpm: float = 0.0) -> None:
+        self._requests = TokenBucket(qps, max(1.0, qps)) if qps and qps > 0 else None
+        # TPM 配额允许一分钟内的突发，桶容量取一分钟的量
+        self._tokens = TokenBucket(tpm / 60.0, tpm) if tpm and tpm > 0 else None
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "tokens": 0, "waited_seconds": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None
+
+    def acquire(self, texts: list[str]) -> None:
+        tokens = sum(len(t) for t in texts)
+        waited = 0.0
+        if self._requests is not None:
+            waited += self._requests.acquire(1)
+        if self._tokens is not None:
+            waited += self._tokens.acquire(tokens)
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["tokens"] += tokens
+            self._counts["waited_seconds"] += waited
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["waited_seconds"] = round(counts["waited_seconds"], 3)
+        return {"enabled": self.enabled, **counts}
+
+
+_limiter: Optional[EmbeddingRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_embedding_rate_limiter() -> EmbeddingRateLimiter:
+    """进程内共享的 embedding 限流器（EMBEDDING_RATE_LIMIT_QPS / EMBEDDING_RATE_LIMIT_TPM）"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = EmbeddingRateLimiter(
+                    qps=settings.EMBEDDING_RATE_LIMIT_QPS,
+                    tpm=settings.EMBEDDING_RATE_LIMIT_TPM,
+                )
+    return _limiter
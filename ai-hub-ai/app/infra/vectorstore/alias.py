@@ -0,0 +1,81 @@
+"""
+向量集合别名：检索 / 写入使用的「当前集合」由一个指针文件决定，全量重建写进新版本集合，校验通过后原子切换指针
+- 指针文件 {persist_dir}/{集合名}.alias.json：{"active", "previous", "updated_at"}；os.replace 原子替换
+- 没有指针文件时当前集合就是配置的集合名（兼容已有数据）
+- previous 保留上一版本，可一键回滚
+- 其它进程（如 scripts/rebuild_all_vectors.py）切换后，按文件修改时间发现并跟随
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class CollectionAlias:
+    def __init__(self, path: Path, default: str) -> None:
+        self._path = Path(path)
+        self.base = default
+        self._lock = threading.Lock()
+        self.active = default
+        self.previous: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """指针文件有变化时重新读取，返回当前集合是否改变"""
+        try:
+            mtime = self._path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            try:
+                state = json.loads(self._path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning("集合别名文件读取失败，沿用当前集合 %s: %s", self.active, e)
+                return False
+            self._mtime = mtime
+            changed = state.get("active") != self.active
+            self.active = state.get("active") or self.base
+            self.previous = state.get("previous")
+            return changed
+
+    def new_version_name(self) -> str:
+        """新版本集合名：{集合名}__v{时间戳}，按名字排序即按版本先后"""
+        return f"{self.base}__v{time.strftime('%Y%m%d%H%M%S')}"
+
+    def is_version(self, name: str) -> bool:
+        return name == self.base or name.startswith(f"{self.base}__v")
+
+    def switch(self, name: str) -> str:
+        """把当前集合切到 name，原当前集合记为 previous；返回原当前集合"""
+        with self._lock:
+            old = self.active
+            self._write(active=name, previous=old)
+            return old
+
+    def rollback(self) -> str:
+        """切回 previous（与 active 互换），返回回滚后的当前集合"""
+        with self._lock:
+            if not self.previous:
+                raise ValueError("没有可回滚的上一版本集合")
+            self._write(active=self.previous, previous=self.active)
+            return self.active
+
+    def _write(self, active: str, previous: Optional[str]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"active": active, "previous": previous, "updated_at": time.time()}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._path)
+        self.active, self.previous = active, previous
+        self._mtime = self._path.stat().st_mtime
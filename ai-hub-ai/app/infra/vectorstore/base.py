@@ -21,6 +21,42 @@ class IVectorStore(ABC):
         """
         raise NotImplementedError
 
+    def get_article_metadatas(self, tenant_id: str, article_ids: list[int]) -> dict[str, dict]:
+        """取这些 article 现有向量的 {vector_id: metadata}（增量重建比对用）"""
+        raise NotImplementedError("get_article_metadatas not supported")
+
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        """只改 metadata，不动向量与文档"""
+        raise NotImplementedError("update_metadatas not supported")
+
+    def delete_ids(self, ids: list[str]) -> None:
+        """按 vector id 删除"""
+        raise NotImplementedError("delete_ids not supported")
+
     def clear_collection(self) -> None:
         """清空当前集合（全量重建前使用）。未实现的 store 会抛 NotImplementedError。"""
         raise NotImplementedError("clear_collection not supported")
+
+    def count(self) -> int:
+        """当前集合的向量条数"""
+        raise NotImplementedError("count not supported")
+
+    def begin_shadow(self) -> "IVectorStore":
+        """新建一个版本集合（影子集合）用于全量重建；返回只写该集合的 store，当前集合照常服务"""
+        raise NotImplementedError("begin_shadow not supported")
+
+    def promote_shadow(self, shadow: "IVectorStore") -> dict:
+        """影子集合原子切换为当前集合，返回 {"active", "previous", ...}"""
+        raise NotImplementedError("promote_shadow not supported")
+
+    def abort_shadow(self, shadow: "IVectorStore") -> None:
+        """放弃并删除影子集合"""
+        raise NotImplementedError("abort_shadow not supported")
+
+    def rollback(self) -> dict:
+        """切回上一版本集合"""
+        raise NotImplementedError("rollback not supported")
+
+    def collection_info(self) -> dict:
+        """当前 / 上一版本 / 构建中的集合"""
+        raise NotImplementedError("collection_info not supported")
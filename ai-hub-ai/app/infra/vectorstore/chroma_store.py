@@ -1,18 +1,46 @@
-"""Chroma 向量库实现"""
+"""
+Chroma 向量库实现
+- 当前集合经别名指针（alias.CollectionAlias）解析；全量重建写入影子集合（新版本），校验后原子切换，可回滚
+- 影子集合构建期间，本进程的增量写入（upsert / 改 metadata / 删除）同时写到影子集合；
+  其它进程（重建脚本之外的 API 服务）的变更由重建方在切换前按主库变更记录补写，见 IngestService._replay_into_shadow
+"""
+from pathlib import Path
+from typing import Optional
+
 import chromadb
 from app.core.config import settings
 from app.core.logging_config import get_logger
+from app.infra.vectorstore.alias import CollectionAlias
 from app.infra.vectorstore.base import IVectorStore
 
 logger = get_logger(__name__)
 
 
 class ChromaVectorStore(IVectorStore):
-    def __init__(self) -> None:
+    def __init__(self, collection_name: Optional[str] = None, client=None) -> None:
+        """collection_name 为空时按别名取当前集合；传入时固定使用该集合（影子集合）"""
         persist_dir = settings.CHROMA_PERSIST_DIR or settings.CHROMA_PERSIST_PATH or "./data/chroma"
-        self._collection_name = settings.CHROMA_COLLECTION or "kb_articles"
-        self._client = chromadb.PersistentClient(path=persist_dir)
+        base = settings.CHROMA_COLLECTION or "kb_articles"
+        self._client = client or chromadb.PersistentClient(path=persist_dir)
+        self._alias = None if collection_name else CollectionAlias(Path(persist_dir) / f"{base}.alias.json", base)
+        self._collection_name = collection_name or self._alias.active
         self._col = self._client.get_or_create_collection(name=self._collection_name)
+        self._shadow: Optional["ChromaVectorStore"] = None
+
+    @property
+    def collection_name(self) -> str:
+        return self._collection_name
+
+    def _current(self):
+        """当前集合；别名被其它进程切换过时跟随"""
+        if self._alias is not None and self._alias.reload() and self._alias.active != self._collection_name:
+            logger.info("Chroma 当前集合已切换: %s -> %s", self._collection_name, self._alias.active)
+            self._use(self._alias.active)
+        return self._col
+
+    def _use(self, name: str) -> None:
+        self._col = self._client.get_or_create_collection(name=name)
+        self._collection_name = name
 
     def _recreate_collection(self) -> None:
         """删除当前集合并重新创建（用于切换 embedding 维度后）"""
@@ -25,6 +53,7 @@ class ChromaVectorStore(IVectorStore):
 
     def clear_collection(self) -> None:
         """清空向量库（删集合并重建），用于全量覆盖前先去掉旧 article_id。"""
+        self._current()
         try:
             self._client.delete_collection(name=self._collection_name)
             logger.info("Chroma 已清空集合: %s（全量重建前）", self._collection_name)
@@ -32,9 +61,90 @@ class ChromaVectorStore(IVectorStore):
             logger.debug("清空集合时忽略: %s", e)
         self._col = self._client.get_or_create_collection(name=self._collection_name)
 
+    # ---------- 影子集合 / 别名切换 ----------
+
+    def count(self) -> int:
+        return self._current().count()
+
+    def begin_shadow(self) -> "ChromaVectorStore":
+        if self._alias is None:
+            raise NotImplementedError("影子集合只能从按别名访问的向量库创建")
+        if self._shadow is not None:
+            raise RuntimeError(f"已有影子集合在构建中: {self._shadow.collection_name}")
+        shadow = ChromaVectorStore(collection_name=self._alias.new_version_name(), client=self._client)
+        self._shadow = shadow
+        logger.info("Chroma 开始构建影子集合: %s（当前集合 %s 照常服务）", shadow.collection_name, self._collection_name)
+        return shadow
+
+    def promote_shadow(self, shadow: "ChromaVectorStore") -> dict:
+        """把影子集合切成当前集合；保留上一版本用于回滚，更早的版本删除"""
+        self._current()
+        old = self._alias.switch(shadow.collection_name)
+        self._col, self._collection_name = shadow._col, shadow.collection_name
+        self._shadow = None
+        dropped = self._drop_old_versions()
+        logger.info("Chroma 当前集合已切换: %s -> %s，删除旧版本 %s", old, self._collection_name, dropped)
+        return {"active": self._collection_name, "previous": old, "dropped": dropped}
+
+    def abort_shadow(self, shadow: "ChromaVectorStore") -> None:
+        """放弃影子集合（构建失败或校验不通过），当前集合不受影响"""
+        if self._shadow is shadow:
+            self._shadow = None
+        try:
+            self._client.delete_collection(name=shadow.collection_name)
+            logger.info("Chroma 已放弃影子集合: %s", shadow.collection_name)
+        except Exception as e:
+            logger.debug("删除影子集合时忽略: %s", e)
+
+    def rollback(self) -> dict:
+        """切回上一版本集合（与当前互换，可再次回滚）"""
+        if self._alias is None:
+            raise NotImplementedError("固定集合不支持回滚")
+        self._current()
+        old = self._collection_name
+        self._use(self._alias.rollback())
+        logger.warning("Chroma 当前集合已回滚: %s -> %s", old, self._collection_name)
+        return {"active": self._collection_name, "previous": old}
+
+    def collection_info(self) -> dict:
+        self._current()
+        shadow = self._shadow
+        return {
+            "active": self._collection_name,
+            "previous": self._alias.previous if self._alias is not None else None,
+            "shadow": shadow.collection_name if shadow is not None else None,
+            "count": self._col.count(),
+        }
+
+    def _drop_old_versions(self) -> list[str]:
+        keep = {self._alias.active, self._alias.previous}
+        dropped = []
+        for c in self._client.list_collections():
+            name = getattr(c, "name", c)
+            if self._alias.is_version(name) and name not in keep:
+                try:
+                    self._client.delete_collection(name=name)
+                    dropped.append(name)
+                except Exception as e:
+                    logger.warning("删除旧版本集合失败 %s: %s", name, e)
+        return dropped
+
+    def _mirror(self, op: str, *args) -> None:
+        """影子集合构建期间，把本进程的增量写入同步一份过去；失败只记日志"""
+        shadow = self._shadow
+        if shadow is None:
+            return
+        try:
+            getattr(shadow, op)(*args)
+        except Exception as e:
+            logger.warning("增量写入同步到影子集合失败（%s）: %s", op, e)
+
+    # ---------- 读写 ----------
+
     def upsert(self, ids: list[str], embeddings: list[list[float]], documents: list[str], metadatas: list[dict]) -> int:
+        self._mirror("upsert", ids, embeddings, documents, metadatas)
         try:
-            self._col.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+            self._current().upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
         except Exception as e:
             err_msg = str(e).lower()
             # 维度与集合不一致（如从 fake 64 维切到百炼 1024 维）：删集合重建后重试一次
@@ -54,15 +164,37 @@ class ChromaVectorStore(IVectorStore):
 
     def delete_by_article(self, tenant_id: str, article_id: int) -> None:
         """用 where 过滤删除（依赖你写入时 metadata 带 article_id）"""
+        self._mirror("delete_by_article", tenant_id, article_id)
         try:
-            self._col.delete(where={"tenant_id": tenant_id, "article_id": article_id})
+            self._current().delete(where={"tenant_id": tenant_id, "article_id": article_id})
             logger.info("Chroma 按 article_id 删除 tenant=%s id=%s", tenant_id, article_id)
         except Exception as e:
             logger.debug("Chroma delete_by_article 可能无匹配: %s", e)
 
+    def get_article_metadatas(self, tenant_id: str, article_ids: list[int]) -> dict[str, dict]:
+        if not article_ids:
+            return {}
+        res = self._current().get(
+            where={"$and": [{"tenant_id": tenant_id}, {"article_id": {"$in": list(article_ids)}}]},
+            include=["metadatas"],
+        )
+        return dict(zip(res.get("ids") or [], res.get("metadatas") or []))
+
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        if ids:
+            self._mirror("update_metadatas", ids, metadatas)
+            self._current().update(ids=ids, metadatas=metadatas)
+            logger.info("Chroma 更新 metadata %d 条", len(ids))
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if ids:
+            self._mirror("delete_ids", ids)
+            self._current().delete(ids=ids)
+            logger.info("Chroma 按 id 删除 %d 条", len(ids))
+
     def query(self, embedding: list[float], top_k: int, where: dict) -> list[dict]:
         # 新版 Chroma 的 include 只支持: documents, embeddings, metadatas, distances, uris, data（不含 ids）
-        res = self._col.query(
+        res = self._current().query(
             query_embeddings=[embedding],
             n_results=top_k,
             where=where,
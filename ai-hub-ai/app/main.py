@@ -25,13 +25,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings, APP_ENV
+from app.core.concurrency import run_blocking, shutdown_executors
 from app.core.logging import setup_logging
 from app.core.logging_config import setup_logging as setup_logging_old, get_logger
 from app.core.exceptions import AppException
 from app.core.middleware import RequestLogMiddleware
 from app.api.v1.router import api_router
 from app.api.chat import router as chat_router
-from app.clients.deepseek_client import DeepSeekClient
+from app.clients.deepseek_client import get_llm_client, reset_llm_client
+from app.clients.http_clients import close_http_clients
+from app.infra.db.pool import close_all_pools, get_pool
+from app.infra.embedding.embedding_store import close_embedding_store
+from app.audit.audit_queue import get_audit_queue
+from app.services.attachment_service import get_remote_attachment_catalog, stop_remote_attachment_catalogs
+from app.services.import_jobs import shutdown_import_jobs
+from app.services.kb_sync import get_kb_sync, stop_kb_sync
 
 # 初始化日志（在其它模块使用 logger 前执行）
 setup_logging()
@@ -60,7 +68,7 @@ def create_app() -> FastAPI:
         logger.info("向量库: %s (collection: %s)", settings.CHROMA_PERSIST_DIR, settings.CHROMA_COLLECTION)
 
         # 对话 LLM：百炼兼容 或 DeepSeek 直连
-        chat_client = DeepSeekClient()
+        chat_client = get_llm_client()
         if chat_client.is_available:
             if getattr(chat_client, "_use_dashscope", False):
                 logger.info(
@@ -103,8 +111,41 @@ def create_app() -> FastAPI:
 
             asyncio.create_task(_open_swagger())
 
+        # 后台预热 SQL Server 连接池（数据库不可达时不影响启动）
+        asyncio.create_task(run_blocking("db", get_pool().warmup))
+
+        # 审计后台队列
+        await get_audit_queue().start()
+
+        # 后台预热对话 LLM 连接，首条消息的意图分类不再付 TLS 握手
+        if settings.LLM_WARMUP_ON_STARTUP and chat_client.is_available:
+            asyncio.create_task(chat_client.warmup())
+
+        # 远程附件目录：启动即拉取一次，之后后台按 TTL 条件刷新
+        if settings.ATTACHMENT_FILES_API_BASE_URL and settings.ATTACHMENT_REMOTE_PATH:
+            await get_remote_attachment_catalog().start()
+
+        # kb_article 增量同步：按水位轮询主库，向量库自动跟上变更
+        if settings.KB_SYNC_ENABLED:
+            await get_kb_sync().start()
+
         yield
 
+        # 取消未完成的导入任务并关闭解析进程池
+        await shutdown_import_jobs()
+        await stop_kb_sync()
+        await stop_remote_attachment_catalogs()
+        # 先把剩余审计事件发完（超时则按溢出策略落盘/丢弃）
+        await get_audit_queue().stop()
+        # 释放出站 HTTP 共享连接池（审计队列发完之后再关）
+        reset_llm_client()
+        await close_http_clients()
+
+        # 关闭阻塞调用线程池与数据库连接池
+        shutdown_executors()
+        close_all_pools()
+        close_embedding_store()
+
     app = FastAPI(
         title=settings.APP_NAME or getattr(settings, "APP_TITLE", "AI Hub 服务"),
         description=getattr(settings, "APP_DESCRIPTION", "处理 Excel 文件导入和智能客服问答"),
@@ -1,11 +1,15 @@
 """从 SQL Server 读 kb_article 和 kb_asset，不直接写 SQL 在 service 里"""
-from typing import Optional, List, Dict, Any
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
 from app.infra.db.sqlserver import SqlServer, execute_query
 from app.schemas.kb_article import KbArticle
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# SQL Server 单条语句参数上限 2100，IN 查询按此分批
+IN_BATCH_SIZE = 1000
+
 
 def get_assets_by_article_id(article_id: int) -> List[Dict[str, Any]]:
     """
@@ -62,6 +66,57 @@ class KbArticleRepository:
             return None
         return KbArticle(**row)
 
+    def get_by_ids(self, article_ids: list[int]) -> list[KbArticle]:
+        """
+        按 id 批量取：一次 WHERE id IN (...) 查询（超长时按 IN_BATCH_SIZE 分批），
+        按传入顺序返回（即向量命中顺序），不存在或已删除的 id 跳过
+        """
+        ids = list(dict.fromkeys(int(i) for i in article_ids))
+        if not ids:
+            return []
+        by_id: dict[int, KbArticle] = {}
+        for start in range(0, len(ids), IN_BATCH_SIZE):
+            part = ids[start:start + IN_BATCH_SIZE]
+            placeholders = ",".join("?" * len(part))
+            sql = f"""
+            SELECT
+                id, tenant_id, title, question_text, cause_text, solution_text, tags, scope_json, status, version
+            FROM dbo.kb_article
+            WHERE id IN ({placeholders}) AND deleted_at IS NULL
+            """
+            for row in self._db.fetch_all(sql, tuple(part)):
+                by_id[int(row["id"])] = KbArticle(**row)
+        return [by_id[i] for i in ids if i in by_id]
+
+    def list_by_import_source(self, tenant_id: str, source: str) -> list[dict]:
+        """
+        取某个 Excel 导入源（文件 + sheet）之前导入的条目：[{"id", "scope_json"}]
+        source 为十六进制摘要，LIKE 粗筛后由调用方解析 scope_json 精确比对
+        """
+        sql = """
+        SELECT id, scope_json
+        FROM dbo.kb_article
+        WHERE tenant_id = ? AND deleted_at IS NULL AND scope_json LIKE ?
+        """
+        return self._db.fetch_all(sql, (tenant_id, f"%{source}%"))
+
+    def list_asset_urls(self, article_ids: list[int]) -> dict[int, set[str]]:
+        """按 article 批量取已有附件地址 {article_id: {url}}，用于增量导入时只补新附件"""
+        ids = list(dict.fromkeys(int(i) for i in article_ids))
+        out: dict[int, set[str]] = {i: set() for i in ids}
+        for start in range(0, len(ids), IN_BATCH_SIZE):
+            part = ids[start:start + IN_BATCH_SIZE]
+            placeholders = ",".join("?" * len(part))
+            sql = f"""
+            SELECT article_id, url
+            FROM dbo.kb_asset
+            WHERE article_id IN ({placeholders}) AND deleted_at IS NULL
+            """
+            for row in self._db.fetch_all(sql, tuple(part)):
+                if row.get("url"):
+                    out[int(row["article_id"])].add(row["url"])
+        return out
+
     def count_ids(self, tenant_id: str, status: str | None = None) -> int:
         """
         统计符合条件的 article 数量（用于调试：确认库中是否有数据）
@@ -113,6 +168,74 @@ class KbArticleRepository:
         logger.info("list_ids 返回: %d 条 (tenant_id=%r)", len(ids), tenant_id)
         return ids
 
+    def iter_pages(
+        self,
+        tenant_id: str,
+        status: str | None = None,
+        limit: int | None = None,
+        page_size: int = 500,
+    ) -> Iterator[list[KbArticle]]:
+        """
+        按 id 游标分页流式读取整行（用于全量 ingest）：WHERE id > 上一页最大 id ORDER BY id，
+        每页一次查询，不先拉 id 再逐条回表；limit 为总条数上限
+        """
+        page_size = max(1, int(page_size))
+        status_filter = "AND status = ?" if status else ""
+        sql = f"""
+        SELECT TOP (?)
+            id, tenant_id, title, question_text, cause_text, solution_text, tags, scope_json, status, version
+        FROM dbo.kb_article
+        WHERE tenant_id = ? {status_filter} AND deleted_at IS NULL AND id > ?
+        ORDER BY id ASC
+        """
+        last_id = 0
+        remaining = limit if limit and limit > 0 else None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            params = (size, tenant_id, status, last_id) if status else (size, tenant_id, last_id)
+            rows = self._db.fetch_all(sql, params)
+            if not rows:
+                return
+            page = [KbArticle(**row) for row in rows]
+            yield page
+            if len(page) < size:
+                return
+            last_id = page[-1].id
+            if remaining is not None:
+                remaining -= len(page)
+
+    def list_changes(self, tenant_id: str, since: datetime, since_id: int = 0, limit: int = 200) -> list[dict]:
+        """
+        增量同步用：取变更位置在 (since, since_id) 之后的行，含已软删除的行
+        变更时间 changed_at 取 created_at / updated_at / deleted_at 中最晚者；按 (changed_at, id) 升序，
+        调用方以最后一行的 (changed_at, id) 作为下一页 / 下一轮的水位
+        """
+        sql = """
+        SELECT TOP (?)
+            a.id, a.tenant_id, a.title, a.question_text, a.cause_text, a.solution_text, a.tags, a.scope_json,
+            a.status, a.version, a.deleted_at, c.changed_at
+        FROM dbo.kb_article a
+        CROSS APPLY (
+            SELECT MAX(v) AS changed_at FROM (VALUES (a.created_at), (a.updated_at), (a.deleted_at)) AS t(v)
+        ) c
+        WHERE a.tenant_id = ? AND (c.changed_at > ? OR (c.changed_at = ? AND a.id > ?))
+        ORDER BY c.changed_at ASC, a.id ASC
+        """
+        return self._db.fetch_all(sql, (max(1, int(limit)), tenant_id, since, since, since_id))
+
+    def latest_change(self, tenant_id: str) -> Optional[datetime]:
+        """当前最晚的变更时间（与 list_changes 的 changed_at 同口径，数据库时钟）；没有数据时返回 None"""
+        sql = """
+        SELECT MAX(c.changed_at) AS changed_at
+        FROM dbo.kb_article a
+        CROSS APPLY (
+            SELECT MAX(v) AS changed_at FROM (VALUES (a.created_at), (a.updated_at), (a.deleted_at)) AS t(v)
+        ) c
+        WHERE a.tenant_id = ?
+        """
+        row = self._db.fetch_one(sql, (tenant_id,))
+        return row["changed_at"] if row else None
+
 
 # 兼容旧代码的函数式接口
 def get_article(article_id: int, tenant_id: Optional[str] = None) -> Optional[KbArticle]:
@@ -12,6 +12,15 @@ class VectorRepository:
     def delete_by_article(self, tenant_id: str, article_id: int) -> None:
         self._store.delete_by_article(tenant_id, article_id)
 
+    def get_article_metadatas(self, tenant_id: str, article_ids: list[int]) -> dict[str, dict]:
+        return self._store.get_article_metadatas(tenant_id, article_ids)
+
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        self._store.update_metadatas(ids, metadatas)
+
+    def delete_ids(self, ids: list[str]) -> None:
+        self._store.delete_ids(ids)
+
     def clear_collection(self) -> None:
         """清空整个向量集合（全量覆盖前调用）。"""
         self._store.clear_collection()
@@ -19,6 +28,25 @@ class VectorRepository:
     def query(self, embedding: list[float], top_k: int, where: dict) -> list[dict]:
         return self._store.query(embedding, top_k, where)
 
+    def count(self) -> int:
+        return self._store.count()
+
+    def begin_shadow(self) -> "VectorRepository":
+        """全量重建用：新版本集合（影子集合）的仓库，写入不影响当前检索"""
+        return VectorRepository(self._store.begin_shadow())
+
+    def promote_shadow(self, shadow: "VectorRepository") -> dict:
+        return self._store.promote_shadow(shadow._store)
+
+    def abort_shadow(self, shadow: "VectorRepository") -> None:
+        self._store.abort_shadow(shadow._store)
+
+    def rollback(self) -> dict:
+        return self._store.rollback()
+
+    def collection_info(self) -> dict:
+        return self._store.collection_info()
+
 
 # 兼容旧代码的函数式接口
 def _default_store() -> IVectorStore:
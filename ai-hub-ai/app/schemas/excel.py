@@ -1,6 +1,6 @@
 """Excel 导入相关 DTO"""
-from typing import List, Any
-from pydantic import BaseModel
+from typing import List, Any, Optional
+from pydantic import BaseModel, Field
 
 
 class ExcelRowFailure(BaseModel):
@@ -9,6 +9,15 @@ class ExcelRowFailure(BaseModel):
     reason: str
 
 
+class ImportIngestStatus(BaseModel):
+    """导入后写入向量的结果：status 为 succeeded / partial / failed"""
+    status: str
+    total: int = 0
+    success: int = 0
+    upserted_total: int = 0
+    failed: List[dict] = Field(default_factory=list)
+
+
 class ExcelImportResponse(BaseModel):
     """Excel 导入响应"""
     total_rows: int
@@ -16,3 +25,34 @@ class ExcelImportResponse(BaseModel):
     failure_count: int
     article_ids: List[int]
     failures: List[dict]  # 兼容原有 dict 结构，元素形态等同 ExcelRowFailure
+    # 增量导入差异：按行指纹与之前导入的条目比对
+    created_count: int = 0
+    updated_count: int = 0
+    unchanged_count: int = 0
+    updated_ids: List[int] = Field(default_factory=list)
+    unchanged_ids: List[int] = Field(default_factory=list)
+    stale_article_ids: List[int] = Field(default_factory=list)  # 表中已无对应行的旧条目，仅报告不删除
+    ingest: Optional[ImportIngestStatus] = None  # 未开启自动写入向量时为空
+
+
+class ImportJobProgress(BaseModel):
+    """导入任务进度（行数）"""
+    rows_parsed: int = 0
+    rows_mapped: int = 0
+    rows_uploaded: int = 0
+    rows_unchanged: int = 0
+    rows_indexed: int = 0
+    rows_failed: int = 0
+
+
+class ImportJobResponse(BaseModel):
+    """后台导入任务状态：status 为 queued / parsing / uploading / indexing / succeeded / failed"""
+    job_id: str
+    filename: str
+    status: str
+    progress: ImportJobProgress
+    created_at: float
+    finished_at: Optional[float] = None
+    result: Optional[ExcelImportResponse] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
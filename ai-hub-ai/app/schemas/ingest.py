@@ -16,7 +16,7 @@ class IngestAllRequest(BaseModel):
     tenant_id: str | None = None
     status: str | None = None  # 例如：published
     limit: int | None = None  # 开发阶段可限制一下，避免一次跑太大
-    clear_first: bool = False  # True=先清空向量库再全量写入，实现全量覆盖（主库更新后重建用）
+    clear_first: bool = False  # True=全量覆盖（写入影子集合后原子切换，主库更新后重建用）
 
 
 class IngestBatchResponse(BaseModel):
@@ -24,6 +24,16 @@ class IngestBatchResponse(BaseModel):
     success: int
     upserted_total: int
     failed: list[dict]
+    # 向量条数：重新 embedding 写入 / 仅更新 metadata / 删除的多余 id / 内容未变跳过
+    changed: int = 0
+    retagged: int = 0
+    removed: int = 0
+    skipped: int = 0
+    # 仅全量重建（流水线）返回：总耗时与各段（read/chunk/embed/write）条数、忙碌时间、吞吐
+    elapsed_seconds: float | None = None
+    stages: dict | None = None
+    # 仅影子集合重建返回：{"promoted", "active", "previous", "dropped"} 或 {"promoted": false, "reason"}
+    swap: dict | None = None
 
 
 # 保留兼容旧代码
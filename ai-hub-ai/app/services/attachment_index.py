@@ -0,0 +1,363 @@
+"""
+附件文件索引
+把附件目录一次性扫描成内存索引，查找时只查字典，不再每次 rglob 全目录：
+- 规范化 stem → 文件列表（精确匹配）
+- 规范化文件夹名 → 文件夹列表，文件夹下文件按相对路径有序存放，前缀二分取出
+- 二元组倒排（查询串被包含）+ 子串枚举（查询串包含文件名）支撑模糊匹配
+本地目录按目录 mtime 轮询增量刷新：只重扫 mtime 变化的目录
+"""
+import bisect
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """索引中的一个文件：relative_path 为 / 分隔的相对路径，payload 由调用方携带（如远程列表项）"""
+
+    relative_path: str
+    file_name: str
+    norm_stem: str
+    ext: str
+    depth: int
+    payload: Any = None
+
+
+def _bigrams(s: str) -> Set[str]:
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+def _substrings(s: str) -> Set[str]:
+    """s 的全部非空子串（引用名通常很短，枚举代价可忽略）"""
+    n = len(s)
+    return {s[i:j] for i in range(n) for j in range(i + 1, n + 1)}
+
+
+class AttachmentLookup:
+    """
+    不可变的查找结构，构建后只读，可在多线程间共享。
+    entries 的顺序即各查询结果的优先顺序。
+    """
+
+    def __init__(
+        self,
+        entries: List[IndexEntry],
+        normalize: Callable[[str], str],
+        folder_key: Callable[[str], str] = lambda name: name,
+    ) -> None:
+        self.entries = entries
+        self._by_stem: Dict[str, List[int]] = {}
+        self._stem_grams: Dict[str, Set[int]] = {}
+        for i, e in enumerate(entries):
+            self._by_stem.setdefault(e.norm_stem, []).append(i)
+            for g in _bigrams(e.norm_stem):
+                self._stem_grams.setdefault(g, set()).add(i)
+
+        # 文件夹：从文件相对路径推出全部祖先目录
+        folders: Set[str] = set()
+        for e in entries:
+            parent = PurePosixPath(e.relative_path).parent
+            while str(parent) not in ("", "."):
+                folders.add(str(parent))
+                parent = parent.parent
+        self._folders = sorted(folders, key=lambda p: (p.count("/"), p.lower()))
+        self._by_folder: Dict[str, List[int]] = {}
+        self._folder_grams: Dict[str, Set[int]] = {}
+        self._norm_folders: List[str] = []
+        for i, rel in enumerate(self._folders):
+            norm = normalize(folder_key(rel.rsplit("/", 1)[-1]))
+            self._norm_folders.append(norm)
+            self._by_folder.setdefault(norm, []).append(i)
+            for g in _bigrams(norm):
+                self._folder_grams.setdefault(g, set()).add(i)
+
+        # 按相对路径（小写）排序，文件夹下的文件用前缀二分取出
+        self._sorted = sorted(entries, key=lambda e: e.relative_path.lower())
+        self._sorted_keys = [e.relative_path.lower() for e in self._sorted]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def folder_count(self) -> int:
+        return len(self._folders)
+
+    def exact(self, norm: str) -> List[IndexEntry]:
+        """规范化 stem 完全相等"""
+        return [self.entries[i] for i in self._by_stem.get(norm, ())]
+
+    def containing(self, norm: str) -> List[IndexEntry]:
+        """规范化 stem 包含 norm"""
+        ids = self._candidates(norm, self._stem_grams, len(self.entries))
+        return [self.entries[i] for i in ids if norm in self.entries[i].norm_stem]
+
+    def contained_in(self, norm: str) -> List[IndexEntry]:
+        """规范化 stem 是 norm 的（非空）子串"""
+        ids: Set[int] = set()
+        for sub in _substrings(norm):
+            ids.update(self._by_stem.get(sub, ()))
+        return [self.entries[i] for i in sorted(ids)]
+
+    def overlapping(self, norm: str) -> List[IndexEntry]:
+        """规范化 stem 与 norm 互相包含（任一方向），保持 entries 顺序"""
+        ids = {i for i in self._candidates(norm, self._stem_grams, len(self.entries)) if norm in self.entries[i].norm_stem}
+        for sub in _substrings(norm):
+            ids.update(self._by_stem.get(sub, ()))
+        return [self.entries[i] for i in sorted(ids)]
+
+    def folders(self, norm: str, fuzzy: bool = False) -> List[str]:
+        """
+        文件夹名匹配，返回相对路径；完全相等的排在前面，其余按层级、路径排序。
+        fuzzy=True 时额外包含「互相包含」的文件夹。
+        """
+        exact = self._by_folder.get(norm, [])
+        if not fuzzy:
+            return [self._folders[i] for i in exact]
+        ids = set(self._candidates(norm, self._folder_grams, len(self._folders)))
+        for sub in _substrings(norm):
+            ids.update(self._by_folder.get(sub, ()))
+        ids.difference_update(exact)
+        fuzzy_ids = [
+            i for i in sorted(ids)
+            if norm in self._norm_folders[i] or self._norm_folders[i] in norm
+        ]
+        return [self._folders[i] for i in exact + fuzzy_ids]
+
+    def under(self, folder: str) -> List[IndexEntry]:
+        """folder 下（递归）全部文件，按相对路径小写排序"""
+        prefix = folder.rstrip("/") + "/"
+        key = prefix.lower()
+        start = bisect.bisect_left(self._sorted_keys, key)
+        result = []
+        for i in range(start, len(self._sorted_keys)):
+            if not self._sorted_keys[i].startswith(key):
+                break
+            e = self._sorted[i]
+            if e.relative_path.startswith(prefix):
+                result.append(e)
+        return result
+
+    @staticmethod
+    def _candidates(norm: str, grams: Dict[str, Set[int]], total: int) -> List[int]:
+        """二元组倒排求交，得到可能包含 norm 的候选下标（单字符查询退化为全量）"""
+        if len(norm) < 2:
+            return list(range(total))
+        postings = []
+        for g in _bigrams(norm):
+            ids = grams.get(g)
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result &= ids
+            if not result:
+                break
+        return sorted(result)
+
+
+class LocalAttachmentIndex:
+    """
+    本地附件目录索引。首次查找时全量扫描；之后每隔 refresh_interval 秒最多检查一次各目录 mtime，
+    仅重扫 mtime 变化的目录（新增/删除/改名都会改变所在目录的 mtime）。
+    文件大小等元数据在构建结果时再 stat，不依赖索引。
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        normalize: Callable[[str], str],
+        skip: Callable[[str], bool] = lambda name: False,
+        refresh_interval: float = 30.0,
+    ) -> None:
+        self.base_path = Path(base_path)
+        self._normalize = normalize
+        self._skip = skip
+        self._interval = max(0.0, float(refresh_interval))
+        self._lock = threading.Lock()
+        # 相对目录（根为 ""）→ (mtime_ns, 文件名集合, 子目录名集合)
+        self._dirs: Dict[str, Tuple[int, Set[str], Set[str]]] = {}
+        self._entries: Dict[str, IndexEntry] = {}
+        self._lookup: Optional[AttachmentLookup] = None
+        self._checked_at = 0.0
+        self._built_at: Optional[float] = None
+        self._full_scans = 0
+        self._polls = 0
+        self._rescanned_dirs = 0
+
+    def lookup(self) -> AttachmentLookup:
+        """返回当前查找结构；到了检查间隔则先增量刷新"""
+        lookup = self._lookup
+        if lookup is not None and time.monotonic() - self._checked_at < self._interval:
+            return lookup
+        with self._lock:
+            if self._lookup is None:
+                self._full_scan()
+            elif time.monotonic() - self._checked_at >= self._interval:
+                self._poll()
+            self._checked_at = time.monotonic()
+            return self._lookup
+
+    def invalidate(self) -> None:
+        """丢弃索引，下次查找时全量重建"""
+        with self._lock:
+            self._dirs.clear()
+            self._entries.clear()
+            self._lookup = None
+
+    def stats(self) -> dict:
+        lookup = self._lookup
+        return {
+            "base_path": str(self.base_path),
+            "files": len(lookup) if lookup is not None else 0,
+            "folders": lookup.folder_count if lookup is not None else 0,
+            "full_scans": self._full_scans,
+            "polls": self._polls,
+            "rescanned_dirs": self._rescanned_dirs,
+            "built_at": self._built_at,
+        }
+
+    # ---------- 扫描 ----------
+
+    def _full_scan(self) -> None:
+        started = time.perf_counter()
+        self._dirs.clear()
+        self._entries.clear()
+        self._scan_tree("")
+        self._rebuild()
+        self._full_scans += 1
+        logger.info(
+            "附件索引构建完成: %s, %d 个文件, %d 个目录, 耗时 %.0fms",
+            self.base_path, len(self._entries), len(self._dirs), (time.perf_counter() - started) * 1000,
+        )
+
+    def _poll(self) -> None:
+        self._polls += 1
+        changed = False
+        for rel in list(self._dirs):
+            if rel not in self._dirs:
+                continue  # 已随父目录一起移除
+            try:
+                mtime = os.stat(self._abs(rel)).st_mtime_ns
+            except OSError:
+                self._remove_tree(rel)
+                changed = True
+                continue
+            if mtime != self._dirs[rel][0]:
+                self._rescan_dir(rel)
+                changed = True
+        if changed:
+            self._rebuild()
+
+    def _scan_tree(self, rel: str) -> None:
+        listing = self._list_dir(rel)
+        if listing is None:
+            return
+        self._dirs[rel] = listing
+        for name in listing[1]:
+            self._add_file(rel, name)
+        for name in listing[2]:
+            self._scan_tree(self._join(rel, name))
+
+    def _rescan_dir(self, rel: str) -> None:
+        self._rescanned_dirs += 1
+        listing = self._list_dir(rel)
+        if listing is None:
+            self._remove_tree(rel)
+            return
+        _, old_files, old_dirs = self._dirs[rel]
+        _, files, dirs = listing
+        self._dirs[rel] = listing
+        for name in old_files - files:
+            self._entries.pop(self._join(rel, name), None)
+        for name in files - old_files:
+            self._add_file(rel, name)
+        for name in old_dirs - dirs:
+            self._remove_tree(self._join(rel, name))
+        for name in dirs - old_dirs:
+            self._scan_tree(self._join(rel, name))
+
+    def _remove_tree(self, rel: str) -> None:
+        prefix = rel + "/"
+        for d in [d for d in self._dirs if d == rel or d.startswith(prefix)]:
+            del self._dirs[d]
+        for p in [p for p in self._entries if p.startswith(prefix)]:
+            del self._entries[p]
+
+    def _list_dir(self, rel: str) -> Optional[Tuple[int, Set[str], Set[str]]]:
+        path = self._abs(rel)
+        files: Set[str] = set()
+        dirs: Set[str] = set()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        # 不跟随目录软链接，避免环路
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.add(entry.name)
+                        elif entry.is_file() and not self._skip(entry.name):
+                            files.add(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.debug("附件索引扫描目录失败: %s, %s", path, e)
+            return None
+        return mtime, files, dirs
+
+    def _add_file(self, rel_dir: str, name: str) -> None:
+        rel = self._join(rel_dir, name)
+        p = PurePosixPath(name)
+        self._entries[rel] = IndexEntry(
+            relative_path=rel,
+            file_name=name,
+            norm_stem=self._normalize(p.stem),
+            ext=p.suffix.lower(),
+            depth=rel.count("/"),
+        )
+
+    def _rebuild(self) -> None:
+        # 浅层优先、同层按路径排序，保持「根目录优先」的查找语义
+        entries = sorted(self._entries.values(), key=lambda e: (e.depth, e.relative_path.lower()))
+        self._lookup = AttachmentLookup(entries, self._normalize)
+        self._built_at = time.time()
+
+    def _abs(self, rel: str) -> Path:
+        return self.base_path / rel if rel else self.base_path
+
+    @staticmethod
+    def _join(rel: str, name: str) -> str:
+        return f"{rel}/{name}" if rel else name
+
+
+
+def build_lookup(
+    items: Iterable[Tuple[str, Any]],
+    normalize: Callable[[str], str],
+    folder_key: Callable[[str], str] = lambda name: name,
+) -> AttachmentLookup:
+    """由 (相对路径, payload) 序列构建查找结构，保持输入顺序（用于远程附件列表）"""
+    entries = []
+    for rel, payload in items:
+        rel = (rel or "").replace("\\", "/").strip("/")
+        if not rel:
+            continue
+        p = PurePosixPath(rel)
+        entries.append(IndexEntry(
+            relative_path=rel,
+            file_name=p.name,
+            norm_stem=normalize(p.stem),
+            ext=p.suffix.lower(),
+            depth=rel.count("/"),
+            payload=payload,
+        ))
+    return AttachmentLookup(entries, normalize, folder_key=folder_key)
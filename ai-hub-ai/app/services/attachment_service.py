@@ -3,16 +3,24 @@
 在固定目录中根据引用名查找文件，并构建可供 .NET 批量创建用的元数据
 支持两种模式：本地目录（ATTACHMENT_BASE_PATH）或远程 API（api/files/list）
 """
+import asyncio
+import hashlib
 import os
 import re
+import threading
+import time
 import unicodedata
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote
 
 import httpx
+from app.clients.http_clients import get_sync_http_client
+from app.core.concurrency import run_blocking
 from app.core.config import settings
 from app.core.logging_config import get_logger
+from app.services.attachment_index import AttachmentLookup, IndexEntry, LocalAttachmentIndex, build_lookup
+from app.utils.text_normalize import extract_filename_from_reference  # noqa: F401  兼容原导入路径
 
 logger = get_logger(__name__)
 
@@ -30,6 +38,25 @@ def _normalize_for_match(s: str) -> str:
     return s
 
 
+def _clean_reference(filename: str) -> Tuple[str, str]:
+    """去掉引用名两侧的引号/括号和扩展名，返回 (清理后, 规范化后)"""
+    clean_filename = filename.strip().strip('"""\'""\'《》【】[]()（）').strip()
+    if "." in clean_filename:
+        clean_filename = Path(clean_filename).stem
+    return clean_filename, _normalize_for_match(clean_filename)
+
+
+_EXTENSIONS_MAP = {
+    "video": [".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv"],
+    "image": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"],
+    "pdf": [".pdf"],
+    "other": [".doc", ".docx", ".xls", ".xlsx", ".txt", ".ppt", ".pptx"],
+}
+# 参与匹配的扩展名及其优先级（视频 > 图片 > pdf > 文档）
+_EXT_PRIORITY = {ext: i for i, ext in enumerate(e for exts in _EXTENSIONS_MAP.values() for e in exts)}
+_ATTACHMENT_EXTS = frozenset(_EXT_PRIORITY)
+
+
 def _guess_asset_type_by_ext(ext: str) -> str:
     """根据扩展名判断文件类型"""
     ext = ext.lower()
@@ -142,31 +169,6 @@ def rewrite_attachment_url_to_remote(url: str) -> str:
     return url
 
 
-def extract_filename_from_reference(text: str) -> Optional[str]:
-    """
-    从文本引用中提取文件名
-    支持：参考"xxx"、参考：xxx、见附件：xxx、参考 xxx
-    """
-    if not text or not text.strip():
-        return None
-    text = text.strip()
-    # 参考"xxx" / 参考"xxx"
-    match = re.search(r'参考["""""]([^"""""]+)["""""]', text)
-    if match:
-        return match.group(1).strip().strip('"""\'""\'') or None
-    match = re.search(r"参考[：:]\s*(.+)", text)
-    if match:
-        return match.group(1).strip().strip('"""\'""\'') or None
-    match = re.search(r"见附件[：:]\s*(.+)", text)
-    if match:
-        return match.group(1).strip().strip('"""\'""\'') or None
-    match = re.search(r"参考\s+(.+)", text)
-    if match:
-        return match.group(1).strip().strip('"""\'""\'') or None
-    filename = re.sub(r"^(参考|见附件)[：:\s]*", "", text).strip('"""\'""\'')
-    return filename.strip() or None
-
-
 def _parse_remote_file_list(response_data: Any, base_url: str) -> List[dict]:
     """
     解析 api/files/list 返回的 JSON，统一为 [{"file_name","url","relative_path","type","size","directory"}]
@@ -214,6 +216,184 @@ def _parse_remote_file_list(response_data: Any, base_url: str) -> List[dict]:
     return result
 
 
+class RemoteAttachmentCatalog:
+    """
+    远程附件目录缓存（GET api/files/list?path=...）
+    - TTL 内直接返回内存中的查找结构，匹配只是字典查询
+    - 过期后条件请求（If-None-Match / If-Modified-Since）；304 或内容哈希未变时不重新解析
+    - 可选后台定时刷新：查找永远不阻塞在列表下载上
+    - 刷新失败时继续使用旧目录，并在 _RETRY_SECONDS 内不再重试
+    """
+
+    _RETRY_SECONDS = 30.0
+
+    def __init__(
+        self,
+        remote_base: str,
+        remote_path: str,
+        ttl_seconds: Optional[float] = None,
+        http_client: Optional[httpx.Client] = None,
+    ) -> None:
+        self.remote_base = (remote_base or "").strip()
+        self.remote_path = (remote_path or "").strip()
+        self._ttl = float(settings.ATTACHMENT_CATALOG_TTL_SECONDS if ttl_seconds is None else ttl_seconds)
+        self._http_client = http_client
+        self._lock = threading.Lock()
+        self._lookup: Optional[AttachmentLookup] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._digest: Optional[str] = None
+        self._fetched_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counts = {"requests": 0, "reloads": 0, "not_modified": 0, "unchanged": 0, "errors": 0}
+
+    @property
+    def _http(self) -> httpx.Client:
+        return self._http_client or get_sync_http_client("attachment")
+
+    def lookup(self) -> Optional[AttachmentLookup]:
+        """返回当前目录；过期且没有后台刷新时同步刷新一次"""
+        if not self._is_stale():
+            return self._lookup
+        if self._lookup is not None and self._refresher_running():
+            return self._lookup
+        with self._lock:
+            if self._is_stale():
+                self._refresh_locked()
+            return self._lookup
+
+    def refresh(self) -> bool:
+        """立即（条件）刷新，返回目录内容是否发生变化"""
+        with self._lock:
+            return self._refresh_locked()
+
+    async def start(self) -> None:
+        """启动后台刷新：先预热一次，之后每个 TTL 条件刷新"""
+        if self._task is not None or self._ttl <= 0 or not self.remote_base or not self.remote_path:
+            return
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        lookup = self._lookup
+        return {
+            "remote_path": self.remote_path,
+            "files": len(lookup) if lookup is not None else 0,
+            "age_seconds": round(time.monotonic() - self._fetched_at, 1) if lookup is not None else None,
+            "ttl_seconds": self._ttl,
+            "background_refresh": self._refresher_running(),
+            **self._counts,
+        }
+
+    def _is_stale(self) -> bool:
+        now = time.monotonic()
+        if self._failed_at is not None and now - self._failed_at < self._RETRY_SECONDS:
+            return False
+        if self._lookup is None:
+            return True
+        return now - self._fetched_at >= self._ttl
+
+    def _refresher_running(self) -> bool:
+        task = self._task
+        return task is not None and not task.done()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await run_blocking("attachment", self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("后台刷新远程附件目录失败: %s", e)
+            await asyncio.sleep(self._ttl)
+
+    def _refresh_locked(self) -> bool:
+        if not self.remote_base or not self.remote_path:
+            return False
+        url = f"{self.remote_base.rstrip('/')}/api/files/list"
+        headers = {}
+        if self._lookup is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        self._counts["requests"] += 1
+        try:
+            resp = self._http.get(url, params={"path": self.remote_path}, headers=headers, timeout=15.0)
+            if resp.status_code == 304 and self._lookup is not None:
+                self._counts["not_modified"] += 1
+                self._mark_fetched()
+                return False
+            resp.raise_for_status()
+            digest = hashlib.sha256(resp.content).hexdigest()
+            self._etag = resp.headers.get("ETag")
+            self._last_modified = resp.headers.get("Last-Modified")
+            if self._lookup is not None and digest == self._digest:
+                self._counts["unchanged"] += 1
+                self._mark_fetched()
+                return False
+            data = resp.json()
+        except Exception as e:
+            logger.warning("调用远程附件列表 API 失败: %s", e)
+            self._counts["errors"] += 1
+            self._failed_at = time.monotonic()
+            return False
+
+        items = _parse_remote_file_list(data, self.remote_base)
+        files = [f for f in items if not f.get("directory")]
+        self._lookup = build_lookup(
+            ((f.get("relative_path") or f.get("path") or f.get("file_name"), f) for f in files),
+            _normalize_for_match,
+            folder_key=lambda name: Path(name).stem,
+        )
+        self._digest = digest
+        self._counts["reloads"] += 1
+        self._mark_fetched()
+        logger.info("远程附件目录已更新: path=%s, %d 个文件", self.remote_path, len(files))
+        return True
+
+    def _mark_fetched(self) -> None:
+        self._fetched_at = time.monotonic()
+        self._failed_at = None
+
+
+_remote_catalogs: Dict[Tuple[str, str], RemoteAttachmentCatalog] = {}
+_remote_catalogs_lock = threading.Lock()
+
+
+def get_remote_attachment_catalog(
+    remote_base: Optional[str] = None, remote_path: Optional[str] = None
+) -> RemoteAttachmentCatalog:
+    """按 (接口地址, 远程路径) 共享的远程附件目录（进程内单例）"""
+    remote_base = (remote_base or settings.ATTACHMENT_FILES_API_BASE_URL or "").strip()
+    remote_path = (remote_path or settings.ATTACHMENT_REMOTE_PATH or "").strip()
+    key = (remote_base, remote_path)
+    with _remote_catalogs_lock:
+        catalog = _remote_catalogs.get(key)
+        if catalog is None:
+            catalog = RemoteAttachmentCatalog(remote_base, remote_path)
+            _remote_catalogs[key] = catalog
+        return catalog
+
+
+async def stop_remote_attachment_catalogs() -> None:
+    """应用关闭时停止各远程目录的后台刷新"""
+    with _remote_catalogs_lock:
+        catalogs = list(_remote_catalogs.values())
+    for catalog in catalogs:
+        await catalog.stop()
+
+
 class AttachmentService:
     """附件查找服务：本地目录（ATTACHMENT_BASE_PATH）或远程 api/files/list 二选一"""
 
@@ -223,107 +403,99 @@ class AttachmentService:
         base_url: Optional[str] = None,
         files_api_base_url: Optional[str] = None,
         remote_path: Optional[str] = None,
+        http_client: Optional[httpx.Client] = None,
     ):
+        self._http_client = http_client
+        self._catalog: Optional[RemoteAttachmentCatalog] = None
         self.base_path = (base_path or settings.ATTACHMENT_BASE_PATH or "").strip()
         self.base_url = (base_url or settings.ATTACHMENT_BASE_URL or "").strip()
         self.remote_base = (files_api_base_url or settings.ATTACHMENT_FILES_API_BASE_URL or "").strip()
         self.remote_path = (remote_path or settings.ATTACHMENT_REMOTE_PATH or "").strip()
 
-    def _fetch_remote_file_list(self) -> List[dict]:
-        """调用 GET api/files/list?path=... 获取远程文件列表"""
-        if not self.remote_base or not self.remote_path:
-            return []
-        url = f"{self.remote_base.rstrip('/')}/api/files/list"
-        params = {"path": self.remote_path}
-        try:
-            with httpx.Client(timeout=15.0) as client:
-                resp = client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-        except Exception as e:
-            logger.warning("调用远程附件列表 API 失败: %s", e)
-            return []
-        return _parse_remote_file_list(data, self.remote_base)
+    def _remote_lookup(self) -> Optional[AttachmentLookup]:
+        """远程附件目录的查找结构（进程内缓存）；注入了 http_client 时用实例自己的目录缓存"""
+        if self._http_client is not None:
+            if self._catalog is None:
+                self._catalog = RemoteAttachmentCatalog(
+                    self.remote_base, self.remote_path, http_client=self._http_client
+                )
+            return self._catalog.lookup()
+        return get_remote_attachment_catalog(self.remote_base, self.remote_path).lookup()
 
     def _find_attachment_files_remote(self, filename: str) -> List[dict]:
         """基于远程 api/files/list 结果按文件名/路径匹配（只返回文件，不含 directory:true）"""
-        clean_filename = filename.strip().strip('"""\'""\'《》【】[]()（）').strip()
-        if "." in clean_filename:
-            clean_filename = Path(clean_filename).stem
-        norm_clean = _normalize_for_match(clean_filename)
+        clean_filename, norm_clean = _clean_reference(filename)
         logger.debug("远程查找附件: 原始='%s', 清理后='%s', 规范化='%s'", filename, clean_filename, norm_clean)
+        if not norm_clean:
+            return []
 
-        all_items = self._fetch_remote_file_list()
-        if not all_items:
+        lookup = self._remote_lookup()
+        if not lookup:
             logger.warning("远程附件列表为空: path=%s", self.remote_path)
             return []
 
-        # 只参与匹配的文件（排除目录项）
-        file_only = [f for f in all_items if not f.get("directory")]
-
-        # 1) 精确匹配：文件名 stem 与 norm_clean 一致
-        for f in file_only:
-            stem = Path(f.get("file_name", "")).stem
-            if _normalize_for_match(stem) == norm_clean:
-                logger.info("找到远程附件（精确）: %s -> %s", clean_filename, f.get("file_name"))
-                return [f]
-        # 2) 路径中含“文件夹名”匹配：relative_path 的某一段与 norm_clean 一致，返回该路径下所有文件
-        segment_matched = []
-        for f in file_only:
-            rp = (f.get("relative_path") or f.get("path") or "").replace("\\", "/")
-            parts = rp.split("/")
-            for part in parts:
-                if _normalize_for_match(Path(part).stem) == norm_clean:
-                    segment_matched.append(f)
-                    break
-        if segment_matched:
-            logger.info("找到远程附件（路径段）: %s 共 %d 个", clean_filename, len(segment_matched))
-            return segment_matched
+        exact = self._find_remote_exact(lookup, clean_filename, norm_clean)
+        if exact:
+            return exact
         # 3) 模糊：stem 包含或被包含
-        for f in file_only:
-            stem = Path(f.get("file_name", "")).stem
-            norm_stem = _normalize_for_match(stem)
-            if norm_clean in norm_stem or norm_stem in norm_clean:
-                logger.info("找到远程附件（模糊）: %s -> %s", clean_filename, f.get("file_name"))
-                return [f]
+        for e in lookup.overlapping(norm_clean)[:1]:
+            logger.info("找到远程附件（模糊）: %s -> %s", clean_filename, e.file_name)
+            return [dict(e.payload)]
         logger.warning("未找到远程附件: %s (清理后: %s)", filename, clean_filename)
         return []
 
     def _find_attachment_files_remote_exact(self, filename: str) -> List[dict]:
         """远程仅精确匹配：stem 或路径段与参考名完全一致，不做模糊包含。供参考资料解析用。"""
-        clean_filename = filename.strip().strip('"""\'""\'《》【】[]()（）').strip()
-        if "." in clean_filename:
-            clean_filename = Path(clean_filename).stem
-        norm_clean = _normalize_for_match(clean_filename)
+        clean_filename, norm_clean = _clean_reference(filename)
         if not norm_clean:
             return []
 
-        all_items = self._fetch_remote_file_list()
-        if not all_items:
+        lookup = self._remote_lookup()
+        if not lookup:
             return []
 
-        file_only = [f for f in all_items if not f.get("directory")]
+        found = self._find_remote_exact(lookup, clean_filename, norm_clean)
+        if not found:
+            logger.debug("远程精确匹配未找到: %s", filename)
+        return found
 
+    @staticmethod
+    def _find_remote_exact(lookup: AttachmentLookup, clean_filename: str, norm_clean: str) -> List[dict]:
         # 1) 精确：文件名 stem == norm_clean
-        for f in file_only:
-            stem = Path(f.get("file_name", "")).stem
-            if _normalize_for_match(stem) == norm_clean:
-                logger.info("找到远程附件（精确）: %s -> %s", clean_filename, f.get("file_name"))
-                return [f]
-        # 2) 精确：路径某段（文件夹名）== norm_clean
-        segment_matched = []
-        for f in file_only:
-            rp = (f.get("relative_path") or f.get("path") or "").replace("\\", "/")
-            for part in rp.split("/"):
-                if _normalize_for_match(Path(part).stem) == norm_clean:
-                    segment_matched.append(f)
-                    break
-        if segment_matched:
-            logger.info("找到远程附件（路径段-精确）: %s 共 %d 个", clean_filename, len(segment_matched))
-            return segment_matched
-        logger.debug("远程精确匹配未找到: %s", filename)
+        for e in lookup.exact(norm_clean)[:1]:
+            logger.info("找到远程附件（精确）: %s -> %s", clean_filename, e.file_name)
+            return [dict(e.payload)]
+        # 2) 路径中某段（文件夹名）== norm_clean，返回这些文件夹下的所有文件
+        matched: Dict[str, IndexEntry] = {}
+        for folder in lookup.folders(norm_clean):
+            for e in lookup.under(folder):
+                matched.setdefault(e.relative_path, e)
+        if matched:
+            logger.info("找到远程附件（路径段）: %s 共 %d 个", clean_filename, len(matched))
+            return [dict(e.payload) for e in matched.values()]
         return []
 
+    def _local_lookup(self, filename: str) -> Optional[AttachmentLookup]:
+        """本地目录的索引查找结构；目录未配置/不存在时返回 None"""
+        if not self.base_path:
+            logger.debug("ATTACHMENT_BASE_PATH 未配置，跳过文件查找: %s", filename)
+            return None
+        if not Path(self.base_path).exists():
+            logger.debug("附件基础路径不存在: %s，跳过: %s", self.base_path, filename)
+            return None
+        return get_local_attachment_index(self.base_path).lookup()
+
+    def _local_info(self, entry: IndexEntry) -> Optional[dict]:
+        base_path = Path(self.base_path)
+        try:
+            return _build_file_info(base_path, base_path / entry.relative_path, self.base_url)
+        except OSError:
+            # 索引刷新前文件已被删除
+            return None
+
+    def _local_infos(self, entries: List[IndexEntry]) -> List[dict]:
+        return [info for info in (self._local_info(e) for e in entries) if info is not None]
+
     def find_attachment_files(self, filename: str) -> List[dict]:
         """
         在固定目录或远程 api/files/list 中查找附件
@@ -336,121 +508,59 @@ class AttachmentService:
         if self.remote_base and self.remote_path:
             return self._find_attachment_files_remote(filename)
 
-        if not self.base_path:
-            logger.debug("ATTACHMENT_BASE_PATH 未配置，跳过文件查找: %s", filename)
+        lookup = self._local_lookup(filename)
+        if lookup is None:
             return []
-        base_path = Path(self.base_path)
-        if not base_path.exists():
-            logger.debug("附件基础路径不存在: %s，跳过: %s", base_path, filename)
+        clean_filename, norm_clean = _clean_reference(filename)
+        logger.debug("查找附件: 原始='%s', 清理后='%s', 规范化='%s'", filename, clean_filename, norm_clean)
+        if not norm_clean:
             return []
 
-        clean_filename = filename.strip().strip('"""\'""\'《》【】[]()（）').strip()
-        if "." in clean_filename:
-            clean_filename = Path(clean_filename).stem
-        norm_clean = _normalize_for_match(clean_filename)
-        logger.debug("查找附件: 原始='%s', 清理后='%s', 规范化='%s'", filename, clean_filename, norm_clean)
+        # 1) 精确：规范化 stem 相等（浅层目录优先）
+        for e in lookup.exact(norm_clean):
+            if e.ext in _ATTACHMENT_EXTS:
+                logger.info("找到附件（规范化匹配）: %s -> %s", clean_filename, e.file_name)
+                return self._local_infos([e])
+
+        # 2) 模糊：stem 包含参考名，按扩展名优先级（视频 > 图片 > pdf > 文档）
+        fuzzy = [e for e in lookup.containing(norm_clean) if e.ext in _ATTACHMENT_EXTS]
+        if fuzzy:
+            best = min(fuzzy, key=lambda e: (_EXT_PRIORITY[e.ext], e.depth, e.relative_path.lower()))
+            logger.info("找到附件（模糊）: %s -> %s", clean_filename, best.file_name)
+            return self._local_infos([best])
+
+        # 3) 文件夹匹配（名称相等或互相包含），返回目录下所有文件
+        for folder in lookup.folders(norm_clean, fuzzy=True):
+            results = self._local_infos(lookup.under(folder))
+            logger.info("找到附件（文件夹）: %s -> %s 共 %d 个", clean_filename, folder, len(results))
+            return results
 
-        extensions_map = {
-            "video": [".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv"],
-            "image": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"],
-            "pdf": [".pdf"],
-            "other": [".doc", ".docx", ".xls", ".xlsx", ".txt", ".ppt", ".pptx"],
-        }
-        all_exts = set()
-        for exts in extensions_map.values():
-            all_exts.update(e.lower() for e in exts)
-
-        # 0) 按“实际文件名”遍历匹配（避免路径拼接导致的编码/全角差异）
-        for fp in base_path.iterdir():
-            if fp.is_file() and not _should_skip_file(fp) and fp.suffix.lower() in all_exts:
-                if _normalize_for_match(fp.stem) == norm_clean:
-                    logger.info("找到附件（根目录-规范化匹配）: %s -> %s", clean_filename, fp.name)
-                    info = _build_file_info(base_path, fp, self.base_url)
-                    info["type"] = _guess_asset_type_by_ext(fp.suffix)
-                    return [info]
-        for fp in base_path.rglob("*"):
-            if fp.is_file() and not _should_skip_file(fp) and fp.suffix.lower() in all_exts:
-                if _normalize_for_match(fp.stem) == norm_clean:
-                    logger.info("找到附件（全目录-规范化匹配）: %s -> %s", clean_filename, fp.name)
-                    info = _build_file_info(base_path, fp, self.base_url)
-                    info["type"] = _guess_asset_type_by_ext(fp.suffix)
-                    return [info]
-
-        # 1) 精确匹配（路径拼接）
-        for asset_type, exts in extensions_map.items():
-            for ext in exts:
-                full_name = clean_filename + ext
-                root_file = base_path / full_name
-                if root_file.is_file():
-                    logger.info("找到附件（根目录精确）: %s -> %s", clean_filename, root_file.name)
-                    info = _build_file_info(base_path, root_file, self.base_url)
-                    info["type"] = asset_type
-                    return [info]
-                for fp in base_path.rglob(full_name):
-                    if fp.is_file():
-                        logger.info("找到附件（精确）: %s -> %s", clean_filename, fp.name)
-                        info = _build_file_info(base_path, fp, self.base_url)
-                        info["type"] = asset_type
-                        return [info]
-
-                # 2) 模糊匹配（使用规范化比较）
-                for pattern in [f"*{clean_filename}*{ext}", f"{clean_filename}*{ext}"]:
-                    for fp in list(base_path.glob(pattern)) + list(base_path.rglob(pattern)):
-                        if fp.is_file():
-                            norm_stem = _normalize_for_match(fp.stem)
-                            if norm_stem == norm_clean or norm_clean in norm_stem or norm_stem in norm_clean:
-                                logger.info("找到附件（模糊）: %s -> %s", clean_filename, fp.name)
-                                info = _build_file_info(base_path, fp, self.base_url)
-                                info["type"] = asset_type
-                                return [info]
-
-        # 3) 文件夹匹配（使用规范化比较）
-        for folder in base_path.rglob("*"):
-            if not folder.is_dir():
-                continue
-            norm_folder = _normalize_for_match(folder.name)
-            if norm_clean == norm_folder or norm_clean in norm_folder or norm_folder in norm_clean:
-                files = [p for p in folder.rglob("*") if p.is_file() and not _should_skip_file(p)]
-                files.sort(key=lambda p: str(p).lower())
-                results = [_build_file_info(base_path, p, self.base_url) for p in files]
-                logger.info("找到附件（文件夹）: %s -> %s 共 %d 个", clean_filename, folder.name, len(results))
-                return results
-
-        # 4) 兜底：按规范化 stem 完全匹配
-        for fp in base_path.iterdir():
-            if fp.is_file() and not _should_skip_file(fp) and _normalize_for_match(fp.stem) == norm_clean:
-                info = _build_file_info(base_path, fp, self.base_url)
-                info["type"] = _guess_asset_type_by_ext(fp.suffix)
-                return [info]
-        for fp in base_path.rglob("*"):
-            if fp.is_file() and not _should_skip_file(fp) and _normalize_for_match(fp.stem) == norm_clean:
-                info = _build_file_info(base_path, fp, self.base_url)
-                info["type"] = _guess_asset_type_by_ext(fp.suffix)
-                return [info]
-
-        # 5) 兜底：规范化后“包含”匹配（取 stem 最短的，避免误匹配）
-        candidates = []
-        for fp in base_path.iterdir():
-            if fp.is_file() and not _should_skip_file(fp) and fp.suffix.lower() in all_exts:
-                norm_stem = _normalize_for_match(fp.stem)
-                if norm_clean in norm_stem or norm_stem in norm_clean:
-                    candidates.append((len(fp.stem), fp))
-        for fp in base_path.rglob("*"):
-            if fp.is_file() and not _should_skip_file(fp) and fp.suffix.lower() in all_exts:
-                norm_stem = _normalize_for_match(fp.stem)
-                if norm_clean in norm_stem or norm_stem in norm_clean:
-                    candidates.append((len(fp.stem), fp))
+        # 4) 兜底：规范化 stem 相等，不限扩展名
+        any_ext = lookup.exact(norm_clean)
+        if any_ext:
+            return self._local_infos(any_ext[:1])
+
+        # 5) 兜底：stem 被参考名包含（取 stem 最短的，避免误匹配）
+        candidates = [e for e in lookup.contained_in(norm_clean) if e.ext in _ATTACHMENT_EXTS]
         if candidates:
-            candidates.sort(key=lambda x: (x[0], str(x[1]).lower()))
-            _, best = candidates[0]
-            logger.info("找到附件（兜底-包含匹配）: %s -> %s", clean_filename, best.name)
-            info = _build_file_info(base_path, best, self.base_url)
-            info["type"] = _guess_asset_type_by_ext(best.suffix)
-            return [info]
+            best = min(candidates, key=lambda e: (len(Path(e.file_name).stem), e.relative_path.lower()))
+            logger.info("找到附件（兜底-包含匹配）: %s -> %s", clean_filename, best.file_name)
+            return self._local_infos([best])
 
         logger.warning("未找到附件: %s (清理后: %s)", filename, clean_filename)
         return []
 
+    def catalog_version(self) -> Optional[AttachmentLookup]:
+        """
+        当前附件目录的版本标识：即当前使用的查找结构对象。
+        本地索引重扫出变化、远程目录重新加载时都会换成新对象，调用方用 `is` 比较即可判断目录是否变化。
+        """
+        if self.remote_base and self.remote_path:
+            return self._remote_lookup()
+        if not self.base_path or not Path(self.base_path).exists():
+            return None
+        return get_local_attachment_index(self.base_path).lookup()
+
     def find_attachment_files_exact(self, filename: str) -> List[dict]:
         """
         仅精确匹配：参考名与文件名 stem 或文件夹名必须完全一致，不做「包含」等模糊匹配。
@@ -460,49 +570,56 @@ class AttachmentService:
         if self.remote_base and self.remote_path:
             return self._find_attachment_files_remote_exact(filename)
 
-        if not self.base_path:
+        lookup = self._local_lookup(filename)
+        if lookup is None:
             return []
-        base_path = Path(self.base_path)
-        if not base_path.exists():
-            return []
-
-        clean_filename = filename.strip().strip('"""\'""\'《》【】[]()（）').strip()
-        if "." in clean_filename:
-            clean_filename = Path(clean_filename).stem
-        norm_clean = _normalize_for_match(clean_filename)
+        clean_filename, norm_clean = _clean_reference(filename)
         if not norm_clean:
             return []
 
-        extensions_map = {
-            "video": [".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv"],
-            "image": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"],
-            "pdf": [".pdf"],
-            "other": [".doc", ".docx", ".xls", ".xlsx", ".txt", ".ppt", ".pptx"],
-        }
-        all_exts = set()
-        for exts in extensions_map.values():
-            all_exts.update(e.lower() for e in exts)
-
         # 1) 文件：stem 规范化后完全相等
-        for fp in base_path.rglob("*"):
-            if fp.is_file() and not _should_skip_file(fp) and fp.suffix.lower() in all_exts:
-                if _normalize_for_match(fp.stem) == norm_clean:
-                    logger.info("找到附件（精确）: %s -> %s", clean_filename, fp.name)
-                    info = _build_file_info(base_path, fp, self.base_url)
-                    info["type"] = _guess_asset_type_by_ext(fp.suffix)
-                    return [info]
+        for e in lookup.exact(norm_clean):
+            if e.ext in _ATTACHMENT_EXTS:
+                logger.info("找到附件（精确）: %s -> %s", clean_filename, e.file_name)
+                return self._local_infos([e])
 
         # 2) 文件夹：文件夹名规范化后完全相等（不要求「包含」）
-        for folder in base_path.rglob("*"):
-            if not folder.is_dir():
-                continue
-            if _normalize_for_match(folder.name) != norm_clean:
-                continue
-            files = [p for p in folder.rglob("*") if p.is_file() and not _should_skip_file(p)]
-            files.sort(key=lambda p: str(p).lower())
-            results = [_build_file_info(base_path, p, self.base_url) for p in files]
-            logger.info("找到附件（精确-文件夹）: %s -> %s 共 %d 个", clean_filename, folder.name, len(results))
+        for folder in lookup.folders(norm_clean):
+            results = self._local_infos(lookup.under(folder))
+            logger.info("找到附件（精确-文件夹）: %s -> %s 共 %d 个", clean_filename, folder, len(results))
             return results
 
         logger.debug("精确匹配未找到: %s (规范化: %s)", filename, norm_clean)
         return []
+
+
+_local_indexes: Dict[str, LocalAttachmentIndex] = {}
+_local_indexes_lock = threading.Lock()
+
+
+def get_local_attachment_index(base_path: Optional[str] = None) -> LocalAttachmentIndex:
+    """按目录共享的本地附件索引（进程内单例），导入与对话解析参考资料共用"""
+    base_path = (base_path or settings.ATTACHMENT_BASE_PATH or "").strip()
+    with _local_indexes_lock:
+        index = _local_indexes.get(base_path)
+        if index is None:
+            index = LocalAttachmentIndex(
+                base_path,
+                normalize=_normalize_for_match,
+                skip=lambda name: _should_skip_file(Path(name)),
+                refresh_interval=settings.ATTACHMENT_INDEX_REFRESH_SECONDS,
+            )
+            _local_indexes[base_path] = index
+        return index
+
+
+def get_attachment_index_stats() -> dict:
+    """附件索引统计，供 /metrics 展示"""
+    with _local_indexes_lock:
+        indexes = list(_local_indexes.values())
+    with _remote_catalogs_lock:
+        catalogs = list(_remote_catalogs.values())
+    return {
+        "local": [index.stats() for index in indexes],
+        "remote": [catalog.stats() for catalog in catalogs],
+    }
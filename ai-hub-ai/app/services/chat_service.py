@@ -4,6 +4,7 @@
 - 若首次搜索结果为空且已配置 DeepSeek，则用 AI 从用户问题中提炼检索关键词再查知识库（如「球阀密封圈漏气怎么处理」→「球阀密封圈漏气」），提高命中率
 - 若仍无结果或知识库不可用（502/503/超时等），则用 AI 生成兜底/引导性回答
 """
+import asyncio
 import re
 from typing import List, Optional, Dict, Any
 from urllib.parse import quote
@@ -12,19 +13,27 @@ import httpx
 from fastapi import HTTPException
 
 from app.core.config import settings, APP_ENV
+from app.core.concurrency import run_blocking
 from app.core.logging_config import get_logger
 from app.clients.dotnet_client import DotnetClient
-from app.clients.deepseek_client import DeepSeekClient
+from app.clients.deepseek_client import DeepSeekClient, get_llm_client
 from app.schemas.chat import ChatRequest, ChatResponse, ResourceItem, ArticleDetailResponse
 from app.services.query_service import QueryService
 from app.repositories.kb_article_repo import KbArticleRepository, get_assets_by_article_id  # 附件按 article_id 从 kb_asset 查
-from app.services.attachment_service import (
-    rewrite_attachment_url_to_remote,
-    extract_filename_from_reference,
-    AttachmentService,
-)
-from app.services.intent_service import classify_intent, Intent
+from app.services.attachment_service import extract_filename_from_reference
+from app.services.reference_resolver import get_reference_resolver
+from app.services.intent_service import classify_intent, get_intent_engine, Intent
 from app.utils.device_type_utils import resolve_device_type_for_query
+from app.utils.text_normalize import (
+    FINAL_SOLUTION,
+    STEP_ACTION,
+    TEMPORARY_SOLUTION,
+    reference_names,
+    reference_names_batch,
+    split_segments,
+    strip_list_marker,
+    strip_reference_mentions,
+)
 
 logger = get_logger(__name__)
 
@@ -164,24 +173,17 @@ def _chat_response_handoff(question: str) -> ChatResponse:
 
 def _strip_reference_mentions(text: str) -> str:
     """去掉文案中的「参考"xxx"」片段，避免在可能原因/排查步骤/解决方案中重复展示"""
-    if not text or not text.strip():
-        return text
-    return re.sub(
-        r'参考["""""][^"""""]*["""""]|参考[：:]\s*[^，。\s]+',
-        "",
-        text,
-    ).replace("参考参考", "参考").strip("，, ")
+    return strip_reference_mentions(text)
 
 
 def parse_causes(cause_text: Optional[str]) -> List[str]:
     """从原因文本解析可能原因列表；跳过纯参考行，并对每条去掉「参考"xxx"」片段"""
     if not cause_text or not cause_text.strip():
         return []
-    lines = [ln.strip() for ln in re.split(r"[\n\r；;。]", cause_text) if ln.strip()]
+    lines = split_segments(cause_text)
     causes = []
     for ln in lines:
-        cleaned = re.sub(r"^\d+[\.、]?\s*", "", ln)
-        cleaned = re.sub(r"^[•·]\s*", "", cleaned).strip()
+        cleaned = strip_list_marker(ln)
         if extract_filename_from_reference(ln) is not None and len(cleaned) < 30:
             continue  # 纯参考行不当作原因
         cleaned = _strip_reference_mentions(cleaned)
@@ -198,17 +200,16 @@ def parse_steps(
     text = solution_text or cause_text or ""
     if not text:
         return []
-    lines = [ln.strip() for ln in re.split(r"[\n\r；;。]", text) if ln.strip()]
+    lines = split_segments(text)
     steps = []
     for i, ln in enumerate(lines, 1):
-        cleaned = re.sub(r"^\d+[\.、]?\s*", "", ln)
-        cleaned = re.sub(r"^[•·]\s*", "", cleaned).strip()
+        cleaned = strip_list_marker(ln)
         if len(cleaned) <= 5:
             continue
         # 纯参考资料引用（如 参考"xxx"）一律不当作步骤，由参考资料区展示
         if extract_filename_from_reference(ln) is not None:
             continue
-        if re.search(r"检查|测试|校准|清理|调整|更换|维修|查看|观察", cleaned):
+        if STEP_ACTION.search(cleaned):
             steps.append({
                 "title": cleaned[:50] if len(cleaned) > 50 else cleaned,
                 "action": cleaned,
@@ -241,8 +242,8 @@ def parse_solution(
     text = solution_text or cause_text or ""
     if not text:
         return {"temporary": "暂无临时解决方案", "final": "请查看详细排查步骤或联系技术支持"}
-    temp_m = re.search(r"临时[：:]\s*([^。]+)", text)
-    final_m = re.search(r"(?:最终|根因|永久)[：:]\s*([^。]+)", text)
+    temp_m = TEMPORARY_SOLUTION.search(text)
+    final_m = FINAL_SOLUTION.search(text)
     temporary = temp_m.group(1).strip() if temp_m else text[:100]
     final = final_m.group(1).strip() if final_m else text
     return {
@@ -293,9 +294,7 @@ def _reorder_articles_by_video_match(articles: list, query: str) -> list:
             return art.solution_text, art.cause_text
         return art.get("solutionText"), art.get("causeText")
 
-    def _has_video_match(art) -> bool:
-        sol, cause = _get_texts(art)
-        ref_names = _extract_reference_names(sol, cause)
+    def _has_video_match(ref_names: List[str]) -> bool:
         for ref in ref_names:
             if not ref or len(ref) < 2:
                 continue
@@ -305,8 +304,8 @@ def _reorder_articles_by_video_match(articles: list, query: str) -> list:
 
     matched: List[Any] = []
     unmatched: List[Any] = []
-    for a in articles:
-        if _has_video_match(a):
+    for a, ref_names in zip(articles, reference_names_batch(_get_texts(a) for a in articles)):
+        if _has_video_match(ref_names):
             matched.append(a)
         else:
             unmatched.append(a)
@@ -317,23 +316,7 @@ def _reorder_articles_by_video_match(articles: list, query: str) -> list:
 
 def _extract_reference_names(solution_text: Optional[str], cause_text: Optional[str]) -> List[str]:
     """从解决方案/原因文本中提取所有「参考xxx」引用名，去重后返回"""
-    text = (solution_text or "") + "\n" + (cause_text or "")
-    if not text.strip():
-        return []
-    seen = set()
-    result: List[str] = []
-    for line in re.split(r"[\n\r；;。]", text):
-        for part in re.split(r"[,，]", line.strip()):
-            part = part.strip()
-            if not part:
-                continue
-            name = extract_filename_from_reference(part)
-            if name:
-                name = name.strip().strip('"\'""\'').strip()
-                if name and name not in seen:
-                    seen.add(name)
-                    result.append(name)
-    return result
+    return reference_names(solution_text, cause_text)
 
 
 def _build_attachment_url(file_name: str) -> str:
@@ -406,16 +389,11 @@ def _resolve_reference_resources(
     ref_names = _extract_reference_names(solution_text, cause_text)
     if not ref_names:
         return []
-    attachment_svc = AttachmentService()
+    resolver = get_reference_resolver()
     items: List[ResourceItem] = []
     seen_urls: set = set()
     for ref_name in ref_names:
-        try:
-            # 仅精确匹配：参考名与文件名/文件夹名完全一致，避免误匹配（如 141油泵 匹配到含多文件的目录）
-            found = attachment_svc.find_attachment_files_exact(ref_name)
-        except Exception as e:
-            logger.debug("解析参考资料失败 ref=%s: %s", ref_name, e)
-            found = []
+        found = resolver.resolve(ref_name)
         if not found:
             # 未匹配到文件也占位一条，便于前端始终显示「参考资料」区
             items.append(
@@ -429,26 +407,12 @@ def _resolve_reference_resources(
                 )
             )
             continue
-        # 单文件一条；文件夹则逐条添加该目录下所有文件
+        # 单文件一条；文件夹则逐条添加该目录下所有文件（不同引用指向同一文件只保留一条）
         for one in found:
-            url_raw = one.get("url") or ""
-            url_rewritten = rewrite_attachment_url_to_remote(url_raw)
-            if not url_rewritten or url_rewritten in seen_urls:
+            if one["url"] in seen_urls:
                 continue
-            seen_urls.add(url_rewritten)
-            t = one.get("type") or "other"
-            if t == "directory":
-                t = "other"
-            items.append(
-                ResourceItem(
-                    id=hash(ref_name + (one.get("file_name") or "") + url_raw) % (10**9),
-                    name=one.get("file_name") or ref_name,
-                    type=t,
-                    url=url_rewritten,
-                    size=one.get("size"),
-                    duration=one.get("duration"),
-                )
-            )
+            seen_urls.add(one["url"])
+            items.append(ResourceItem(**one))
     return items
 
 
@@ -545,6 +509,43 @@ def _chat_response_from_ai_fallback(
     )
 
 
+# 投机检索统计：started 启动次数 / used 被 RAG 路由用上 / wasted 意图非 RAG 被丢弃（其中 cancelled_in_flight 为仍在执行时取消）
+_SPECULATION_STATS = {"started": 0, "used": 0, "wasted": 0, "cancelled_in_flight": 0}
+
+
+class _Speculation:
+    """与 LLM 意图识别并行启动的向量检索：意图为查库时直接取结果，否则取消并计为浪费"""
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self._settled = False
+        # 始终取走异常，避免被丢弃的任务打印 "exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _SPECULATION_STATS["started"] += 1
+
+    async def result(self) -> List[Dict[str, Any]]:
+        self._settled = True
+        _SPECULATION_STATS["used"] += 1
+        return await self.task
+
+    def discard(self) -> None:
+        if self._settled:
+            return
+        self._settled = True
+        _SPECULATION_STATS["wasted"] += 1
+        if not self.task.done():
+            self.task.cancel()
+            _SPECULATION_STATS["cancelled_in_flight"] += 1
+
+
+def get_speculation_stats() -> dict:
+    """投机检索统计（/api/v1/metrics）"""
+    stats = dict(_SPECULATION_STATS)
+    stats["enabled"] = settings.SPECULATIVE_RETRIEVAL_ENABLED
+    stats["wasted_rate"] = round(stats["wasted"] / stats["started"], 4) if stats["started"] else 0.0
+    return stats
+
+
 class ChatService:
     """智能客服问答服务"""
 
@@ -556,7 +557,7 @@ class ChatService:
         kb_repo: Optional[KbArticleRepository] = None,
     ):
         self.dotnet_client = dotnet_client or DotnetClient()
-        self.deepseek_client = deepseek_client or DeepSeekClient()
+        self.deepseek_client = deepseek_client or get_llm_client()
         self._query_service = query_service
         self._kb_repo = kb_repo
 
@@ -653,9 +654,10 @@ class ChatService:
         """
         if not self._kb_repo:
             return None
-        article = self._kb_repo.get_by_id(article_id)
-        if not article:
+        found = self._kb_repo.get_by_ids([article_id])
+        if not found:
             return None
+        article = found[0]
         cause_text = article.cause_text or ""
         solution_text = article.solution_text or ""
         top_causes = parse_causes(cause_text)
@@ -698,13 +700,47 @@ class ChatService:
         self.dotnet_client.tenant_id = tenant_id
         logger.info("收到搜索请求 - 问题: %s, TenantId: %s", request.question, tenant_id)
 
-        # 1) 先意图识别（优先）
-        intent_result = None
+        speculation: Optional[_Speculation] = None
         try:
-            intent_result = await classify_intent(request.question)
-        except Exception as e:
-            logger.warning("意图识别异常，走规则兜底: %s", e)
+            # 1) 先意图识别（优先）；缓存/本地规则判不出、需要等 LLM 时，并行投机启动向量检索
+            intent_result = None
+            try:
+                intent_result = get_intent_engine().classify_fast(request.question)
+                if intent_result is None:
+                    speculation = self._start_speculative_retrieval(request, tenant_id)
+                    intent_result = await classify_intent(request.question)
+            except Exception as e:
+                logger.warning("意图识别异常，走规则兜底: %s", e)
+
+            return await self._answer_by_intent(request, tenant_id, intent_result, speculation)
+        finally:
+            # 最终没用上投机检索（转人工/闲聊/能力咨询、或请求被取消）：取消并计为浪费
+            if speculation is not None:
+                speculation.discard()
 
+    def _start_speculative_retrieval(self, request: ChatRequest, tenant_id: str) -> Optional[_Speculation]:
+        """与 LLM 意图识别并行启动向量检索（大部分问题最终走查库）"""
+        if not settings.SPECULATIVE_RETRIEVAL_ENABLED or not (self._query_service and self._kb_repo):
+            return None
+        effective_dt = resolve_device_type_for_query(request.device_type_code, request.device_model)
+        task = asyncio.create_task(
+            self._query_service.aquery(
+                tenant_id=tenant_id,
+                query_text=request.question,
+                top_k=5,
+                device_type_code=effective_dt,
+            )
+        )
+        return _Speculation(task)
+
+    async def _answer_by_intent(
+        self,
+        request: ChatRequest,
+        tenant_id: str,
+        intent_result,
+        speculation: Optional[_Speculation] = None,
+    ) -> ChatResponse:
+        """按意图路由：转人工 / 闲聊 / 查库（向量检索 → .NET 兜底 → AI 兜底）"""
         # 2) 意图识别成功且为转人工 → 直接返回 handoff，不查知识库
         if intent_result and intent_result.intent == Intent.HANDOFF:
             logger.info(
@@ -788,28 +824,30 @@ class ChatService:
                     logger.info("检索设备类型(解析结果): %s", effective_dt)
                 else:
                     logger.info("检索设备类型: 未指定，不按设备类型过滤向量")
-                hits = self._query_service.query(
-                    tenant_id=tenant_id,
-                    query_text=request.question,
-                    top_k=5,
-                    device_type_code=effective_dt,
-                )
+                if speculation is not None:
+                    # 意图识别期间已并行发起，直接取结果
+                    hits = await speculation.result()
+                else:
+                    # embedding 异步请求、Chroma 查询放线程池，不阻塞其它并发请求
+                    hits = await self._query_service.aquery(
+                        tenant_id=tenant_id,
+                        query_text=request.question,
+                        top_k=5,
+                        device_type_code=effective_dt,
+                    )
                 if hits:
                     article_ids = [h["article_id"] for h in hits]
                     logger.info("向量检索命中 %d 条，article_ids: %s", len(hits), article_ids[:5])
                     
-                    # 从数据库读取完整的 article 数据
-                    articles = []
-                    for aid in article_ids:
-                        article = self._kb_repo.get_by_id(aid)
-                        if article:
-                            articles.append(article)
+                    # 从数据库读取完整的 article 数据：单次 IN 查询，保持命中顺序（放到 db 线程池）
+                    articles = await run_blocking("db", self._kb_repo.get_by_ids, article_ids)
                     
                     if articles:
                         # 若用户问题与维修视频名称高度相关，将匹配条目置于首位（最有可能）
                         articles = _reorder_articles_by_video_match(articles, request.question)
                         logger.info("成功读取 %d 条 article 数据", len(articles))
-                        return self._kb_article_to_chat_response(articles)
+                        # 组装响应时会查 kb_asset，同样放到 db 线程池
+                        return await run_blocking("db", self._kb_article_to_chat_response, articles)
                     else:
                         logger.warning("向量检索返回了 article_ids，但数据库查询为空")
                 else:
@@ -960,7 +998,7 @@ class ChatService:
         try:
             primary_id = primary.get("id")
             if primary_id is not None:
-                assets = get_assets_by_article_id(int(primary_id))
+                assets = await run_blocking("db", get_assets_by_article_id, int(primary_id))
                 if assets:
                     technical_resources = _assets_to_resource_items(assets)
                     logger.info("按 article_id 查出 %d 条附件（.NET 兜底，文章 ID: %s）", len(assets), primary_id)
@@ -1,23 +1,187 @@
 """
 Excel 导入业务：读取 Excel、行映射、调用 .NET 批量创建文章与附件
+解析 + 映射（parse_excel）是纯同步 CPU 工作，可放到进程池执行；上传在事件循环里并发进行
 """
-from io import BytesIO
-from typing import List, Optional
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, MutableMapping, Optional, Set, Tuple
 
-import pandas as pd
 import httpx
 from fastapi import HTTPException
 
+from app.core.concurrency import run_blocking
 from app.core.config import settings
 from app.core.logging_config import get_logger
 from app.clients.dotnet_client import DotnetClient
-from app.schemas.excel import ExcelImportResponse
+from app.infra.db.sqlserver import SqlServer
+from app.repositories.kb_article_repo import KbArticleRepository
+from app.schemas.excel import ExcelImportResponse, ImportIngestStatus
 from app.services.attachment_service import AttachmentService
-from app.services.excel_utils import map_excel_row_to_article
+from app.services.excel_reader import ExcelSheetStream
+from app.services.excel_utils import map_excel_rows_to_articles
+from app.services.import_fingerprint import RowFingerprinter, index_existing
+from app.services.kb_uploader import KbBatchUploader, UploadResult
 from app.utils.device_type_utils import scope_label_for_excel_import
 
 logger = get_logger(__name__)
 
+# 进程池解析时，父进程把子进程上报的进度拷回 ImportProgress 的间隔
+_PROGRESS_POLL_SECONDS = 0.2
+
+
+@dataclass
+class ImportProgress:
+    """导入进度：阶段 queued → parsing → uploading → indexing → succeeded / failed，以及各阶段行数"""
+
+    stage: str = "queued"
+    rows_parsed: int = 0
+    rows_mapped: int = 0
+    rows_uploaded: int = 0
+    rows_unchanged: int = 0
+    rows_indexed: int = 0
+    rows_failed: int = 0
+
+    def on_uploaded(self, ok: int, failed: int) -> None:
+        self.rows_uploaded += ok
+        self.rows_failed += failed
+
+
+class SharedProgress:
+    """
+    进程池里的解析 / 映射进度：子进程按 ImportProgress 的写法更新行数，实际写入 Manager().dict() 代理，
+    父进程按 _PROGRESS_POLL_SECONDS 轮询拷回
+    """
+
+    FIELDS = ("rows_parsed", "rows_mapped", "rows_failed")
+
+    def __init__(self, values: MutableMapping[str, int]) -> None:
+        self._values = values
+
+    def __getattr__(self, name: str) -> Any:
+        if name in SharedProgress.FIELDS:
+            return self._values.get(name, 0)
+        raise AttributeError(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in SharedProgress.FIELDS:
+            self._values[name] = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def copy_to(self, progress: ImportProgress) -> None:
+        values = dict(self._values)
+        for name in SharedProgress.FIELDS:
+            if name in values:
+                setattr(progress, name, values[name])
+
+
+@dataclass
+class ParsedExcel:
+    """解析 + 映射结果（可跨进程传递）"""
+
+    sheet_name: str
+    header_row: int
+    columns: list
+    source: str = ""
+    data_rows: int = 0
+    body_rows: int = 0
+    valid_rows: int = 0
+    articles: List[dict] = field(default_factory=list)
+    article_rows: List[int] = field(default_factory=list)
+    # 与 articles 一一对应的 (导入键, 内容指纹)
+    fingerprints: List[Tuple[str, str]] = field(default_factory=list)
+    failures: List[dict] = field(default_factory=list)
+    skipped: int = 0
+
+
+@dataclass
+class ImportPlan:
+    """按指纹比对后的分组：新增 / 变更（带原条目 id）/ 未变；stale 为表中已没有的旧条目"""
+
+    create: List[int] = field(default_factory=list)
+    update: List[Tuple[int, int]] = field(default_factory=list)
+    unchanged_ids: List[int] = field(default_factory=list)
+    stale_ids: List[int] = field(default_factory=list)
+
+
+def parse_excel(
+    file_content: bytes,
+    filename: str,
+    import_scope_label: Optional[str],
+    attachment_service: Optional[AttachmentService] = None,
+    progress: Optional[ImportProgress] = None,
+) -> ParsedExcel:
+    """
+    单遍流式读取 + 分块批量映射（列名只解析一次、整列清理、附件并发查找）
+    模块级函数，可直接提交到进程池；表头缺失时抛 ValueError
+    """
+    attachment_service = attachment_service or AttachmentService()
+    with ExcelSheetStream(file_content, settings.EXCEL_IMPORT_CHUNK_ROWS) as stream:
+        parsed = ParsedExcel(stream.sheet_name, stream.header_row, stream.columns)
+        fingerprint = RowFingerprinter(filename, stream.sheet_name)
+        parsed.source = fingerprint.source
+        for chunk, row_numbers in stream.chunks():
+            if progress:
+                progress.rows_parsed += len(chunk)
+            mapped = map_excel_rows_to_articles(
+                chunk,
+                filename,
+                stream.sheet_name,
+                row_numbers,
+                attachment_service,
+                import_device_type_label=import_scope_label,
+                max_workers=settings.EXCEL_ATTACHMENT_RESOLVE_WORKERS,
+            )
+            for excel_row_num, article, error in mapped:
+                if error is not None:
+                    logger.error("处理第 %s 行出错", excel_row_num, exc_info=error)
+                    parsed.failures.append({"row_index": excel_row_num, "reason": str(error)})
+                elif article:
+                    parsed.fingerprints.append(fingerprint(article))
+                    parsed.articles.append(article)
+                    parsed.article_rows.append(excel_row_num)
+                else:
+                    parsed.skipped += 1
+            if progress:
+                progress.rows_mapped = len(parsed.articles)
+                progress.rows_failed = len(parsed.failures)
+        parsed.data_rows = stream.data_rows
+        parsed.body_rows = stream.body_rows
+        parsed.valid_rows = stream.valid_rows
+    return parsed
+
+
+_DOTNET_ERRORS = (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError)
+
+
+def _dotnet_http_error(e: Exception) -> HTTPException:
+    """调用 .NET 的连接 / 超时 / 状态码错误转换为接口错误"""
+    if isinstance(e, httpx.ConnectError):
+        logger.error("无法连接 .NET 后端: %s", e)
+        return HTTPException(status_code=503, detail=f"无法连接 .NET 后端: {settings.DOTNET_BASE_URL}")
+    if isinstance(e, httpx.TimeoutException):
+        logger.error("调用 .NET 超时: %s", e)
+        return HTTPException(status_code=504, detail="调用 .NET 后端超时，请稍后重试")
+    logger.error(".NET 返回错误: %s %s", e.response.status_code, e.response.text)
+    return HTTPException(status_code=e.response.status_code, detail=f".NET 后端错误: {e.response.text}")
+
+
+async def _follow(future: "asyncio.Future[ParsedExcel]", shared: SharedProgress, progress: ImportProgress) -> ParsedExcel:
+    """等待子进程解析完成，期间把子进程上报的行数拷回 progress"""
+    try:
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=_PROGRESS_POLL_SECONDS)
+            try:
+                shared.copy_to(progress)
+            except Exception as e:  # Manager 进程异常时只是看不到中间进度
+                logger.debug("读取解析进度失败: %s", e)
+            if done:
+                return future.result()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
 
 class ExcelImportService:
     """Excel 导入服务：解析表头与行，调用 .NET 批量创建并顺带创建附件"""
@@ -26,214 +190,214 @@ class ExcelImportService:
         self,
         dotnet_client: Optional[DotnetClient] = None,
         attachment_service: Optional[AttachmentService] = None,
+        kb_repo: Optional[KbArticleRepository] = None,
+        ingest_service=None,
     ):
         self.dotnet_client = dotnet_client or DotnetClient()
         self.attachment_service = attachment_service or AttachmentService()
+        self._kb_repo = kb_repo
+        self._ingest_service = ingest_service
+
+    @property
+    def kb_repo(self) -> KbArticleRepository:
+        """查已导入条目用的仓储（懒创建，未配置数据库时不影响服务构造）"""
+        if self._kb_repo is None:
+            self._kb_repo = KbArticleRepository(SqlServer())
+        return self._kb_repo
+
+    @property
+    def ingest_service(self):
+        """导入后写入向量用的 IngestService（默认与 /ingest 接口共用同一实例）"""
+        if self._ingest_service is None:
+            from app.api.deps import get_ingest_service
+
+            self._ingest_service = get_ingest_service()
+        return self._ingest_service
+
+    def validate(self, filename: str, device_type: Optional[str] = None) -> Optional[str]:
+        """校验文件名与设备类型，返回写入 scope_json 的设备类型标签"""
+        try:
+            import_scope_label = scope_label_for_excel_import(device_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+        if not filename or not filename.endswith(".xlsx"):
+            raise HTTPException(status_code=400, detail="只支持 .xlsx 格式的 Excel 文件")
+        return import_scope_label
 
     async def import_excel(
         self,
         file_content: bytes,
         filename: str,
         device_type: Optional[str] = None,
+        progress: Optional[ImportProgress] = None,
+        executor: Optional[Executor] = None,
+        progress_values: Optional[MutableMapping[str, int]] = None,
     ) -> ExcelImportResponse:
         """
         导入 Excel 为知识条目
         - 校验 .xlsx、解析表头与行
         - 每行映射为一条知识草稿（含 _attachment_info）
-        - 调用 .NET 批量创建文章，再批量创建附件
+        - 按行指纹与之前导入的条目比对：未变的跳过，变更的更新原条目，其余新增
+        - 分块并发调用 .NET 批量创建/更新文章，每块完成后紧跟着创建该块的新附件
+        - IMPORT_AUTO_INGEST 开启时，把新建/更新的条目按批写入向量库，结果见 ingest 字段
         - device_type：可选，造型机/浇注机/抛丸机/通用或标准码；写入每条 scope_json 的「设备类型」
+        - executor：传入进程池时解析/映射在子进程执行（子进程用默认附件服务），否则在 import 线程池执行；
+          progress_values 为可跨进程共享的 dict（Manager().dict()），子进程经它上报解析 / 映射行数
         """
+        import_scope_label = self.validate(filename, device_type)
+        progress = progress or ImportProgress()
+
+        progress.stage = "parsing"
         try:
-            import_scope_label = scope_label_for_excel_import(device_type)
+            if executor is not None:
+                shared = SharedProgress(progress_values) if progress_values is not None else None
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, parse_excel, file_content, filename, import_scope_label, None, shared
+                )
+                parsed = await (_follow(future, shared, progress) if shared is not None else future)
+            else:
+                parsed = await run_blocking(
+                    "import", parse_excel, file_content, filename, import_scope_label, self.attachment_service, progress
+                )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e)) from e
+        progress.rows_parsed = parsed.valid_rows
+        progress.rows_mapped = len(parsed.articles)
+        progress.rows_failed = len(parsed.failures)
 
-        if not filename or not filename.endswith(".xlsx"):
-            raise HTTPException(status_code=400, detail="只支持 .xlsx 格式的 Excel 文件")
-
-        excel_file = BytesIO(file_content)
-        df = pd.read_excel(excel_file, engine="openpyxl", header=0)
-
-        fault_phenomenon_columns = [
-            "故障现象", "现象（问题）", "现象(问题)", "现象 （问题）", "现象 (问题)", "现象", "问题",
-        ]
-
-        def normalize_col(c: str) -> str:
-            return str(c).strip().lower()
-
-        norm_columns = {normalize_col(c): c for c in df.columns}
-        norm_fault = [normalize_col(c) for c in fault_phenomenon_columns]
-        has_fault = any(n in norm_columns for n in norm_fault)
-        header_row = 0
-
-        if not has_fault:
-            excel_file.seek(0)
-            df = pd.read_excel(excel_file, engine="openpyxl", header=1)
-            header_row = 1
-            norm_columns = {normalize_col(c): c for c in df.columns}
-            has_fault = any(n in norm_columns for n in norm_fault)
-            if not has_fault:
-                for col in df.columns:
-                    cl = str(col).strip().lower()
-                    if "现象" in cl or "问题" in cl or "故障" in cl:
-                        has_fault = True
-                        break
-            if not has_fault:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"缺少必需字段，请包含以下任一列：{', '.join(fault_phenomenon_columns)}；实际列名：{list(df.columns)}",
-                )
-
-        if df.empty:
+        if parsed.data_rows == 0:
             raise HTTPException(status_code=400, detail="Excel 文件为空")
-
-        # 确定“现象”列名（用于后面过滤无效行）
-        phenomenon_col = None
-        for v in fault_phenomenon_columns:
-            nv = normalize_col(v)
-            if nv in norm_columns:
-                phenomenon_col = norm_columns[nv]
-                break
-        if not phenomenon_col and has_fault:
-            for c in df.columns:
-                if "现象" in str(c) or "问题" in str(c) or "故障" in str(c):
-                    phenomenon_col = c
-                    break
-
-        # 使用 header=1 时，首行多为标题行，丢弃避免多导 1 条
-        if header_row == 1 and len(df) > 0:
-            df = df.iloc[1:].reset_index(drop=True)
-            if df.empty:
-                raise HTTPException(status_code=400, detail="Excel 除标题行外无数据")
-
-        # 只保留“现象”列有实质内容的行，避免空行、重复表头行被当作数据（导致 45 条变 50 条等）
-        header_like = {"序号", "现象", "问题", "检查点", "原因", "维修对策", "解决办法", "维修视频", "附件", "故障现象"}
-        if phenomenon_col and phenomenon_col in df.columns:
-            def _valid_phenomenon(val) -> bool:
-                if pd.isna(val):
-                    return False
-                s = str(val).strip()
-                if not s or s.lower() == "nan":
-                    return False
-                if s in header_like or len(s) < 2:
-                    return False
-                return True
-            df = df[df[phenomenon_col].apply(_valid_phenomenon)].reset_index(drop=True)
-
-        if df.empty:
+        if parsed.header_row == 1 and parsed.body_rows == 0:
+            raise HTTPException(status_code=400, detail="Excel 除标题行外无数据")
+        if parsed.valid_rows == 0:
             raise HTTPException(status_code=400, detail="没有有效数据行（现象列为空或仅为表头）")
 
-        # 过滤“型号”列
-        cols_drop = [c for c in df.columns if "型号" in str(c).strip()]
-        if cols_drop:
-            df = df.drop(columns=cols_drop)
-
-        sheet_name = "Sheet1"
-        try:
-            import openpyxl
-            excel_file.seek(0)
-            wb = openpyxl.load_workbook(excel_file, read_only=True)
-            if wb.sheetnames:
-                sheet_name = wb.sheetnames[0]
-            excel_file.seek(0)
-        except Exception as e:
-            logger.warning("无法获取 sheet 名称，使用默认: %s", e)
+        failures: List[dict] = list(parsed.failures)
+        if not parsed.articles:
+            raise HTTPException(
+                status_code=400,
+                detail=f"没有有效数据行。总行数: {parsed.valid_rows}, 跳过: {parsed.skipped}, 失败: {len(failures)}；列名: {parsed.columns}",
+            )
 
-        articles: List[dict] = []
-        articles_with_attachments: List[dict] = []
-        failures: List[dict] = []
-        skipped = 0
+        plan = await self._plan(parsed)
+        progress.rows_unchanged = len(plan.unchanged_ids)
+        logger.info(
+            "增量导入比对: 新增 %d, 变更 %d, 未变 %d, 表中已删除 %d",
+            len(plan.create), len(plan.update), len(plan.unchanged_ids), len(plan.stale_ids),
+        )
 
-        for idx, row in df.iterrows():
-            excel_row_num = int(idx) + header_row + 2
+        progress.stage = "uploading"
+        uploader = KbBatchUploader(self.dotnet_client)
+        created, updated = UploadResult(), UploadResult()
+        if plan.create:
             try:
-                article = map_excel_row_to_article(
-                    row,
-                    filename,
-                    sheet_name,
-                    excel_row_num,
-                    self.attachment_service,
-                    import_device_type_label=import_scope_label,
+                created = await uploader.upload(
+                    [parsed.articles[i] for i in plan.create],
+                    [parsed.article_rows[i] for i in plan.create],
+                    on_progress=progress.on_uploaded,
+                )
+            except _DOTNET_ERRORS as e:
+                raise _dotnet_http_error(e) from e
+        if plan.update:
+            update_rows = [parsed.article_rows[i] for i, _ in plan.update]
+            try:
+                known_assets = await self._known_assets([aid for _, aid in plan.update])
+                updated = await uploader.upload(
+                    [parsed.articles[i] for i, _ in plan.update],
+                    update_rows,
+                    on_progress=progress.on_uploaded,
+                    article_ids=[aid for _, aid in plan.update],
+                    known_assets=known_assets,
                 )
-                if article:
-                    articles_with_attachments.append(article)
-                    api_article = {k: v for k, v in article.items() if not str(k).startswith("_")}
-                    articles.append(api_article)
-                else:
-                    skipped += 1
             except Exception as e:
-                logger.exception("处理第 %s 行出错", excel_row_num)
-                failures.append({"row_index": excel_row_num, "reason": str(e)})
-
-        if not articles:
-            raise HTTPException(
-                status_code=400,
-                detail=f"没有有效数据行。总行数: {len(df)}, 跳过: {skipped}, 失败: {len(failures)}；列名: {list(df.columns)}",
-            )
-
-        logger.info("准备调用 .NET 批量创建文章，数量: %s", len(articles))
-        try:
-            result = await self.dotnet_client.batch_create_articles(articles)
-        except httpx.ConnectError as e:
-            logger.error("无法连接 .NET 后端: %s", e)
-            raise HTTPException(status_code=503, detail=f"无法连接 .NET 后端: {settings.DOTNET_BASE_URL}")
-        except httpx.TimeoutException as e:
-            logger.error("调用 .NET 超时: %s", e)
-            raise HTTPException(status_code=504, detail="调用 .NET 后端超时，请稍后重试")
-        except httpx.HTTPStatusError as e:
-            logger.error(".NET 返回错误: %s %s", e.response.status_code, e.response.text)
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f".NET 后端错误: {e.response.text}",
-            )
+                if not created.article_ids:
+                    if isinstance(e, _DOTNET_ERRORS):
+                        raise _dotnet_http_error(e) from e
+                    raise
+                # 新建已落库：更新整体失败（如 .NET 尚未部署批量更新接口）只记为行失败，新建条目照常返回并写入向量，
+                # 否则下次导入它们指纹相同、被当作未变而永远不会写入向量
+                logger.error("变更条目全部更新失败，已新建的 %d 条照常返回: %s", len(created.article_ids), e)
+                updated.failures = [{"row_index": row, "reason": f"更新 .NET 失败: {e}"} for row in update_rows]
 
-        success_count = result.get("successCount", 0)
-        failure_count = result.get("failureCount", 0)
-        article_ids: List[int] = []
-        article_id_to_attachments: dict = {}
-
-        for i, item in enumerate(result.get("results", [])):
-            if item.get("success") and item.get("articleId"):
-                aid = item["articleId"]
-                article_ids.append(aid)
-                if i < len(articles_with_attachments):
-                    att = articles_with_attachments[i].get("_attachment_info")
-                    if att:
-                        article_id_to_attachments[aid] = att if isinstance(att, list) else [att]
-            elif not item.get("success"):
-                failures.append({
-                    "row_index": item.get("index", -1) + header_row + 2,
-                    "reason": item.get("error", "未知错误"),
-                })
-
-        # 批量创建附件
-        if article_id_to_attachments:
-            assets_to_create: List[dict] = []
-            for aid, att_list in article_id_to_attachments.items():
-                for info in att_list:
-                    assets_to_create.append({
-                        "articleId": aid,
-                        "assetType": info.get("asset_type", "other"),
-                        "fileName": info.get("file_name", ""),
-                        "url": info.get("url", ""),
-                        "size": info.get("size"),
-                        "duration": None,
-                    })
-            if assets_to_create:
-                try:
-                    asset_result = await self.dotnet_client.batch_create_assets(assets_to_create)
-                    logger.info(
-                        "附件创建结果: 成功 %s, 失败 %s",
-                        asset_result.get("successCount", 0),
-                        asset_result.get("failureCount", 0),
-                    )
-                except Exception as e:
-                    logger.exception("批量创建附件失败: %s", e)
+        failures.extend(created.failures)
+        failures.extend(updated.failures)
 
+        ingest = None
+        changed_ids = created.article_ids + updated.article_ids
+        if settings.IMPORT_AUTO_INGEST and changed_ids:
+            progress.stage = "indexing"
+            ingest = await self._ingest(changed_ids, progress)
         return ExcelImportResponse(
-            total_rows=len(df),
-            success_count=success_count,
-            failure_count=len(failures) + failure_count,
-            article_ids=article_ids,
+            total_rows=parsed.valid_rows,
+            success_count=created.success_count + updated.success_count,
+            failure_count=len(failures),
+            article_ids=created.article_ids + updated.article_ids,
             failures=failures,
+            created_count=created.success_count,
+            updated_count=updated.success_count,
+            unchanged_count=len(plan.unchanged_ids),
+            updated_ids=updated.article_ids,
+            unchanged_ids=plan.unchanged_ids,
+            stale_article_ids=plan.stale_ids,
+            ingest=ingest,
         )
+
+    async def _plan(self, parsed: ParsedExcel) -> ImportPlan:
+        """按导入键找到之前导入的条目：指纹相同跳过，不同则更新，找不到则新增"""
+        plan = ImportPlan()
+        existing: Dict[str, Tuple[int, str]] = {}
+        if settings.EXCEL_IMPORT_INCREMENTAL:
+            try:
+                rows = await run_blocking(
+                    "db", self.kb_repo.list_by_import_source, self.dotnet_client.tenant_id, parsed.source
+                )
+                existing = index_existing(rows, parsed.source)
+            except Exception as e:
+                logger.warning("查询已导入条目失败，本次全部按新增处理: %s", e)
+        seen: Set[str] = set()
+        for i, (key, digest) in enumerate(parsed.fingerprints):
+            seen.add(key)
+            hit = existing.get(key)
+            if hit is None:
+                plan.create.append(i)
+            elif hit[1] == digest:
+                plan.unchanged_ids.append(hit[0])
+            else:
+                plan.update.append((i, hit[0]))
+        plan.stale_ids = sorted(aid for key, (aid, _) in existing.items() if key not in seen)
+        return plan
+
+    async def _ingest(self, article_ids: List[int], progress: ImportProgress) -> ImportIngestStatus:
+        """
+        新导入条目按 IMPORT_INGEST_BATCH_SIZE 分批写入向量（每批一次 embedding 请求）。
+        向量写入失败不影响导入结果，只在 ingest 中报告
+        """
+        out = ImportIngestStatus(status="succeeded", total=len(article_ids))
+        size = max(1, settings.IMPORT_INGEST_BATCH_SIZE)
+        for start in range(0, len(article_ids), size):
+            batch = article_ids[start:start + size]
+            try:
+                # 首次取 ingest_service 会初始化向量库，一并放到线程池；用单独的 ingest 池，
+                # embedding 调用与限流等待不占对话检索的 vector 池
+                result = await run_blocking("ingest", lambda b=batch: self.ingest_service.ingest_articles(b))
+            except Exception as e:
+                logger.warning("导入后写入向量失败（%d 条）: %s", len(batch), e)
+                result = {"success": 0, "upserted_total": 0, "failed": [{"article_id": a, "error": str(e)} for a in batch]}
+            out.success += result["success"]
+            out.upserted_total += result["upserted_total"]
+            out.failed.extend(result["failed"])
+            progress.rows_indexed += result["success"]
+        if out.failed:
+            out.status = "partial" if out.success else "failed"
+        logger.info("导入后写入向量: %s 成功 %d/%d, 向量 %d 条", out.status, out.success, out.total, out.upserted_total)
+        return out
+
+    async def _known_assets(self, article_ids: List[int]) -> Dict[int, Set[str]]:
+        """变更条目已有的附件地址；查询失败时不去重（附件可能重复创建）"""
+        try:
+            return await run_blocking("db", self.kb_repo.list_asset_urls, article_ids)
+        except Exception as e:
+            logger.warning("查询已有附件失败，变更条目的附件将全部重新创建: %s", e)
+            return {}
+
@@ -0,0 +1,163 @@
+"""
+Excel 流式读取：基于 openpyxl 只读模式 iter_rows 单遍解析
+- 一遍内识别表头行（第 1 行或第 2 行）、拿到 sheet 名，不再重复加载工作簿
+- 数据行过滤后按块产出 DataFrame 交给批量映射，内存不随行数增长
+表头/列名规则与 pandas.read_excel 一致（空表头为 "Unnamed: i"，重名加 ".1" 后缀）
+"""
+from io import BytesIO
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FAULT_PHENOMENON_COLUMNS = [
+    "故障现象", "现象（问题）", "现象(问题)", "现象 （问题）", "现象 (问题)", "现象", "问题",
+]
+
+# 现象列取这些值的行是重复表头，不是数据
+HEADER_LIKE = {"序号", "现象", "问题", "检查点", "原因", "维修对策", "解决办法", "维修视频", "附件", "故障现象"}
+
+
+def _normalize_col(c) -> str:
+    return str(c).strip().lower()
+
+
+def _is_blank(values: tuple) -> bool:
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in values)
+
+
+def _valid_phenomenon(val) -> bool:
+    if val is None or pd.isna(val):
+        return False
+    s = str(val).strip()
+    if not s or s.lower() == "nan":
+        return False
+    if s in HEADER_LIKE or len(s) < 2:
+        return False
+    return True
+
+
+def _header_names(cells: tuple, width: int) -> list:
+    """按 pandas 规则生成列名：空单元格为 Unnamed: i，重名依次加 .1/.2"""
+    names = []
+    seen: dict = {}
+    for i in range(width):
+        v = cells[i] if i < len(cells) else None
+        name = f"Unnamed: {i}" if v is None or (isinstance(v, str) and not v.strip()) else v
+        k = seen.get(name, 0)
+        seen[name] = k + 1
+        names.append(f"{name}.{k}" if k else name)
+    return names
+
+
+class ExcelSheetStream:
+    """
+    第一个 sheet 的流式视图。构造时只读到表头（最多前两行）；chunks() 逐块产出有效数据行。
+    读完后统计全表：data_rows 为表头下非空行数，body_rows 为去掉标题行后的非空行数，
+    valid_rows 为现象列有效的行数。使用完需 close()（或用 with）。
+    """
+
+    def __init__(self, file_content: bytes, chunk_size: int = 500) -> None:
+        import openpyxl
+
+        self.chunk_size = max(1, int(chunk_size))
+        self._wb = openpyxl.load_workbook(BytesIO(file_content), read_only=True, data_only=True)
+        try:
+            self.sheet_names: List[str] = list(self._wb.sheetnames)
+            self.sheet_name = self.sheet_names[0] if self.sheet_names else "Sheet1"
+            ws = self._wb.worksheets[0]
+            self._rows = ws.iter_rows(values_only=True)
+            self._detect_header(ws.max_column or 0)
+        except Exception:
+            self.close()
+            raise
+        self.data_rows = 0
+        self.body_rows = 0
+        self.valid_rows = 0
+        self._title_row_dropped = self.header_row == 0
+
+    def __enter__(self) -> "ExcelSheetStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def _detect_header(self, max_column: int) -> None:
+        """第 1 行含「现象」类列名则为表头；否则第 2 行（可按包含现象/问题/故障放宽）"""
+        norm_fault = [_normalize_col(c) for c in FAULT_PHENOMENON_COLUMNS]
+        first = next(self._rows, ())
+        width = max(max_column, len(first))
+        columns = _header_names(first, width)
+        self.header_row = 0
+        if not any(_normalize_col(c) in norm_fault for c in columns):
+            second = next(self._rows, ())
+            width = max(width, len(second))
+            columns = _header_names(second, width)
+            self.header_row = 1
+            has_fault = any(_normalize_col(c) in norm_fault for c in columns) or any(
+                "现象" in _normalize_col(c) or "问题" in _normalize_col(c) or "故障" in _normalize_col(c)
+                for c in columns
+            )
+            if not has_fault:
+                raise ValueError(
+                    f"缺少必需字段，请包含以下任一列：{', '.join(FAULT_PHENOMENON_COLUMNS)}；实际列名：{columns}"
+                )
+        self._width = width
+
+        # 确定“现象”列（用于过滤无效行）
+        norm_columns = {_normalize_col(c): i for i, c in enumerate(columns)}
+        self._phenomenon_idx: Optional[int] = None
+        for nv in norm_fault:
+            if nv in norm_columns:
+                self._phenomenon_idx = norm_columns[nv]
+                break
+        if self._phenomenon_idx is None:
+            for i, c in enumerate(columns):
+                if "现象" in str(c) or "问题" in str(c) or "故障" in str(c):
+                    self._phenomenon_idx = i
+                    break
+
+        # 过滤“型号”列
+        self._keep = [i for i, c in enumerate(columns) if "型号" not in str(c).strip()]
+        self.columns = [columns[i] for i in self._keep]
+
+    def chunks(self) -> Iterator[Tuple[pd.DataFrame, List[int]]]:
+        """
+        产出 (DataFrame 块, 对应行号)。行号沿用原导入规则：有效行序号 + 表头行 + 2。
+        表头为第 2 行时，表头下第一行视为标题行丢弃；空行不计入 data_rows。
+        """
+        buf: List[list] = []
+        numbers: List[int] = []
+        for values in self._rows:
+            blank = _is_blank(values)
+            if not self._title_row_dropped:
+                self._title_row_dropped = True
+                if not blank:
+                    self.data_rows += 1
+                continue
+            if blank:
+                continue
+            self.data_rows += 1
+            self.body_rows += 1
+            values = tuple(values[:self._width]) + (None,) * (self._width - len(values))
+            if self._phenomenon_idx is not None and not _valid_phenomenon(values[self._phenomenon_idx]):
+                continue
+            numbers.append(self.valid_rows + self.header_row + 2)
+            self.valid_rows += 1
+            buf.append([values[i] for i in self._keep])
+            if len(buf) >= self.chunk_size:
+                yield self._frame(buf, numbers)
+                buf, numbers = [], []
+        if buf:
+            yield self._frame(buf, numbers)
+
+    def _frame(self, rows: List[list], numbers: List[int]) -> Tuple[pd.DataFrame, List[int]]:
+        return pd.DataFrame(rows, columns=self.columns, dtype=object), numbers
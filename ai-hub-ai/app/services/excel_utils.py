@@ -5,12 +5,19 @@ Excel 解析与行映射的纯函数工具
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import pandas as pd
 
-from app.services.attachment_service import AttachmentService, extract_filename_from_reference
+from app.services.attachment_service import AttachmentService
+from app.utils.text_normalize import (
+    QUOTED_REFERENCE,
+    clean_labels as clean_bracketed_labels,
+    clean_labels_series as clean_bracketed_labels_series,
+    extract_filename_from_reference,
+)
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -32,7 +39,7 @@ def extract_video_names_from_ref(video_ref: str) -> list[str]:
                 continue
             # 处理 参考"xxx" 或 参考"xxx" 参考"yyy" 在同一行
             if part.count("参考") > 1 or '"' in part or '"' in part or '"' in part:
-                matches = re.findall(r'参考["""""]([^"""""]+)["""""]', part)
+                matches = QUOTED_REFERENCE.findall(part)
                 for m in matches:
                     n = m.strip().strip('"""\'""\'')
                     if n and n.lower() != "nan" and n not in seen:
@@ -48,150 +55,162 @@ def extract_video_names_from_ref(video_ref: str) -> list[str]:
     return names
 
 
-def clean_bracketed_labels(text: str) -> str:
-    """
-    清理文本中的中括号标签和列标题
-    移除：【序号】、【现象（问题）】、【检查点（原因）】等
-    """
-    if not text or not isinstance(text, str):
-        return text if text else ""
-    patterns_to_remove = [
-        r"【[^】]*序号[^】]*】",
-        r"【[^】]*现象[^】]*问题[^】]*】",
-        r"【[^】]*现象[^】]*】",
-        r"【[^】]*问题[^】]*】",
-        r"【[^】]*检查点[^】]*原因[^】]*】",
-        r"【[^】]*检查点[^】]*】",
-        r"【[^】]*原因[^】]*】",
-        r"【[^】]*维修对策[^】]*解决办法[^】]*】",
-        r"【[^】]*维修对策[^】]*】",
-        r"【[^】]*解决办法[^】]*】",
-        r"【[^】]*维修视频[^】]*附件[^】]*】",
-        r"【[^】]*维修视频[^】]*】",
-        r"【[^】]*附件[^】]*】",
-        r"【[^】]*YH400[^】]*YH500[^】]*】",
-        r"【[^】]*YH400[^】]*】",
-        r"【[^】]*YH500[^】]*】",
-        r"\[[^\]]*序号[^\]]*\]",
-        r"\[[^\]]*现象[^\]]*问题[^\]]*\]",
-        r"\[[^\]]*检查点[^\]]*原因[^\]]*\]",
-        r"\[[^\]]*维修对策[^\]]*解决办法[^\]]*\]",
-        r"\[[^\]]*维修视频[^\]]*附件[^\]]*\]",
-        r"\[[^\]]*YH400[^\]]*YH500[^\]]*\]",
-        r"\[[^\]]*YH400[^\]]*\]",
-        r"\[[^\]]*YH500[^\]]*\]",
-    ]
-    cleaned = text
-    for _ in range(5):
-        old = cleaned
-        for pat in patterns_to_remove:
-            cleaned = re.sub(pat, "", cleaned, flags=re.IGNORECASE)
-        if cleaned == old:
-            break
-    cleaned = re.sub(r"[ \t]+", " ", cleaned)
-    lines = [ln.strip() for ln in cleaned.split("\n")]
-    cleaned = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
-    return cleaned
+# 各字段对应的列名变体（按优先级）
+COLUMN_VARIANTS = {
+    "serial": ["序号"],
+    "phenomenon": ["现象（问题）", "现象(问题)", "现象 （问题）", "现象 (问题)", "现象", "问题", "故障现象"],
+    "checkpoints": ["检查点（原因）", "检查点(原因)", "检查点 （原因）", "检查点 (原因)", "检查点", "原因"],
+    "solution": [
+        "维修对策（解决办法）",
+        "维修对策(解决办法)",
+        "维修对策 （解决办法）",
+        "维修对策 (解决办法)",
+        "对策",
+        "维修对策",
+        "解决办法",
+        "解决方法",
+    ],
+    "video_ref": ["维修视频（附件）", "维修视频(附件)", "维修视频 （附件）", "维修视频 (附件)", "维修视频", "附件", "备注"],
+}
+
+_TITLE_KEYWORDS = ["现象", "问题", "检查点", "原因", "维修对策", "解决办法", "维修视频", "附件", "序号", "型号"]
+_HEADER_MARKERS = ["现象（问题）", "现象(问题)", "检查点（原因）", "维修对策（解决办法）"]
+
+
+def _cell_text(val) -> Optional[str]:
+    """单元格 → 去空白文本；空值/空串/"nan" 返回 None"""
+    if pd.notna(val) and val is not None:
+        s = str(val).strip()
+        if s and s.lower() != "nan":
+            return s
+    return None
 
 
 def find_column_by_variants(row: pd.Series, variants: List[str]) -> Optional[str]:
     """通过多种列名变体查找列值，支持忽略空格和大小写"""
-    for col_name in variants:
-        if col_name in row.index:
-            val = row.get(col_name)
-            if pd.notna(val) and val is not None:
-                s = str(val).strip()
-                if s and s.lower() != "nan":
-                    return s
-    normalized = {str(c).strip().lower(): c for c in row.index}
+    for col_name in resolve_column_variants(row.index, variants):
+        s = _cell_text(row.get(col_name))
+        if s is not None:
+            return s
+    return None
+
+
+def resolve_column_variants(columns, variants: List[str]) -> list:
+    """
+    按优先级列出表头中可提供该字段的列：先原样匹配，再忽略空格和大小写匹配。
+    取值时依次尝试，第一个非空的即为字段值；每个 sheet 只需解析一次。
+    """
+    columns = list(columns)
+    ordered = [v for v in variants if v in columns]
+    normalized = {str(c).strip().lower(): c for c in columns}
     for v in variants:
         nv = v.strip().lower()
         if nv in normalized:
-            val = row.get(normalized[nv])
-            if pd.notna(val) and val is not None:
-                s = str(val).strip()
-                if s and s.lower() != "nan":
-                    return s
-    return None
+            ordered.append(normalized[nv])
+    return ordered
 
 
-def map_excel_row_to_article(
-    row: pd.Series,
+def _coalesce_columns(df: pd.DataFrame, columns: list) -> pd.Series:
+    """整列版 find_column_by_variants：逐行取候选列中第一个非空值，无值为空串"""
+    result = pd.Series([None] * len(df), index=df.index, dtype=object)
+    for col in columns:
+        missing = result.isna()
+        if not missing.any():
+            break
+        result[missing] = df.loc[missing, col].map(_cell_text)
+    return result.fillna("")
+
+
+def _is_data_phenomenon(phenomenon: str) -> bool:
+    """现象列为空或是表头文字的行不是数据行"""
+    if not phenomenon:
+        return False
+    if phenomenon in _TITLE_KEYWORDS or any(k in phenomenon for k in _HEADER_MARKERS):
+        return False
+    return True
+
+
+def _clean_field(s: str) -> str:
+    if not s or str(s).lower() == "nan":
+        return ""
+    return clean_bracketed_labels(str(s))
+
+
+def parse_attachment_refs(video_ref: str) -> List[str]:
+    """从「维修视频（附件）」列文本解析出待查找的附件名（按出现顺序，可能重复）"""
+    if not video_ref:
+        return []
+    all_refs: List[str] = []
+    for line in video_ref.split("\n"):
+        for part in re.split(r"[；;]", line.strip()):
+            if part.strip():
+                all_refs.append(part.strip())
+    if video_ref.count("参考") > 1 or len(all_refs) == 1:
+        matches = QUOTED_REFERENCE.findall(video_ref)
+        if matches:
+            all_refs = [f'参考"{m}"' for m in matches]
+    names: List[str] = []
+    for ref_line in all_refs:
+        fn = extract_filename_from_reference(ref_line)
+        if not fn:
+            continue
+        fn = fn.strip('"""\'""\'《》【】[]()（）').strip()
+        if fn:
+            names.append(fn)
+    return names
+
+
+class _CleanMemo:
+    """同一批次内 clean_bracketed_labels 的记忆化；清理结果本身已是不动点，再清理直接命中"""
+
+    def __init__(self) -> None:
+        self._known: Dict[str, str] = {}
+
+    def mark_clean(self, texts) -> None:
+        for t in texts:
+            self._known[t] = t
+
+    def __call__(self, text: str) -> str:
+        hit = self._known.get(text)
+        if hit is None:
+            hit = clean_bracketed_labels(text)
+            self._known[text] = hit
+            self._known.setdefault(hit, hit)
+        return hit
+
+
+def _compose_article(
+    fields: Dict[str, str],
     source_file_name: str,
     sheet_name: str,
     row_index: int,
-    attachment_service: AttachmentService,
+    attachment_hits: List[Tuple[str, List[dict]]],
     import_device_type_label: Optional[str] = None,
+    clean: Callable[[str], str] = clean_bracketed_labels,
 ) -> Optional[dict]:
-    """
-    将 Excel 行映射为知识条目（含 _attachment_info、_has_attachment_reference）
-    表头：序号 | 现象（问题） | 检查点（原因） | 维修对策（解决办法） | 维修视频（附件）
-    """
-    serial = find_column_by_variants(row, ["序号"]) or ""
-    phenomenon = find_column_by_variants(
-        row,
-        ["现象（问题）", "现象(问题)", "现象 （问题）", "现象 (问题)", "现象", "问题", "故障现象"],
-    ) or ""
-    checkpoints = find_column_by_variants(
-        row,
-        ["检查点（原因）", "检查点(原因)", "检查点 （原因）", "检查点 (原因)", "检查点", "原因"],
-    ) or ""
-    solution = find_column_by_variants(
-        row,
-        [
-            "维修对策（解决办法）",
-            "维修对策(解决办法)",
-            "维修对策 （解决办法）",
-            "维修对策 (解决办法)",
-            "对策",
-            "维修对策",
-            "解决办法",
-            "解决方法",
-        ],
-    ) or ""
-    video_ref = find_column_by_variants(
-        row,
-        ["维修视频（附件）", "维修视频(附件)", "维修视频 （附件）", "维修视频 (附件)", "维修视频", "附件", "备注"],
-    ) or ""
+    """由已清理的字段与附件查找结果 [(引用名, 文件信息列表)] 组装知识条目"""
+    phenomenon = fields["phenomenon"]
+    checkpoints = fields["checkpoints"]
+    solution = fields["solution"]
+    video_ref = fields["video_ref"]
 
-    if not phenomenon:
-        return None
-    title_keywords = [
-        "现象", "问题", "检查点", "原因", "维修对策", "解决办法", "维修视频", "附件", "序号", "型号",
-    ]
-    if phenomenon in title_keywords or any(
-        k in phenomenon for k in ["现象（问题）", "现象(问题)", "检查点（原因）", "维修对策（解决办法）"]
-    ):
-        return None
-
-    def clean(s: str) -> str:
-        if not s or str(s).lower() == "nan":
-            return ""
-        return clean_bracketed_labels(str(s))
-
-    serial = clean(serial)
-    phenomenon = clean(phenomenon)
-    checkpoints = clean(checkpoints)
-    solution = clean(solution)
-    video_ref = clean(video_ref)
-
-    title = clean_bracketed_labels(phenomenon.strip())
+    title = clean(phenomenon.strip())
     if not title:
         return None
     # 现象 + 维修视频名称，使视频名也能像「现象」一样被检索
-    question_parts = [clean(phenomenon.strip())] if phenomenon.strip() else []
+    question_parts = [_clean_with(clean, phenomenon.strip())] if phenomenon.strip() else []
     video_names = extract_video_names_from_ref(video_ref)
     if video_names:
         question_parts.append(" ".join(video_names))
     question_text = "\n".join(question_parts) if question_parts else None
-    cause_text = clean(checkpoints.strip()) if checkpoints.strip() else None
+    cause_text = _clean_with(clean, checkpoints.strip()) if checkpoints.strip() else None
 
-    solution_parts = [clean(solution)] if solution.strip() else []
+    solution_parts = [_clean_with(clean, solution)] if solution.strip() else []
     if video_ref.strip():
-        solution_parts.append(clean(video_ref.strip()))
+        solution_parts.append(_clean_with(clean, video_ref.strip()))
     solution_text = "\n\n".join(solution_parts) if solution_parts else None
     if solution_text:
-        solution_text = clean_bracketed_labels(solution_text)
+        solution_text = clean(solution_text)
 
     scope_data: dict = {
         "来源文件": source_file_name,
@@ -212,27 +231,11 @@ def map_excel_row_to_article(
         tags.append(f"来源:{stem}")
     tags_str = ", ".join(tags)
 
-    # 附件：从“维修视频（附件）”解析引用并查找文件
+    # 附件：从“维修视频（附件）”解析出的引用及其查找结果
     attachment_info_list: List[dict] = []
     has_attachment_reference = bool(video_ref)
     if video_ref:
-        all_refs: List[str] = []
-        for line in video_ref.split("\n"):
-            for part in re.split(r"[；;]", line.strip()):
-                if part.strip():
-                    all_refs.append(part.strip())
-        if video_ref.count("参考") > 1 or len(all_refs) == 1:
-            matches = re.findall(r'参考["""""]([^"""""]+)["""""]', video_ref)
-            if matches:
-                all_refs = [f'参考"{m}"' for m in matches]
-        for ref_line in all_refs:
-            fn = extract_filename_from_reference(ref_line)
-            if not fn:
-                continue
-            fn = fn.strip('"""\'""\'《》【】[]()（）').strip()
-            if not fn:
-                continue
-            infos = attachment_service.find_attachment_files(fn)
+        for fn, infos in attachment_hits:
             for info in infos:
                 attachment_info_list.append({
                     "filename": fn,
@@ -254,10 +257,10 @@ def map_excel_row_to_article(
         attachment_info_list = unique
 
     attachment_info = attachment_info_list if attachment_info_list else None
-    final_title = clean_bracketed_labels(title)
-    final_question_text = clean_bracketed_labels(question_text) if question_text else None
-    final_cause_text = clean_bracketed_labels(cause_text) if cause_text else None
-    final_solution_text = clean_bracketed_labels(solution_text) if solution_text else None
+    final_title = clean(title)
+    final_question_text = clean(question_text) if question_text else None
+    final_cause_text = clean(cause_text) if cause_text else None
+    final_solution_text = clean(solution_text) if solution_text else None
 
     return {
         "title": final_title,
@@ -270,3 +273,124 @@ def map_excel_row_to_article(
         "_attachment_info": attachment_info,
         "_has_attachment_reference": has_attachment_reference,
     }
+
+
+def _clean_with(clean: Callable[[str], str], s: str) -> str:
+    """等价于行映射里的 clean()：空值/"nan" 为空串，否则清理标签"""
+    if not s or str(s).lower() == "nan":
+        return ""
+    return clean(str(s))
+
+
+def map_excel_row_to_article(
+    row: pd.Series,
+    source_file_name: str,
+    sheet_name: str,
+    row_index: int,
+    attachment_service: AttachmentService,
+    import_device_type_label: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    将 Excel 行映射为知识条目（含 _attachment_info、_has_attachment_reference）
+    表头：序号 | 现象（问题） | 检查点（原因） | 维修对策（解决办法） | 维修视频（附件）
+    """
+    raw = {field: find_column_by_variants(row, variants) or "" for field, variants in COLUMN_VARIANTS.items()}
+    if not _is_data_phenomenon(raw["phenomenon"]):
+        return None
+    fields = {field: _clean_field(v) for field, v in raw.items()}
+    if not clean_bracketed_labels(fields["phenomenon"].strip()):
+        return None
+    hits = [(fn, attachment_service.find_attachment_files(fn)) for fn in parse_attachment_refs(fields["video_ref"])]
+    return _compose_article(
+        fields, source_file_name, sheet_name, row_index, hits,
+        import_device_type_label=import_device_type_label,
+    )
+
+
+def _resolve_references(
+    names: List[str],
+    attachment_service: AttachmentService,
+    max_workers: int,
+) -> Dict[str, Union[List[dict], Exception]]:
+    """在有界线程池里并发查找去重后的附件名；单个失败只影响引用它的行"""
+
+    def _find(fn: str) -> Union[List[dict], Exception]:
+        try:
+            return attachment_service.find_attachment_files(fn)
+        except Exception as e:
+            return e
+
+    if not names:
+        return {}
+    workers = max(1, min(int(max_workers), len(names)))
+    if workers == 1:
+        return {fn: _find(fn) for fn in names}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aihub-attach") as pool:
+        return dict(zip(names, pool.map(_find, names)))
+
+
+def map_excel_rows_to_articles(
+    df: pd.DataFrame,
+    source_file_name: str,
+    sheet_name: str,
+    row_numbers: List[int],
+    attachment_service: AttachmentService,
+    import_device_type_label: Optional[str] = None,
+    max_workers: int = 8,
+) -> List[Tuple[int, Optional[dict], Optional[Exception]]]:
+    """
+    批量版 map_excel_row_to_article，逐行结果与单行映射一致：
+    - 每个 sheet 只解析一次列名变体
+    - 文本列整列清理
+    - 全部行的附件引用去重后在有界线程池中并发查找
+    - 一遍组装文章
+    返回 [(Excel 行号, 文章或 None, 异常或 None)]，顺序与 df 行一致
+    """
+    n = len(df)
+    raw = {
+        field: _coalesce_columns(df, resolve_column_variants(df.columns, variants))
+        for field, variants in COLUMN_VARIANTS.items()
+    }
+    valid = raw["phenomenon"].map(_is_data_phenomenon).astype(bool)
+    fields = {field: clean_bracketed_labels_series(series[valid]) for field, series in raw.items()}
+
+    clean = _CleanMemo()
+    for series in fields.values():
+        clean.mark_clean(series)
+
+    positions = [i for i, ok in enumerate(valid.tolist()) if ok]
+    row_fields: Dict[int, Dict[str, str]] = {}
+    row_refs: Dict[int, List[str]] = {}
+    distinct: Dict[str, None] = {}
+    for j, i in enumerate(positions):
+        f = {field: fields[field].iat[j] for field in COLUMN_VARIANTS}
+        if not clean(f["phenomenon"].strip()):
+            continue
+        row_fields[i] = f
+        row_refs[i] = parse_attachment_refs(f["video_ref"])
+        distinct.update(dict.fromkeys(row_refs[i]))
+
+    resolved = _resolve_references(list(distinct), attachment_service, max_workers)
+
+    results: List[Tuple[int, Optional[dict], Optional[Exception]]] = []
+    for i in range(n):
+        row_num = row_numbers[i]
+        f = row_fields.get(i)
+        if f is None:
+            results.append((row_num, None, None))
+            continue
+        try:
+            hits = []
+            for fn in row_refs[i]:
+                found = resolved[fn]
+                if isinstance(found, Exception):
+                    raise found
+                hits.append((fn, found))
+            article = _compose_article(
+                f, source_file_name, sheet_name, row_num, hits,
+                import_device_type_label=import_device_type_label, clean=clean,
+            )
+            results.append((row_num, article, None))
+        except Exception as e:
+            results.append((row_num, None, e))
+    return results
@@ -0,0 +1,95 @@
+"""
+Excel 导入行指纹：重复导入同一表格时据此判断新增 / 变更 / 未变
+- 导入源 = 来源文件名 + sheet 的摘要；用于一次查出该表之前导入的所有条目
+- 导入键 = 导入源 + 行标识（清理后的现象 + 同名序次），插行、删行、重排序号都不影响
+- 内容指纹 = 规范化后的标题 / 问题 / 原因 / 对策 / 标签 / 适用范围（不含行号）/ 附件地址
+三者写入 scope_json，之后的导入按导入键对比内容指纹
+"""
+import hashlib
+import json
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+SOURCE_FIELD = "导入源"
+KEY_FIELD = "导入键"
+HASH_FIELD = "内容指纹"
+# 不参与内容指纹的 scope 字段：行号随插行变化，指纹字段本身
+_VOLATILE_SCOPE = {"行号", SOURCE_FIELD, KEY_FIELD, HASH_FIELD}
+_CONTENT_FIELDS = ("title", "questionText", "causeText", "solutionText", "tags")
+
+
+def _norm(text: Optional[str]) -> str:
+    """NFKC + 合并空白，全角/半角、多余空格的差异不算变更"""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).split())
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def source_key(source_file_name: str, sheet_name: str) -> str:
+    """同一文件同一 sheet 的导入源（只取文件名，不含上传路径）"""
+    return _digest(_norm(Path(source_file_name or "").name).lower(), _norm(sheet_name))[:24]
+
+
+def content_hash(article: dict) -> str:
+    """条目内容指纹；scope_json 里的行号与指纹字段不参与"""
+    scope = json.loads(article.get("scopeJson") or "{}")
+    attachments = article.get("_attachment_info") or []
+    payload = {
+        "fields": [_norm(article.get(f)) for f in _CONTENT_FIELDS],
+        "scope": {k: _norm(v) for k, v in sorted(scope.items()) if k not in _VOLATILE_SCOPE},
+        "attachments": sorted(a.get("url") or a.get("relative_path") or "" for a in attachments),
+    }
+    return _digest(json.dumps(payload, ensure_ascii=False, sort_keys=True))
+
+
+def read_fingerprint(scope_json: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """从已有条目的 scope_json 读出 (导入源, 导入键, 内容指纹)；非指纹导入的条目返回 None"""
+    try:
+        scope = json.loads(scope_json or "{}")
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(scope, dict):
+        return None
+    fp = scope.get(SOURCE_FIELD), scope.get(KEY_FIELD), scope.get(HASH_FIELD)
+    return fp if all(isinstance(v, str) and v for v in fp) else None
+
+
+class RowFingerprinter:
+    """
+    按行序给同一 sheet 的条目打指纹（写回 scopeJson）。
+    同名现象按出现次序区分，需按表格顺序逐条调用。
+    """
+
+    def __init__(self, source_file_name: str, sheet_name: str) -> None:
+        self.source = source_key(source_file_name, sheet_name)
+        self._seen: Counter = Counter()
+
+    def __call__(self, article: dict) -> Tuple[str, str]:
+        identity = _norm(article.get("title")).lower()
+        self._seen[identity] += 1
+        key = _digest(self.source, identity, str(self._seen[identity]))[:32]
+        digest = content_hash(article)
+        scope = json.loads(article.get("scopeJson") or "{}")
+        scope.update({SOURCE_FIELD: self.source, KEY_FIELD: key, HASH_FIELD: digest})
+        article["scopeJson"] = json.dumps(scope, ensure_ascii=False)
+        return key, digest
+
+
+def index_existing(rows, source: str) -> Dict[str, Tuple[int, str]]:
+    """[{"id", "scope_json"}] → {导入键: (article_id, 内容指纹)}；同键多条时取 id 最大的"""
+    out: Dict[str, Tuple[int, str]] = {}
+    for r in rows:
+        fp = read_fingerprint(r.get("scope_json"))
+        if fp is None or fp[0] != source:
+            continue
+        article_id = int(r["id"])
+        prev = out.get(fp[1])
+        if prev is None or article_id > prev[0]:
+            out[fp[1]] = (article_id, fp[2])
+    return out
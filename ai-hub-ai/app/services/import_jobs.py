@@ -0,0 +1,237 @@
+"""
+Excel 后台导入任务：提交后立即返回 job_id，前端轮询进度
+- 解析 + 映射放到独立进程池（IMPORT_PROCESS_WORKERS > 0），不占用 API 进程的 GIL；为 0 时在 import 线程池执行
+- 进度按阶段上报：解析 / 映射 / 上传 / 失败行数；进程池解析时子进程经 Manager().dict() 实时上报解析 / 映射行数
+- 已结束的任务保留 IMPORT_JOB_RETENTION_SECONDS 秒供查询，之后清理
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, MutableMapping, Optional
+
+from fastapi import HTTPException
+
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.services.excel_import_service import ExcelImportService, ImportProgress
+
+logger = get_logger(__name__)
+
+# 终态
+_FINISHED = ("succeeded", "failed")
+# 最多保留的任务数（含未过期的已结束任务），防止频繁导入撑大内存
+_MAX_JOBS = 200
+
+
+@dataclass
+class ImportJob:
+    """单个导入任务；status 取 progress.stage"""
+
+    job_id: str
+    filename: str
+    progress: ImportProgress = field(default_factory=ImportProgress)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def status(self) -> str:
+        return self.progress.stage
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": {k: v for k, v in asdict(self.progress).items() if k != "stage"},
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "error_status": self.error_status,
+        }
+
+
+class ImportJobManager:
+    """导入任务登记与执行；进程池懒创建，关闭时一并释放"""
+
+    def __init__(self, process_workers: Optional[int] = None, retention_seconds: Optional[float] = None) -> None:
+        self._process_workers = max(
+            0, int(settings.IMPORT_PROCESS_WORKERS if process_workers is None else process_workers)
+        )
+        self._retention = float(
+            settings.IMPORT_JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        )
+        self._jobs: Dict[str, ImportJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # 子进程上报解析进度用的 Manager（随进程池懒创建）
+        self._mp_manager = None
+        self._submitted = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._process_workers <= 0:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn：子进程不继承父进程的连接池 / 线程状态
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _progress_channel(self) -> Optional[MutableMapping[str, int]]:
+        """给子进程的进度 dict；Manager 启动失败时返回 None（只是看不到解析中的进度）"""
+        with self._executor_lock:
+            try:
+                if self._mp_manager is None:
+                    self._mp_manager = multiprocessing.get_context("spawn").Manager()
+                return self._mp_manager.dict()
+            except Exception as e:
+                logger.warning("导入进度通道不可用，解析期间不上报行数: %s", e)
+                self._mp_manager = None
+                return None
+
+    def submit(
+        self,
+        service: ExcelImportService,
+        contents: bytes,
+        filename: str,
+        device_type: Optional[str] = None,
+    ) -> ImportJob:
+        """登记任务并在后台执行；文件名/设备类型不合法时直接抛 HTTPException(400)"""
+        service.validate(filename, device_type)
+        self._purge()
+        job = ImportJob(job_id=uuid.uuid4().hex, filename=filename)
+        self._jobs[job.job_id] = job
+        self._submitted += 1
+        job.task = asyncio.create_task(self._run(job, service, contents, device_type))
+        return job
+
+    async def _run(self, job: ImportJob, service: ExcelImportService, contents: bytes, device_type: Optional[str]) -> None:
+        try:
+            executor = self._get_executor()
+            # 首次会启动 Manager 进程，放到线程池，不阻塞事件循环
+            channel = await run_blocking("import", self._progress_channel) if executor is not None else None
+            resp = await service.import_excel(
+                contents,
+                job.filename,
+                device_type=device_type,
+                progress=job.progress,
+                executor=executor,
+                progress_values=channel,
+            )
+            job.result = resp.model_dump()
+            job.progress.stage = "succeeded"
+        except asyncio.CancelledError:
+            job.error = "导入已取消"
+            job.progress.stage = "failed"
+            raise
+        except HTTPException as e:
+            job.error, job.error_status = str(e.detail), e.status_code
+            job.progress.stage = "failed"
+        except BrokenProcessPool as e:
+            # 子进程异常退出后进程池不可再用，丢弃以便下个任务重建
+            logger.error("导入进程池异常，已重置: %s", e)
+            self._reset_executor()
+            job.error, job.error_status = f"导入失败: {e}", 500
+            job.progress.stage = "failed"
+        except Exception as e:
+            logger.exception("导入任务 %s 失败: %s", job.job_id, e)
+            job.error, job.error_status = f"导入失败: {e}", 500
+            job.progress.stage = "failed"
+        finally:
+            job.finished_at = time.time()
+            logger.info(
+                "导入任务 %s 结束: %s 解析 %s 映射 %s 上传 %s 失败 %s",
+                job.job_id, job.status, job.progress.rows_parsed, job.progress.rows_mapped,
+                job.progress.rows_uploaded, job.progress.rows_failed,
+            )
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: ImportJob) -> ImportJob:
+        """等待任务结束（同步接口复用后台任务时使用）"""
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [
+            jid for jid, j in self._jobs.items()
+            if j.finished and j.finished_at is not None and now - j.finished_at > self._retention
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+        # 超出上限时从最早结束的开始丢弃
+        if len(self._jobs) >= _MAX_JOBS:
+            done = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished_at or 0)
+            for j in done[: len(self._jobs) - _MAX_JOBS + 1]:
+                del self._jobs[j.job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        for j in self._jobs.values():
+            by_status[j.status] = by_status.get(j.status, 0) + 1
+        return {
+            "process_workers": self._process_workers,
+            "submitted": self._submitted,
+            "jobs": by_status,
+        }
+
+    async def shutdown(self) -> None:
+        """取消未完成任务并关闭进程池"""
+        pending = [j.task for j in self._jobs.values() if j.task is not None and not j.task.done()]
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._reset_executor()
+        with self._executor_lock:
+            if self._mp_manager is not None:
+                self._mp_manager.shutdown()
+                self._mp_manager = None
+
+    def _reset_executor(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                logger.info("导入进程池已关闭")
+
+
+_manager: Optional[ImportJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_import_job_manager() -> ImportJobManager:
+    """获取导入任务管理器单例"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ImportJobManager()
+    return _manager
+
+
+async def shutdown_import_jobs() -> None:
+    """应用关闭时调用"""
+    if _manager is not None:
+        await _manager.shutdown()
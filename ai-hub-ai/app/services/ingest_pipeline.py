@@ -0,0 +1,277 @@
+"""
+全量 ingest 流水线：读 SQL → 拆分 → embedding → 写向量，四段由有界队列串起来并行执行
+- 读：按 id 游标分页取整行（KbArticleRepository.iter_pages），不再先拉 id 再逐条回表
+- 拆分：build_chunks 并与向量库现有指纹比对（vector_diff），只有内容变化的 chunk 进入 embedding；
+  按单次请求上限把若干篇文章的待算 chunk 攒成一个工作单元
+- embedding：INGEST_EMBED_WORKERS 个线程并发，经共享限流器（QPS / TPM 令牌桶）按配额放行
+- 写：攒满 INGEST_WRITE_BATCH_SIZE 条向量再一次 upsert（另一次改 metadata、一次删多余 id）
+队列有界，下游慢时上游自然阻塞，内存占用与数据量无关；每段统计条数、耗时与吞吐
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.infra.embedding.batching import BatchEmbedder
+from app.infra.embedding.rate_limit import get_embedding_rate_limiter
+from app.repositories.kb_article_repo import KbArticleRepository
+from app.repositories.vector_repo import VectorRepository
+from app.services.vector_diff import CHANGE_COUNTS, ChunkChanges, apply_changes, plan_changes
+
+logger = get_logger(__name__)
+
+_DONE = object()
+# 队列 put/get 的轮询间隔：出错中止时各线程最多这么久内退出
+_POLL_SECONDS = 0.2
+
+
+@dataclass
+class _Unit:
+    """一个 embedding 工作单元：若干篇完整文章的变更，vectors 与 changes.embed_chunks 一一对应"""
+
+    changes: ChunkChanges = field(default_factory=ChunkChanges)
+    vectors: List[Optional[List[float]]] = field(default_factory=list)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    def merge(self, other: "_Unit") -> None:
+        """并入另一个已算好向量的单元（错误下标按偏移平移）"""
+        offset = len(self.changes.embed_chunks)
+        self.changes.merge(other.changes)
+        self.vectors.extend(other.vectors)
+        self.errors.update({offset + i: e for i, e in other.errors.items()})
+
+
+class _StageStats:
+    """单段统计：处理条数与忙碌时间（多线程段为各线程之和）"""
+
+    def __init__(self, unit: str) -> None:
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def to_dict(self, elapsed: float) -> dict:
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "busy_seconds": round(self.busy, 3),
+            "per_second": round(self.items / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+class IngestPipeline:
+    """一次全量 ingest；run() 阻塞到全部写完，返回与 rebuild_batch 相同的统计结构，另含各段吞吐"""
+
+    def __init__(
+        self,
+        kb_repo: KbArticleRepository,
+        vec_repo: VectorRepository,
+        batcher: BatchEmbedder,
+        page_size: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        write_batch_size: Optional[int] = None,
+    ) -> None:
+        self._kb_repo = kb_repo
+        self._vec_repo = vec_repo
+        self._batcher = batcher
+        self._page_size = max(1, int(page_size or settings.INGEST_READ_PAGE_SIZE))
+        self._workers = max(1, int(embed_workers or settings.INGEST_EMBED_WORKERS))
+        size = max(1, int(queue_size or settings.INGEST_QUEUE_SIZE))
+        self._write_batch = max(1, int(write_batch_size or settings.INGEST_WRITE_BATCH_SIZE))
+        self._pages: queue.Queue = queue.Queue(maxsize=size)
+        self._units: queue.Queue = queue.Queue(maxsize=size)
+        self._embedded: queue.Queue = queue.Queue(maxsize=size)
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._stats = {
+            "read": _StageStats("articles"),
+            "chunk": _StageStats("chunks"),
+            "embed": _StageStats("chunks"),
+            "write": _StageStats("vectors"),
+        }
+        self._total = 0
+        self._failed: List[dict] = []
+        self._counts = dict.fromkeys(CHANGE_COUNTS, 0)
+
+    def run(self, tenant_id: str, status: Optional[str] = None, limit: Optional[int] = None) -> dict:
+        started = time.perf_counter()
+        requests_before = self._batcher.requests
+        threads = [
+            self._thread("read", self._read, tenant_id, status, limit),
+            self._thread("chunk", self._chunk),
+            *(self._thread(f"embed-{i}", self._embed) for i in range(self._workers)),
+            self._thread("write", self._write),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
+
+        elapsed = time.perf_counter() - started
+        failed_ids = {f["article_id"] for f in self._failed}
+        stages = {name: s.to_dict(elapsed) for name, s in self._stats.items()}
+        stages["embed"]["requests"] = self._batcher.requests - requests_before
+        stages["embed"]["workers"] = self._workers
+        result = {
+            "total": self._total,
+            "success": self._total - len(failed_ids),
+            "failed": self._failed,
+            "upserted_total": self._counts["changed"],
+            **self._counts,
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": stages,
+        }
+        logger.info(
+            "全量 ingest 完成: total=%d, success=%d, failed=%d, changed=%d, retagged=%d, removed=%d, skipped=%d, "
+            "耗时 %.1fs, 各段吞吐(/s): %s",
+            result["total"], result["success"], len(self._failed), self._counts["changed"], self._counts["retagged"],
+            self._counts["removed"], self._counts["skipped"], elapsed,
+            ", ".join(f"{k}={v['per_second']}" for k, v in stages.items()),
+        )
+        _record_last_run(result)
+        return result
+
+    # ---------- 各段 ----------
+
+    def _read(self, tenant_id: str, status: Optional[str], limit: Optional[int]) -> None:
+        pages = self._kb_repo.iter_pages(tenant_id=tenant_id, status=status, limit=limit, page_size=self._page_size)
+        while True:
+            t0 = time.perf_counter()
+            page = next(pages, None)
+            if page is None:
+                break
+            self._stats["read"].record(len(page), time.perf_counter() - t0)
+            self._total += len(page)
+            if not self._put(self._pages, page):
+                return
+        self._put(self._pages, _DONE)
+
+    def _chunk(self) -> None:
+        while True:
+            page = self._get(self._pages)
+            if page is _DONE:
+                break
+            t0 = time.perf_counter()
+            planned = plan_changes(self._vec_repo, page, self._batcher)
+            ready: List[_Unit] = []
+            unit = _Unit()
+            chunk_count = 0
+            for changes in planned:
+                chunk_count += len(changes.embed_chunks) + len(changes.retag_chunks) + changes.skipped
+                # 待算 chunk 按当前单次请求上限攒满即发出；文章不拆开，保证一篇的 chunk 在同一单元
+                pending = len(unit.changes.embed_chunks)
+                if pending and pending + len(changes.embed_chunks) > self._batcher.max_items:
+                    ready.append(unit)
+                    unit = _Unit()
+                unit.changes.merge(changes)
+            # 每页末尾发出剩余部分，全部未变的页不会一直攒在拆分段
+            if unit.changes.articles:
+                ready.append(unit)
+            self._stats["chunk"].record(chunk_count, time.perf_counter() - t0)
+            for u in ready:
+                if not self._put(self._units, u):
+                    return
+        for _ in range(self._workers):
+            if not self._put(self._units, _DONE):
+                return
+
+    def _embed(self) -> None:
+        while True:
+            unit = self._get(self._units)
+            if unit is _DONE:
+                self._put(self._embedded, _DONE)
+                return
+            t0 = time.perf_counter()
+            docs = [c["doc"] for c in unit.changes.embed_chunks]
+            unit.vectors, unit.errors = self._batcher.embed(docs)
+            self._stats["embed"].record(len(docs) - len(unit.errors), time.perf_counter() - t0)
+            if not self._put(self._embedded, unit):
+                return
+
+    def _write(self) -> None:
+        pending = _Unit()
+        done_workers = 0
+        while done_workers < self._workers:
+            unit = self._get(self._embedded)
+            if unit is _DONE:
+                done_workers += 1
+                continue
+            pending.merge(unit)
+            c = pending.changes
+            if len(c.embed_chunks) + len(c.retag_chunks) + len(c.stale) >= self._write_batch:
+                self._flush(pending)
+                pending = _Unit()
+        if pending.changes.articles and not self._abort.is_set():
+            self._flush(pending)
+
+    def _flush(self, unit: _Unit) -> None:
+        t0 = time.perf_counter()
+        counts, failed = apply_changes(self._vec_repo, unit.changes, unit.vectors, unit.errors)
+        self._stats["write"].record(counts["changed"], time.perf_counter() - t0)
+        for key, value in counts.items():
+            self._counts[key] += value
+        self._failed.extend(failed)
+
+    # ---------- 线程与队列 ----------
+
+    def _thread(self, name: str, target: Callable[..., None], *args: Any) -> threading.Thread:
+        def _run() -> None:
+            try:
+                target(*args)
+            except BaseException as e:
+                logger.exception("ingest 流水线 %s 段失败: %s", name, e)
+                if self._error is None:
+                    self._error = e
+                self._abort.set()
+
+        return threading.Thread(target=_run, name=f"aihub-ingest-{name}", daemon=True)
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """阻塞放入；流水线中止时放弃并返回 False"""
+        while not self._abort.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        """阻塞取出；流水线中止时返回 _DONE"""
+        while not self._abort.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+
+_last_run: Optional[dict] = None
+_last_run_lock = threading.Lock()
+
+
+def _record_last_run(result: dict) -> None:
+    global _last_run
+    summary = {k: v for k, v in result.items() if k != "failed"}
+    summary["failed"] = len(result["failed"])
+    summary["finished_at"] = time.time()
+    with _last_run_lock:
+        _last_run = summary
+
+
+def get_ingest_pipeline_stats() -> dict:
+    """最近一次全量 ingest 的各段吞吐与 embedding 限流统计（/api/v1/metrics）"""
+    with _last_run_lock:
+        last_run = dict(_last_run) if _last_run is not None else None
+    return {"rate_limiter": get_embedding_rate_limiter().stats(), "last_run": last_run}
@@ -1,69 +1,122 @@
 """读 SQL → 拆分 → embedding → upsert"""
 import logging
+from datetime import datetime, timedelta
+from app.core.config import settings
 from app.core.exceptions import AppError
 from app.repositories.kb_article_repo import KbArticleRepository
 from app.repositories.vector_repo import VectorRepository
 from app.infra.embedding.base import IEmbedder
-from app.services.chunker import build_chunks
+from app.infra.embedding.batching import BatchEmbedder
+from app.infra.embedding.embedding_store import get_embedding_store
+from app.infra.embedding.rate_limit import get_embedding_rate_limiter
+from app.schemas.kb_article import KbArticle
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.vector_diff import CHANGE_COUNTS, ChunkChanges, apply_changes, plan_changes
 
 logger = logging.getLogger(__name__)
 
+# 重建开始时主库没有数据：影子集合补写从头读
+_EPOCH = datetime(1900, 1, 1)
+
 
 class IngestService:
     def __init__(self, kb_repo: KbArticleRepository, vec_repo: VectorRepository, embedder: IEmbedder) -> None:
         self._kb_repo = kb_repo
         self._vec_repo = vec_repo
         self._embedder = embedder
+        # 跨调用共用：某次请求因批过大被拆分后，后续批直接用更小的上限
+        self._batcher = BatchEmbedder(embedder, limiter=get_embedding_rate_limiter(), store=get_embedding_store())
 
     def rebuild_article(self, article_id: int) -> int:
-        """重建单条向量：删旧 → 重新拆分 → 重新写入"""
+        """重建单条向量：重新拆分 → 与现有向量比对 → 只写变化的部分，返回重新写入的向量数"""
         article = self._kb_repo.get_by_id(article_id)
         if not article:
             raise AppError(f"kb_article 不存在: {article_id}")
-
-        # 先删旧，再写新
-        self._vec_repo.delete_by_article(article.tenant_id, article.id)
-
-        chunks = build_chunks(article)
-        if not chunks:
-            return 0
-
-        docs = [c["doc"] for c in chunks]
-        vecs = self._embedder.embed_texts(docs)
-
-        ids = [c["id"] for c in chunks]
-        metas = [c["metadata"] for c in chunks]
-
-        return self._vec_repo.upsert(ids=ids, embeddings=vecs, documents=docs, metadatas=metas)
+        counts, failed = self._write_articles([article])
+        if failed:
+            raise AppError(f"kb_article 向量写入失败: {article_id}, {failed[0]['error']}")
+        return counts["changed"]
 
     def rebuild_batch(self, ids: list[int], log_every: int = 50) -> dict:
         """
-        批量重建：返回统计信息（成功/失败）
+        批量重建：返回统计信息（成功/失败，及跳过/变更/删除的向量数）
+        每 INGEST_REBUILD_BATCH_ARTICLES 篇一批：一次 SQL 取文章，批内内容变化的 chunk 按 embedding 服务商上限
+        打包请求（不再每篇一次），再按文章映射回去写入
         """
+        ids = list(dict.fromkeys(int(i) for i in ids))
         total = len(ids)
-        success = 0
-        failed: list[dict] = []
-        upserted_total = 0
+        window = max(1, settings.INGEST_REBUILD_BATCH_ARTICLES)
+        summary = {"total": total, "success": 0, "failed": [], "upserted_total": 0, **dict.fromkeys(CHANGE_COUNTS, 0)}
+        requests_before = self._batcher.requests
 
-        for i, aid in enumerate(ids, start=1):
-            try:
-                upserted = self.rebuild_article(aid)
-                upserted_total += upserted
-                success += 1
-            except Exception as e:
-                failed.append({"article_id": aid, "error": str(e)})
+        for start in range(0, total, window):
+            result = self.ingest_articles(ids[start:start + window])
+            summary["success"] += result["success"]
+            summary["failed"].extend(result["failed"])
+            for key in ("upserted_total", *CHANGE_COUNTS):
+                summary[key] += result[key]
+            done = min(start + window, total)
+            if log_every > 0 and (done // log_every > start // log_every or done == total):
+                logger.info(
+                    f"批量 ingest 进度: {done}/{total}, success={summary['success']}, failed={len(summary['failed'])}, "
+                    f"changed={summary['changed']}, skipped={summary['skipped']}"
+                )
 
-            if log_every > 0 and i % log_every == 0:
-                logger.info(f"批量 ingest 进度: {i}/{total}, success={success}, failed={len(failed)}, upserted_total={upserted_total}")
+        logger.info(
+            f"批量 ingest 完成: total={total}, success={summary['success']}, failed={len(summary['failed'])}, "
+            f"changed={summary['changed']}, retagged={summary['retagged']}, removed={summary['removed']}, "
+            f"skipped={summary['skipped']}, embedding_requests={self._batcher.requests - requests_before}"
+        )
+        return summary
 
-        logger.info(f"批量 ingest 完成: total={total}, success={success}, failed={len(failed)}, upserted_total={upserted_total}")
+    def ingest_articles(self, ids: list[int]) -> dict:
+        """
+        按批写入一组文章（新导入的条目、批量重建共用）：一次 SQL 取全部文章，
+        内容变化的 chunk 打包成尽量少的 embed_texts、一次 upsert。返回与 rebuild_batch 相同的统计结构
+        """
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        articles = self._kb_repo.get_by_ids(ids)
+        found = {a.id for a in articles}
+        failed = [{"article_id": aid, "error": f"kb_article 不存在: {aid}"} for aid in ids if aid not in found]
+        counts, write_failed = self._write_articles(articles)
+        failed.extend(write_failed)
+        failed_ids = {f["article_id"] for f in failed}
         return {
-            "total": total,
-            "success": success,
+            "total": len(ids),
+            "success": sum(1 for aid in ids if aid not in failed_ids),
             "failed": failed,
-            "upserted_total": upserted_total,
+            "upserted_total": counts["changed"],
+            **counts,
         }
 
+    def sync_articles(self, articles: list[KbArticle]) -> tuple[dict, list[dict]]:
+        """写入已读出的文章（增量同步用，不再回表），返回 (变更计数, 失败列表)"""
+        return self._write_articles(articles)
+
+    def remove_articles(self, tenant_id: str, article_ids: list[int], vec_repo: VectorRepository | None = None) -> int:
+        """删除一组文章的全部向量（主库软删除后同步），一次查询 + 一次删除，返回删除的向量数"""
+        if not article_ids:
+            return 0
+        vec_repo = vec_repo or self._vec_repo
+        ids = list(vec_repo.get_article_metadatas(tenant_id, list(article_ids)))
+        if ids:
+            vec_repo.delete_ids(ids)
+        return len(ids)
+
+    def _write_articles(
+        self, articles: list[KbArticle], vec_repo: VectorRepository | None = None
+    ) -> tuple[dict, list[dict]]:
+        """
+        一组文章与现有向量比对后，只把内容变化的 chunk 合并打包 embedding；某批失败只影响 chunk 落在该批里的文章。
+        vec_repo 默认当前集合，影子集合补写时传影子集合。返回 ({"changed", "retagged", "removed", "skipped"}, 失败列表)
+        """
+        vec_repo = vec_repo or self._vec_repo
+        changes = ChunkChanges()
+        for item in plan_changes(vec_repo, articles, self._batcher):
+            changes.merge(item)
+        vecs, errors = self._batcher.embed([c["doc"] for c in changes.embed_chunks])
+        return apply_changes(vec_repo, changes, vecs, errors)
+
     def clear_vector_collection(self) -> None:
         """仅清空向量库（不写入）。可与 ingest/all 分两步：先 clear 再 all。"""
         self._vec_repo.clear_collection()
@@ -80,16 +133,107 @@ class IngestService:
         clear_first: bool = False,
     ) -> dict:
         """
-        全量重建：先从 SQL 拉取 id 列表，再走 batch。
-        clear_first=True 时先清空向量库再写入，实现全量覆盖（主库更新后重建，避免旧 article_id 残留）。
+        全量重建：走 IngestPipeline（游标分页读整行 → 拆分 → 并发 embedding（限流）→ 批量写），各段并行。
+        clear_first=True 时全量覆盖（主库更新后重建，避免旧 article_id 残留）：写入新版本的影子集合，
+        当前集合照常服务检索，重建期间主库的变更补写进影子集合后校验、原子切换
+        （VECTOR_BLUE_GREEN_REBUILD=false 或向量库不支持时退回先清空再写入）。
+        返回值另含 elapsed_seconds 与各段吞吐 stages，影子重建另含 replayed 与 swap
         """
+        if clear_first and settings.VECTOR_BLUE_GREEN_REBUILD:
+            try:
+                shadow = self._vec_repo.begin_shadow()
+            except NotImplementedError:
+                logger.warning("向量库不支持影子集合，退回先清空再写入")
+            else:
+                return self._rebuild_into_shadow(shadow, tenant_id, status, limit)
         if clear_first:
             self._vec_repo.clear_collection()
             logger.info("向量库已清空，开始按当前主库全量写入")
-        ids = self._kb_repo.list_ids(tenant_id=tenant_id, status=status, limit=limit)
-        if not ids:
-            return {"total": 0, "success": 0, "failed": [], "upserted_total": 0}
-        return self.rebuild_batch(ids, log_every=100)
+        return IngestPipeline(self._kb_repo, self._vec_repo, self._batcher).run(tenant_id, status=status, limit=limit)
+
+    def _rebuild_into_shadow(
+        self, shadow: VectorRepository, tenant_id: str, status: str | None, limit: int | None
+    ) -> dict:
+        try:
+            # 重建开始前的主库变更位置（数据库时钟），切换前从这里补写
+            start = self._kb_repo.latest_change(tenant_id)
+            result = IngestPipeline(self._kb_repo, shadow, self._batcher).run(tenant_id, status=status, limit=limit)
+            result["replayed"] = self._replay_into_shadow(shadow, tenant_id, status, start)
+            result["failed"].extend(result["replayed"]["failed"])
+        except Exception:
+            self._vec_repo.abort_shadow(shadow)
+            raise
+        reason = self._validate_shadow(shadow, result)
+        if reason:
+            self._vec_repo.abort_shadow(shadow)
+            logger.warning(f"影子集合校验未通过，保留当前集合: {reason}")
+            result["swap"] = {"promoted": False, "reason": reason}
+            return result
+        result["swap"] = {"promoted": True, **self._vec_repo.promote_shadow(shadow)}
+        logger.info(f"全量重建完成并已切换集合: {result['swap']}")
+        return result
+
+    def _replay_into_shadow(
+        self, shadow: VectorRepository, tenant_id: str, status: str | None, start: datetime | None
+    ) -> dict:
+        """
+        把重建期间主库的变更补写进影子集合：重建常在独立进程（scripts/rebuild_all_vectors.py）里跑，
+        API 进程的增量写入只会同步到它自己进程里的影子集合，这里的影子集合收不到。
+        从重建开始前的变更位置（回看 KB_SYNC_OVERLAP_SECONDS 补上提交较晚的事务）分页读到最新：
+        未删除且符合 status 的增量写入，已删除或不再符合 status 的删掉其向量；内容未变的按指纹跳过
+        """
+        since = start - timedelta(seconds=max(0.0, settings.KB_SYNC_OVERLAP_SECONDS)) if start else _EPOCH
+        cursor = (since, 0)
+        page = max(1, settings.INGEST_READ_PAGE_SIZE)
+        replayed = {"rows": 0, "upserted": 0, "deleted": 0, "failed": []}
+        while True:
+            rows = self._kb_repo.list_changes(tenant_id, cursor[0], cursor[1], page)
+            if not rows:
+                break
+            live = [
+                KbArticle(**row) for row in rows
+                if row.get("deleted_at") is None and (not status or row.get("status") == status)
+            ]
+            live_ids = {a.id for a in live}
+            gone = [int(row["id"]) for row in rows if int(row["id"]) not in live_ids]
+            _, failed = self._write_articles(live, shadow)
+            self.remove_articles(tenant_id, gone, shadow)
+            replayed["rows"] += len(rows)
+            replayed["upserted"] += len(live) - len({f["article_id"] for f in failed})
+            replayed["deleted"] += len(gone)
+            replayed["failed"].extend(failed)
+            cursor = (rows[-1]["changed_at"], int(rows[-1]["id"]))
+            if len(rows) < page:
+                break
+        logger.info(
+            f"重建期间的主库变更已补写进影子集合: rows={replayed['rows']}, upserted={replayed['upserted']}, "
+            f"deleted={replayed['deleted']}, failed={len(replayed['failed'])}"
+        )
+        return replayed
+
+    def _validate_shadow(self, shadow: VectorRepository, result: dict) -> str | None:
+        """切换前校验：失败比例不超限、影子集合非空且条数不低于当前集合的 VECTOR_SWAP_MIN_RATIO；返回不通过原因"""
+        total = result["total"]
+        failed = len({f["article_id"] for f in result["failed"]})
+        if total and failed / total > settings.VECTOR_SWAP_MAX_FAILED_RATIO:
+            return f"失败 {failed}/{total} 篇，超过 VECTOR_SWAP_MAX_FAILED_RATIO={settings.VECTOR_SWAP_MAX_FAILED_RATIO}"
+        shadow_count = shadow.count()
+        if total and shadow_count == 0:
+            return "影子集合为空"
+        active_count = self._vec_repo.count()
+        if active_count and shadow_count < active_count * settings.VECTOR_SWAP_MIN_RATIO:
+            return (
+                f"影子集合 {shadow_count} 条，少于当前集合 {active_count} 条的 "
+                f"VECTOR_SWAP_MIN_RATIO={settings.VECTOR_SWAP_MIN_RATIO}"
+            )
+        return None
+
+    def rollback_collection(self) -> dict:
+        """切回上一版本向量集合（全量重建切换后发现问题时用）"""
+        return self._vec_repo.rollback()
+
+    def collection_info(self) -> dict:
+        return self._vec_repo.collection_info()
 
 
 # 兼容旧代码的函数式接口
@@ -1,9 +1,24 @@
-"""意图分类：闲聊(chat) / 能力咨询(capability) / 故障解决(solution)"""
+"""
+意图分类：闲聊(chat) / 能力咨询(capability) / 故障解决(solution) / 转人工(handoff)
+分层判定，确定的情况不再调用 LLM：
+1. cache：规范化后的消息命中内存缓存（LRU + TTL）
+2. local：本地高精度规则，只处理与提示词硬规则一致的确定情况
+3. llm：其余模糊输入才调用 LLM；LLM 异常时走兜底规则（fallback，不缓存）
+"""
 from __future__ import annotations
+import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
 
 class Intent(str, Enum):
     CHAT = "chat"              # 闲聊/寒暄/情绪
@@ -17,6 +32,38 @@ class IntentResult:
     intent: Intent
     confidence: float
     reason: str
+    source: str = ""  # 判定来源：cache / local / llm / fallback
+
+
+# 关键词（兜底规则与本地快速判定共用）
+HANDOFF_KEYWORDS = (
+    "转人工", "人工客服", "人工服务", "真人", "联系工程师", "找客服",
+    "转接", "售后电话", "客服电话", "投诉",
+)
+SOLUTION_KEYWORDS = (
+    "报警", "故障", "异常", "停机", "不工作", "不出", "无法",
+    "怎么办", "如何解决", "原因", "为什么", "报错",
+    "不射砂", "不合箱", "不翻箱", "压力", "温度", "卡住", "不出砂",
+)
+CAPABILITY_KEYWORDS = (
+    "你能做什么", "你会什么", "能帮我什么", "有什么功能",
+    "你能分析", "能分析什么", "你能解决", "能解决什么",
+    "你是干什么的", "你的功能", "系统能做什么",
+)
+# 提示词硬规则 2「一律归为 solution」的故障词，本地直接判定
+STRONG_SOLUTION_KEYWORDS = (
+    "故障", "报警", "异常", "报错", "不工作", "不射砂", "不出砂", "卡住", "停机", "怎么处理", "怎么办",
+)
+# 整句即寒暄/身份询问（规范化后完全相等才命中）
+GREETING_PHRASES = frozenset({
+    "你好", "您好", "你好呀", "你好啊", "在吗", "在不在", "哈喽", "hello", "hi", "嗨",
+    "谢谢", "谢谢你", "感谢", "多谢", "好的", "嗯嗯", "ok", "收到",
+    "再见", "拜拜", "辛苦了", "早上好", "下午好", "晚上好",
+    "你是", "你是谁", "你是啥", "你是什么", "你是哪个",
+})
+# 报警码：单独出现的字母 + 3~4 位数字（如 E001、A102），规范化后已转小写
+_ALARM_CODE_RE = re.compile(r"(?<![a-z0-9])[a-z]\d{3,4}(?![0-9])")
+_EDGE_PUNCT = "?？!！。.,，~～…；;、 "
 
 
 INTENT_PROMPT = """你是工业设备售后客服的"意图分类器"。
@@ -55,60 +102,189 @@ def _fallback_rule(user_input: str) -> IntentResult:
     """兜底规则：handoff > solution > capability > chat"""
     q = (user_input or "").strip()
     # 1. 转人工优先
-    keywords_handoff = (
-        "转人工", "人工客服", "人工服务", "真人", "联系工程师", "找客服",
-        "转接", "售后电话", "客服电话", "投诉",
-    )
-    if any(k in q for k in keywords_handoff):
-        return IntentResult(intent=Intent.HANDOFF, confidence=0.70, reason="命中转人工关键词(兜底)")
+    if any(k in q for k in HANDOFF_KEYWORDS):
+        return IntentResult(intent=Intent.HANDOFF, confidence=0.70, reason="命中转人工关键词(兜底)", source="fallback")
     # 2. 故障/解决方案关键词
-    keywords_solution = [
-        "报警", "故障", "异常", "停机", "不工作", "不出", "无法",
-        "怎么办", "如何解决", "原因", "为什么", "报错",
-        "不射砂", "不合箱", "不翻箱", "压力", "温度", "卡住", "不出砂",
-    ]
-    if any(k in q for k in keywords_solution):
-        return IntentResult(intent=Intent.SOLUTION, confidence=0.60, reason="命中故障/解决关键词(兜底)")
+    if any(k in q for k in SOLUTION_KEYWORDS):
+        return IntentResult(intent=Intent.SOLUTION, confidence=0.60, reason="命中故障/解决关键词(兜底)", source="fallback")
     # 3. 能力咨询关键词
-    keywords_capability = [
-        "你能做什么", "你会什么", "能帮我什么", "有什么功能",
-        "你能分析", "能分析什么", "你能解决", "能解决什么",
-        "你是干什么的", "你的功能", "系统能做什么",
-    ]
-    for kw in keywords_capability:
+    for kw in CAPABILITY_KEYWORDS:
         if kw in q:
-            return IntentResult(intent=Intent.CAPABILITY, confidence=0.70, reason="命中能力咨询关键词(兜底)")
-    return IntentResult(intent=Intent.CHAT, confidence=0.55, reason="未命中特定关键词(兜底)")
+            return IntentResult(intent=Intent.CAPABILITY, confidence=0.70, reason="命中能力咨询关键词(兜底)", source="fallback")
+    return IntentResult(intent=Intent.CHAT, confidence=0.55, reason="未命中特定关键词(兜底)", source="fallback")
 
 
-async def classify_intent(user_input: str) -> IntentResult:
-    """调用 LLM 做意图分类；异常时走兜底规则"""
+def normalize_message(user_input: str) -> str:
+    """缓存 key / 本地规则用的规范化：合并空白、英文小写、去首尾标点"""
+    q = " ".join((user_input or "").split()).lower()
+    return q.strip(_EDGE_PUNCT)
+
+
+def _local_rule(normalized: str) -> Optional[IntentResult]:
+    """
+    本地高精度判定：只处理提示词硬规则覆盖的确定情况，拿不准返回 None 交给 LLM
+    - 含转人工关键词 → handoff（硬规则 1）
+    - 含故障词或报警码 → solution（硬规则 2）
+    - 整句为寒暄/身份询问 → chat；整句为能力询问 → capability
+    """
+    q = normalized
+    if not q:
+        return None
+    if any(k in q for k in HANDOFF_KEYWORDS):
+        return IntentResult(Intent.HANDOFF, 0.95, "命中转人工关键词(本地)", source="local")
+    if any(k in q for k in STRONG_SOLUTION_KEYWORDS) or _ALARM_CODE_RE.search(q):
+        return IntentResult(Intent.SOLUTION, 0.90, "命中故障/报警词(本地)", source="local")
+    if q in GREETING_PHRASES:
+        return IntentResult(Intent.CHAT, 0.95, "寒暄/身份询问(本地)", source="local")
+    if any(q == k or q == k + "呢" for k in CAPABILITY_KEYWORDS):
+        return IntentResult(Intent.CAPABILITY, 0.90, "能力咨询(本地)", source="local")
+    return None
+
+
+async def _classify_by_llm(user_input: str) -> IntentResult:
+    """调用 LLM 做意图分类；调用/解析异常直接抛出，由调用方走兜底规则"""
     from app.services.llm_service import call_llm, safe_json_loads
 
-    try:
-        prompt = INTENT_PROMPT.format(user_input=user_input.strip())
-        raw = await call_llm(prompt)
-        data = safe_json_loads(raw)
-
-        intent_str = str(data.get("intent", "")).strip().lower()
-        conf = float(data.get("confidence", 0.5))
-        reason = str(data.get("reason", "")).strip()[:60]
-
-        # 解析意图类型
-        if intent_str == "handoff":
-            intent = Intent.HANDOFF
-        elif intent_str == "solution":
-            intent = Intent.SOLUTION
-        elif intent_str == "capability":
-            intent = Intent.CAPABILITY
-        else:
-            intent = Intent.CHAT
-        
-        # 置信度范围校验；低于阈值时走兜底规则更安全，避免漏检故障
-        conf = max(0.0, min(1.0, conf))
-        if conf < 0.55:
-            return _fallback_rule(user_input)
-
-        return IntentResult(intent=intent, confidence=conf, reason=reason or "ok")
-    except Exception:
+    prompt = INTENT_PROMPT.format(user_input=user_input.strip())
+    raw = await call_llm(prompt)
+    data = safe_json_loads(raw)
+
+    intent_str = str(data.get("intent", "")).strip().lower()
+    conf = float(data.get("confidence", 0.5))
+    reason = str(data.get("reason", "")).strip()[:60]
+
+    # 解析意图类型
+    if intent_str == "handoff":
+        intent = Intent.HANDOFF
+    elif intent_str == "solution":
+        intent = Intent.SOLUTION
+    elif intent_str == "capability":
+        intent = Intent.CAPABILITY
+    else:
+        intent = Intent.CHAT
+
+    # 置信度范围校验；低于阈值时走兜底规则更安全，避免漏检故障
+    conf = max(0.0, min(1.0, conf))
+    if conf < 0.55:
         return _fallback_rule(user_input)
+
+    return IntentResult(intent=intent, confidence=conf, reason=reason or "ok")
+
+
+class IntentEngine:
+    """分层意图判定：cache → local → llm（LLM 异常时 fallback），按层统计命中"""
+
+    TIERS = ("cache", "local", "llm", "fallback")
+
+    def __init__(
+        self,
+        cache_enabled: bool = True,
+        cache_max_size: int = 4096,
+        cache_ttl_seconds: float = 3600,
+        local_enabled: bool = True,
+    ) -> None:
+        self._cache_enabled = cache_enabled
+        self._max_size = max(1, int(cache_max_size))
+        self._ttl = float(cache_ttl_seconds or 0)
+        self._local_enabled = local_enabled
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple[IntentResult, float]]" = OrderedDict()
+        self._counts = {tier: 0 for tier in self.TIERS}
+
+    def classify_fast(self, user_input: str) -> Optional[IntentResult]:
+        """只查缓存与本地规则（不发网络请求）；判不出返回 None，调用方可据此决定是否并行做其它事"""
+        key = normalize_message(user_input)
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._done("cache", cached)
+
+        if self._local_enabled:
+            local = _local_rule(key)
+            if local is not None:
+                self._cache_put(key, local)
+                return self._done("local", local)
+        return None
+
+    async def classify(self, user_input: str) -> IntentResult:
+        fast = self.classify_fast(user_input)
+        if fast is not None:
+            return fast
+
+        key = normalize_message(user_input)
+        try:
+            result = await _classify_by_llm(user_input)
+        except Exception as e:
+            logger.debug("LLM 意图分类失败，走兜底规则: %s", e)
+            # LLM 暂时不可用时的兜底结果不缓存，恢复后仍由 LLM 判定
+            return self._done("fallback", _fallback_rule(user_input))
+        self._cache_put(key, result)
+        return self._done("llm", result)
+
+    def stats(self) -> dict:
+        """各层命中次数与占比"""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._cache)
+        total = sum(counts.values())
+        return {
+            "total": total,
+            **counts,
+            "rates": {tier: round(counts[tier] / total, 4) if total else 0.0 for tier in self.TIERS},
+            "cache_size": size,
+            "cache_max_size": self._max_size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _done(self, tier: str, result: IntentResult) -> IntentResult:
+        with self._lock:
+            self._counts[tier] += 1
+        return IntentResult(result.intent, result.confidence, result.reason, source=tier)
+
+    def _cache_get(self, key: str) -> Optional[IntentResult]:
+        if not self._cache_enabled or not key:
+            return None
+        now = time.time()
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return None
+            result, created_at = item
+            if self._ttl > 0 and now - created_at > self._ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key: str, result: IntentResult) -> None:
+        if not self._cache_enabled or not key:
+            return
+        with self._lock:
+            self._cache[key] = (result, time.time())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+
+_engine: Optional[IntentEngine] = None
+
+
+def get_intent_engine() -> IntentEngine:
+    """获取意图引擎单例"""
+    global _engine
+    if _engine is None:
+        _engine = IntentEngine(
+            cache_enabled=settings.INTENT_CACHE_ENABLED,
+            cache_max_size=settings.INTENT_CACHE_MAX_SIZE,
+            cache_ttl_seconds=settings.INTENT_CACHE_TTL_SECONDS,
+            local_enabled=settings.INTENT_LOCAL_RULES_ENABLED,
+        )
+    return _engine
+
+
+async def classify_intent(user_input: str) -> IntentResult:
+    """意图分类：缓存 → 本地规则 → LLM；LLM 异常时走兜底规则"""
+    return await get_intent_engine().classify(user_input)
@@ -0,0 +1,322 @@
+"""
+kb_article 增量同步（CDC 风格）：后台按水位轮询主库，向量库在数秒内跟上主库变更，不再依赖手动重建
+- 水位 = 最后处理行的 (changed_at, id)，changed_at 取 created_at / updated_at / deleted_at 中最晚者，落盘保存
+- 每轮按水位分页取变更行：未删除的走增量写入（内容未变的 chunk 只比对指纹，不请求 embedding），
+  已软删除的删掉其全部向量
+- 水位推进后的下一轮从「水位 - KB_SYNC_OVERLAP_SECONDS」回看一次，补上提交晚于水位推进的事务；
+  水位未动时从水位本身开始读，空闲时不再反复比对最近的行。重复处理的行因指纹相同被跳过，也不计入统计
+- 某篇写入失败时水位停在它之前，下一轮重试；连续失败 KB_SYNC_MAX_ATTEMPTS 次转入死信（落盘 + 统计），
+  水位越过它继续同步，该篇之后再有变更且写入成功时移出死信
+- 统计：水位、距最近一次追平的秒数（lag_seconds）、各类计数与死信，见 /api/v1/metrics
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.repositories.kb_article_repo import KbArticleRepository
+from app.schemas.kb_article import KbArticle
+from app.services.ingest_service import IngestService
+
+logger = get_logger(__name__)
+
+# 没有水位时从头同步：已在向量库且内容未变的条目只比对指纹
+_EPOCH = datetime(1900, 1, 1)
+
+
+class KbSyncService:
+    """单租户的水位同步；sync_once 可手动调用，start/stop 控制后台轮询"""
+
+    def __init__(
+        self,
+        ingest_service: IngestService,
+        kb_repo: KbArticleRepository,
+        tenant_id: Optional[str] = None,
+        interval_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        overlap_seconds: Optional[float] = None,
+        state_path: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self._ingest = ingest_service
+        self._kb_repo = kb_repo
+        self.tenant_id = tenant_id or settings.DEFAULT_TENANT
+        self._interval = float(settings.KB_SYNC_INTERVAL_SECONDS if interval_seconds is None else interval_seconds)
+        self._batch = max(1, int(batch_size or settings.KB_SYNC_BATCH_SIZE))
+        overlap = settings.KB_SYNC_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+        self._overlap = timedelta(seconds=max(0.0, float(overlap)))
+        path = settings.KB_SYNC_STATE_PATH if state_path is None else state_path
+        self._state_path = Path(path) if path else None
+        self._max_attempts = max(1, int(max_attempts or settings.KB_SYNC_MAX_ATTEMPTS))
+        self._run_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._watermark: Optional[Tuple[datetime, int]] = self._load_watermark()
+        # 上次回看窗口时的水位：水位没动就不再回看
+        self._overlap_from: Optional[Tuple[datetime, int]] = None
+        # 已计入统计的最大位置：回看 / 失败后重读的行不重复计数
+        self._counted: Tuple[datetime, int] = self._watermark or (_EPOCH, 0)
+        # 写入失败的文章 → 连续失败次数；死信：文章 id → {changed_at, error, attempts}
+        self._attempts: Dict[int, int] = {}
+        self._dead_letter: Dict[int, dict] = self._load_dead_letter()
+        self._caught_up_at: Optional[float] = None
+        self._last_run_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._counts = {
+            "cycles": 0,
+            "rows": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "vectors_changed": 0,
+            "vectors_removed": 0,
+            "failures": 0,
+            "dead_lettered": 0,
+            "errors": 0,
+        }
+
+    @property
+    def watermark(self) -> Optional[Tuple[datetime, int]]:
+        return self._watermark
+
+    def sync_once(self) -> dict:
+        """同步到当前最新（或遇到失败为止）；已有一轮在跑时直接返回"""
+        if not self._run_lock.acquire(blocking=False):
+            return {"running": True}
+        try:
+            return self._sync()
+        except Exception as e:
+            self._counts["errors"] += 1
+            self._last_error = str(e)
+            raise
+        finally:
+            self._last_run_at = time.time()
+            self._run_lock.release()
+
+    async def start(self) -> None:
+        if self._task is not None or self._interval <= 0:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info("kb_article 增量同步已启动: tenant_id=%s, 间隔 %.1fs", self.tenant_id, self._interval)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        wm = self._watermark
+        return {
+            "enabled": self._task is not None and not self._task.done(),
+            "tenant_id": self.tenant_id,
+            "interval_seconds": self._interval,
+            "watermark": {"changed_at": wm[0].isoformat(), "id": wm[1]} if wm else None,
+            # 距最近一次追平主库的秒数：此前的变更都已进入向量库
+            "lag_seconds": round(time.time() - self._caught_up_at, 1) if self._caught_up_at else None,
+            "last_run_at": self._last_run_at,
+            "last_error": self._last_error,
+            "dead_letter": sorted(self._dead_letter),
+            **self._counts,
+        }
+
+    # ---------- 同步 ----------
+
+    def _sync(self) -> dict:
+        result = {"rows": 0, "upserted": 0, "deleted": 0, "failed": [], "dead_lettered": [], "caught_up": False}
+        since, since_id = self._watermark or (_EPOCH, 0)
+        if self._watermark and self._overlap and self._overlap_from != self._watermark:
+            cursor = (since - self._overlap, 0)
+            self._overlap_from = self._watermark
+        else:
+            cursor = (since, since_id)
+        while True:
+            rows = self._kb_repo.list_changes(self.tenant_id, cursor[0], cursor[1], self._batch)
+            if not rows:
+                result["caught_up"] = True
+                break
+            done, failed = self._apply(rows, result)
+            if done:
+                last = rows[done - 1]
+                cursor = (last["changed_at"], int(last["id"]))
+                self._advance(cursor)
+            if failed:
+                result["failed"].extend(failed)
+                break
+            if len(rows) < self._batch:
+                result["caught_up"] = True
+                break
+        self._counts["cycles"] += 1
+        if result["caught_up"]:
+            self._caught_up_at = time.time()
+            self._last_error = None
+        if result["upserted"] or result["deleted"] or result["failed"] or result["dead_lettered"]:
+            logger.info(
+                "kb_article 增量同步: rows=%d, upserted=%d, deleted=%d, failed=%d, dead_lettered=%d, 水位=%s",
+                result["rows"], result["upserted"], result["deleted"], len(result["failed"]),
+                len(result["dead_lettered"]), self._watermark,
+            )
+        return result
+
+    def _apply(self, rows: list[dict], result: dict) -> Tuple[int, list[dict]]:
+        """处理一页变更行，返回 (按顺序处理成功或已转死信的前缀行数, 仍需重试的失败列表)"""
+        live = [KbArticle(**row) for row in rows if row.get("deleted_at") is None]
+        deleted = [int(row["id"]) for row in rows if row.get("deleted_at") is not None]
+        counts, failed = self._ingest.sync_articles(live)
+        removed = self._ingest.remove_articles(self.tenant_id, deleted)
+
+        failed_ids = {f["article_id"] for f in failed}
+        # 首次读到的行才计入统计；此前失败、本轮重试成功的计入 upserted
+        fresh = [row for row in rows if (row["changed_at"], int(row["id"])) > self._counted]
+        self._counted = max(self._counted, (rows[-1]["changed_at"], int(rows[-1]["id"])))
+        fresh_ids = {int(row["id"]) for row in fresh}
+        fresh_live = sum(
+            1 for row in rows
+            if row.get("deleted_at") is None and int(row["id"]) not in failed_ids
+            and (int(row["id"]) in fresh_ids or int(row["id"]) in self._attempts)
+        )
+        fresh_deleted = sum(1 for row in fresh if row.get("deleted_at") is not None)
+        retry = self._track_failures(rows, failed, result)
+        retry_ids = {f["article_id"] for f in retry}
+        done = next((i for i, row in enumerate(rows) if int(row["id"]) in retry_ids), len(rows))
+
+        result["rows"] += len(fresh)
+        result["upserted"] += fresh_live
+        result["deleted"] += fresh_deleted
+        self._counts["rows"] += len(fresh)
+        self._counts["upserted"] += fresh_live
+        self._counts["deleted"] += fresh_deleted
+        self._counts["vectors_changed"] += counts["changed"]
+        self._counts["vectors_removed"] += counts["removed"] + removed
+        self._counts["failures"] += len(failed)
+        if failed:
+            self._last_error = failed[0]["error"]
+        return done, retry
+
+    def _track_failures(self, rows: list[dict], failed: list[dict], result: dict) -> list[dict]:
+        """累计各篇连续失败次数，达到上限的转入死信；返回仍需重试（挡住水位）的失败"""
+        errors = {f["article_id"]: f for f in failed}
+        retry, dead_changed = [], False
+        for row in rows:
+            aid = int(row["id"])
+            if aid not in errors:
+                self._attempts.pop(aid, None)
+                if self._dead_letter.pop(aid, None) is not None:
+                    dead_changed = True
+                continue
+            dead = self._dead_letter.get(aid)
+            if dead is not None and dead["changed_at"] == row["changed_at"].isoformat():
+                continue  # 回看窗口重读到已转死信的同一版本，不再重新计数
+            attempts = self._attempts.get(aid, 0) + 1
+            if attempts < self._max_attempts:
+                self._attempts[aid] = attempts
+                retry.append(errors[aid])
+                continue
+            self._attempts.pop(aid, None)
+            self._dead_letter[aid] = {
+                "changed_at": row["changed_at"].isoformat(),
+                "error": errors[aid]["error"],
+                "attempts": attempts,
+            }
+            dead_changed = True
+            self._counts["dead_lettered"] += 1
+            result["dead_lettered"].append(aid)
+            logger.warning("kb_article 连续 %d 次写入失败，转入死信并跳过: id=%s, %s", attempts, aid, errors[aid]["error"])
+        if dead_changed:
+            self._save_state()
+        return retry
+
+    # ---------- 水位 ----------
+
+    def _advance(self, position: Tuple[datetime, int]) -> None:
+        if self._watermark is not None and position <= self._watermark:
+            return
+        self._watermark = position
+        self._save_state()
+
+    def _save_state(self) -> None:
+        """水位与死信写入状态文件：{租户: {"changed_at", "id", "dead_letter": {id: {...}}}}"""
+        if self._state_path is None:
+            return
+        try:
+            self._state_path.parent.mkdir(parents=True, exist_ok=True)
+            state = self._read_state()
+            entry = {"dead_letter": {str(aid): item for aid, item in self._dead_letter.items()}}
+            if self._watermark is not None:
+                entry.update(changed_at=self._watermark[0].isoformat(), id=self._watermark[1])
+            state[self.tenant_id] = entry
+            tmp = self._state_path.with_suffix(self._state_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self._state_path)
+        except OSError as e:
+            logger.warning("保存同步水位失败（重启后将从旧水位重放）: %s", e)
+
+    def _read_state(self) -> dict:
+        if self._state_path is None or not self._state_path.exists():
+            return {}
+        try:
+            return json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("同步水位文件损坏，从头同步: %s, %s", self._state_path, e)
+            return {}
+
+    def _load_watermark(self) -> Optional[Tuple[datetime, int]]:
+        entry = self._read_state().get(self.tenant_id)
+        if not entry:
+            return None
+        try:
+            return datetime.fromisoformat(entry["changed_at"]), int(entry["id"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _load_dead_letter(self) -> Dict[int, dict]:
+        entry = self._read_state().get(self.tenant_id) or {}
+        try:
+            return {int(aid): item for aid, item in (entry.get("dead_letter") or {}).items()}
+        except (AttributeError, TypeError, ValueError):
+            return {}
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await run_blocking("sync", self.sync_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("kb_article 增量同步失败: %s", e)
+            await asyncio.sleep(self._interval)
+
+
+_sync: Optional[KbSyncService] = None
+_sync_lock = threading.Lock()
+
+
+def get_kb_sync() -> KbSyncService:
+    """进程内共享的增量同步（默认租户）"""
+    global _sync
+    if _sync is None:
+        with _sync_lock:
+            if _sync is None:
+                from app.api.deps import get_ingest_service, get_kb_repo
+
+                _sync = KbSyncService(get_ingest_service(), get_kb_repo())
+    return _sync
+
+
+def get_kb_sync_stats() -> dict:
+    """增量同步水位与延迟（/api/v1/metrics）；未创建时不触发数据库连接"""
+    return _sync.stats() if _sync is not None else {"enabled": False}
+
+
+async def stop_kb_sync() -> None:
+    if _sync is not None:
+        await _sync.stop()
@@ -0,0 +1,182 @@
+"""
+知识条目分块上传：把导入结果按页调用 .NET 批量接口
+- 文章按 DOTNET_UPLOAD_PAGE_SIZE 分块，最多 DOTNET_UPLOAD_CONCURRENCY 个请求并发
+- 每块文章完成后立即提交该块的附件，不再等全部文章结束
+- 单块请求失败按可重试错误重试；仍失败时该块各行记为失败，失败行号取自 Excel 原行号
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.clients.dotnet_client import DotnetClient
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 请求未被 .NET 处理的错误才重试，避免超时重试导致重复建文章
+_RETRYABLE_STATUS = {429, 502, 503}
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, _RETRYABLE_ERRORS):
+        return True
+    return isinstance(e, httpx.HTTPStatusError) and e.response.status_code in _RETRYABLE_STATUS
+
+
+def _assets_for(article_id: int, article: dict) -> List[dict]:
+    att = article.get("_attachment_info")
+    if not att:
+        return []
+    att_list = att if isinstance(att, list) else [att]
+    return [
+        {
+            "articleId": article_id,
+            "assetType": info.get("asset_type", "other"),
+            "fileName": info.get("file_name", ""),
+            "url": info.get("url", ""),
+            "size": info.get("size"),
+            "duration": None,
+        }
+        for info in att_list
+    ]
+
+
+@dataclass
+class UploadResult:
+    """上传汇总：article_ids 按文章顺序；failures 为 [{"row_index", "reason"}]"""
+
+    success_count: int = 0
+    article_ids: List[int] = field(default_factory=list)
+    failures: List[dict] = field(default_factory=list)
+    asset_success: int = 0
+    asset_failure: int = 0
+
+
+class KbBatchUploader:
+    """按页并发调用 batch_create_articles / batch_create_assets"""
+
+    def __init__(
+        self,
+        dotnet_client: DotnetClient,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self._client = dotnet_client
+        self._page_size = max(1, int(page_size or settings.DOTNET_UPLOAD_PAGE_SIZE))
+        self._concurrency = max(1, int(concurrency or settings.DOTNET_UPLOAD_CONCURRENCY))
+        self._max_attempts = max(1, int(max_attempts or settings.DOTNET_UPLOAD_MAX_ATTEMPTS))
+
+    async def upload(
+        self,
+        articles: List[dict],
+        row_numbers: List[int],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        article_ids: Optional[List[int]] = None,
+        known_assets: Optional[Dict[int, Set[str]]] = None,
+    ) -> UploadResult:
+        """
+        articles 为行映射结果（可含 _attachment_info 等下划线字段），row_numbers 为对应 Excel 行号。
+        on_progress(成功数, 失败数) 在每个文章块结束时回调，用于导入进度。
+        article_ids 给出时为更新已有条目（batch_update_articles），否则批量创建；
+        known_assets 为已有附件地址 {article_id: {url}}，这些附件不再重复创建。
+        所有文章块都失败时抛出第一个异常，由调用方按连接/超时/状态码转换错误。
+        """
+        known_assets = known_assets or {}
+        call = self._client.batch_update_articles if article_ids is not None else self._client.batch_create_articles
+        sem = asyncio.Semaphore(self._concurrency)
+        asset_tasks: List[asyncio.Task] = []
+        size = self._page_size
+        chunks = [(start, articles[start:start + size]) for start in range(0, len(articles), size)]
+
+        async def _article_chunk(start: int, chunk: List[dict]) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+            payload = [{k: v for k, v in a.items() if not str(k).startswith("_")} for a in chunk]
+            if article_ids is not None:
+                for i, item in enumerate(payload):
+                    item["articleId"] = article_ids[start + i]
+            try:
+                result = await self._send(sem, call, payload, "文章", start)
+            except Exception as e:
+                if on_progress:
+                    on_progress(0, len(chunk))
+                return None, e
+            results = result.get("results", [])
+            if on_progress:
+                on_progress(
+                    sum(1 for item in results if item.get("success") and item.get("articleId")),
+                    sum(1 for item in results if not item.get("success")),
+                )
+            # 这一块的附件紧跟着提交，与其余文章块并行
+            assets: List[dict] = []
+            for pos, item in enumerate(results):
+                i = item.get("index", pos)
+                if item.get("success") and item.get("articleId") and 0 <= i < len(chunk):
+                    known = known_assets.get(item["articleId"], ())
+                    assets.extend(a for a in _assets_for(item["articleId"], chunk[i]) if a["url"] not in known)
+            for a in range(0, len(assets), size):
+                asset_tasks.append(asyncio.create_task(self._asset_chunk(sem, assets[a:a + size], start)))
+            return result, None
+
+        outcomes = await asyncio.gather(*(_article_chunk(start, chunk) for start, chunk in chunks))
+        asset_outcomes = await asyncio.gather(*asset_tasks)
+
+        errors = [e for _, e in outcomes if e is not None]
+        if errors and len(errors) == len(outcomes):
+            raise errors[0]
+
+        out = UploadResult()
+        for (start, chunk), (result, error) in zip(chunks, outcomes):
+            if error is not None:
+                logger.error("文章块上传失败（第 %d-%d 条）: %s", start + 1, start + len(chunk), error)
+                out.failures.extend(
+                    {"row_index": row_numbers[start + i], "reason": f"上传 .NET 失败: {error}"}
+                    for i in range(len(chunk))
+                )
+                continue
+            for pos, item in enumerate(result.get("results", [])):
+                i = item.get("index", pos)
+                if item.get("success") and item.get("articleId"):
+                    out.success_count += 1
+                    out.article_ids.append(item["articleId"])
+                elif not item.get("success"):
+                    row = row_numbers[start + i] if 0 <= i < len(chunk) else -1
+                    out.failures.append({"row_index": row, "reason": item.get("error", "未知错误")})
+        for ok, failed in asset_outcomes:
+            out.asset_success += ok
+            out.asset_failure += failed
+        if asset_outcomes:
+            logger.info("附件创建结果: 成功 %s, 失败 %s", out.asset_success, out.asset_failure)
+        return out
+
+    async def _asset_chunk(self, sem: asyncio.Semaphore, assets: List[dict], start: int) -> Tuple[int, int]:
+        try:
+            result = await self._send(sem, self._client.batch_create_assets, assets, "附件", start)
+        except Exception as e:
+            logger.exception("批量创建附件失败: %s", e)
+            return 0, len(assets)
+        return result.get("successCount", 0), result.get("failureCount", 0)
+
+    async def _send(
+        self,
+        sem: asyncio.Semaphore,
+        call: Callable[[List[dict]], Awaitable[Dict[str, Any]]],
+        payload: List[dict],
+        what: str,
+        start: int,
+    ) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with sem:
+                    return await call(payload)
+            except Exception as e:
+                if attempt >= self._max_attempts or not _is_retryable(e):
+                    raise
+                delay = 0.5 * (2 ** (attempt - 1))
+                logger.warning("%s块（起始第 %d 条）上传失败，%.1fs 后第 %d 次重试: %s", what, start + 1, delay, attempt + 1, e)
+                await asyncio.sleep(delay)
@@ -3,12 +3,12 @@ from __future__ import annotations
 import json
 from typing import Any, Dict
 
-from app.clients.deepseek_client import DeepSeekClient
+from app.clients.deepseek_client import get_llm_client
 
 
 async def call_llm(prompt: str) -> str:
     """调用 DeepSeek 返回纯文本；未配置或失败时抛出或返回空，由调用方兜底"""
-    client = DeepSeekClient()
+    client = get_llm_client()
     if not client.is_available:
         raise RuntimeError("DeepSeek 未配置，无法调用 LLM")
     result = await client.chat(
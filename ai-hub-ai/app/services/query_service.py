@@ -1,5 +1,6 @@
 """embedding → topK → 去重加权 → 返回 [{article_id, score, hit_type}]"""
 from typing import Optional, List
+from app.core.concurrency import run_blocking
 from app.core.logging_config import get_logger
 from app.infra.embedding.base import IEmbedder
 from app.repositories.vector_repo import VectorRepository
@@ -31,7 +32,34 @@ class QueryService:
             enable_fallback: 是否启用兜底机制
         """
         qvec = self._embedder.embed_texts([query_text])[0]
+        return self._search(qvec, tenant_id, top_k, device_type_code, enable_fallback)
 
+    async def aquery(
+        self,
+        tenant_id: str,
+        query_text: str,
+        top_k: int,
+        device_type_code: Optional[str] = None,
+        enable_fallback: bool = True
+    ) -> list[dict]:
+        """
+        query 的异步版本：embedding 走 aembed_texts，向量检索放到有界线程池，
+        整个过程不阻塞事件循环。参数与返回同 query。
+        """
+        qvec = (await self._embedder.aembed_texts([query_text]))[0]
+        return await run_blocking(
+            "vector", self._search, qvec, tenant_id, top_k, device_type_code, enable_fallback
+        )
+
+    def _search(
+        self,
+        qvec: List[float],
+        tenant_id: str,
+        top_k: int,
+        device_type_code: Optional[str],
+        enable_fallback: bool,
+    ) -> list[dict]:
+        """已有查询向量时的检索逻辑（设备类型过滤 + 兜底）"""
         # 设备类型过滤逻辑
         if device_type_code:
             # 第一阶段：按设备类型过滤
@@ -0,0 +1,127 @@
+"""
+参考资料解析缓存：「参考xxx」引用名 → 重写后的资源条目
+- 进程内共享一个 AttachmentService，不再每次对话新建
+- LRU 有界缓存，容量 REFERENCE_RESOLVE_CACHE_SIZE；0 表示不缓存
+- 附件目录变化（本地索引重建 / 远程目录重新加载）时整体失效
+- 查找异常不缓存，下次重新查找
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.services.attachment_service import AttachmentService, rewrite_attachment_url_to_remote
+
+logger = get_logger(__name__)
+
+
+def _to_items(ref_name: str, found: List[dict]) -> Tuple[dict, ...]:
+    """查找结果 → 资源条目（url 已重写，同一引用内按 url 去重，目录类型记为 other）"""
+    items: List[dict] = []
+    seen_urls = set()
+    for one in found:
+        url_raw = one.get("url") or ""
+        url_rewritten = rewrite_attachment_url_to_remote(url_raw)
+        if not url_rewritten or url_rewritten in seen_urls:
+            continue
+        seen_urls.add(url_rewritten)
+        t = one.get("type") or "other"
+        if t == "directory":
+            t = "other"
+        items.append({
+            "id": hash(ref_name + (one.get("file_name") or "") + url_raw) % (10**9),
+            "name": one.get("file_name") or ref_name,
+            "type": t,
+            "url": url_rewritten,
+            "size": one.get("size"),
+            "duration": one.get("duration"),
+        })
+    return tuple(items)
+
+
+class ReferenceResolver:
+    """引用名 → 资源条目列表（仅精确匹配），带 LRU 缓存与命中统计"""
+
+    def __init__(self, attachment_service: Optional[AttachmentService] = None, max_entries: Optional[int] = None) -> None:
+        self._service = attachment_service or AttachmentService()
+        size = settings.REFERENCE_RESOLVE_CACHE_SIZE if max_entries is None else max_entries
+        self._max = max(0, int(size))
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[dict, ...]]" = OrderedDict()
+        self._version: object = None
+        self._counts = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "errors": 0}
+
+    def resolve(self, ref_name: str) -> List[dict]:
+        """返回 [{"id","name","type","url","size","duration"}]；未命中附件返回 []"""
+        version = self._service.catalog_version()
+        with self._lock:
+            if version is not self._version:
+                if self._cache:
+                    self._counts["invalidations"] += 1
+                    self._cache.clear()
+                self._version = version
+            hit = self._cache.get(ref_name)
+            if hit is not None:
+                self._cache.move_to_end(ref_name)
+                self._counts["hits"] += 1
+                return [dict(item) for item in hit]
+            self._counts["misses"] += 1
+
+        try:
+            # 仅精确匹配：参考名与文件名/文件夹名完全一致，避免误匹配（如 141油泵 匹配到含多文件的目录）
+            found = self._service.find_attachment_files_exact(ref_name)
+        except Exception as e:
+            logger.debug("解析参考资料失败 ref=%s: %s", ref_name, e)
+            with self._lock:
+                self._counts["errors"] += 1
+            return []
+        items = _to_items(ref_name, found)
+
+        if self._max:
+            with self._lock:
+                # 查找期间目录已变化的结果不再写入
+                if self._version is version:
+                    self._cache[ref_name] = items
+                    self._cache.move_to_end(ref_name)
+                    while len(self._cache) > self._max:
+                        self._cache.popitem(last=False)
+                        self._counts["evictions"] += 1
+        return [dict(item) for item in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._cache)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "enabled": self._max > 0,
+            "size": size,
+            "max_entries": self._max,
+            **counts,
+            "hit_rate": round(counts["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_resolver: Optional[ReferenceResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_reference_resolver() -> ReferenceResolver:
+    """进程内共享的参考资料解析器"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = ReferenceResolver()
+    return _resolver
+
+
+def get_reference_resolver_stats() -> Dict[str, object]:
+    """参考资料解析缓存统计（/api/v1/metrics）"""
+    return get_reference_resolver().stats()
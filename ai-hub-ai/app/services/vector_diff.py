@@ -0,0 +1,159 @@
+"""
+向量增量重建：每个 chunk 的 metadata 带内容指纹 content_hash = sha256(模型 | 维度 | doc)
+重建时与向量库里同一 article 的现有向量逐 id 比对：
+- 指纹相同且 metadata 相同 → 跳过
+- 指纹相同、metadata 变了（状态 / 版本 / 标签）→ 只改 metadata，不重新 embedding
+- 指纹不同或向量不存在 → 重新 embedding 并 upsert
+- 向量库里有、新 chunk 里已没有的 id（如适用设备类型减少）→ 删除
+换 embedding 模型或维度后指纹全部变化，自然全量重算
+"""
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.repositories.vector_repo import VectorRepository
+from app.schemas.kb_article import KbArticle
+from app.services.chunker import build_chunks
+
+logger = get_logger(__name__)
+
+HASH_FIELD = "content_hash"
+# 重建统计里的变更计数（向量条数）
+CHANGE_COUNTS = ("changed", "retagged", "removed", "skipped")
+
+
+def chunk_hash(doc: str, model: str, dimensions: Optional[int]) -> str:
+    raw = f"{model}|{dimensions or ''}|{doc}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _comparable(metadata: Optional[dict]) -> dict:
+    """向量库不保存 None 值，比对前两边都去掉"""
+    return {k: v for k, v in (metadata or {}).items() if v is not None}
+
+
+@dataclass
+class ChunkChanges:
+    """一组文章相对向量库的变更；embed_* 为需要重新 embedding 的 chunk，向量按同一顺序对应"""
+
+    articles: List[KbArticle] = field(default_factory=list)
+    embed_chunks: List[dict] = field(default_factory=list)
+    embed_owners: List[int] = field(default_factory=list)
+    retag_chunks: List[dict] = field(default_factory=list)
+    retag_owners: List[int] = field(default_factory=list)
+    stale: List[Tuple[int, str]] = field(default_factory=list)  # (article_id, vector_id)
+    skipped: int = 0
+
+    def merge(self, other: "ChunkChanges") -> None:
+        self.articles.extend(other.articles)
+        self.embed_chunks.extend(other.embed_chunks)
+        self.embed_owners.extend(other.embed_owners)
+        self.retag_chunks.extend(other.retag_chunks)
+        self.retag_owners.extend(other.retag_owners)
+        self.stale.extend(other.stale)
+        self.skipped += other.skipped
+
+
+def existing_metadatas(vec_repo: VectorRepository, articles: List[KbArticle]) -> Dict[int, Dict[str, dict]]:
+    """按租户各查一次向量库：{article_id: {vector_id: metadata}}"""
+    by_tenant: Dict[str, List[int]] = defaultdict(list)
+    for a in articles:
+        by_tenant[a.tenant_id].append(a.id)
+    out: Dict[int, Dict[str, dict]] = defaultdict(dict)
+    for tenant_id, ids in by_tenant.items():
+        for vid, meta in vec_repo.get_article_metadatas(tenant_id, ids).items():
+            aid = (meta or {}).get("article_id")
+            if aid is not None:
+                out[int(aid)][vid] = meta
+    return out
+
+
+def diff_article(
+    article: KbArticle,
+    chunks: List[dict],
+    existing: Dict[str, dict],
+    model: str,
+    dimensions: Optional[int],
+    force: bool = False,
+) -> ChunkChanges:
+    """单篇文章的新 chunk 与现有向量比对；会把指纹写入各 chunk 的 metadata。force=True 时全部重新 embedding"""
+    changes = ChunkChanges(articles=[article])
+    for c in chunks:
+        c["metadata"][HASH_FIELD] = chunk_hash(c["doc"], model, dimensions)
+        old = existing.get(c["id"])
+        if force or old is None or old.get(HASH_FIELD) != c["metadata"][HASH_FIELD]:
+            changes.embed_chunks.append(c)
+            changes.embed_owners.append(article.id)
+        elif _comparable(old) != _comparable(c["metadata"]):
+            changes.retag_chunks.append(c)
+            changes.retag_owners.append(article.id)
+        else:
+            changes.skipped += 1
+    new_ids = {c["id"] for c in chunks}
+    changes.stale.extend((article.id, vid) for vid in existing if vid not in new_ids)
+    return changes
+
+
+def plan_changes(vec_repo: VectorRepository, articles: List[KbArticle], embedder) -> List[ChunkChanges]:
+    """
+    拆分一组文章并逐篇与向量库比对（每个租户一次查询）；embedder 提供 model_name / dimensions。
+    INGEST_SKIP_UNCHANGED=false 时全部重新 embedding（仍会删除多余 id）
+    """
+    existing = existing_metadatas(vec_repo, articles) if articles else {}
+    force = not settings.INGEST_SKIP_UNCHANGED
+    return [
+        diff_article(a, build_chunks(a), existing.get(a.id, {}), embedder.model_name, embedder.dimensions, force)
+        for a in articles
+    ]
+
+
+def apply_changes(
+    vec_repo: VectorRepository,
+    changes: ChunkChanges,
+    vectors: List[Optional[List[float]]],
+    errors: Dict[int, str],
+) -> Tuple[Dict[str, int], List[dict]]:
+    """
+    写回一组变更：有 chunk embedding 失败的文章整篇不动（保留旧向量），其余文章
+    一次 upsert 变化的 chunk、一次改 metadata、一次删除多余 id。
+    返回 ({"changed", "retagged", "removed", "skipped"}, 失败列表 [{"article_id", "error"}])
+    """
+    bad: Dict[int, str] = {}
+    for i, error in errors.items():
+        bad.setdefault(changes.embed_owners[i], error)
+    failed = [{"article_id": aid, "error": error} for aid, error in bad.items()]
+
+    upsert = [i for i, owner in enumerate(changes.embed_owners) if owner not in bad]
+    retag = [i for i, owner in enumerate(changes.retag_owners) if owner not in bad]
+    stale = [vid for owner, vid in changes.stale if owner not in bad]
+    touched = (
+        {changes.embed_owners[i] for i in upsert}
+        | {changes.retag_owners[i] for i in retag}
+        | {owner for owner, _ in changes.stale if owner not in bad}
+    )
+    counts = dict.fromkeys(CHANGE_COUNTS, 0)
+    counts["skipped"] = changes.skipped
+    try:
+        if upsert:
+            counts["changed"] = vec_repo.upsert(
+                ids=[changes.embed_chunks[i]["id"] for i in upsert],
+                embeddings=[vectors[i] for i in upsert],
+                documents=[changes.embed_chunks[i]["doc"] for i in upsert],
+                metadatas=[changes.embed_chunks[i]["metadata"] for i in upsert],
+            )
+        if retag:
+            vec_repo.update_metadatas(
+                [changes.retag_chunks[i]["id"] for i in retag],
+                [changes.retag_chunks[i]["metadata"] for i in retag],
+            )
+            counts["retagged"] = len(retag)
+        if stale:
+            vec_repo.delete_ids(stale)
+            counts["removed"] = len(stale)
+    except Exception as e:
+        logger.warning("批量写入向量失败（%d 篇）: %s", len(touched), e)
+        failed.extend({"article_id": aid, "error": str(e)} for aid in sorted(touched))
+    return counts, failed
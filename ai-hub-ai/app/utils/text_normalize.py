@@ -0,0 +1,166 @@
+"""
+文本规范化引擎：Excel 导入清洗与知识库回答解析共用
+- 规则在导入模块时编译一次；可合并的规则合并为一个交替模式，单遍扫描
+- 不含相关字符（【、[、参考 等）的文本直接走快速路径，不进正则
+- 单条接口之外提供批量接口（list / pandas.Series），批内相同文本只算一次
+结果与原先逐条 re.sub / re.search 的实现逐字一致，scripts/bench_text_normalize.py 校验并计时
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ---------- 中括号标签 / 列标题 ----------
+
+# 【】内含任一关键词即整段移除（原 16 条【】规则的并集；「现象…问题」等组合规则已被单关键词覆盖）
+_CJK_LABEL = re.compile(
+    r"【[^】]*(?:序号|现象|问题|检查点|原因|维修对策|解决办法|维修视频|附件|YH400|YH500)[^】]*】",
+    re.IGNORECASE,
+)
+# [] 只移除这几类列标题（原 8 条 [] 规则的并集）
+_ASCII_LABEL = re.compile(
+    r"\[[^\]]*(?:序号|现象[^\]]*问题|检查点[^\]]*原因|维修对策[^\]]*解决办法|维修视频[^\]]*附件|YH400|YH500)[^\]]*\]",
+    re.IGNORECASE,
+)
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+# 移除一段后可能拼出新的标签，最多重复这么多轮
+_LABEL_ROUNDS = 5
+
+
+def clean_labels(text: str) -> str:
+    """
+    清理文本中的中括号标签和列标题
+    移除：【序号】、【现象（问题）】、【检查点（原因）】等；再规整空白与空行
+    """
+    if not text or not isinstance(text, str):
+        return text if text else ""
+    cleaned = text
+    if "【" in cleaned or "[" in cleaned:
+        for _ in range(_LABEL_ROUNDS):
+            old = cleaned
+            cleaned = _ASCII_LABEL.sub("", _CJK_LABEL.sub("", cleaned))
+            if cleaned == old:
+                break
+    cleaned = _SPACES.sub(" ", cleaned)
+    cleaned = "\n".join(ln.strip() for ln in cleaned.split("\n"))
+    return _BLANK_LINES.sub("\n\n", cleaned).strip()
+
+
+def clean_labels_batch(texts: Iterable[str]) -> List[str]:
+    """clean_labels 的批量版本，批内重复文本只清理一次"""
+    memo: Dict[str, str] = {}
+    out: List[str] = []
+    for t in texts:
+        hit = memo.get(t) if isinstance(t, str) else None
+        if hit is None:
+            hit = clean_labels(t)
+            if isinstance(t, str):
+                memo[t] = hit
+        out.append(hit)
+    return out
+
+
+def clean_labels_series(texts):
+    """clean_labels 的整列版本（pandas.Series，元素为 str），保留原索引"""
+    import pandas as pd
+
+    cleaned = texts.astype(object)
+    if cleaned.empty:
+        return cleaned
+    return pd.Series(clean_labels_batch(cleaned.tolist()), index=cleaned.index, dtype=object)
+
+
+# ---------- 参考资料引用 ----------
+
+_QUOTES = "\"'"
+# 参考"xxx"
+QUOTED_REFERENCE = re.compile(r'参考"([^"]+)"')
+# 引用名提取按优先级依次尝试（优先级不是「最左匹配」，不能合并为一个交替模式）
+_REFERENCE_RULES = (
+    QUOTED_REFERENCE,
+    re.compile(r"参考[：:]\s*(.+)"),
+    re.compile(r"见附件[：:]\s*(.+)"),
+    re.compile(r"参考\s+(.+)"),
+)
+_REFERENCE_PREFIX = re.compile(r"^(参考|见附件)[：:\s]*")
+_REFERENCE_MENTION = re.compile(r'参考"[^"]*"|参考[：:]\s*[^，。\s]+')
+
+
+def extract_filename_from_reference(text: str) -> Optional[str]:
+    """
+    从文本引用中提取文件名
+    支持：参考"xxx"、参考：xxx、见附件：xxx、参考 xxx
+    """
+    if not text or not text.strip():
+        return None
+    text = text.strip()
+    if "参考" in text or "见附件" in text:
+        for rule in _REFERENCE_RULES:
+            match = rule.search(text)
+            if match:
+                return match.group(1).strip().strip(_QUOTES) or None
+        text = _REFERENCE_PREFIX.sub("", text)
+    return text.strip(_QUOTES).strip() or None
+
+
+def strip_reference_mentions(text: str) -> str:
+    """去掉文案中的「参考"xxx"」「参考：xxx」片段"""
+    if not text or not text.strip():
+        return text
+    if "参考" in text:
+        text = _REFERENCE_MENTION.sub("", text).replace("参考参考", "参考")
+    return text.strip("，, ")
+
+
+# ---------- 回答文本切分 ----------
+
+_SEGMENT_SPLIT = re.compile(r"[\n\r；;。]")
+# 段落 + 逗号，一次切到引用粒度
+_REFERENCE_SPLIT = re.compile(r"[\n\r；;。,，]")
+# 行首序号「1.」「2、」与项目符号「•」「·」（原两条规则按顺序作用，合并后等价）
+_LIST_MARKER = re.compile(r"^(?:\d+[\.、]?\s*)?(?:[•·]\s*)?")
+STEP_ACTION = re.compile(r"检查|测试|校准|清理|调整|更换|维修|查看|观察")
+TEMPORARY_SOLUTION = re.compile(r"临时[：:]\s*([^。]+)")
+FINAL_SOLUTION = re.compile(r"(?:最终|根因|永久)[：:]\s*([^。]+)")
+
+
+def split_segments(text: str) -> List[str]:
+    """按换行、分号、句号切分，去掉空段"""
+    return [seg for seg in (s.strip() for s in _SEGMENT_SPLIT.split(text)) if seg]
+
+
+def strip_list_marker(line: str) -> str:
+    """去掉行首序号与项目符号"""
+    return _LIST_MARKER.sub("", line, count=1).strip()
+
+
+def reference_names(solution_text: Optional[str], cause_text: Optional[str]) -> List[str]:
+    """从解决方案/原因文本中提取所有「参考xxx」引用名，去重后返回"""
+    text = (solution_text or "") + "\n" + (cause_text or "")
+    if not text.strip():
+        return []
+    seen = set()
+    result: List[str] = []
+    for part in _REFERENCE_SPLIT.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        name = extract_filename_from_reference(part)
+        if name:
+            name = name.strip().strip(_QUOTES).strip()
+            if name and name not in seen:
+                seen.add(name)
+                result.append(name)
+    return result
+
+
+def reference_names_batch(pairs: Iterable[Tuple[Optional[str], Optional[str]]]) -> List[List[str]]:
+    """reference_names 的批量版本：[(solution_text, cause_text), ...]，批内相同文本只解析一次"""
+    memo: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+    out: List[List[str]] = []
+    for pair in pairs:
+        key = tuple(pair)
+        hit = memo.get(key)
+        if hit is None:
+            hit = memo[key] = reference_names(*key)
+        out.append(list(hit))
+    return out
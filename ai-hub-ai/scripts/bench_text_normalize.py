@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+文本规范化微基准：新引擎（app/utils/text_normalize.py）与原逐条正则实现对比
+
+执行步骤：
+1. 生成随机语料（标签、嵌套括号、各种参考写法、序号、空白）
+2. 逐条校验新旧结果完全一致，不一致立即报错退出
+3. 分别计时并输出加速比
+
+使用方法：
+python scripts/bench_text_normalize.py
+python scripts/bench_text_normalize.py --size 20000 --repeat 5
+"""
+import argparse
+import random
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+# ---------- 原实现（保持原样，作为对照） ----------
+
+LEGACY_BRACKET_LABEL_PATTERNS = [
+    r"【[^】]*序号[^】]*】",
+    r"【[^】]*现象[^】]*问题[^】]*】",
+    r"【[^】]*现象[^】]*】",
+    r"【[^】]*问题[^】]*】",
+    r"【[^】]*检查点[^】]*原因[^】]*】",
+    r"【[^】]*检查点[^】]*】",
+    r"【[^】]*原因[^】]*】",
+    r"【[^】]*维修对策[^】]*解决办法[^】]*】",
+    r"【[^】]*维修对策[^】]*】",
+    r"【[^】]*解决办法[^】]*】",
+    r"【[^】]*维修视频[^】]*附件[^】]*】",
+    r"【[^】]*维修视频[^】]*】",
+    r"【[^】]*附件[^】]*】",
+    r"【[^】]*YH400[^】]*YH500[^】]*】",
+    r"【[^】]*YH400[^】]*】",
+    r"【[^】]*YH500[^】]*】",
+    r"\[[^\]]*序号[^\]]*\]",
+    r"\[[^\]]*现象[^\]]*问题[^\]]*\]",
+    r"\[[^\]]*检查点[^\]]*原因[^\]]*\]",
+    r"\[[^\]]*维修对策[^\]]*解决办法[^\]]*\]",
+    r"\[[^\]]*维修视频[^\]]*附件[^\]]*\]",
+    r"\[[^\]]*YH400[^\]]*YH500[^\]]*\]",
+    r"\[[^\]]*YH400[^\]]*\]",
+    r"\[[^\]]*YH500[^\]]*\]",
+]
+
+
+def legacy_clean_bracketed_labels(text: str) -> str:
+    if not text or not isinstance(text, str):
+        return text if text else ""
+    cleaned = text
+    for _ in range(5):
+        old = cleaned
+        for pat in LEGACY_BRACKET_LABEL_PATTERNS:
+            cleaned = re.sub(pat, "", cleaned, flags=re.IGNORECASE)
+        if cleaned == old:
+            break
+    cleaned = re.sub(r"[ \t]+", " ", cleaned)
+    lines = [ln.strip() for ln in cleaned.split("\n")]
+    cleaned = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+    return cleaned
+
+
+def legacy_extract_filename_from_reference(text: str) -> Optional[str]:
+    if not text or not text.strip():
+        return None
+    text = text.strip()
+    match = re.search(r'参考["""""]([^"""""]+)["""""]', text)
+    if match:
+        return match.group(1).strip().strip('"""\'""\'') or None
+    match = re.search(r"参考[：:]\s*(.+)", text)
+    if match:
+        return match.group(1).strip().strip('"""\'""\'') or None
+    match = re.search(r"见附件[：:]\s*(.+)", text)
+    if match:
+        return match.group(1).strip().strip('"""\'""\'') or None
+    match = re.search(r"参考\s+(.+)", text)
+    if match:
+        return match.group(1).strip().strip('"""\'""\'') or None
+    filename = re.sub(r"^(参考|见附件)[：:\s]*", "", text).strip('"""\'""\'')
+    return filename.strip() or None
+
+
+def legacy_strip_reference_mentions(text: str) -> str:
+    if not text or not text.strip():
+        return text
+    return re.sub(
+        r'参考["""""][^"""""]*["""""]|参考[：:]\s*[^，。\s]+',
+        "",
+        text,
+    ).replace("参考参考", "参考").strip("，, ")
+
+
+def legacy_parse_causes(cause_text: Optional[str]) -> List[str]:
+    if not cause_text or not cause_text.strip():
+        return []
+    lines = [ln.strip() for ln in re.split(r"[\n\r；;。]", cause_text) if ln.strip()]
+    causes = []
+    for ln in lines:
+        cleaned = re.sub(r"^\d+[\.、]?\s*", "", ln)
+        cleaned = re.sub(r"^[•·]\s*", "", cleaned).strip()
+        if legacy_extract_filename_from_reference(ln) is not None and len(cleaned) < 30:
+            continue
+        cleaned = legacy_strip_reference_mentions(cleaned)
+        if len(cleaned) > 3:
+            causes.append(cleaned)
+    return causes[:5]
+
+
+def legacy_parse_steps(solution_text: Optional[str], cause_text: Optional[str] = None) -> List[Dict[str, str]]:
+    text = solution_text or cause_text or ""
+    if not text:
+        return []
+    lines = [ln.strip() for ln in re.split(r"[\n\r；;。]", text) if ln.strip()]
+    steps = []
+    for i, ln in enumerate(lines, 1):
+        cleaned = re.sub(r"^\d+[\.、]?\s*", "", ln)
+        cleaned = re.sub(r"^[•·]\s*", "", cleaned).strip()
+        if len(cleaned) <= 5:
+            continue
+        if legacy_extract_filename_from_reference(ln) is not None:
+            continue
+        if re.search(r"检查|测试|校准|清理|调整|更换|维修|查看|观察", cleaned):
+            steps.append({
+                "title": cleaned[:50] if len(cleaned) > 50 else cleaned,
+                "action": cleaned,
+                "expect": "完成检查或操作",
+                "next": "如问题未解决，进行下一步" if i < len(lines) else "如问题未解决，请联系技术支持",
+            })
+        else:
+            steps.append({
+                "title": f"步骤 {i}",
+                "action": cleaned,
+                "expect": "完成操作",
+                "next": "进行下一步" if i < len(lines) else "如问题未解决，请联系技术支持",
+            })
+    if not steps and text:
+        steps.append({
+            "title": "结合可能原因与参考资料排查",
+            "action": "请根据上方可能原因逐项检查，并查看下方参考资料中的操作说明。",
+            "expect": "问题得到解决",
+            "next": "如问题未解决，请联系技术支持",
+        })
+    return steps
+
+
+def legacy_parse_solution(solution_text: Optional[str], cause_text: Optional[str] = None) -> Dict[str, str]:
+    text = solution_text or cause_text or ""
+    if not text:
+        return {"temporary": "暂无临时解决方案", "final": "请查看详细排查步骤或联系技术支持"}
+    temp_m = re.search(r"临时[：:]\s*([^。]+)", text)
+    final_m = re.search(r"(?:最终|根因|永久)[：:]\s*([^。]+)", text)
+    temporary = temp_m.group(1).strip() if temp_m else text[:100]
+    final = final_m.group(1).strip() if final_m else text
+    return {
+        "temporary": legacy_strip_reference_mentions(temporary),
+        "final": legacy_strip_reference_mentions(final),
+    }
+
+
+def legacy_extract_reference_names(solution_text: Optional[str], cause_text: Optional[str]) -> List[str]:
+    text = (solution_text or "") + "\n" + (cause_text or "")
+    if not text.strip():
+        return []
+    seen = set()
+    result: List[str] = []
+    for line in re.split(r"[\n\r；;。]", text):
+        for part in re.split(r"[,，]", line.strip()):
+            part = part.strip()
+            if not part:
+                continue
+            name = legacy_extract_filename_from_reference(part)
+            if name:
+                name = name.strip().strip('"\'""\'').strip()
+                if name and name not in seen:
+                    seen.add(name)
+                    result.append(name)
+    return result
+
+
+# ---------- 语料 ----------
+
+_PIECES = [
+    "主泵压力低", "砂箱定位销磨损", "推杆卡滞", "浇注机报警 E101", "溢流阀堵塞", "润滑不足",
+    "【序号】", "【现象（问题）】", "【检查点（原因）】", "【维修对策（解决办法）】", "【维修视频（附件）】",
+    "【YH400】", "【yh500 机型】", "【备注】", "【", "】", "[序号]", "[现象/问题]", "[YH400/YH500]",
+    "[维修视频 附件]", "[其他]", "[", "]", "[a【序号】b]", "【a[序号]b】", "【x【现象】y】",
+    '参考"主泵清洗"', "参考：溢流阀拆解", "参考: 定位销更换", "见附件：步骤说明.pdf", "参考 曲线轨的调节",
+    "参考", "参考参考", '"', "'", "临时：", "最终：", "根因:", "永久：",
+    "1.", "2、", "3 ", "• ", "·", "检查", "更换", "调整", "清理",
+    " ", "  ", "\t", "　", "\n", "\n\n\n\n", "\r\n", "；", ";", "。", "，", ",",
+]
+
+
+def make_corpus(size: int, seed: int = 7) -> List[str]:
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(_PIECES) for _ in range(rnd.randint(0, 24))) for _ in range(size)]
+
+
+# ---------- 校验与计时 ----------
+
+def _pairs(new: Callable, old: Callable, corpus: List[str], two_args: bool = False):
+    if two_args:
+        half = len(corpus) // 2
+        args = list(zip(corpus[:half], corpus[half:]))
+        return (lambda: [new(a, b) for a, b in args]), (lambda: [old(a, b) for a, b in args])
+    return (lambda: [new(t) for t in corpus]), (lambda: [old(t) for t in corpus])
+
+
+def cases():
+    """(名称, 新实现, 原实现, 是否两参数)"""
+    from app.services.chat_service import (
+        _extract_reference_names,
+        _strip_reference_mentions,
+        parse_causes,
+        parse_solution,
+        parse_steps,
+    )
+    from app.utils.text_normalize import clean_labels, extract_filename_from_reference
+
+    return [
+        ("clean_bracketed_labels", clean_labels, legacy_clean_bracketed_labels, False),
+        ("extract_filename_from_reference", extract_filename_from_reference, legacy_extract_filename_from_reference, False),
+        ("_strip_reference_mentions", _strip_reference_mentions, legacy_strip_reference_mentions, False),
+        ("parse_causes", parse_causes, legacy_parse_causes, False),
+        ("parse_steps", parse_steps, legacy_parse_steps, True),
+        ("parse_solution", parse_solution, legacy_parse_solution, True),
+        ("_extract_reference_names", _extract_reference_names, legacy_extract_reference_names, True),
+    ]
+
+
+def check_equivalence(corpus: List[str]) -> None:
+    """新旧实现逐条比对，不一致抛 AssertionError"""
+    for name, new, old, two_args in cases():
+        run_new, run_old = _pairs(new, old, corpus, two_args)
+        got, expected = run_new(), run_old()
+        for i, (g, e) in enumerate(zip(got, expected)):
+            if g != e:
+                raise AssertionError(f"{name} 结果不一致（第 {i} 条）：新={g!r} 原={e!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本规范化微基准")
+    parser.add_argument("--size", type=int, default=10000, help="语料条数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.size)
+    check_equivalence(corpus)
+    print(f"语料 {len(corpus)} 条，新旧结果一致")
+    print(f"{'函数':<34}{'原实现(ms)':>12}{'新实现(ms)':>12}{'加速比':>9}")
+    for name, new, old, two_args in cases():
+        run_new, run_old = _pairs(new, old, corpus, two_args)
+        t_old = min(_timed(run_old) for _ in range(args.repeat))
+        t_new = min(_timed(run_new) for _ in range(args.repeat))
+        print(f"{name:<34}{t_old * 1000:>12.1f}{t_new * 1000:>12.1f}{t_old / t_new:>8.1f}x")
+
+
+def _timed(fn: Callable) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,9 @@
 全量重建向量脚本
 
 执行步骤：
-1. 清空现有的向量集合
-2. 从数据库读取所有文章
-3. 重新构建向量并存储
+1. 从数据库读取所有文章
+2. 重新构建向量，写入新版本的影子集合（当前集合照常服务检索）
+3. 校验通过后原子切换到新集合（--no-clear 则在当前集合上增量追加）
 
 使用方法：
 python scripts/rebuild_all_vectors.py --tenant-id default
@@ -18,6 +18,7 @@ from app.services.ingest_service import IngestService
 from app.repositories.kb_article_repo import KbArticleRepository
 from app.infra.embedding.openai_embedder import OpenAIEmbedder
 from app.infra.vectorstore.chroma_store import ChromaVectorStore
+from app.repositories.vector_repo import VectorRepository
 from app.infra.db.sqlserver import SqlServer
 from app.core.logging_config import get_logger
 
@@ -36,7 +37,7 @@ def main():
     print("\n=== 全量重建向量脚本 ===")
     print(f"租户ID: {args.tenant_id}")
     print(f"限制数量: {args.limit or '无限制'}")
-    print(f"清空现有向量: {'否' if args.no_clear else '是'}")
+    print(f"全量覆盖（影子集合 + 切换）: {'否' if args.no_clear else '是'}")
     print(f"批量大小: {args.batch_size}")
     print("=" * 50)
 
@@ -44,15 +45,9 @@ def main():
         # 初始化组件
         db = SqlServer()
         kb_repo = KbArticleRepository(db)
-        vec_store = ChromaVectorStore()
+        vec_repo = VectorRepository(ChromaVectorStore())
         embedder = OpenAIEmbedder()
-        ingest_service = IngestService(kb_repo, vec_store, embedder)
-
-        # 步骤1：清空向量集合（如果需要）
-        if not args.no_clear:
-            print("\n[步骤1] 清空向量集合...")
-            ingest_service.clear_vector_collection()
-            print("向量集合已清空")
+        ingest_service = IngestService(kb_repo, vec_repo, embedder)
 
         # 统计信息
         total_articles = ingest_service.count_articles(args.tenant_id, "published")
@@ -63,14 +58,14 @@ def main():
             print(f"[信息] 限制处理 {total_articles} 篇文章")
 
         # 执行全量重建
-        print(f"\n[步骤2] 开始全量重建向量...")
+        print(f"\n[步骤1] 开始全量重建向量...")
         start_time = time.time()
 
         result = ingest_service.rebuild_all(
             tenant_id=args.tenant_id,
             status="published",
             limit=args.limit,
-            clear_first=False  # 已经手动清空过
+            clear_first=not args.no_clear,
         )
 
         # 计算耗时
@@ -86,6 +81,14 @@ def main():
         print(f"成功处理: {result['success']}")
         print(f"失败处理: {result['failed']}")
         print(f"写入向量数: {result['upserted_total']}")
+        for name, stage in (result.get("stages") or {}).items():
+            print(f"  {name:<6} {stage['items']} {stage['unit']}, {stage['per_second']}/s, 忙碌 {stage['busy_seconds']}s")
+        swap = result.get("swap")
+        if swap:
+            if swap["promoted"]:
+                print(f"已切换集合: {swap['previous']} -> {swap['active']}（可 POST /ingest/rollback 回滚）")
+            else:
+                print(f"未切换集合（当前集合保持不变）: {swap['reason']}")
         if result['failed']:
             print("\n失败的文章:")
             for fail in result['failed']:
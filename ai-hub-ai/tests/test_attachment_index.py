@@ -0,0 +1,127 @@
+"""附件文件索引测试"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from app.services.attachment_index import LocalAttachmentIndex
+from app.services.attachment_service import AttachmentService, RemoteAttachmentCatalog, _normalize_for_match
+
+
+def _touch(base: Path, rel: str) -> None:
+    p = base / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"x")
+
+
+class TestAttachmentIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        _touch(self.base, "主泵清洗.mp4")
+        _touch(self.base, "141泵高低压阀拆解/步骤1.jpg")
+        _touch(self.base, "141泵高低压阀拆解/子目录/步骤2.mp4")
+        _touch(self.base, "深层/主泵清洗.mp4")
+        _touch(self.base, "深层/Thumbs.db")
+        _touch(self.base, "说明/砂箱定位销更换说明.pdf")
+        self.service = AttachmentService(base_path=str(self.base), base_url="http://files/uploads",
+                                         files_api_base_url="", remote_path="")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_exact_prefers_shallow_file(self):
+        found = self.service.find_attachment_files("参考：主泵清洗")
+        self.assertEqual([f["relative_path"] for f in found], ["主泵清洗.mp4"])
+        self.assertEqual(found[0]["type"], "video")
+
+    def test_folder_returns_all_files_sorted(self):
+        found = self.service.find_attachment_files_exact("《141泵高低压阀拆解》")
+        self.assertEqual(
+            [f["relative_path"] for f in found],
+            ["141泵高低压阀拆解/子目录/步骤2.mp4", "141泵高低压阀拆解/步骤1.jpg"],
+        )
+
+    def test_fuzzy_tiers(self):
+        # stem 包含参考名
+        found = self.service.find_attachment_files("定位销更换")
+        self.assertEqual(found[0]["file_name"], "砂箱定位销更换说明.pdf")
+        # 参考名包含 stem
+        found = self.service.find_attachment_files("砂箱定位销更换说明及注意事项")
+        self.assertEqual(found[0]["file_name"], "砂箱定位销更换说明.pdf")
+        # 精确模式不做模糊
+        self.assertEqual(self.service.find_attachment_files_exact("定位销更换"), [])
+
+    def test_incremental_refresh(self):
+        index = LocalAttachmentIndex(str(self.base), _normalize_for_match, refresh_interval=0)
+        lookup = index.lookup()
+        self.assertEqual(len(lookup), 6)
+        self.assertEqual(index.lookup().exact("新视频"), [])
+
+        _touch(self.base, "141泵高低压阀拆解/新视频.mp4")
+        os.remove(self.base / "说明/砂箱定位销更换说明.pdf")
+        # mtime 精度较粗的文件系统上强制推进目录 mtime
+        for d in ("141泵高低压阀拆解", "说明"):
+            st = os.stat(self.base / d)
+            os.utime(self.base / d, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        lookup = index.lookup()
+        self.assertEqual([e.relative_path for e in lookup.exact("新视频")], ["141泵高低压阀拆解/新视频.mp4"])
+        self.assertEqual(lookup.exact("砂箱定位销更换说明"), [])
+        stats = index.stats()
+        self.assertEqual(stats["full_scans"], 1)
+        self.assertEqual(stats["rescanned_dirs"], 2)
+
+
+REMOTE_LIST = {
+    "code": 0,
+    "data": [
+        {"name": "141泵高低压阀拆解", "relativePath": "diyi\\视频\\141泵高低压阀拆解", "directory": True},
+        {"name": "步骤1.jpg", "relativePath": "diyi\\视频\\141泵高低压阀拆解\\步骤1.jpg", "size": 10},
+        {"name": "步骤2.mp4", "relativePath": "diyi\\视频\\141泵高低压阀拆解\\步骤2.mp4", "size": 20},
+        {"name": "主泵清洗.mp4", "relativePath": "diyi\\视频\\主泵清洗.mp4", "size": 30},
+    ],
+}
+
+
+class TestRemoteAttachmentCatalog(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json=REMOTE_LIST, headers={"ETag": '"v1"'})
+
+        self.http = httpx.Client(transport=httpx.MockTransport(_handler))
+        self.service = AttachmentService(files_api_base_url="http://files", remote_path="diyi/视频",
+                                         http_client=self.http)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_lookups_hit_cached_catalog(self):
+        """多次查找只下载一次列表"""
+        found = self.service.find_attachment_files("主泵清洗")
+        self.assertEqual(found[0]["relative_path"], "diyi/视频/主泵清洗.mp4")
+        folder = self.service.find_attachment_files_exact("141泵高低压阀拆解")
+        self.assertEqual([f["file_name"] for f in folder], ["步骤1.jpg", "步骤2.mp4"])
+        self.assertEqual(self.service.find_attachment_files("主泵")[0]["file_name"], "主泵清洗.mp4")
+        self.assertEqual(self.service.find_attachment_files_exact("主泵"), [])
+        self.assertEqual(len(self.requests), 1)
+
+    def test_conditional_refresh(self):
+        catalog = RemoteAttachmentCatalog("http://files", "diyi/视频", ttl_seconds=0, http_client=self.http)
+        first = catalog.lookup()
+        self.assertIs(catalog.lookup(), first)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers["If-None-Match"], '"v1"')
+        stats = catalog.stats()
+        self.assertEqual((stats["reloads"], stats["not_modified"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
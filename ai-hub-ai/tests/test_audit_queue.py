@@ -0,0 +1,155 @@
+"""审计后台队列测试（假 AuditClient，不发真实请求）"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from app.audit.audit_queue import AuditQueue
+
+
+class _FakeClient:
+    def __init__(self, fail_times: int = 0, server_ids: bool = False):
+        self.is_enabled = True
+        self.sent: list[tuple[str, dict]] = []
+        self._fail_times = fail_times
+        self._server_ids = server_ids
+
+    async def send_event(self, kind: str, payload: dict) -> dict:
+        if self._fail_times > 0:
+            self._fail_times -= 1
+            raise RuntimeError("dotnet down")
+        self.sent.append((kind, dict(payload)))
+        if kind == "message":
+            mid = "server-" + payload["messageId"] if self._server_ids else payload["messageId"]
+            return {"messageId": mid}
+        return {}
+
+
+class TestAuditQueue(unittest.TestCase):
+    def _queue(self, client, **kwargs) -> AuditQueue:
+        kwargs.setdefault("flush_interval", 0.01)
+        return AuditQueue(client=client, **kwargs)
+
+    def test_enqueue_returns_id_and_sends_in_background(self):
+        """入队立即返回预生成 message_id，后台先发消息再发决策"""
+        client = _FakeClient()
+
+        async def _run():
+            q = self._queue(client)
+            mid = q.append_message("conv-1", "user", "设备不射砂")
+            q.log_decision(mid, "solution", 0.9)
+            self.assertEqual(client.sent, [])
+            self.assertTrue(await q.flush(timeout=1))
+            await q.stop()
+            return mid, q.stats()
+
+        mid, stats = asyncio.run(_run())
+        self.assertTrue(mid)
+        self.assertEqual([k for k, _ in client.sent], ["message", "decision"])
+        self.assertEqual(client.sent[0][1]["messageId"], mid)
+        self.assertEqual(stats["sent"], 2)
+
+    def test_no_worker_after_stop(self):
+        """stop() 期间 flush 不清掉关闭标记：失败事件不再重试，之后入队也不再起新 worker"""
+        client = _FakeClient(fail_times=100)
+
+        async def _run():
+            q = self._queue(client, max_attempts=5)
+            q.log_response("m-1", "答案", 120)
+            await q.stop(timeout=1)
+            self.assertTrue(q._stopping)
+            self.assertIsNone(q._task)
+            q.log_retrieval("m-2", [])
+            self.assertIsNone(q._task)
+            return q.stats()
+
+        stats = asyncio.run(_run())
+        self.assertEqual(stats["retried"], 0)
+        self.assertEqual(stats["sent"], 0)
+
+    def test_disabled_returns_none(self):
+        client = _FakeClient()
+        client.is_enabled = False
+        q = self._queue(client)
+        self.assertIsNone(q.append_message("conv-1", "user", "hi"))
+        self.assertEqual(q.stats()["enqueued"], 0)
+
+    def test_retry_then_success(self):
+        """发送失败会重试"""
+        client = _FakeClient(fail_times=1)
+
+        async def _run():
+            q = self._queue(client, max_attempts=3)
+            q.log_response("m-1", "答案", 120)
+            await q.flush(timeout=3)
+            await q.stop()
+            return q.stats()
+
+        stats = asyncio.run(_run())
+        self.assertEqual(stats["retried"], 1)
+        self.assertEqual(stats["sent"], 1)
+
+    def test_dependents_wait_for_failed_message(self):
+        """消息本批发送失败重排时，依赖它的决策排到它后面，且不消耗重试次数"""
+        client = _FakeClient(fail_times=1)
+
+        async def _run():
+            q = self._queue(client, max_attempts=2)
+            mid = q.append_message("conv-1", "user", "设备不射砂")
+            q.log_decision(mid, "solution", 0.9)
+            await q.flush(timeout=3)
+            await q.stop()
+            return q.stats()
+
+        stats = asyncio.run(_run())
+        self.assertEqual([k for k, _ in client.sent], ["message", "decision"])
+        self.assertEqual((stats["deferred"], stats["retried"], stats["failed"]), (1, 1, 0))
+
+    def test_server_assigned_id_is_remapped(self):
+        """旧版 .NET 忽略预生成 ID 时，后续事件改用服务端返回的 ID"""
+        client = _FakeClient(server_ids=True)
+
+        async def _run():
+            q = self._queue(client)
+            mid = q.append_message("conv-1", "assistant", "答案")
+            q.log_response(mid, "答案", 50)
+            await q.flush(timeout=1)
+            await q.stop()
+            return mid
+
+        mid = asyncio.run(_run())
+        self.assertEqual(client.sent[1][1]["messageId"], "server-" + mid)
+
+    def test_overflow_drop_and_spill(self):
+        """队列满：drop 策略计数丢弃；spill 策略落盘，启动时回放"""
+        q = self._queue(_FakeClient(), max_size=1)
+        q.log_response("m-1", "a", 1)
+        q.log_response("m-2", "b", 1)
+        self.assertEqual(q.stats()["dropped"], 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            spill = os.path.join(tmp, "audit_spill.jsonl")
+            client = _FakeClient()
+            q = self._queue(client, max_size=1, overflow_policy="spill", spill_path=spill)
+            q.log_response("m-1", "a", 1)
+            q.log_response("m-2", "b", 1)
+            self.assertEqual(q.stats()["spilled"], 1)
+            with open(spill, encoding="utf-8") as f:
+                self.assertEqual(json.loads(f.readline())["payload"]["messageId"], "m-2")
+
+            async def _run():
+                await q.start()
+                for _ in range(100):
+                    if len(client.sent) == 2:
+                        break
+                    await asyncio.sleep(0.01)
+                await q.stop()
+
+            asyncio.run(_run())
+            self.assertEqual(sorted(p["messageId"] for _, p in client.sent), ["m-1", "m-2"])
+            self.assertFalse(os.path.exists(spill))
+
+
+if __name__ == "__main__":
+    unittest.main()
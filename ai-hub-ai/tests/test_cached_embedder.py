@@ -0,0 +1,95 @@
+"""CachedEmbedder 测试"""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.infra.embedding.cached_embedder import CachedEmbedder
+from app.infra.embedding.fake_embedder import FakeEmbedder
+
+
+class CountingEmbedder(FakeEmbedder):
+    """记录调用次数与每次请求的文本"""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return super().embed_texts(texts)
+
+
+class TestCachedEmbedder(unittest.TestCase):
+    """CachedEmbedder 测试"""
+
+    def test_repeat_query_hits_cache(self):
+        """相同问题（空白差异）第二次不再调用内层 embedder"""
+        inner = CountingEmbedder()
+        emb = CachedEmbedder(inner, max_size=10, ttl_seconds=60)
+        v1 = emb.embed_texts(["不射砂怎么办"])
+        v2 = emb.embed_texts(["  不射砂怎么办 "])
+        self.assertEqual(v1, v2)
+        self.assertEqual(len(inner.calls), 1)
+        stats = emb.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_batch_only_requests_missing(self):
+        """批量请求只把未命中的、去重后的文本交给内层"""
+        inner = CountingEmbedder()
+        emb = CachedEmbedder(inner, max_size=10, ttl_seconds=60)
+        emb.embed_texts(["E101报警"])
+        out = emb.embed_texts(["E101报警", "不射砂", "不射砂"])
+        self.assertEqual(len(out), 3)
+        self.assertEqual(out[1], out[2])
+        self.assertEqual(inner.calls[-1], ["不射砂"])
+
+    def test_original_text_sent_to_inner(self):
+        """规范化只用于缓存 key，内层收到的是原文（多行文档不被改写）"""
+        inner = CountingEmbedder()
+        emb = CachedEmbedder(inner, max_size=10, ttl_seconds=60)
+        emb.embed_texts(["标题\n问题  描述"])
+        self.assertEqual(inner.calls, [["标题\n问题  描述"]])
+
+    def test_lru_eviction(self):
+        """超过容量淘汰最久未使用的条目"""
+        inner = CountingEmbedder()
+        emb = CachedEmbedder(inner, max_size=2, ttl_seconds=60)
+        emb.embed_texts(["a"])
+        emb.embed_texts(["b"])
+        emb.embed_texts(["a"])  # a 变为最近使用
+        emb.embed_texts(["c"])  # 淘汰 b
+        emb.embed_texts(["a"])
+        emb.embed_texts(["b"])
+        self.assertEqual([c[0] for c in inner.calls], ["a", "b", "c", "b"])
+        self.assertEqual(emb.stats()["evictions"], 2)
+
+    def test_ttl_expiry(self):
+        """过期后重新请求"""
+        inner = CountingEmbedder()
+        emb = CachedEmbedder(inner, max_size=10, ttl_seconds=10)
+        now = time.time()
+        with patch("app.infra.embedding.cached_embedder.time.time", return_value=now):
+            emb.embed_texts(["a"])
+        with patch("app.infra.embedding.cached_embedder.time.time", return_value=now + 11):
+            emb.embed_texts(["a"])
+        self.assertEqual(len(inner.calls), 2)
+
+    def test_persist_survives_restart(self):
+        """落盘后新实例可直接命中"""
+        with tempfile.TemporaryDirectory() as d:
+            path = str(Path(d) / "cache.sqlite3")
+            first = CachedEmbedder(CountingEmbedder(), persist_path=path)
+            v1 = first.embed_texts(["E101报警"])[0]
+
+            inner = CountingEmbedder()
+            second = CachedEmbedder(inner, persist_path=path)
+            v2 = second.embed_texts(["E101报警"])[0]
+            self.assertEqual(v1, v2)
+            self.assertEqual(inner.calls, [])
+            self.assertEqual(second.stats()["disk_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
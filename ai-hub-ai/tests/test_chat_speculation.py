@@ -0,0 +1,79 @@
+"""意图识别与向量检索并行（投机检索）测试"""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.schemas.chat import ChatRequest
+from app.services import chat_service
+from app.services.chat_service import ChatService, get_speculation_stats
+from app.services.intent_service import Intent, IntentResult
+
+# 缓存/本地规则都判不出的问题，才会走 LLM + 投机检索
+AMBIGUOUS = "砂型表面出现气孔要注意哪些参数"
+
+
+class TestSpeculativeRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.query_service = Mock()
+        self.deepseek = Mock()
+        self.deepseek.is_available = False
+        self.dotnet = Mock()
+        self.dotnet.search_knowledge = AsyncMock(return_value={"items": [], "totalCount": 0})
+        self.service = ChatService(
+            dotnet_client=self.dotnet,
+            deepseek_client=self.deepseek,
+            query_service=self.query_service,
+            kb_repo=Mock(),
+        )
+
+    def _run(self, intent: Intent, retrieval_delay: float, intent_delay: float):
+        started = asyncio.Event()
+
+        async def _aquery(**kwargs):
+            started.set()
+            await asyncio.sleep(retrieval_delay)
+            return []
+
+        async def _classify(question):
+            await asyncio.sleep(intent_delay)
+            return IntentResult(intent, 0.9, "mock", source="llm")
+
+        self.query_service.aquery = AsyncMock(side_effect=_aquery)
+
+        async def _go():
+            with patch.object(chat_service, "classify_intent", new=_classify):
+                resp = await self.service.search_and_answer(ChatRequest(question=AMBIGUOUS))
+            return resp, started.is_set()
+
+        return asyncio.run(_go())
+
+    def test_solution_uses_speculative_result(self):
+        """意图为 solution：用上并行发起的检索，只检索一次"""
+        before = get_speculation_stats()
+        _, started = self._run(Intent.SOLUTION, retrieval_delay=0.01, intent_delay=0.05)
+        after = get_speculation_stats()
+        self.assertTrue(started)
+        self.assertEqual(self.query_service.aquery.await_count, 1)
+        self.assertEqual(after["used"] - before["used"], 1)
+        self.assertEqual(after["wasted"], before["wasted"])
+
+    def test_chat_discards_speculation(self):
+        """意图为 chat：投机检索被取消并计为浪费"""
+        before = get_speculation_stats()
+        resp, started = self._run(Intent.CHAT, retrieval_delay=1.0, intent_delay=0.01)
+        after = get_speculation_stats()
+        self.assertTrue(started)
+        self.assertEqual(resp.reply_mode, "conversation")
+        self.assertEqual(after["wasted"] - before["wasted"], 1)
+        self.assertEqual(after["cancelled_in_flight"] - before["cancelled_in_flight"], 1)
+
+    def test_disabled_by_setting(self):
+        before = get_speculation_stats()
+        with patch.object(chat_service.settings, "SPECULATIVE_RETRIEVAL_ENABLED", False):
+            self._run(Intent.CHAT, retrieval_delay=0.0, intent_delay=0.0)
+        self.assertEqual(get_speculation_stats()["started"], before["started"])
+        self.query_service.aquery.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""SQL Server 连接池测试（用假连接，不依赖真实数据库）"""
+import threading
+import time
+import unittest
+
+import pyodbc
+
+from app.infra.db.pool import ConnectionPool
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self.description = [("one",)]
+
+    def execute(self, sql, params=()):
+        if self._conn.dead:
+            raise pyodbc.OperationalError("08S01", "[08S01] Communication link failure")
+        self._conn.executed.append(sql)
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class _FakeConn:
+    def __init__(self):
+        self.dead = False
+        self.closed = False
+        self.executed: list[str] = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.conns: list[_FakeConn] = []
+
+    def _connect(self, dsn):
+        conn = _FakeConn()
+        self.conns.append(conn)
+        return conn
+
+    def _pool(self, **kwargs) -> ConnectionPool:
+        kwargs.setdefault("connect", self._connect)
+        return ConnectionPool("fake-dsn", **kwargs)
+
+    def _select(self, conn):
+        return conn.cursor().execute("SELECT x").fetchone()
+
+    def test_reuses_connection(self):
+        """顺序查询复用同一条连接"""
+        pool = self._pool()
+        for _ in range(5):
+            pool.run(self._select, "SELECT x")
+        self.assertEqual(len(self.conns), 1)
+        stats = pool.stats()
+        self.assertEqual(stats["queries"], 5)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_max_size_blocks_and_times_out(self):
+        """连接全部借出时等待超时"""
+        pool = self._pool(max_size=1, acquire_timeout=0.05)
+        with pool.connection():
+            with self.assertRaises(TimeoutError):
+                with pool.connection():
+                    pass
+
+    def test_health_check_replaces_dead_idle_connection(self):
+        """空闲连接失效：取出时健康检查失败，自动换新连接"""
+        pool = self._pool(health_check_after=0)
+        pool.run(self._select)
+        self.conns[0].dead = True
+        self.assertEqual(pool.run(self._select), (1,))
+        self.assertEqual(len(self.conns), 2)
+        self.assertTrue(self.conns[0].closed)
+        self.assertEqual(pool.stats()["health_check_failures"], 1)
+
+    def test_reconnect_on_transient_error(self):
+        """执行中出现 08S01：丢弃连接并重连重试一次"""
+        pool = self._pool(health_check_after=3600)
+        pool.run(self._select)
+        self.conns[0].dead = True
+        self.assertEqual(pool.run(self._select), (1,))
+        stats = pool.stats()
+        self.assertEqual(stats["reconnects"], 1)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_non_transient_error_keeps_connection(self):
+        """业务错误（非连接类）不重试，连接归还池中"""
+        pool = self._pool()
+
+        def _bad(conn):
+            raise ValueError("bad sql")
+
+        with self.assertRaises(ValueError):
+            pool.run(_bad)
+        self.assertEqual(pool.stats()["reconnects"], 0)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_idle_eviction_keeps_min_size(self):
+        """空闲超时回收多余连接，保留 min_size 条"""
+        pool = self._pool(min_size=1, idle_timeout=0.01)
+        barrier = threading.Barrier(3)
+
+        def _hold(conn):
+            barrier.wait(timeout=1)
+            return None
+
+        threads = [threading.Thread(target=pool.run, args=(_hold,)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.conns), 3)
+        time.sleep(0.03)
+        pool.run(self._select)
+        self.assertEqual(pool.stats()["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Embedding 批量打包测试"""
+import unittest
+from unittest.mock import patch
+
+from app.infra.embedding.batching import BatchEmbedder, BatchLimits, is_size_limit_error, resolve_batch_limits
+
+
+class _SizeError(Exception):
+    status_code = 400
+
+
+class _Embedder:
+    """超过 limit 条时报 400 batch size 错误，记录每次请求条数"""
+
+    def __init__(self, limit=None, fail_on=None):
+        self.limit = limit
+        self.fail_on = fail_on
+        self.calls = []
+
+    def embed_texts(self, texts):
+        self.calls.append(len(texts))
+        if self.limit and len(texts) > self.limit:
+            raise _SizeError(f"batch size is invalid, it should not be larger than {self.limit}")
+        if self.fail_on and self.fail_on in texts:
+            raise RuntimeError("quota exceeded")
+        return [[float(len(t))] for t in texts]
+
+
+class TestBatchEmbedder(unittest.TestCase):
+    def test_pack_by_items_and_chars(self):
+        emb = _Embedder()
+        vecs, errors = BatchEmbedder(emb, BatchLimits(max_items=3, max_chars=5)).embed(["aa", "bb", "c", "dddddd", "e"])
+        self.assertEqual(emb.calls, [3, 1, 1])
+        self.assertEqual(vecs, [[2.0], [2.0], [1.0], [6.0], [1.0]])
+        self.assertEqual(errors, {})
+
+    def test_split_on_size_error_and_tighten_limit(self):
+        emb = _Embedder(limit=3)
+        batcher = BatchEmbedder(emb, BatchLimits(max_items=8))
+        vecs, errors = batcher.embed(["x"] * 12)
+        self.assertEqual(errors, {})
+        self.assertTrue(all(v == [1.0] for v in vecs))
+        # 8 条、4 条各失败一次，之后全部按 2 条一批
+        self.assertEqual(emb.calls, [8, 4, 2, 2, 2, 2, 2, 2])
+        self.assertEqual(batcher.max_items, 2)
+
+    def test_other_errors_only_fail_their_batch(self):
+        emb = _Embedder(fail_on="bad")
+        vecs, errors = BatchEmbedder(emb, BatchLimits(max_items=2)).embed(["a", "bad", "c", "d"])
+        self.assertEqual(sorted(errors), [0, 1])
+        self.assertEqual(vecs[2:], [[1.0], [1.0]])
+        self.assertEqual(emb.calls, [2, 2])
+
+    def test_size_error_detection(self):
+        self.assertTrue(is_size_limit_error(_SizeError("batch size is invalid")))
+        self.assertFalse(is_size_limit_error(_SizeError("invalid api key")))
+        self.assertFalse(is_size_limit_error(RuntimeError("batch too large")))
+
+    def test_provider_limits_and_override(self):
+        self.assertEqual(resolve_batch_limits("https://dashscope.aliyuncs.com/compatible-mode/v1").max_items, 10)
+        with patch("app.infra.embedding.batching.settings.EMBEDDING_BATCH_MAX_ITEMS", 4):
+            self.assertEqual(resolve_batch_limits("https://dashscope.aliyuncs.com/compatible-mode/v1").max_items, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
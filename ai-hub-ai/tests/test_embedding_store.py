@@ -0,0 +1,118 @@
+"""本地 embedding 仓库测试"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.infra.embedding.batching import BatchEmbedder, BatchLimits
+from app.infra.embedding.embedding_store import EmbeddingStore
+
+
+class _Embedder:
+    """按文本长度生成 4 维向量，记录每次请求的文本"""
+
+    model_name = "text-embedding-v3"
+    dimensions = None
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_texts(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5, -1.0, 2.0] for t in texts]
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_roundtrip_survives_reopen(self):
+        store = EmbeddingStore(self.root)
+        store.put_many("m", None, ["甲", "乙乙"], [[1.0, 2.0], [3.0, 4.0]])
+        store.close()
+        reopened = EmbeddingStore(self.root)
+        self.assertEqual(reopened.get_many("m", None, ["乙乙", "丙", "甲"]), [[3.0, 4.0], None, [1.0, 2.0]])
+        reopened.close()
+
+    def test_key_includes_model_and_dimensions(self):
+        store = EmbeddingStore(self.root)
+        store.put_many("m", 1024, ["甲"], [[1.0, 2.0]])
+        self.assertEqual(store.get_many("m", 512, ["甲"]), [None])
+        self.assertEqual(store.get_many("other", 1024, ["甲"]), [None])
+        self.assertEqual(store.get_many("m", 1024, ["甲"]), [[1.0, 2.0]])
+        store.close()
+
+    def test_truncated_tail_is_ignored(self):
+        store = EmbeddingStore(self.root)
+        store.put_many("m", None, ["甲", "乙"], [[1.0, 2.0], [3.0, 4.0]])
+        store.close()
+        # 模拟写最后一行时崩溃：矩阵只剩半行
+        vec_file = next(Path(self.root).glob("*.f32"))
+        with open(vec_file, "r+b") as f:
+            f.truncate(12)
+        reopened = EmbeddingStore(self.root)
+        self.assertEqual(reopened.get_many("m", None, ["甲", "乙"]), [[1.0, 2.0], None])
+        reopened.put_many("m", None, ["乙"], [[5.0, 6.0]])
+        self.assertEqual(reopened.get_many("m", None, ["乙"]), [[5.0, 6.0]])
+        reopened.close()
+
+    def test_compaction_keeps_recently_used(self):
+        # 每行 8 字节，上限 40 字节 = 5 行，压缩后保留 4 行
+        store = EmbeddingStore(self.root, max_mb=40 / (1024 * 1024))
+        store.put_many("m", None, ["a", "b", "c", "d", "e"], [[float(i), 0.0] for i in range(5)])
+        store.get_many("m", None, ["a"])
+        store.put_many("m", None, ["f"], [[5.0, 0.0]])
+        stats = store.stats()["spaces"][0]
+        self.assertEqual((stats["entries"], stats["compactions"]), (4, 1))
+        self.assertEqual(store.get_many("m", None, ["a", "b", "f"]), [[0.0, 0.0], None, [5.0, 0.0]])
+        store.close()
+        self.assertEqual(len(list(Path(self.root).glob("*.f32"))), 1)
+        reopened = EmbeddingStore(self.root)
+        self.assertEqual(reopened.get_many("m", None, ["a", "f"]), [[0.0, 0.0], [5.0, 0.0]])
+        reopened.close()
+
+    def test_two_writers_share_directory(self):
+        """两个进程（API 服务与重建脚本）交替写同一目录：行号按文件大小分配，互相能读到对方写入"""
+        api = EmbeddingStore(self.root)
+        script = EmbeddingStore(self.root)
+        api.put_many("m", None, ["x"], [[1.0, 1.0]])
+        script.put_many("m", None, ["y"], [[2.0, 2.0]])
+        api.put_many("m", None, ["z"], [[3.0, 3.0]])
+        for store in (api, script):
+            self.assertEqual(store.get_many("m", None, ["x", "y", "z"]), [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+        api.close()
+        script.close()
+        reopened = EmbeddingStore(self.root)
+        self.assertEqual(reopened.get_many("m", None, ["y"]), [[2.0, 2.0]])
+        self.assertEqual(reopened.stats()["spaces"][0]["entries"], 3)
+        reopened.close()
+
+    def test_reader_follows_other_process_compaction(self):
+        store = EmbeddingStore(self.root, max_mb=40 / (1024 * 1024))
+        reader = EmbeddingStore(self.root, max_mb=40 / (1024 * 1024))
+        store.put_many("m", None, ["a", "b", "c", "d", "e"], [[float(i), 0.0] for i in range(5)])
+        self.assertEqual(reader.get_many("m", None, ["b"]), [[1.0, 0.0]])
+        store.put_many("m", None, ["f"], [[5.0, 0.0]])
+        self.assertEqual(reader.get_many("m", None, ["a", "f"]), [None, [5.0, 0.0]])
+        reader.put_many("m", None, ["g"], [[6.0, 0.0]])
+        self.assertEqual(store.get_many("m", None, ["f", "g"]), [[5.0, 0.0], [6.0, 0.0]])
+        store.close()
+        reader.close()
+
+
+class TestBatchEmbedderWithStore(unittest.TestCase):
+    def test_only_missing_texts_requested(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = EmbeddingStore(root)
+            emb = _Embedder()
+            batcher = BatchEmbedder(emb, BatchLimits(max_items=10), store=store)
+            first, _ = batcher.embed(["甲", "乙乙"])
+            # 清空向量库后重建：已算过的直接读盘
+            second, errors = batcher.embed(["乙乙", "丙丙丙", "甲"])
+            self.assertEqual(emb.calls, [["甲", "乙乙"], ["丙丙丙"]])
+            self.assertEqual(errors, {})
+            self.assertEqual(second[0], first[1])
+            self.assertEqual(second[2], first[0])
+            self.assertEqual(batcher.stored, 2)
+            store.close()
@@ -0,0 +1,79 @@
+"""Excel 行映射测试：批量映射与逐行映射结果一致"""
+import unittest
+
+import pandas as pd
+
+from app.services.excel_utils import (
+    clean_bracketed_labels,
+    clean_bracketed_labels_series,
+    map_excel_row_to_article,
+    map_excel_rows_to_articles,
+)
+
+
+class _FakeAttachments:
+    def __init__(self):
+        self.calls = []
+
+    def find_attachment_files(self, fn):
+        self.calls.append(fn)
+        if fn == "坏引用":
+            raise RuntimeError("lookup failed")
+        if fn.startswith("无"):
+            return []
+        return [{
+            "path": f"/v/{fn}.mp4",
+            "url": f"http://files/uploads/{fn}.mp4",
+            "type": "video",
+            "size": 1,
+            "file_name": f"{fn}.mp4",
+            "relative_path": f"{fn}.mp4",
+        }]
+
+
+ROWS = {
+    "序号": [1, 2, 3, 4, 5, 6, None],
+    "现象 (问题)": [
+        "【现象（问题）】主泵压力低",
+        "砂箱  定位销\n\n\n\n磨损",
+        None,
+        "现象",
+        "浇注机报警 E101",
+        "推杆卡滞",
+        "nan",
+    ],
+    "检查点（原因）": ["【检查点】溢流阀", None, "x", "", "传感器", "润滑不足", ""],
+    "维修对策": ["清洗溢流阀", "更换定位销 [YH400]", "", "", "复位", "加油", ""],
+    "维修视频（附件）": [
+        '参考"主泵清洗"参考"溢流阀拆解"',
+        "参考：定位销更换；参考：无此视频",
+        "", "", "见附件：坏引用", '参考"主泵清洗"', "",
+    ],
+}
+
+
+class TestBatchMapping(unittest.TestCase):
+    def test_same_output_as_row_mapping(self):
+        df = pd.DataFrame(ROWS)
+        row_numbers = [i + 2 for i in range(len(df))]
+        expected = []
+        for (idx, row), num in zip(df.iterrows(), row_numbers):
+            try:
+                expected.append((num, map_excel_row_to_article(row, "维修.xlsx", "Sheet1", num, _FakeAttachments(), "造型机"), None))
+            except Exception as e:
+                expected.append((num, None, str(e)))
+
+        attachments = _FakeAttachments()
+        got = map_excel_rows_to_articles(df, "维修.xlsx", "Sheet1", row_numbers, attachments, "造型机", max_workers=4)
+        self.assertEqual([(n, a, str(e) if e else None) for n, a, e in got], expected)
+        # 相同引用只查找一次
+        self.assertEqual(attachments.calls.count("主泵清洗"), 1)
+
+    def test_series_clean_matches_scalar(self):
+        texts = ["【序号】1 【现象（问题）】 a\t b", "【【YH400】】x", " 行1 \n\n\n\n 行2 ", "", "[维修视频（附件）]y"]
+        got = clean_bracketed_labels_series(pd.Series(texts)).tolist()
+        self.assertEqual(got, [clean_bracketed_labels(t) for t in texts])
+
+
+if __name__ == "__main__":
+    unittest.main()
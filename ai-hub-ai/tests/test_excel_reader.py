@@ -0,0 +1,85 @@
+"""Excel 流式读取与导入测试"""
+import asyncio
+import io
+import json
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+import openpyxl
+from fastapi import HTTPException
+
+from app.services.excel_import_service import ExcelImportService
+from app.services.excel_reader import ExcelSheetStream
+
+
+def _workbook(rows, title="维修记录") -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = title
+    for r in rows:
+        ws.append(r)
+    wb.create_sheet("备用")
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+TITLED = _workbook([
+    ["YH400 维修手册"],
+    ["序号", "现象（问题）", "检查点（原因）", "维修对策（解决办法）", "型号", "现象"],
+    ["", "【现象（问题）】标题行"],
+    [1, "主泵压力低", "溢流阀", "清洗", "YH400"],
+    [],
+    [2, "现象", "", ""],
+    [3, "推杆卡滞", "润滑不足", "加油"],
+])
+
+
+class TestExcelSheetStream(unittest.TestCase):
+    def test_second_row_header_single_pass(self):
+        with ExcelSheetStream(TITLED, chunk_size=1) as stream:
+            self.assertEqual(stream.sheet_names, ["维修记录", "备用"])
+            self.assertEqual(stream.header_row, 1)
+            # 型号列被过滤，重名列加后缀与 pandas 一致
+            self.assertEqual(stream.columns, ["序号", "现象（问题）", "检查点（原因）", "维修对策（解决办法）", "现象"])
+            chunks = list(stream.chunks())
+        self.assertEqual([n for _, n in chunks], [[3], [4]])
+        self.assertEqual([df.iloc[0]["现象（问题）"] for df, _ in chunks], ["主泵压力低", "推杆卡滞"])
+        self.assertEqual((stream.data_rows, stream.body_rows, stream.valid_rows), (4, 3, 2))
+
+    def test_missing_fault_column(self):
+        data = _workbook([["a", "b"], ["c", "d"], ["e", "f"]])
+        with self.assertRaises(ValueError):
+            ExcelSheetStream(data)
+
+
+class TestImportExcel(unittest.TestCase):
+    def test_import_streams_rows(self):
+        dotnet = Mock()
+        dotnet.batch_create_articles = AsyncMock(return_value={
+            "successCount": 2,
+            "results": [{"success": True, "articleId": 11}, {"success": True, "articleId": 12}],
+        })
+        dotnet.batch_create_assets = AsyncMock()
+        attachments = Mock()
+        attachments.find_attachment_files.return_value = []
+        service = ExcelImportService(dotnet_client=dotnet, attachment_service=attachments)
+
+        resp = asyncio.run(service.import_excel(TITLED, "维修.xlsx"))
+        self.assertEqual(resp.total_rows, 2)
+        self.assertEqual(resp.article_ids, [11, 12])
+        sent = dotnet.batch_create_articles.await_args[0][0]
+        self.assertEqual([a["title"] for a in sent], ["主泵压力低", "推杆卡滞"])
+        scope = json.loads(sent[0]["scopeJson"])
+        self.assertEqual((scope["sheet"], scope["行号"]), ("维修记录", 3))
+
+    def test_empty_body_rejected(self):
+        data = _workbook([["序号", "现象"]])
+        service = ExcelImportService(dotnet_client=Mock(), attachment_service=Mock())
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(service.import_excel(data, "空.xlsx"))
+        self.assertEqual(ctx.exception.detail, "Excel 文件为空")
+
+
+if __name__ == "__main__":
+    unittest.main()
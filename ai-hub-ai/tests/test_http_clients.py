@@ -0,0 +1,61 @@
+"""出站 HTTP 共享客户端测试"""
+import asyncio
+import unittest
+
+import httpx
+
+from app.clients.dotnet_client import DotnetClient
+from app.clients.http_clients import HttpClientRegistry
+
+
+class TestHttpClientRegistry(unittest.TestCase):
+    def test_same_upstream_reuses_client(self):
+        """同一上游复用同一个客户端，不同上游各自独立"""
+        registry = HttpClientRegistry()
+        a = registry.get_sync("attachment")
+        self.assertIs(a, registry.get_sync("attachment"))
+        self.assertIsNot(a, registry.get_sync("dotnet"))
+        self.assertEqual(registry.stats()["sync_clients"], ["attachment", "dotnet"])
+        asyncio.run(registry.aclose())
+        self.assertTrue(a.is_closed)
+        self.assertEqual(registry.stats()["sync_clients"], [])
+
+    def test_closed_client_is_recreated(self):
+        registry = HttpClientRegistry()
+
+        async def _run():
+            first = registry.get_async("llm")
+            await first.aclose()
+            second = registry.get_async("llm")
+            await registry.aclose()
+            return first, second
+
+        first, second = asyncio.run(_run())
+        self.assertIsNot(first, second)
+
+
+class TestDotnetClientInjection(unittest.TestCase):
+    def test_requests_go_through_injected_client(self):
+        """注入的客户端被多次调用复用，且不会被调用方关闭"""
+        seen = []
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.url.path)
+            return httpx.Response(200, json={"ok": True})
+
+        async def _run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+            client = DotnetClient(base_url="http://dotnet", internal_token="t", http_client=http)
+            await client.batch_create_articles([{"title": "a"}])
+            await client.batch_create_assets([{"name": "b"}])
+            closed = http.is_closed
+            await http.aclose()
+            return closed
+
+        closed = asyncio.run(_run())
+        self.assertFalse(closed)
+        self.assertEqual(seen, ["/api/ai/kb/articles/batch", "/api/ai/kb/articles/assets/batch"])
+
+
+if __name__ == "__main__":
+    unittest.main()
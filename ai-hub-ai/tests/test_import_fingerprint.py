@@ -0,0 +1,138 @@
+"""Excel 增量导入测试：行指纹与新增 / 变更 / 未变分组"""
+import asyncio
+import io
+import json
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import openpyxl
+
+from app.services.excel_import_service import ExcelImportService, parse_excel
+from app.services.import_fingerprint import HASH_FIELD, KEY_FIELD, SOURCE_FIELD
+
+
+def _workbook(rows) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["序号", "现象（问题）", "检查点（原因）", "维修对策"])
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+V1 = _workbook([
+    [1, "主泵压力低", "溢流阀", "清洗"],
+    [2, "推杆卡滞", "润滑不足", "加油"],
+    [3, "浇注机报警", "传感器", "复位"],
+    [4, "砂箱漏砂", "密封条", "更换"],
+])
+# 插入一行、改一行、删一行；序号整体重排
+V2 = _workbook([
+    [1, "新增故障", "未知", "排查"],
+    [2, "主泵压力低", "溢流阀", "清洗"],
+    [3, "推杆卡滞", "润滑不足", "加油脂并检查油路"],
+    [4, "浇注机报警", "传感器", "复位"],
+])
+
+# 只改一行：没有新增条目
+V1_EDITED = _workbook([
+    [1, "主泵压力低", "溢流阀", "清洗"],
+    [2, "推杆卡滞", "润滑不足", "加油脂并检查油路"],
+    [3, "浇注机报警", "传感器", "复位"],
+    [4, "砂箱漏砂", "密封条", "更换"],
+])
+
+
+def _scopes(data: bytes):
+    parsed = parse_excel(data, "维修.xlsx", None, attachment_service=_attachments())
+    return [json.loads(a["scopeJson"]) for a in parsed.articles]
+
+
+def _attachments():
+    m = Mock()
+    m.find_attachment_files.return_value = []
+    return m
+
+
+class TestRowFingerprint(unittest.TestCase):
+    def test_key_stable_when_rows_shift(self):
+        old = {s["行号"]: s for s in _scopes(V1)}
+        new = {s["行号"]: s for s in _scopes(V2)}
+        # 主泵压力低 从第 2 行移到第 3 行：键与指纹不变
+        self.assertEqual(old[2][KEY_FIELD], new[3][KEY_FIELD])
+        self.assertEqual(old[2][HASH_FIELD], new[3][HASH_FIELD])
+        # 推杆卡滞 对策变化：键不变，指纹变化
+        self.assertEqual(old[3][KEY_FIELD], new[4][KEY_FIELD])
+        self.assertNotEqual(old[3][HASH_FIELD], new[4][HASH_FIELD])
+        self.assertEqual(len({s[SOURCE_FIELD] for s in old.values()}), 1)
+
+
+class TestIncrementalImport(unittest.TestCase):
+    def _service(self, update_result, ingest=None):
+        previous = [
+            {"id": 100 + i, "scope_json": json.dumps(s, ensure_ascii=False)}
+            for i, s in enumerate(_scopes(V1))
+        ]
+        repo = Mock()
+        repo.list_by_import_source.return_value = previous
+        repo.list_asset_urls.return_value = {}
+        dotnet = Mock()
+        dotnet.tenant_id = "default"
+        dotnet.batch_create_articles = AsyncMock(return_value={"results": [{"success": True, "articleId": 200}]})
+        if isinstance(update_result, Exception):
+            dotnet.batch_update_articles = AsyncMock(side_effect=update_result)
+        else:
+            dotnet.batch_update_articles = AsyncMock(return_value=update_result)
+        service = ExcelImportService(
+            dotnet_client=dotnet, attachment_service=_attachments(), kb_repo=repo, ingest_service=ingest
+        )
+        return service, dotnet, repo, previous
+
+    def test_reimport_reports_diff(self):
+        service, dotnet, repo, previous = self._service({"results": [{"success": True, "articleId": 101}]})
+
+        resp = asyncio.run(service.import_excel(V2, "维修.xlsx"))
+        self.assertEqual((resp.created_count, resp.updated_count, resp.unchanged_count), (1, 1, 2))
+        self.assertEqual(resp.article_ids, [200, 101])
+        self.assertEqual(resp.unchanged_ids, [100, 102])
+        self.assertEqual(resp.stale_article_ids, [103])
+        self.assertEqual([a["title"] for a in dotnet.batch_create_articles.await_args[0][0]], ["新增故障"])
+        updated = dotnet.batch_update_articles.await_args[0][0]
+        self.assertEqual([(a["articleId"], a["title"]) for a in updated], [(101, "推杆卡滞")])
+        source = json.loads(previous[0]["scope_json"])[SOURCE_FIELD]
+        repo.list_by_import_source.assert_called_once_with("default", source)
+
+    def test_update_failure_keeps_created_articles(self):
+        """批量更新接口整体失败（如 .NET 未部署返回 404）：已新建的条目照常返回并写入向量，变更行记为失败"""
+        request = httpx.Request("PUT", "http://dotnet/api/ai/kb/articles/batch")
+        not_found = httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+        ingest = Mock()
+        ingest.ingest_articles.side_effect = lambda ids: {"success": len(ids), "upserted_total": len(ids), "failed": []}
+        service, _, _, _ = self._service(not_found, ingest)
+
+        with patch("app.services.excel_import_service.settings.IMPORT_AUTO_INGEST", True):
+            resp = asyncio.run(service.import_excel(V2, "维修.xlsx"))
+        self.assertEqual((resp.created_count, resp.updated_count), (1, 0))
+        self.assertEqual(resp.article_ids, [200])
+        self.assertEqual([f["row_index"] for f in resp.failures], [4])
+        self.assertTrue(resp.failures[0]["reason"].startswith("更新 .NET 失败"))
+        ingest.ingest_articles.assert_called_once_with([200])
+        self.assertEqual(resp.ingest.success, 1)
+
+    def test_update_failure_without_created_raises(self):
+        """没有新建条目时保持原行为：按 .NET 错误返回"""
+        from fastapi import HTTPException
+
+        request = httpx.Request("PUT", "http://dotnet/api/ai/kb/articles/batch")
+        down = httpx.ConnectError("refused", request=request)
+        service, dotnet, _, _ = self._service(down)
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(service.import_excel(V1_EDITED, "维修.xlsx"))
+        self.assertEqual(ctx.exception.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""后台导入任务测试（线程模式 + 进程池解析进度）"""
+import asyncio
+import io
+import os
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import openpyxl
+
+from app.services.excel_import_service import ExcelImportService
+from app.services.import_jobs import ImportJobManager
+
+
+def _workbook(rows) -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+DATA = _workbook([
+    ["序号", "现象（问题）", "检查点（原因）", "维修对策"],
+    [1, "主泵压力低", "溢流阀", "清洗"],
+    [2, "推杆卡滞", "润滑不足", "加油"],
+    [3, "浇注机报警", "传感器", "复位"],
+])
+
+
+def _service(results):
+    dotnet = Mock()
+    dotnet.batch_create_articles = AsyncMock(return_value={"results": results})
+    dotnet.batch_create_assets = AsyncMock()
+    attachments = Mock()
+    attachments.find_attachment_files.return_value = []
+    ingest = Mock()
+    ingest.ingest_articles.side_effect = lambda ids: {"success": len(ids), "upserted_total": 3 * len(ids), "failed": []}
+    return ExcelImportService(dotnet_client=dotnet, attachment_service=attachments, ingest_service=ingest)
+
+
+class TestImportJobs(unittest.TestCase):
+    def test_job_progress_and_result(self):
+        service = _service([
+            {"success": True, "articleId": 1},
+            {"success": False, "error": "重复"},
+            {"success": True, "articleId": 3},
+        ])
+
+        async def _run():
+            manager = ImportJobManager(process_workers=0)
+            job = manager.submit(service, DATA, "维修.xlsx")
+            self.assertEqual(job.status, "queued")
+            await manager.wait(job)
+            self.assertIs(manager.get(job.job_id), job)
+            return job.to_dict(), manager.stats()
+
+        job, stats = asyncio.run(_run())
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], {"rows_parsed": 3, "rows_mapped": 3, "rows_uploaded": 2, "rows_unchanged": 0, "rows_indexed": 2, "rows_failed": 1})
+        self.assertEqual(job["result"]["article_ids"], [1, 3])
+        self.assertEqual(job["result"]["failures"], [{"row_index": 3, "reason": "重复"}])
+        self.assertEqual(job["result"]["ingest"], {"status": "succeeded", "total": 2, "success": 2, "upserted_total": 6, "failed": []})
+        self.assertEqual(stats["jobs"], {"succeeded": 1})
+
+    def test_failed_job_keeps_status_code_and_expires(self):
+        async def _run():
+            manager = ImportJobManager(process_workers=0, retention_seconds=0)
+            job = manager.submit(_service([]), _workbook([["序号", "现象"]]), "空.xlsx")
+            await manager.wait(job)
+            await asyncio.sleep(0.01)
+            return job, manager.get(job.job_id)
+
+        job, after = asyncio.run(_run())
+        self.assertEqual((job.status, job.error_status, job.error), ("failed", 400, "Excel 文件为空"))
+        self.assertIsNone(after)
+
+
+class TestProcessPoolProgress(unittest.TestCase):
+    def test_parse_progress_reported_from_child(self):
+        """解析在子进程执行时，进入 uploading 之前就能看到不断增长的 rows_parsed"""
+        total = 5000
+        data = _workbook(
+            [["序号", "现象（问题）", "检查点（原因）", "维修对策"]]
+            + [[i, f"故障{i}", "原因", "对策"] for i in range(total)]
+        )
+        service = _service([])
+        service._kb_repo = Mock()
+        service._kb_repo.list_by_import_source.return_value = []
+
+        async def _run():
+            manager = ImportJobManager(process_workers=1)
+            try:
+                job = manager.submit(service, data, "维修.xlsx")
+                seen = []
+                while not job.finished:
+                    seen.append((job.status, job.progress.rows_parsed))
+                    await asyncio.sleep(0.01)
+                return job, seen
+            finally:
+                await manager.shutdown()
+
+        # 子进程（spawn）读环境变量：小分块让解析持续一段时间
+        with patch.dict(os.environ, {"EXCEL_IMPORT_CHUNK_ROWS": "10"}), \
+                patch("app.services.excel_import_service._PROGRESS_POLL_SECONDS", 0.02):
+            job, seen = asyncio.run(asyncio.wait_for(_run(), 120))
+        self.assertEqual(job.status, "succeeded", job.error)
+        parsing = [n for status, n in seen if status == "parsing"]
+        self.assertTrue(any(0 < n < total for n in parsing), parsing[-5:])
+        self.assertEqual(job.progress.rows_parsed, total)
+
+
+if __name__ == "__main__":
+    unittest.main()
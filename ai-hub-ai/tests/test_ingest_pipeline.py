@@ -0,0 +1,123 @@
+"""全量 ingest 流水线测试"""
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from app.infra.embedding.batching import BatchEmbedder, BatchLimits
+from app.infra.embedding.rate_limit import EmbeddingRateLimiter, TokenBucket
+from app.repositories.kb_article_repo import KbArticleRepository
+from app.schemas.kb_article import KbArticle
+from app.services.ingest_pipeline import IngestPipeline
+
+
+def _row(aid: int) -> dict:
+    return {
+        "id": aid,
+        "tenant_id": "default",
+        "title": f"故障{aid}",
+        "question_text": "设备无法射砂怎么办？",
+        "cause_text": "射砂管堵塞",
+        "solution_text": None,
+        "tags": None,
+        "scope_json": '{"设备类型": "造型机"}',
+        "status": "published",
+        "version": 1,
+    }
+
+
+class _Embedder:
+    model_name = "fake"
+    dimensions = None
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def embed_texts(self, texts):
+        with self._lock:
+            self.calls.append(len(texts))
+        if self.fail_on and any(self.fail_on in t for t in texts):
+            raise RuntimeError("quota")
+        return [[0.1]] * len(texts)
+
+
+class TestIterPages(unittest.TestCase):
+    def test_keyset_pagination_with_limit(self):
+        db = Mock()
+        rows = [_row(i) for i in range(1, 8)]
+        db.fetch_all.side_effect = lambda sql, params: [r for r in rows if r["id"] > params[-1]][:params[0]]
+        pages = list(KbArticleRepository(db).iter_pages("default", status="published", limit=5, page_size=2))
+        self.assertEqual([[a.id for a in p] for p in pages], [[1, 2], [3, 4], [5]])
+        self.assertEqual([c[0][1] for c in db.fetch_all.call_args_list],
+                         [(2, "default", "published", 0), (2, "default", "published", 2), (1, "default", "published", 4)])
+        self.assertIn("id > ?", db.fetch_all.call_args[0][0])
+
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.kb_repo = Mock()
+        self.kb_repo.iter_pages.return_value = iter([[KbArticle(**_row(i)) for i in range(1, 5)],
+                                                     [KbArticle(**_row(i)) for i in range(5, 8)]])
+        self.vec_repo = Mock()
+        self.vec_repo.upsert.side_effect = lambda ids, **kw: len(ids)
+        self.vec_repo.get_article_metadatas.return_value = {}
+
+    def _run(self, embedder, **kw):
+        batcher = BatchEmbedder(embedder, BatchLimits(max_items=6))
+        pipeline = IngestPipeline(self.kb_repo, self.vec_repo, batcher, page_size=4, embed_workers=3,
+                                  queue_size=2, write_batch_size=kw.get("write_batch_size", 9))
+        return pipeline.run("default", status="published")
+
+    def test_all_articles_written_with_stage_stats(self):
+        embedder = _Embedder()
+        result = self._run(embedder)
+        self.assertEqual((result["total"], result["success"], result["upserted_total"]), (7, 7, 21))
+        # 每篇 3 个 chunk，单元上限 6 条 → 2 篇一个单元
+        self.assertTrue(all(n <= 6 for n in embedder.calls))
+        self.assertEqual(sum(embedder.calls), 21)
+        stages = result["stages"]
+        self.assertEqual((stages["read"]["items"], stages["chunk"]["items"], stages["embed"]["items"],
+                          stages["write"]["items"]), (7, 21, 21, 21))
+        self.assertEqual(stages["embed"]["requests"], len(embedder.calls))
+        # 写入按批合并：21 条、每批至少 9 条 → 不超过 3 次 upsert
+        self.assertLessEqual(self.vec_repo.upsert.call_count, 3)
+
+    def test_embedding_failure_only_fails_owning_articles(self):
+        result = self._run(_Embedder(fail_on="故障3"))
+        failed = sorted(f["article_id"] for f in result["failed"])
+        self.assertIn(3, failed)
+        self.assertLessEqual(len(failed), 2)
+        self.assertEqual(result["success"], 7 - len(failed))
+        written = {m["article_id"] for c in self.vec_repo.upsert.call_args_list for m in c[1]["metadatas"]}
+        self.assertTrue(written.isdisjoint(failed))
+
+    def test_reader_error_aborts_and_raises(self):
+        def pages():
+            yield [KbArticle(**_row(1))]
+            raise ConnectionError("db down")
+
+        self.kb_repo.iter_pages.return_value = pages()
+        with self.assertRaises(ConnectionError):
+            self._run(_Embedder())
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket_waits_when_empty(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        self.assertEqual(bucket.acquire(), 0.0)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+    def test_limiter_counts_requests_and_tokens(self):
+        limiter = EmbeddingRateLimiter(qps=1000, tpm=600000)
+        limiter.acquire(["abc", "de"])
+        stats = limiter.stats()
+        self.assertEqual((stats["enabled"], stats["requests"], stats["tokens"]), (True, 1, 5))
+        self.assertFalse(EmbeddingRateLimiter().enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
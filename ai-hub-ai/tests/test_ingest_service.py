@@ -0,0 +1,103 @@
+"""IngestService 批量写入测试"""
+import unittest
+from unittest.mock import Mock, patch
+
+from app.infra.embedding.batching import BatchLimits
+from app.schemas.kb_article import KbArticle
+from app.services.ingest_service import IngestService
+
+
+def _article(aid: int) -> KbArticle:
+    return KbArticle(
+        id=aid,
+        tenant_id="default",
+        title=f"故障{aid}",
+        question_text="设备无法射砂怎么办？",
+        cause_text="射砂管堵塞",
+        scope_json='{"设备类型": "造型机"}',
+        status="draft",
+        version=1,
+    )
+
+
+class TestIngestArticles(unittest.TestCase):
+    def setUp(self):
+        self.kb_repo = Mock()
+        self.kb_repo.get_by_ids.return_value = [_article(1), _article(2)]
+        self.vec_repo = Mock()
+        self.vec_repo.upsert.side_effect = lambda ids, **kw: len(ids)
+        self.vec_repo.get_article_metadatas.return_value = {}
+        self.embedder = Mock()
+        self.embedder.embed_texts.side_effect = lambda docs: [[0.1]] * len(docs)
+        self.embedder.batch_limits = BatchLimits(max_items=64)
+        with patch("app.services.ingest_service.get_embedding_store", return_value=None):
+            self.svc = IngestService(self.kb_repo, self.vec_repo, self.embedder)
+
+    def test_one_embedding_call_for_batch(self):
+        result = self.svc.ingest_articles([1, 2, 3])
+        self.embedder.embed_texts.assert_called_once()
+        self.assertEqual(len(self.embedder.embed_texts.call_args[0][0]), 6)
+        self.vec_repo.upsert.assert_called_once()
+        self.assertEqual(result["success"], 2)
+        self.assertEqual(result["upserted_total"], 6)
+        self.assertEqual([f["article_id"] for f in result["failed"]], [3])
+
+    def test_embedding_failure_marks_batch_failed(self):
+        self.embedder.embed_texts.side_effect = RuntimeError("quota")
+        result = self.svc.ingest_articles([1, 2])
+        self.assertEqual(result["success"], 0)
+        self.assertEqual([f["article_id"] for f in result["failed"]], [1, 2])
+
+    def test_failed_embedding_keeps_old_vectors(self):
+        self.embedder.embed_texts.side_effect = RuntimeError("quota")
+        self.svc.ingest_articles([1])
+        self.vec_repo.upsert.assert_not_called()
+        self.vec_repo.delete_ids.assert_not_called()
+
+
+class TestRebuildBatch(unittest.TestCase):
+    def setUp(self):
+        articles = {aid: _article(aid) for aid in range(1, 8)}
+        self.kb_repo = Mock()
+        self.kb_repo.get_by_ids.side_effect = lambda ids: [articles[i] for i in ids if i in articles]
+        self.kb_repo.get_by_id.side_effect = articles.get
+        self.vec_repo = Mock()
+        self.vec_repo.upsert.side_effect = lambda ids, **kw: len(ids)
+        self.vec_repo.get_article_metadatas.return_value = {}
+        self.embedder = Mock()
+        self.embedder.embed_texts.side_effect = lambda docs: [[0.1]] * len(docs)
+        self.embedder.batch_limits = BatchLimits(max_items=10)
+        with patch("app.services.ingest_service.get_embedding_store", return_value=None):
+            self.svc = IngestService(self.kb_repo, self.vec_repo, self.embedder)
+
+    def test_chunks_packed_across_articles(self):
+        result = self.svc.rebuild_batch([1, 2, 3, 4, 5, 6, 7])
+        # 7 篇 × 3 个 chunk = 21 条，按 10 条一批只需 3 次请求
+        self.assertEqual([len(c[0][0]) for c in self.embedder.embed_texts.call_args_list], [10, 10, 1])
+        self.assertEqual((result["success"], result["upserted_total"]), (7, 21))
+
+    def test_failed_batch_only_fails_its_articles(self):
+        calls = []
+
+        def embed(docs):
+            calls.append(len(docs))
+            if len(calls) == 2:
+                raise RuntimeError("timeout")
+            return [[0.1]] * len(docs)
+
+        self.embedder.embed_texts.side_effect = embed
+        result = self.svc.rebuild_batch([1, 2, 3, 4, 5, 6, 7])
+        # 第 2 批为第 11-20 条 chunk，落在第 4-7 篇
+        self.assertEqual([f["article_id"] for f in result["failed"]], [4, 5, 6, 7])
+        self.assertEqual(result["success"], 3)
+        written = {m["article_id"] for m in self.vec_repo.upsert.call_args[1]["metadatas"]}
+        self.assertEqual(written, {1, 2, 3})
+
+    def test_rebuild_article_raises_on_embedding_failure(self):
+        self.embedder.embed_texts.side_effect = RuntimeError("quota")
+        with self.assertRaises(Exception):
+            self.svc.rebuild_article(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
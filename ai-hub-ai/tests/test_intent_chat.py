@@ -2,9 +2,14 @@
 意图识别与闲聊兜底规则测试
 验收：闲聊/能力不查库，故障查库；「你是什么故障」→ solution；LLM 不可用时规则兜底
 """
+from unittest.mock import AsyncMock, patch
+
 import pytest
+from app.services import intent_service
 from app.services.intent_service import (
     Intent,
+    IntentEngine,
+    IntentResult,
     _fallback_rule,
     classify_intent,
 )
@@ -96,6 +101,53 @@ def test_handoff_question_detection():
     assert _is_handoff_question("不射砂") is False
 
 
+# ----- 分层意图引擎：cache → local → llm -----
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("q,intent", [
+    ("你好！", Intent.CHAT),
+    ("转人工", Intent.HANDOFF),
+    ("E001 报警", Intent.SOLUTION),
+    ("你能做什么？", Intent.CAPABILITY),
+])
+async def test_local_tier_skips_llm(q: str, intent: Intent):
+    """确定的情况本地判定，不调用 LLM"""
+    engine = IntentEngine()
+    with patch.object(intent_service, "_classify_by_llm", new=AsyncMock()) as llm:
+        r = await engine.classify(q)
+    llm.assert_not_called()
+    assert r.intent == intent
+    assert r.source == "local"
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_goes_to_llm_then_cache():
+    """模糊输入走 LLM，规范化后相同的消息第二次命中缓存"""
+    engine = IntentEngine()
+    llm = AsyncMock(return_value=IntentResult(Intent.SOLUTION, 0.8, "ok"))
+    with patch.object(intent_service, "_classify_by_llm", new=llm):
+        r1 = await engine.classify("砂型表面有气孔")
+        r2 = await engine.classify("  砂型表面有气孔？ ")
+    assert llm.await_count == 1
+    assert (r1.source, r2.source) == ("llm", "cache")
+    assert r2.intent == Intent.SOLUTION
+    stats = engine.stats()
+    assert (stats["llm"], stats["cache"], stats["total"]) == (1, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_llm_failure_fallback_not_cached():
+    """LLM 异常走兜底规则，且不缓存，下次仍尝试 LLM"""
+    engine = IntentEngine()
+    llm = AsyncMock(side_effect=RuntimeError("down"))
+    with patch.object(intent_service, "_classify_by_llm", new=llm):
+        r = await engine.classify("砂型表面有气孔")
+        await engine.classify("砂型表面有气孔")
+    assert r.source == "fallback"
+    assert llm.await_count == 2
+
+
 # ----- 验收说明 -----
 # 运行：cd ai-hub-ai && pip install -r requirements.txt && python -m pytest tests/test_intent_chat.py -v
 # 若未配置 LLM，classify_intent 会走兜底规则，async 测试仍可验证兜底结果。
@@ -0,0 +1,61 @@
+"""KbArticleRepository 测试"""
+import unittest
+from unittest.mock import Mock
+
+from app.infra.db.sqlserver import SqlServer
+from app.repositories import kb_article_repo
+from app.repositories.kb_article_repo import KbArticleRepository
+
+
+def _row(aid: int) -> dict:
+    return {
+        "id": aid,
+        "tenant_id": "default",
+        "title": f"标题{aid}",
+        "question_text": None,
+        "cause_text": None,
+        "solution_text": None,
+        "tags": None,
+        "scope_json": None,
+        "status": "published",
+        "version": 1,
+    }
+
+
+class TestGetByIds(unittest.TestCase):
+    """get_by_ids 批量回表测试"""
+
+    def setUp(self):
+        self.db = Mock(spec=SqlServer)
+        self.repo = KbArticleRepository(self.db)
+
+    def test_single_query_preserves_hit_order(self):
+        """一次 IN 查询，按命中顺序返回，跳过不存在的 id"""
+        self.db.fetch_all.return_value = [_row(1), _row(3), _row(5)]
+        articles = self.repo.get_by_ids([5, 2, 1, 3])
+        self.assertEqual([a.id for a in articles], [5, 1, 3])
+        self.db.fetch_all.assert_called_once()
+        sql, params = self.db.fetch_all.call_args[0]
+        self.assertIn("IN (?,?,?,?)", sql)
+        self.assertEqual(params, (5, 2, 1, 3))
+
+    def test_empty_ids(self):
+        """空列表不查库"""
+        self.assertEqual(self.repo.get_by_ids([]), [])
+        self.db.fetch_all.assert_not_called()
+
+    def test_duplicates_and_batching(self):
+        """重复 id 去重；超过 IN_BATCH_SIZE 时分批查询"""
+        old = kb_article_repo.IN_BATCH_SIZE
+        kb_article_repo.IN_BATCH_SIZE = 2
+        try:
+            self.db.fetch_all.side_effect = [[_row(1), _row(2)], [_row(3)]]
+            articles = self.repo.get_by_ids([1, 2, 2, 3])
+        finally:
+            kb_article_repo.IN_BATCH_SIZE = old
+        self.assertEqual([a.id for a in articles], [1, 2, 3])
+        self.assertEqual(self.db.fetch_all.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""kb_article 水位增量同步测试"""
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import Mock
+
+from app.services.kb_sync import KbSyncService
+
+_T0 = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def _row(aid: int, minute: int, deleted: bool = False) -> dict:
+    changed_at = _T0 + timedelta(minutes=minute)
+    return {
+        "id": aid,
+        "tenant_id": "default",
+        "title": f"故障{aid}",
+        "question_text": "设备无法射砂怎么办？",
+        "cause_text": None,
+        "solution_text": None,
+        "tags": None,
+        "scope_json": None,
+        "status": "published",
+        "version": 1,
+        "deleted_at": changed_at if deleted else None,
+        "changed_at": changed_at,
+    }
+
+
+class _KbRepo:
+    """按 (changed_at, id) 水位过滤的内存主库"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def list_changes(self, tenant_id, since, since_id=0, limit=200):
+        self.calls.append((since, since_id))
+        out = sorted(
+            (r for r in self.rows if (r["changed_at"], r["id"]) > (since, since_id)),
+            key=lambda r: (r["changed_at"], r["id"]),
+        )
+        return out[:limit]
+
+
+class TestKbSync(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.state_path = str(Path(self._tmp.name) / "sync_state.json")
+        self.kb_repo = _KbRepo([_row(1, 0), _row(2, 1), _row(3, 2, deleted=True), _row(4, 3)])
+        self.ingest = Mock()
+        self.ingest.sync_articles.side_effect = lambda articles: (
+            {"changed": len(articles), "retagged": 0, "removed": 0, "skipped": 0},
+            [],
+        )
+        self.ingest.remove_articles.return_value = 2
+
+    def _service(self, **kw):
+        kw.setdefault("batch_size", 2)
+        kw.setdefault("overlap_seconds", 0)
+        return KbSyncService(self.ingest, self.kb_repo, tenant_id="default", state_path=self.state_path, **kw)
+
+    def test_syncs_changes_and_deletes_in_pages(self):
+        svc = self._service()
+        result = svc.sync_once()
+        self.assertEqual((result["rows"], result["upserted"], result["deleted"]), (4, 3, 1))
+        self.assertTrue(result["caught_up"])
+        synced = [a.id for c in self.ingest.sync_articles.call_args_list for a in c[0][0]]
+        self.assertEqual(synced, [1, 2, 4])
+        self.ingest.remove_articles.assert_any_call("default", [3])
+        self.assertEqual(svc.watermark, (_T0 + timedelta(minutes=3), 4))
+        self.assertIsNotNone(svc.stats()["lag_seconds"])
+
+    def test_watermark_persists_across_restart(self):
+        self._service().sync_once()
+        self.kb_repo.rows.append(_row(5, 10))
+        self.ingest.sync_articles.reset_mock()
+        result = self._service().sync_once()
+        self.assertEqual(result["rows"], 1)
+        self.assertEqual([a.id for a in self.ingest.sync_articles.call_args[0][0]], [5])
+
+    def test_failed_article_holds_watermark(self):
+        self.ingest.sync_articles.side_effect = lambda articles: (
+            {"changed": 0, "retagged": 0, "removed": 0, "skipped": 0},
+            [{"article_id": 2, "error": "quota"}] if any(a.id == 2 for a in articles) else [],
+        )
+        svc = self._service()
+        result = svc.sync_once()
+        self.assertFalse(result["caught_up"])
+        self.assertEqual(svc.watermark, (_T0, 1))
+        self.assertEqual(svc.stats()["last_error"], "quota")
+        # 下一轮从失败的那篇重试
+        self.ingest.sync_articles.side_effect = lambda articles: (
+            {"changed": len(articles), "retagged": 0, "removed": 0, "skipped": 0},
+            [],
+        )
+        first_call = len(self.kb_repo.calls)
+        result = svc.sync_once()
+        self.assertTrue(result["caught_up"])
+        self.assertEqual(self.kb_repo.calls[first_call], (_T0, 1))
+        self.assertEqual(svc.watermark, (_T0 + timedelta(minutes=3), 4))
+
+    def test_overlap_reread_once_after_advance(self):
+        svc = self._service(overlap_seconds=90)
+        svc.sync_once()
+        first_call = len(self.kb_repo.calls)
+        result = svc.sync_once()
+        self.assertEqual(self.kb_repo.calls[first_call], (_T0 + timedelta(minutes=3) - timedelta(seconds=90), 0))
+        # 回看窗口里的行重复处理（内容未变，写入时按指纹跳过），不重复计数，水位不倒退
+        self.assertEqual(result["rows"], 0)
+        self.assertEqual(svc.stats()["rows"], 4)
+        self.assertEqual(svc.watermark, (_T0 + timedelta(minutes=3), 4))
+        # 水位没动：空闲时从水位本身开始读
+        idle_call = len(self.kb_repo.calls)
+        svc.sync_once()
+        self.assertEqual(self.kb_repo.calls[idle_call], (_T0 + timedelta(minutes=3), 4))
+        # 水位推进后再回看一次
+        self.kb_repo.rows.append(_row(5, 10))
+        svc.sync_once()
+        moved_call = len(self.kb_repo.calls)
+        svc.sync_once()
+        self.assertEqual(self.kb_repo.calls[moved_call], (_T0 + timedelta(minutes=10) - timedelta(seconds=90), 0))
+        self.assertEqual(svc.stats()["rows"], 5)
+
+    def test_poison_article_dead_lettered(self):
+        """同一篇连续失败达到上限后转入死信，水位越过它，重启后死信仍在"""
+        self.ingest.sync_articles.side_effect = lambda articles: (
+            {"changed": 0, "retagged": 0, "removed": 0, "skipped": 0},
+            [{"article_id": 2, "error": "too long"}] if any(a.id == 2 for a in articles) else [],
+        )
+        svc = self._service(max_attempts=2)
+        self.assertEqual(svc.sync_once()["failed"][0]["article_id"], 2)
+        self.assertEqual(svc.watermark, (_T0, 1))
+        result = svc.sync_once()
+        self.assertEqual(result["dead_lettered"], [2])
+        self.assertEqual(result["failed"], [])
+        self.assertTrue(result["caught_up"])
+        self.assertEqual(svc.watermark, (_T0 + timedelta(minutes=3), 4))
+        stats = svc.stats()
+        self.assertEqual((stats["dead_letter"], stats["dead_lettered"], stats["failures"]), ([2], 1, 2))
+        self.assertEqual(stats["rows"], 4)
+
+        restarted = self._service(max_attempts=2)
+        self.assertEqual(restarted.stats()["dead_letter"], [2])
+        self.assertEqual(restarted.watermark, (_T0 + timedelta(minutes=3), 4))
+
+        # 修好后再次编辑：写入成功即移出死信
+        self.ingest.sync_articles.side_effect = lambda articles: (
+            {"changed": len(articles), "retagged": 0, "removed": 0, "skipped": 0},
+            [],
+        )
+        edited = _row(2, 20)
+        self.kb_repo.rows = [r for r in self.kb_repo.rows if r["id"] != 2] + [edited]
+        restarted.sync_once()
+        self.assertEqual(restarted.stats()["dead_letter"], [])
+        self.assertEqual(self._service().stats()["dead_letter"], [])
+
+
+class TestListChanges(unittest.TestCase):
+    def test_query_includes_soft_deleted_rows(self):
+        from app.repositories.kb_article_repo import KbArticleRepository
+
+        db = Mock()
+        db.fetch_all.return_value = []
+        KbArticleRepository(db).list_changes("default", _T0, 7, limit=50)
+        sql, params = db.fetch_all.call_args[0]
+        self.assertNotIn("deleted_at IS NULL", sql)
+        self.assertIn("ORDER BY c.changed_at ASC, a.id ASC", sql)
+        self.assertEqual(params, (50, "default", _T0, _T0, 7))
+
+    def test_latest_change_uses_same_changed_at(self):
+        from app.repositories.kb_article_repo import KbArticleRepository
+
+        db = Mock()
+        db.fetch_one.return_value = {"changed_at": _T0}
+        self.assertEqual(KbArticleRepository(db).latest_change("default"), _T0)
+        sql, params = db.fetch_one.call_args[0]
+        self.assertIn("(a.created_at), (a.updated_at), (a.deleted_at)", sql)
+        self.assertEqual(params, ("default",))
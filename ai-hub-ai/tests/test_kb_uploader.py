@@ -0,0 +1,77 @@
+"""知识条目分块上传测试"""
+import asyncio
+import unittest
+
+import httpx
+
+from app.services.kb_uploader import KbBatchUploader
+
+
+def _article(n: int, with_asset: bool = False) -> dict:
+    a = {"title": f"t{n}", "_has_attachment_reference": with_asset}
+    if with_asset:
+        a["_attachment_info"] = [{"asset_type": "video", "file_name": f"{n}.mp4", "url": f"u/{n}", "size": 1}]
+    return a
+
+
+class _FakeDotnet:
+    def __init__(self, fail_first=0, fail_titles=()):
+        self.article_calls = []
+        self.asset_calls = []
+        self._fail_first = fail_first
+        self._fail_titles = set(fail_titles)
+        self._next_id = 100
+
+    async def batch_create_articles(self, articles):
+        self.article_calls.append([a["title"] for a in articles])
+        if self._fail_first > 0:
+            self._fail_first -= 1
+            raise httpx.ConnectError("down")
+        results = []
+        for i, a in enumerate(articles):
+            assert not any(k.startswith("_") for k in a)
+            if a["title"] in self._fail_titles:
+                results.append({"index": i, "success": False, "error": "重复"})
+            else:
+                self._next_id += 1
+                results.append({"index": i, "success": True, "articleId": self._next_id})
+        await asyncio.sleep(0)
+        return {"successCount": sum(r["success"] for r in results), "results": results}
+
+    async def batch_create_assets(self, assets):
+        self.asset_calls.append([a["articleId"] for a in assets])
+        return {"successCount": len(assets), "failureCount": 0}
+
+
+class TestKbBatchUploader(unittest.TestCase):
+    def test_chunks_assets_and_failure_rows(self):
+        dotnet = _FakeDotnet(fail_titles={"t3"})
+        articles = [_article(n, with_asset=n % 2 == 0) for n in range(5)]
+        rows = [10, 12, 15, 17, 20]
+        uploader = KbBatchUploader(dotnet, page_size=2, concurrency=2, max_attempts=1)
+        result = asyncio.run(uploader.upload(articles, rows))
+
+        self.assertEqual(dotnet.article_calls, [["t0", "t1"], ["t2", "t3"], ["t4"]])
+        self.assertEqual(result.success_count, 4)
+        self.assertEqual(len(result.article_ids), 4)
+        # 失败行号是 Excel 原行号，而不是块内下标
+        self.assertEqual(result.failures, [{"row_index": 17, "reason": "重复"}])
+        self.assertEqual(result.asset_success, 3)
+        self.assertEqual(len(dotnet.asset_calls), 3)
+
+    def test_retry_connect_error(self):
+        dotnet = _FakeDotnet(fail_first=1)
+        uploader = KbBatchUploader(dotnet, page_size=10, concurrency=1, max_attempts=2)
+        result = asyncio.run(uploader.upload([_article(0)], [2]))
+        self.assertEqual(result.success_count, 1)
+        self.assertEqual(len(dotnet.article_calls), 2)
+
+    def test_all_chunks_failed_raises(self):
+        dotnet = _FakeDotnet(fail_first=10)
+        uploader = KbBatchUploader(dotnet, page_size=1, concurrency=2, max_attempts=1)
+        with self.assertRaises(httpx.ConnectError):
+            asyncio.run(uploader.upload([_article(0), _article(1)], [2, 3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""对话 LLM 客户端单例测试"""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from app.clients import deepseek_client
+from app.clients.deepseek_client import get_llm_client, reset_llm_client
+from app.services import llm_service
+
+
+class TestLlmClientSingleton(unittest.TestCase):
+    def tearDown(self):
+        reset_llm_client()
+
+    def test_same_instance_until_reset(self):
+        first = get_llm_client()
+        self.assertIs(first, get_llm_client())
+        reset_llm_client()
+        self.assertIsNot(first, get_llm_client())
+
+    def test_call_llm_reuses_singleton(self):
+        """多次 call_llm 不再重复构造 DeepSeekClient"""
+        client = get_llm_client()
+        client.api_key = "k"
+        client.chat = AsyncMock(return_value="ok")
+        with patch.object(deepseek_client, "DeepSeekClient") as ctor:
+            self.assertEqual(asyncio.run(llm_service.call_llm("a")), "ok")
+            self.assertEqual(asyncio.run(llm_service.call_llm("b")), "ok")
+            ctor.assert_not_called()
+        self.assertEqual(client.chat.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
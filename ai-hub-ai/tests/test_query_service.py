@@ -1,6 +1,7 @@
 """QueryService 测试"""
+import asyncio
 import unittest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import AsyncMock, Mock, MagicMock
 from app.services.query_service import QueryService
 from app.repositories.vector_repo import VectorRepository
 from app.infra.embedding.base import IEmbedder
@@ -199,6 +200,28 @@ class TestQueryService(unittest.TestCase):
         hits = [{"article_id": 1, "score": 0.8}, {"article_id": 2, "score": 0.7}]
         self.assertFalse(self.query_service._need_fallback(hits, 2))
 
+    def test_aquery_uses_async_embedding(self):
+        """测试异步查询：走 aembed_texts，检索结果与同步版本一致"""
+        self.mock_embedder.aembed_texts = AsyncMock(return_value=[[0.1, 0.2, 0.3]])
+        self.mock_vec_repo.query.return_value = [
+            {
+                "id": "default:kb:1:q",
+                "score": 0.1,
+                "metadata": {"tenant_id": "default", "article_id": 1, "type": "q"},
+            }
+        ]
+
+        result = asyncio.run(self.query_service.aquery(
+            tenant_id="default",
+            query_text="设备故障",
+            top_k=5,
+        ))
+
+        self.mock_embedder.aembed_texts.assert_awaited_once_with(["设备故障"])
+        self.mock_embedder.embed_texts.assert_not_called()
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["article_id"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
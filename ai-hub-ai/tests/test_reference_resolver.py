@@ -0,0 +1,127 @@
+"""参考资料解析缓存测试"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.services.attachment_service import AttachmentService, get_local_attachment_index
+from app.services.chat_service import _resolve_reference_resources
+from app.services.reference_resolver import ReferenceResolver
+
+
+class _FakeService:
+    """按版本对象返回固定结果，记录查找次数"""
+
+    def __init__(self, files):
+        self.files = files
+        self.version = object()
+        self.calls = 0
+        self.fail = False
+
+    def catalog_version(self):
+        return self.version
+
+    def find_attachment_files_exact(self, name):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("boom")
+        return [dict(f) for f in self.files.get(name, [])]
+
+
+_FILES = {
+    "主泵清洗": [{"file_name": "主泵清洗.mp4", "url": "https://files/uploads/主泵清洗.mp4", "type": "video", "size": 3}],
+    "141泵": [
+        {"file_name": "a.jpg", "url": "https://files/uploads/141泵/a.jpg", "type": "image"},
+        {"file_name": "a.jpg", "url": "https://files/uploads/141泵/a.jpg", "type": "image"},
+        {"file_name": "sub", "url": "https://files/uploads/141泵/sub", "type": "directory"},
+    ],
+}
+
+
+class TestReferenceResolver(unittest.TestCase):
+    def setUp(self):
+        self.service = _FakeService(_FILES)
+        self.resolver = ReferenceResolver(self.service, max_entries=2)
+
+    def test_hit_skips_lookup(self):
+        first = self.resolver.resolve("主泵清洗")
+        second = self.resolver.resolve("主泵清洗")
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["name"], "主泵清洗.mp4")
+        self.assertEqual(self.service.calls, 1)
+        stats = self.resolver.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_items_deduped_and_directory_as_other(self):
+        items = self.resolver.resolve("141泵")
+        self.assertEqual([i["type"] for i in items], ["image", "other"])
+
+    def test_returned_items_are_copies(self):
+        self.resolver.resolve("主泵清洗")[0]["name"] = "改过"
+        self.assertEqual(self.resolver.resolve("主泵清洗")[0]["name"], "主泵清洗.mp4")
+
+    def test_catalog_change_invalidates(self):
+        self.resolver.resolve("主泵清洗")
+        self.service.version = object()
+        self.resolver.resolve("主泵清洗")
+        self.assertEqual(self.service.calls, 2)
+        self.assertEqual(self.resolver.stats()["invalidations"], 1)
+
+    def test_lru_eviction(self):
+        self.resolver.resolve("主泵清洗")
+        self.resolver.resolve("141泵")
+        self.resolver.resolve("主泵清洗")
+        self.resolver.resolve("未知")
+        stats = self.resolver.stats()
+        self.assertEqual((stats["size"], stats["evictions"]), (2, 1))
+        self.resolver.resolve("主泵清洗")
+        self.assertEqual(self.service.calls, 3)  # 141泵 被淘汰，主泵清洗仍命中
+
+    def test_errors_not_cached(self):
+        self.service.fail = True
+        self.assertEqual(self.resolver.resolve("主泵清洗"), [])
+        self.service.fail = False
+        self.assertEqual(len(self.resolver.resolve("主泵清洗")), 1)
+        self.assertEqual(self.resolver.stats()["errors"], 1)
+
+    def test_zero_size_disables_cache(self):
+        resolver = ReferenceResolver(self.service, max_entries=0)
+        resolver.resolve("主泵清洗")
+        resolver.resolve("主泵清洗")
+        self.assertEqual(self.service.calls, 2)
+        self.assertFalse(resolver.stats()["enabled"])
+
+    def test_chat_resources_placeholder_and_cross_reference_dedup(self):
+        files = dict(_FILES, 主泵清洗2=_FILES["主泵清洗"])
+        resolver = ReferenceResolver(_FakeService(files))
+        with patch("app.services.chat_service.get_reference_resolver", return_value=resolver):
+            items = _resolve_reference_resources('参考"主泵清洗"，参考"主泵清洗2"，参考"未知"', None)
+        self.assertEqual([(i.name, i.url) for i in items], [
+            ("主泵清洗.mp4", "https://files/uploads/主泵清洗.mp4"),
+            ("未知", ""),
+        ])
+
+
+class TestLocalCatalogVersion(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        (self.base / "主泵清洗.mp4").write_bytes(b"x")
+        self.service = AttachmentService(base_path=str(self.base), base_url="http://files/uploads",
+                                         files_api_base_url="", remote_path="")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_index_rebuild_invalidates_resolver(self):
+        resolver = ReferenceResolver(self.service)
+        self.assertEqual(resolver.resolve("步骤说明"), [])
+        (self.base / "步骤说明.pdf").write_bytes(b"x")
+        self.assertEqual(resolver.resolve("步骤说明"), [])  # 索引未刷新，仍走缓存
+        get_local_attachment_index(str(self.base)).invalidate()
+        self.assertEqual([i["name"] for i in resolver.resolve("步骤说明")], ["步骤说明.pdf"])
+        self.assertEqual(resolver.stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""文本规范化引擎测试：与原逐条正则实现结果一致"""
+import unittest
+
+import pandas as pd
+
+from app.utils.text_normalize import clean_labels, clean_labels_batch, clean_labels_series, reference_names_batch
+from scripts.bench_text_normalize import check_equivalence, legacy_extract_reference_names, make_corpus
+
+
+class TestTextNormalize(unittest.TestCase):
+    def test_matches_legacy_on_random_corpus(self):
+        for seed in range(3):
+            check_equivalence(make_corpus(3000, seed=seed))
+
+    def test_mixed_bracket_nesting(self):
+        # 【】先于 [] 清理，与原规则顺序一致
+        self.assertEqual(clean_labels("[a【序号】b]"), "[ab]")
+        self.assertEqual(clean_labels("【a[序号]b】"), "")
+        self.assertEqual(clean_labels("【x【现象】y】"), "y】")
+
+    def test_batch_apis(self):
+        texts = ["【序号】1  a", "[yh400]x", "【序号】1  a", ""]
+        expected = [clean_labels(t) for t in texts]
+        self.assertEqual(clean_labels_batch(texts), expected)
+        got = clean_labels_series(pd.Series(texts, index=[5, 6, 7, 8]))
+        self.assertEqual(got.tolist(), expected)
+        self.assertEqual(got.index.tolist(), [5, 6, 7, 8])
+
+        pairs = [('参考"主泵清洗"，参考：阀', None), (None, "见附件：a.pdf"), ('参考"主泵清洗"，参考：阀', None)]
+        self.assertEqual(reference_names_batch(pairs), [legacy_extract_reference_names(*p) for p in pairs])
+
+
+if __name__ == "__main__":
+    unittest.main()
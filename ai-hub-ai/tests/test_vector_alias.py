@@ -0,0 +1,177 @@
+"""向量集合影子重建与别名切换测试"""
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from app.core.config import settings
+from app.infra.vectorstore.chroma_store import ChromaVectorStore
+from app.repositories.vector_repo import VectorRepository
+from app.services.ingest_service import IngestService
+
+
+class _Collection:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for i, e, d, m in zip(ids, embeddings, documents, metadatas):
+            self.rows[i] = (e, d, m)
+
+    def delete(self, ids=None, where=None):
+        for i in ids or []:
+            self.rows.pop(i, None)
+
+    def count(self):
+        return len(self.rows)
+
+
+class _Client:
+    """内存版 Chroma PersistentClient"""
+
+    def __init__(self):
+        self.collections = {}
+
+    def get_or_create_collection(self, name):
+        return self.collections.setdefault(name, _Collection())
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def list_collections(self):
+        return list(self.collections)
+
+
+def _upsert(store, vid):
+    store.upsert([vid], [[0.1]], [vid], [{"article_id": 1}])
+
+
+class TestChromaAlias(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        patcher = patch.multiple(settings, CHROMA_PERSIST_DIR=self._tmp.name, CHROMA_COLLECTION="kb")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = _Client()
+        self.store = ChromaVectorStore(client=self.client)
+        _upsert(self.store, "old")
+
+    def test_shadow_build_keeps_serving_then_swaps(self):
+        shadow = self.store.begin_shadow()
+        _upsert(shadow, "new")
+        # 构建期间当前集合不变，增量写入同时进影子集合
+        self.assertEqual(self.store.count(), 1)
+        _upsert(self.store, "live")
+        self.assertEqual(set(self.client.collections[shadow.collection_name].rows), {"new", "live"})
+
+        info = self.store.promote_shadow(shadow)
+        self.assertEqual((info["active"], info["previous"]), (shadow.collection_name, "kb"))
+        self.assertEqual(self.store.count(), 2)
+        # 别名已落盘：新实例（如另一个进程）直接用新集合
+        self.assertEqual(ChromaVectorStore(client=self.client).collection_name, shadow.collection_name)
+
+    def test_rollback_and_old_version_cleanup(self):
+        first = self.store.begin_shadow()
+        self.store.promote_shadow(first)
+        with patch.object(self.store._alias, "new_version_name", return_value="kb__v2"):
+            second = self.store.begin_shadow()
+        info = self.store.promote_shadow(second)
+        # 只保留当前与上一版本
+        self.assertEqual(info["dropped"], ["kb"])
+        self.assertEqual(self.store.rollback(), {"active": first.collection_name, "previous": "kb__v2"})
+        self.assertEqual(self.store.collection_info()["active"], first.collection_name)
+
+    def test_other_process_swap_is_followed(self):
+        other = ChromaVectorStore(client=self.client)
+        shadow = other.begin_shadow()
+        _upsert(shadow, "new")
+        other.promote_shadow(shadow)
+        self.assertEqual(self.store.collection_info()["active"], shadow.collection_name)
+
+    def test_abort_drops_shadow(self):
+        shadow = self.store.begin_shadow()
+        self.store.abort_shadow(shadow)
+        self.assertNotIn(shadow.collection_name, self.client.collections)
+        _upsert(self.store, "live")
+        self.assertEqual(self.store.collection_info()["shadow"], None)
+
+
+class TestShadowRebuild(unittest.TestCase):
+    def setUp(self):
+        self.vec_repo = Mock(spec=VectorRepository)
+        self.shadow = Mock(spec=VectorRepository)
+        self.vec_repo.begin_shadow.return_value = self.shadow
+        self.vec_repo.promote_shadow.return_value = {"active": "kb__v2", "previous": "kb", "dropped": []}
+        self.vec_repo.count.return_value = 100
+        self.kb_repo = Mock()
+        self.kb_repo.latest_change.return_value = datetime(2026, 1, 1, 8, 0, 0)
+        self.kb_repo.list_changes.return_value = []
+        with patch("app.services.ingest_service.get_embedding_store", return_value=None):
+            self.svc = IngestService(self.kb_repo, self.vec_repo, Mock())
+        self.result = {"total": 10, "success": 10, "failed": []}
+
+    def _rebuild(self):
+        with patch("app.services.ingest_service.IngestPipeline") as pipeline:
+            pipeline.return_value.run.return_value = dict(self.result)
+            result = self.svc.rebuild_all("default", clear_first=True)
+        self.assertIs(pipeline.call_args[0][1], self.shadow)
+        return result
+
+    def test_promotes_validated_shadow(self):
+        self.shadow.count.return_value = 95
+        result = self._rebuild()
+        self.assertTrue(result["swap"]["promoted"])
+        self.vec_repo.promote_shadow.assert_called_once_with(self.shadow)
+        self.vec_repo.clear_collection.assert_not_called()
+
+    def test_keeps_active_when_shadow_too_small(self):
+        self.shadow.count.return_value = 10
+        result = self._rebuild()
+        self.assertFalse(result["swap"]["promoted"])
+        self.vec_repo.promote_shadow.assert_not_called()
+        self.vec_repo.abort_shadow.assert_called_once_with(self.shadow)
+
+    def test_keeps_active_when_too_many_failures(self):
+        self.shadow.count.return_value = 100
+        self.result["failed"] = [{"article_id": 1, "error": "quota"}]
+        result = self._rebuild()
+        self.assertFalse(result["swap"]["promoted"])
+        self.vec_repo.abort_shadow.assert_called_once_with(self.shadow)
+
+    def _changes_during_rebuild(self):
+        t = datetime(2026, 1, 1, 8, 5, 0)
+        base = {"tenant_id": "default", "question_text": "设备无法射砂怎么办？", "status": "published", "version": 2}
+        self.kb_repo.list_changes.side_effect = [
+            [
+                {**base, "id": 5, "title": "改过的", "deleted_at": None, "changed_at": t},
+                {**base, "id": 6, "title": "删掉的", "deleted_at": t, "changed_at": t},
+            ],
+            [],
+        ]
+        self.shadow.get_article_metadatas.return_value = {"default:6:question": {}}
+
+    def test_replays_changes_made_during_rebuild(self):
+        """重建在独立进程里跑时，期间主库的编辑 / 删除在切换前补写进影子集合"""
+        self._changes_during_rebuild()
+        self.shadow.count.return_value = 100
+        with patch.object(self.svc, "_write_articles", return_value=({}, [])) as write:
+            result = self._rebuild()
+        since = self.kb_repo.list_changes.call_args_list[0][0][1]
+        self.assertEqual(since, datetime(2026, 1, 1, 8, 0, 0) - timedelta(seconds=settings.KB_SYNC_OVERLAP_SECONDS))
+        articles, target = write.call_args[0]
+        self.assertEqual(([a.id for a in articles], target), ([5], self.shadow))
+        self.shadow.delete_ids.assert_called_once_with(["default:6:question"])
+        self.assertEqual({k: result["replayed"][k] for k in ("rows", "upserted", "deleted")},
+                         {"rows": 2, "upserted": 1, "deleted": 1})
+        self.assertTrue(result["swap"]["promoted"])
+
+    def test_replay_failures_block_swap(self):
+        self._changes_during_rebuild()
+        self.shadow.count.return_value = 100
+        self.result["total"] = 1
+        failed = [{"article_id": 5, "error": "quota"}]
+        with patch.object(self.svc, "_write_articles", return_value=({}, failed)):
+            result = self._rebuild()
+        self.assertFalse(result["swap"]["promoted"])
+        self.vec_repo.promote_shadow.assert_not_called()
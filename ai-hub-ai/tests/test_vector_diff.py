@@ -0,0 +1,116 @@
+"""向量增量重建（内容指纹比对）测试"""
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+from app.infra.embedding.batching import BatchLimits
+from app.schemas.kb_article import KbArticle
+from app.services.ingest_service import IngestService
+from app.services.vector_diff import HASH_FIELD
+
+
+class _MemoryVectorRepo:
+    """内存版向量库：{id: (vector, doc, metadata)}，记录各操作次数"""
+
+    def __init__(self):
+        self.rows = {}
+        self.ops = {"upsert": 0, "update": 0, "delete": 0}
+
+    def get_article_metadatas(self, tenant_id, article_ids):
+        return {vid: dict(m) for vid, (_, _, m) in self.rows.items()
+                if m["tenant_id"] == tenant_id and m["article_id"] in article_ids}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.ops["upsert"] += 1
+        for vid, vec, doc, meta in zip(ids, embeddings, documents, metadatas):
+            self.rows[vid] = (vec, doc, {k: v for k, v in meta.items() if v is not None})
+        return len(ids)
+
+    def update_metadatas(self, ids, metadatas):
+        self.ops["update"] += 1
+        for vid, meta in zip(ids, metadatas):
+            vec, doc, _ = self.rows[vid]
+            self.rows[vid] = (vec, doc, {k: v for k, v in meta.items() if v is not None})
+
+    def delete_ids(self, ids):
+        self.ops["delete"] += 1
+        for vid in ids:
+            self.rows.pop(vid, None)
+
+
+def _article(aid: int, **overrides) -> KbArticle:
+    data = dict(
+        id=aid,
+        tenant_id="default",
+        title=f"故障{aid}",
+        question_text="设备无法射砂怎么办？",
+        cause_text="射砂管堵塞",
+        scope_json=json.dumps({"设备类型": "造型机"}, ensure_ascii=False),
+        status="published",
+        version=1,
+    )
+    data.update(overrides)
+    return KbArticle(**data)
+
+
+class TestIncrementalRebuild(unittest.TestCase):
+    def setUp(self):
+        self.articles = {1: _article(1), 2: _article(2)}
+        self.kb_repo = Mock()
+        self.kb_repo.get_by_ids.side_effect = lambda ids: [self.articles[i] for i in ids if i in self.articles]
+        self.vec_repo = _MemoryVectorRepo()
+        self.embedder = Mock()
+        self.embedder.model_name = "text-embedding-v3"
+        self.embedder.dimensions = 1024
+        self.embedder.batch_limits = BatchLimits(max_items=64)
+        self.embedder.embed_texts.side_effect = lambda docs: [[0.1]] * len(docs)
+        with patch("app.services.ingest_service.get_embedding_store", return_value=None):
+            self.svc = IngestService(self.kb_repo, self.vec_repo, self.embedder)
+        self.first = self.svc.rebuild_batch([1, 2])
+        self.embedder.embed_texts.reset_mock()
+
+    def test_first_build_stamps_hash(self):
+        self.assertEqual(self.first["changed"], len(self.vec_repo.rows))
+        self.assertTrue(all(HASH_FIELD in m for _, _, m in self.vec_repo.rows.values()))
+
+    def test_unchanged_rebuild_makes_no_calls(self):
+        result = self.svc.rebuild_batch([1, 2])
+        self.embedder.embed_texts.assert_not_called()
+        self.assertEqual((result["changed"], result["skipped"], result["removed"]), (0, self.first["changed"], 0))
+        self.assertEqual(result["success"], 2)
+
+    def test_only_changed_article_reembedded(self):
+        self.articles[2] = _article(2, cause_text="射砂阀损坏")
+        result = self.svc.rebuild_batch([1, 2])
+        docs = self.embedder.embed_texts.call_args[0][0]
+        self.assertTrue(docs and all("射砂阀损坏" in d for d in docs))
+        self.assertEqual(result["changed"], len(docs))
+
+    def test_metadata_only_change_is_retagged(self):
+        self.articles[1] = _article(1, status="archived")
+        result = self.svc.rebuild_batch([1])
+        self.embedder.embed_texts.assert_not_called()
+        self.assertGreater(result["retagged"], 0)
+        self.assertEqual({m["status"] for _, _, m in self.vec_repo.rows.values() if m["article_id"] == 1}, {"archived"})
+
+    def test_stale_ids_removed(self):
+        before = {vid for vid, (_, _, m) in self.vec_repo.rows.items() if m["article_id"] == 1}
+        self.articles[1] = _article(1, question_text=None, cause_text=None)
+        result = self.svc.rebuild_batch([1])
+        after = {vid for vid, (_, _, m) in self.vec_repo.rows.items() if m["article_id"] == 1}
+        self.assertTrue(after < before)
+        self.assertEqual(result["removed"], len(before - after))
+
+    def test_model_change_reembeds_everything(self):
+        self.embedder.dimensions = 512
+        result = self.svc.rebuild_batch([1, 2])
+        self.assertEqual(result["changed"], self.first["changed"])
+
+    def test_skip_can_be_disabled(self):
+        with patch("app.services.vector_diff.settings.INGEST_SKIP_UNCHANGED", False):
+            result = self.svc.rebuild_batch([1, 2])
+        self.assertEqual((result["changed"], result["skipped"]), (self.first["changed"], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -73,6 +73,59 @@ public class InternalApiController : BaseController
         return Ok(response);
     }
 
+    /// <summary>
+    /// 批量更新知识条目（Excel 重复导入时更新内容有变化的行，状态不变）
+    /// </summary>
+    [HttpPut("batch")]
+    public async Task<ActionResult<BatchCreateArticlesResponseDto>> BatchUpdate(
+        [FromBody] BatchUpdateArticlesRequestDto request)
+    {
+        if (request.Articles == null || request.Articles.Count == 0)
+        {
+            return BadRequest("Articles 列表不能为空");
+        }
+
+        var tenantId = GetTenantId();
+        var response = new BatchCreateArticlesResponseDto();
+
+        for (int i = 0; i < request.Articles.Count; i++)
+        {
+            var articleDto = request.Articles[i];
+            var resultItem = new BatchCreateResultItemDto { Index = i, ArticleId = articleDto.ArticleId };
+
+            try
+            {
+                if (string.IsNullOrWhiteSpace(articleDto.Title))
+                {
+                    resultItem.Success = false;
+                    resultItem.Error = "Title 不能为空";
+                    response.FailureCount++;
+                }
+                else if (await _knowledgeArticleService.UpdateAsync(articleDto.ArticleId, articleDto, tenantId) == null)
+                {
+                    resultItem.Success = false;
+                    resultItem.Error = "未找到或不属于当前租户";
+                    response.FailureCount++;
+                }
+                else
+                {
+                    resultItem.Success = true;
+                    response.SuccessCount++;
+                }
+            }
+            catch (Exception ex)
+            {
+                resultItem.Success = false;
+                resultItem.Error = ex.Message;
+                response.FailureCount++;
+            }
+
+            response.Results.Add(resultItem);
+        }
+
+        return Ok(response);
+    }
+
     /// <summary>
     /// 批量发布知识条目
     /// </summary>
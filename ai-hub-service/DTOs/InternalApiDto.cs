@@ -29,6 +29,22 @@ public class BatchCreateResultItemDto
     public string? Error { get; set; }
 }
 
+/// <summary>
+/// 批量更新知识条目请求 DTO（内部 API，Excel 增量导入用）
+/// </summary>
+public class BatchUpdateArticlesRequestDto
+{
+    public List<BatchUpdateArticleItemDto> Articles { get; set; } = new();
+}
+
+/// <summary>
+/// 批量更新项：目标条目 ID + 新内容
+/// </summary>
+public class BatchUpdateArticleItemDto : UpdateKnowledgeArticleDto
+{
+    public int ArticleId { get; set; }
+}
+
 /// <summary>
 /// 批量发布请求 DTO
 /// </summary>
@@ -15,6 +15,8 @@ public class StartConversationRequest
 public class AppendMessageRequest
 {
     public Guid ConversationId { get; set; }
+    /// <summary>调用方预生成的消息 ID（Python 审计队列异步写入时使用），为空则由服务端生成</summary>
+    public Guid? MessageId { get; set; }
     public string Role { get; set; } = "user";
     public string Content { get; set; } = "";
     public bool IsMasked { get; set; }
@@ -75,7 +75,7 @@ public class AiAuditService : IAiAuditService
     {
         var message = new AiMessage
         {
-            MessageId = Guid.NewGuid(),
+            MessageId = request.MessageId ?? Guid.NewGuid(),
             ConversationId = request.ConversationId,
             Role = request.Role,
             Content = request.Content,